@@ -3,9 +3,13 @@ Analysis API Routes
 Harmonic analysis, chord overrides, key region management, and theory chat.
 """
 from fastapi import APIRouter, HTTPException, Depends
+from fastapi.concurrency import run_in_threadpool
 from typing import Optional, List
 from pydantic import BaseModel
 from app.services.analysis_service import analyze_song, HarmonicAnalyzer
+from app.services.analysis_executor import analysis_executor, AnalysisTimeout
+from app.services import analysis_cache, chord_timeline, song_artifacts
+from app.db import codec
 from app.db.connection import DatabaseConnection, get_db
 import json
 import re
@@ -145,13 +149,19 @@ def _merge_key_regions(algorithm_regions: list, user_defined_regions: list) -> l
     return merged
 
 
+def _detect_patterns(chords: list) -> tuple:
+    """ii-V-I patterns and turnarounds for analyzed chords (runs on the analysis executor)."""
+    from app.services.key_center_service import detect_ii_v_i_patterns, detect_turnarounds
+    return detect_ii_v_i_patterns(chords), detect_turnarounds(chords)
+
+
 @router.get("/songs/{song_id}/key-centers")
 async def get_key_centers(
     song_id: int,
     db: DatabaseConnection = Depends(get_db),
 ):
     """Get key center regions for a song."""
-    from app.services.key_center_service import detect_key_centers, detect_ii_v_i_patterns, detect_turnarounds
+    from app.services.key_center_service import detect_key_centers
 
     # Get analysis data
     analysis = await get_analysis(song_id, db=db)
@@ -159,7 +169,7 @@ async def get_key_centers(
     detected_key = analysis.get('detected_key', 'C')
 
     # HM35D: Always compute algorithm regions, then merge with user-defined KeyRegions
-    algorithm_regions = detect_key_centers(chords, detected_key)
+    algorithm_regions = await _run_analysis(detect_key_centers, chords, detected_key)
     # Ensure algorithm regions have all required fields
     for ar in algorithm_regions:
         ar.setdefault('start_chord_index', ar.get('start_index'))
@@ -168,7 +178,8 @@ async def get_key_centers(
         ar.setdefault('is_user_defined', False)
 
     # Get user-defined regions from KeyRegions table
-    user_defined_rows = db.execute_query(
+    user_defined_rows = await run_in_threadpool(
+        db.execute_query,
         "SELECT start_chord_index, end_chord_index, key_center, transition_type, "
         "is_user_defined "
         "FROM KeyRegions WHERE song_id = ? AND is_user_defined = 1 "
@@ -197,8 +208,7 @@ async def get_key_centers(
     if user_defined_regions:
         detected_key = user_defined_regions[0]['key_center']
 
-    patterns = detect_ii_v_i_patterns(chords)
-    turnarounds = detect_turnarounds(chords)
+    patterns, turnarounds = await _run_analysis(_detect_patterns, chords)
 
     return {
         'song_id': song_id,
@@ -215,13 +225,10 @@ async def get_patterns(
     db: DatabaseConnection = Depends(get_db),
 ):
     """Get detected harmonic patterns for a song (ii-V-I + turnarounds)."""
-    from app.services.key_center_service import detect_ii_v_i_patterns, detect_turnarounds
-
     analysis = await get_analysis(song_id, db=db)
     chords = analysis.get('chords', [])
 
-    patterns = detect_ii_v_i_patterns(chords)
-    turnarounds = detect_turnarounds(chords)
+    patterns, turnarounds = await _run_analysis(_detect_patterns, chords)
 
     return {
         'song_id': song_id,
@@ -237,7 +244,7 @@ async def get_phrases(
 ):
     """HL-046: Get phrase boundaries for a song (from section markers or default 8-bar groups)."""
     # Check song exists
-    songs = db.execute_query("SELECT id, section_markers_json FROM Songs WHERE id = ?", (song_id,))
+    songs = db.execute_query("SELECT id FROM Songs WHERE id = ?", (song_id,))
     if not songs:
         raise HTTPException(status_code=404, detail="Song not found")
 
@@ -250,7 +257,7 @@ async def get_phrases(
     total_measures = measure_count or 0
 
     phrases = []
-    markers_json = songs[0].get('section_markers_json')
+    markers_json = song_artifacts.get(song_id, song_artifacts.SECTION_MARKERS, db)
     if markers_json:
         try:
             markers = json.loads(markers_json)
@@ -315,33 +322,35 @@ class TransposeRequest(BaseModel):
     semitones: int
 
 
-@router.post("/songs/{song_id}/transpose")
-async def transpose_song(
-    song_id: int,
-    request: TransposeRequest,
-    db: DatabaseConnection = Depends(get_db),
-):
-    """Transpose a song's analysis by N semitones. Session-only, not persisted."""
-    semitones = max(-11, min(11, request.semitones))
+async def _run_analysis(fn, *args):
+    """Run CPU-bound analysis on the analysis executor; 504 if it times out."""
+    try:
+        return await analysis_executor.run(fn, *args)
+    except AnalysisTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
 
+
+# HL-TRANSPOSE-001: music21 produces #III, #IV etc. for chromatic chords — jazz convention uses bIV, bV
+# Handles both uppercase (major) and lowercase (minor) roman numerals
+_SHARP_TO_FLAT_RE = re.compile(
+    r'^#(VII|VI|V|IV|III|II|I|vii|vi|v|iv|iii|ii|i)(.*)'
+)
+_DEGREE_NEXT = {
+    'I': 'II', 'II': 'III', 'III': 'IV', 'IV': 'V', 'V': 'VI', 'VI': 'VII', 'VII': 'I',
+    'i': 'ii', 'ii': 'iii', 'iii': 'iv', 'iv': 'v', 'v': 'vi', 'vi': 'vii', 'vii': 'i',
+}
+
+
+def _load_transpose_inputs(song_id: int, db: DatabaseConnection) -> dict:
+    """DB stage of transpose_song: chords, untransposed notes and the original key."""
     # Get chords for this song
-    chords = db.execute_query("""
-        SELECT c.chord_symbol, m.measure_number, c.beat_position, c.chord_order
-        FROM Chords c
-        JOIN Measures m ON c.measure_id = m.id
-        JOIN Sections s ON m.section_id = s.id
-        WHERE s.song_id = ?
-        ORDER BY s.section_order, m.measure_number, c.chord_order
-    """, (song_id,))
+    chords = chord_timeline.load(song_id, db)
 
     if not chords:
         raise HTTPException(status_code=404, detail="No chords found for this song")
 
-    # Transpose each chord symbol
-    transposed_symbols = [transpose_chord_symbol(c['chord_symbol'], semitones) for c in chords]
-
-    # Fetch and transpose MIDI notes for note-based key detection
-    transposed_midi = None
+    # Fetch MIDI notes for note-based key detection
+    midi_notes = None
     notes_per_measure = {}
     try:
         note_rows = db.execute_query("""
@@ -350,7 +359,7 @@ async def transpose_song(
             ORDER BY measure_num, beat
         """, (song_id,))
         if note_rows:
-            transposed_midi = [r['midi_pitch'] + semitones for r in note_rows]
+            midi_notes = [r['midi_pitch'] for r in note_rows]
             for r in note_rows:
                 m = r['measure_num']
                 notes_per_measure[m] = notes_per_measure.get(m, 0) + 1
@@ -366,27 +375,41 @@ async def transpose_song(
                 ORDER BY measure_number, beat_position
             """, (song_id,))
             if legacy_rows:
-                transposed_midi = [r['midi_note'] + semitones for r in legacy_rows]
+                midi_notes = [r['midi_note'] for r in legacy_rows]
                 for r in legacy_rows:
                     m = r['measure_number']
                     notes_per_measure[m] = notes_per_measure.get(m, 0) + 1
         except Exception:
             pass
 
+    # Report original key from Songs table
+    songs = db.execute_query("SELECT original_key FROM Songs WHERE id = ?", (song_id,))
+    original_key = (songs[0].get('original_key') or 'C') if songs else 'C'
+
+    return {
+        'chords': chords,
+        'midi_notes': midi_notes,
+        'notes_per_measure': notes_per_measure,
+        'original_key': original_key,
+    }
+
+
+def _transpose_analysis(inputs: dict, semitones: int) -> dict:
+    """CPU stage of transpose_song (runs on the analysis executor)."""
+    chords = inputs['chords']
+    notes_per_measure = inputs['notes_per_measure']
+
+    # Transpose each chord symbol
+    transposed_symbols = [transpose_chord_symbol(c['chord_symbol'], semitones) for c in chords]
+    transposed_midi = (
+        [p + semitones for p in inputs['midi_notes']] if inputs['midi_notes'] else None
+    )
+
     # Re-analyze with transposed chords and shifted notes
     # Pass transposed notes for key detection (no key override — let algorithm detect)
     result = analyze_song(transposed_symbols, key_override=None, midi_notes=transposed_midi)
 
     # HL-TRANSPOSE-001: Convert sharp roman numerals to flat equivalents
-    # music21 produces #III, #IV etc. for chromatic chords — jazz convention uses bIV, bV
-    # Handles both uppercase (major) and lowercase (minor) roman numerals
-    _SHARP_TO_FLAT_RE = re.compile(
-        r'^#(VII|VI|V|IV|III|II|I|vii|vi|v|iv|iii|ii|i)(.*)'
-    )
-    _DEGREE_NEXT = {
-        'I': 'II', 'II': 'III', 'III': 'IV', 'IV': 'V', 'V': 'VI', 'VI': 'VII', 'VII': 'I',
-        'i': 'ii', 'ii': 'iii', 'iii': 'iv', 'iv': 'v', 'v': 'vi', 'vi': 'vii', 'vii': 'i',
-    }
     for ch in result.get('chords', []):
         roman = ch.get('roman', '')
         m = _SHARP_TO_FLAT_RE.match(roman)
@@ -406,12 +429,25 @@ async def transpose_song(
             ch['beat'] = chord_positions[i]['beat']
             ch['note_count'] = notes_per_measure.get(chord_positions[i]['measure'], 0)
 
-    # Report original key from Songs table
-    songs = db.execute_query("SELECT original_key FROM Songs WHERE id = ?", (song_id,))
-    original_key = (songs[0].get('original_key') or 'C') if songs else 'C'
+    return result
+
+
+@router.post("/songs/{song_id}/transpose")
+async def transpose_song(
+    song_id: int,
+    request: TransposeRequest,
+    db: DatabaseConnection = Depends(get_db),
+):
+    """Transpose a song's analysis by N semitones. Session-only, not persisted."""
+    semitones = max(-11, min(11, request.semitones))
+
+    inputs = await run_in_threadpool(_load_transpose_inputs, song_id, db)
+    # Hand the request's pooled connection back while the analysis queues
+    db.close()
+    result = await _run_analysis(_transpose_analysis, inputs, semitones)
 
     result['transposed_semitones'] = semitones
-    result['original_key'] = original_key
+    result['original_key'] = inputs['original_key']
 
     return result
 
@@ -422,23 +458,36 @@ async def get_analysis(
     refresh: bool = False,
     db: DatabaseConnection = Depends(get_db)
 ):
-    """Get harmonic analysis for a song."""
+    """Get harmonic analysis for a song.
 
-    # Check cache unless refresh requested
+    Runs in three stages so the event loop never blocks: DB reads in the
+    threadpool, music21 analysis on the analysis executor, then the cache
+    write in the threadpool again. No pooled connection is held during the
+    analysis stage. A current cached response (see app.services.analysis_cache)
+    is served from the first stage.
+    """
+    inputs = await run_in_threadpool(_load_analysis_inputs, song_id, refresh, db)
+    if 'result' in inputs:
+        return inputs['result']
+    # Hand the request's pooled connection back while the analysis queues on
+    # the executor; _store_analysis checks out a fresh one
+    db.close()
+    result = await _run_analysis(_build_analysis, inputs)
+    return await run_in_threadpool(_store_analysis, song_id, result, db)
+
+
+def _load_analysis_inputs(song_id: int, refresh: bool, db: DatabaseConnection) -> dict:
+    """DB stage of get_analysis.
+
+    Returns {'result': ...} when no analysis run is needed (cache hit, a
+    cached analysis whose inputs are unchanged, or a song without chords),
+    otherwise the inputs for _build_analysis.
+    """
+    # Served response is still valid: one indexed read
     if not refresh:
-        cached = db.execute_query(
-            "SELECT analysis_json, manual_key_override FROM SongAnalysis WHERE song_id = ?",
-            (song_id,)
-        )
-        if cached and cached[0].get('analysis_json'):
-            result = json.loads(cached[0]['analysis_json'])
-            # HL-MEGA-003: Enrich with live note counts (may have changed since cache)
-            result = _enrich_note_counts(result, song_id, db)
-            # HL-006: Apply secondary dominant flags (cache predates this detection)
-            result = _enrich_secondary_dominants(result)
-            # HL-044: Apply transition chord annotations (tritone subs, dim passing)
-            result = _enrich_transition_chords(result)
-            return _apply_overrides(result, song_id, db)
+        served = analysis_cache.load_served(song_id, db)
+        if served is not None:
+            return {'result': served}
 
     # Verify song exists
     songs = db.execute_query("SELECT id, original_key, source_file_type FROM Songs WHERE id = ?", (song_id,))
@@ -447,15 +496,10 @@ async def get_analysis(
 
     # Get all chords for this song ordered by section/measure/position
     # Include measure_number and beat_position for granularity context
-    chords = db.execute_query("""
-        SELECT c.chord_symbol, m.measure_number, c.beat_position, c.chord_order,
-               s.name as section_name
-        FROM Chords c
-        JOIN Measures m ON c.measure_id = m.id
-        JOIN Sections s ON m.section_id = s.id
-        WHERE s.song_id = ?
-        ORDER BY s.section_order, m.measure_number, c.chord_order
-    """, (song_id,))
+    chords = chord_timeline.load(
+        song_id, db,
+        ('chord_symbol', 'measure_number', 'beat_position', 'chord_order', 'section_name'),
+    )
 
     if not chords:
         # Return empty analysis instead of 404 so the page still loads
@@ -467,19 +511,12 @@ async def get_analysis(
             "total_measures": 0,
             "message": "No chord symbols found for this song. Try re-importing the score file, or check for duplicate entries.",
         }
-        return empty_result
-
-    chord_symbols = [c['chord_symbol'] for c in chords]
-    # Build measure context for each chord (cast Decimal to float for JSON)
-    chord_positions = [
-        {"measure": c['measure_number'], "beat": float(c.get('beat_position') or 1.0)}
-        for c in chords
-    ]
+        return {'result': empty_result}
 
-    # Check for manual key override
+    # Check for manual key override (and the cached analysis, if any)
     key_override = None
     existing = db.execute_query(
-        "SELECT manual_key_override FROM SongAnalysis WHERE song_id = ?",
+        "SELECT manual_key_override, analysis_json, content_hash FROM SongAnalysis WHERE song_id = ?",
         (song_id,)
     )
     if existing and existing[0].get('manual_key_override'):
@@ -521,6 +558,64 @@ async def get_analysis(
         except Exception:
             pass
 
+    # Add total measures count
+    measure_count = db.execute_scalar("""
+        SELECT COUNT(DISTINCT m.measure_number)
+        FROM Measures m
+        JOIN Sections s ON m.section_id = s.id
+        WHERE s.song_id = ?
+    """, (song_id,))
+
+    # Group E: Load section markers for form detection and display
+    try:
+        section_markers_raw = song_artifacts.get(song_id, song_artifacts.SECTION_MARKERS, db)
+    except Exception:
+        section_markers_raw = None
+
+    # BV-04: Check for form override first, then fall back to auto-detection
+    form_override = db.execute_scalar(
+        "SELECT form_override FROM Songs WHERE id = ?", (song_id,)
+    )
+
+    inputs = {
+        'chords': chords,
+        'key_override': key_override,
+        'midi_notes': midi_notes,
+        'note_measures': note_measures,
+        'notes_per_measure': notes_per_measure,
+        'source_type': songs[0].get('source_file_type', ''),
+        'measure_count': measure_count,
+        'section_markers_raw': section_markers_raw,
+        'form_override': form_override,
+    }
+    inputs['content_hash'] = analysis_cache.content_hash(inputs)
+
+    # Inputs unchanged since the last run (e.g. only overrides changed):
+    # reuse the stored analysis and just re-apply overrides
+    if (not refresh and existing and existing[0].get('analysis_json')
+            and existing[0].get('content_hash') == inputs['content_hash']):
+        result = codec.unpack_json(existing[0]['analysis_json'])
+        return {'result': _serve_analysis(song_id, result, db)}
+
+    return inputs
+
+
+def _build_analysis(inputs: dict) -> dict:
+    """CPU stage of get_analysis (runs on the analysis executor; no DB access)."""
+    chords = inputs['chords']
+    key_override = inputs['key_override']
+    midi_notes = inputs['midi_notes']
+    note_measures = inputs['note_measures']
+    notes_per_measure = inputs['notes_per_measure']
+    measure_count = inputs['measure_count']
+
+    chord_symbols = [c['chord_symbol'] for c in chords]
+    # Build measure context for each chord (cast Decimal to float for JSON)
+    chord_positions = [
+        {"measure": c['measure_number'], "beat": float(c.get('beat_position') or 1.0)}
+        for c in chords
+    ]
+
     # Run analysis (HL-006A: pass measure data for cadence weighting)
     max_chord_measure = max((c['measure_number'] for c in chords), default=0)
     result = analyze_song(chord_symbols, key_override, midi_notes,
@@ -528,7 +623,7 @@ async def get_analysis(
     result['has_note_data'] = midi_notes is not None
 
     # HL-006B: Determine chord provenance from source file type
-    source_type = songs[0].get('source_file_type', '')
+    source_type = inputs['source_type']
     if source_type == 'MIDI':
         chord_source = 'algorithm'
     elif source_type in ('MuseScore', 'MusicXML'):
@@ -580,20 +675,11 @@ async def get_analysis(
             # HL-006A: voicing_type field
             ch['voicing_type'] = 'rootless' if ch.get('is_rootless') else 'closed'
 
-    # Add total measures count
-    measure_count = db.execute_scalar("""
-        SELECT COUNT(DISTINCT m.measure_number)
-        FROM Measures m
-        JOIN Sections s ON m.section_id = s.id
-        WHERE s.song_id = ?
-    """, (song_id,))
     result['total_measures'] = measure_count or 0
 
-    # Group E: Load section markers for form detection and display
+    # Group E: Section markers for form detection and display
     try:
-        section_markers_raw = db.execute_scalar(
-            "SELECT section_markers_json FROM Songs WHERE id = ?", (song_id,)
-        )
+        section_markers_raw = inputs['section_markers_raw']
         if section_markers_raw:
             result['section_markers'] = json.loads(section_markers_raw)
         else:
@@ -602,9 +688,7 @@ async def get_analysis(
         result['section_markers'] = []
 
     # BV-04: Check for form override first, then fall back to auto-detection
-    form_override = db.execute_scalar(
-        "SELECT form_override FROM Songs WHERE id = ?", (song_id,)
-    )
+    form_override = inputs['form_override']
     if form_override:
         result['form'] = form_override
         result['form_source'] = 'override'
@@ -669,8 +753,19 @@ async def get_analysis(
     except Exception as kc_err:
         logger.warning("Key center recomputation failed (non-fatal): %s", kc_err)
 
+    # HL-006 / HL-044: fold the route-level annotations into the cached document
+    result = _enrich_secondary_dominants(result)
+    result = _enrich_transition_chords(result)
+    result['content_hash'] = inputs['content_hash']
+
+    return result
+
+
+def _store_analysis(song_id: int, result: dict, db: DatabaseConnection) -> dict:
+    """DB stage after _build_analysis: cache the result and apply chord overrides."""
     # Cache result using MERGE (upsert)
-    analysis_json = json.dumps(result)
+    content_hash = result.pop('content_hash', None)
+    analysis_json = codec.pack_json(result)
     detected_key = result['detected_key']
     confidence = result['confidence']
 
@@ -682,16 +777,27 @@ async def get_analysis(
     if exists > 0:
         db.execute_non_query("""
             UPDATE SongAnalysis
-            SET analysis_json = ?, detected_key = ?, confidence = ?, updated_at = GETDATE()
+            SET analysis_json = ?, content_hash = ?, detected_key = ?, confidence = ?,
+                updated_at = GETDATE()
             WHERE song_id = ?
-        """, (analysis_json, detected_key, confidence, song_id))
+        """, (analysis_json, content_hash, detected_key, confidence, song_id))
     else:
         db.execute_non_query("""
-            INSERT INTO SongAnalysis (song_id, analysis_json, detected_key, confidence)
-            VALUES (?, ?, ?, ?)
-        """, (song_id, analysis_json, detected_key, confidence))
+            INSERT INTO SongAnalysis (song_id, analysis_json, content_hash, detected_key, confidence)
+            VALUES (?, ?, ?, ?, ?)
+        """, (song_id, analysis_json, content_hash, detected_key, confidence))
 
-    return _apply_overrides(result, song_id, db)
+    return _serve_analysis(song_id, result, db)
+
+
+def _serve_analysis(song_id: int, result: dict, db: DatabaseConnection) -> dict:
+    """Apply chord overrides and cache the response as SongAnalysis.served_json."""
+    result = _apply_overrides(result, song_id, db)
+    db.execute_non_query(
+        "UPDATE SongAnalysis SET served_json = ? WHERE song_id = ?",
+        (codec.pack_json(result), song_id)
+    )
+    return result
 
 
 @router.post("/songs/{song_id}")
@@ -710,7 +816,7 @@ async def update_analysis_key(
     if exists > 0:
         db.execute_non_query("""
             UPDATE SongAnalysis
-            SET manual_key_override = ?, updated_at = GETDATE()
+            SET manual_key_override = ?, served_json = NULL, updated_at = GETDATE()
             WHERE song_id = ?
         """, (request.key_override, song_id))
     else:
@@ -760,6 +866,7 @@ async def override_chord(
             override.notes
         ))
 
+    analysis_cache.invalidate(song_id, db)
     return {"status": "updated", "chord_index": chord_index}
 
 
@@ -774,6 +881,7 @@ async def delete_chord_override(
         "DELETE FROM ChordAnalysisOverrides WHERE song_id = ? AND chord_index = ?",
         (song_id, chord_index)
     )
+    analysis_cache.invalidate(song_id, db)
     return {"status": "deleted", "chord_index": chord_index}
 
 
@@ -841,7 +949,7 @@ async def activate_rlhf(
     if not cached or not cached[0].get('analysis_json'):
         raise HTTPException(status_code=404, detail="No analysis found — run analysis first")
 
-    algorithm_result = json.loads(cached[0]['analysis_json'])
+    algorithm_result = codec.unpack_json(cached[0]['analysis_json'])
 
     # Get this song's existing overrides (already applied separately)
     song_overrides = db.execute_query(
@@ -864,7 +972,7 @@ async def activate_rlhf(
     evidence = {}
     for ov in all_overrides:
         try:
-            ov_analysis = json.loads(ov['analysis_json'])
+            ov_analysis = codec.unpack_json(ov['analysis_json'])
             ov_chords = ov_analysis.get('chords', [])
             for ch in ov_chords:
                 if ch.get('index') == ov['chord_index']:
@@ -910,7 +1018,7 @@ async def activate_rlhf(
 
     # Store session with algorithm snapshot (for revert)
     session_id = str(uuid.uuid4())
-    algorithm_snapshot = cached[0]['analysis_json']  # Pre-RLHF state
+    algorithm_snapshot = cached[0]['analysis_json']  # Pre-RLHF state, still packed
 
     db.execute_non_query("""
         INSERT INTO rlhf_sessions
@@ -919,9 +1027,9 @@ async def activate_rlhf(
     """, (session_id, song_id, influenced_count, algorithm_snapshot))
 
     # Update cached analysis with RLHF-modified result
-    rlhf_json = json.dumps(algorithm_result)
+    rlhf_json = codec.pack_json(algorithm_result)
     db.execute_non_query("""
-        UPDATE SongAnalysis SET analysis_json = ?, updated_at = GETDATE()
+        UPDATE SongAnalysis SET analysis_json = ?, served_json = NULL, updated_at = GETDATE()
         WHERE song_id = ?
     """, (rlhf_json, song_id))
 
@@ -959,7 +1067,7 @@ async def revert_rlhf(
     if snapshot:
         # Restore the pre-RLHF algorithm analysis
         db.execute_non_query("""
-            UPDATE SongAnalysis SET analysis_json = ?, updated_at = GETDATE()
+            UPDATE SongAnalysis SET analysis_json = ?, served_json = NULL, updated_at = GETDATE()
             WHERE song_id = ?
         """, (snapshot, song_id))
 
@@ -970,7 +1078,7 @@ async def revert_rlhf(
     """, (session['id'],))
 
     # Return the restored analysis
-    result = json.loads(snapshot) if snapshot else {}
+    result = codec.unpack_json(snapshot) if snapshot else {}
     result = _apply_overrides(result, song_id, db)
 
     return {
@@ -980,42 +1088,9 @@ async def revert_rlhf(
     }
 
 
-def _enrich_note_counts(result: dict, song_id: int, db: DatabaseConnection) -> dict:
-    """HL-MEGA-003: Refresh note counts from live DB (song_notes → MelodyNotes fallback)."""
-    notes_per_measure = {}
-    try:
-        rows = db.execute_query("""
-            SELECT measure_num, COUNT(*) as cnt FROM song_notes
-            WHERE song_id = ? AND is_rest = 0
-            GROUP BY measure_num
-        """, (song_id,))
-        for r in rows:
-            notes_per_measure[r['measure_num']] = r['cnt']
-    except Exception:
-        pass
-    if not notes_per_measure:
-        try:
-            rows = db.execute_query("""
-                SELECT measure_number, COUNT(*) as cnt FROM MelodyNotes
-                WHERE song_id = ?
-                GROUP BY measure_number
-            """, (song_id,))
-            for r in rows:
-                notes_per_measure[r['measure_number']] = r['cnt']
-        except Exception:
-            pass
-    if notes_per_measure:
-        result['has_note_data'] = True
-        for ch in result.get('chords', []):
-            m = ch.get('measure')
-            if m is not None:
-                ch['note_count'] = notes_per_measure.get(m, 0)
-    return result
-
-
 def _enrich_secondary_dominants(result: dict) -> dict:
-    """HL-006: Flag dom7 chords as secondary dominant candidates on cached results.
-    Replicates HarmonicAnalyzer._detect_secondary_dominants() for stale cache entries."""
+    """HL-006: Flag dom7 chords as secondary dominant candidates.
+    Looser variant of HarmonicAnalyzer._detect_secondary_dominants(), folded into cached results."""
     import re
     _NOTE_SEMI = {
         'C': 0, 'C#': 1, 'Db': 1, 'D': 2, 'D#': 3, 'Eb': 3, 'E': 4,
@@ -1052,7 +1127,7 @@ def _enrich_secondary_dominants(result: dict) -> dict:
 
 
 def _enrich_transition_chords(result: dict) -> dict:
-    """HL-044: Detect tritone subs and diminished passing chords on cached results."""
+    """HL-044: Detect tritone subs and diminished passing chords (folded into cached results)."""
     import re
     _NOTE_SEMI = {
         'C': 0, 'C#': 1, 'Db': 1, 'D': 2, 'D#': 3, 'Eb': 3, 'E': 4,
@@ -1511,6 +1586,7 @@ User comment: {request.comment or 'No comment provided'}"""
 
     # 7. Store RLHF: song-specific overrides (legacy)
     corrections = result.get("suggested_corrections", result.get("roman_numeral_analysis", []))
+    overrides_stored = 0
     if corrections and isinstance(corrections, list):
         for corr in corrections:
             m = corr.get("measure")
@@ -1534,8 +1610,12 @@ User comment: {request.comment or 'No comment provided'}"""
                      song_id, m, func, key_ctx,
                      f"AI: {result.get('analysis', '')[:200]}")
                 )
+                overrides_stored += 1
             except Exception as e:
                 logger.warning(f"[AI-ANALYSIS] RLHF override store failed: {e}")
+    if overrides_stored:
+        # Overrides feed the served analysis, as in put_override
+        analysis_cache.invalidate(song_id, db)
 
     # 8. Store generalized pattern in JazzTheoryPatterns
     pattern = result.get("pattern_identified")
@@ -1609,7 +1689,7 @@ async def record_exchange_outcome(song_id: int, exchange_id: int,
             if existing:
                 db.execute_non_query(
                     "UPDATE SongAnalysis SET detected_key = ?, manual_key_override = ?, "
-                    "analysis_json = NULL, updated_at = GETDATE() WHERE song_id = ?",
+                    "analysis_json = NULL, served_json = NULL, updated_at = GETDATE() WHERE song_id = ?",
                     (suggested_key, suggested_key, song_id)
                 )
             else:
@@ -1628,28 +1708,12 @@ async def record_exchange_outcome(song_id: int, exchange_id: int,
                     measure_nums = [int(m.strip()) for m in selected_measures_str.split(",") if m.strip()]
                     if measure_nums:
                         placeholders = ",".join("?" * len(measure_nums))
+                        # seq is the chord's position in the song's progression
                         chord_range = db.execute_query(
-                            """WITH RankedChords AS (
-                                SELECT c.id AS chord_id,
-                                    ROW_NUMBER() OVER (
-                                        ORDER BY s.section_order, m.measure_number, c.chord_order
-                                    ) - 1 AS positional_index
-                                FROM Chords c
-                                JOIN Measures m ON c.measure_id = m.id
-                                JOIN Sections s ON m.section_id = s.id
-                                WHERE s.song_id = ?
-                            )
-                            SELECT MIN(positional_index) AS start_index,
-                                   MAX(positional_index) AS end_index
-                            FROM RankedChords
-                            WHERE chord_id IN (
-                                SELECT c.id
-                                FROM Chords c
-                                JOIN Measures m ON c.measure_id = m.id
-                                JOIN Sections s ON m.section_id = s.id
-                                WHERE s.song_id = ? AND m.measure_number IN ({})
-                            )""".format(placeholders),
-                            [song_id, song_id] + measure_nums
+                            """SELECT MIN(seq) AS start_index, MAX(seq) AS end_index
+                            FROM SongChordTimeline
+                            WHERE song_id = ? AND measure_number IN ({})""".format(placeholders),
+                            [song_id] + measure_nums
                         )
                         if chord_range and chord_range[0]["start_index"] is not None:
                             start_ci = chord_range[0]["start_index"]
@@ -1690,7 +1754,7 @@ async def set_manual_key(song_id: int, body: ManualKeyRequest,
     if existing:
         db.execute_non_query(
             "UPDATE SongAnalysis SET detected_key = ?, manual_key_override = ?, "
-            "analysis_json = NULL, updated_at = GETDATE() WHERE song_id = ?",
+            "analysis_json = NULL, served_json = NULL, updated_at = GETDATE() WHERE song_id = ?",
             (body.detected_key, body.detected_key, song_id)
         )
     else:
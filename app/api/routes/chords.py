@@ -6,6 +6,7 @@ from typing import List
 from pydantic import BaseModel
 from app.models import Chord, ChordCreate
 from app.db.connection import DatabaseConnection
+from app.services import analysis_cache, chord_timeline
 from config.settings import Settings
 
 router = APIRouter(prefix="/api/v1/chords", tags=["chords"])
@@ -42,16 +43,21 @@ async def create_chord(chord: ChordCreate):
         VALUES (?, ?, ?, ?, ?, ?, ?, ?)
     """
 
-    result = db.execute_query(query, (
-        chord.measure_id,
-        float(chord.beat_position),
-        chord.chord_symbol,
-        chord.roman_numeral,
-        chord.key_center,
-        chord.function_label,
-        chord.comments,
-        chord.chord_order
-    ))
+    song_id = chord_timeline.song_of_measure(chord.measure_id, db)
+    with db.transaction() as tx:
+        result = tx.query(query, (
+            chord.measure_id,
+            float(chord.beat_position),
+            chord.chord_symbol,
+            chord.roman_numeral,
+            chord.key_center,
+            chord.function_label,
+            chord.comments,
+            chord.chord_order
+        ))
+        if result:
+            chord_timeline.rebuild_in(tx, song_id)
+            tx.execute(analysis_cache.INVALIDATE_SQL, (song_id,))
 
     if not result:
         raise HTTPException(
@@ -80,51 +86,55 @@ async def create_chords_bulk(bulk_data: BulkChordCreate):
     db = DatabaseConnection(settings)
     created_chords = []
 
-    for chord in bulk_data.chords:
-        # Check if measure exists
-        check_query = "SELECT COUNT(*) FROM Measures WHERE id = ?"
-        count = db.execute_scalar(check_query, (chord.measure_id,))
-        if count == 0:
+    # Check every measure exists (and find its song) before writing anything
+    song_of = {}
+    for measure_id in dict.fromkeys(c.measure_id for c in bulk_data.chords):
+        song_of[measure_id] = chord_timeline.song_of_measure(measure_id, db)
+        if song_of[measure_id] is None:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"Measure with id {chord.measure_id} not found"
+                detail=f"Measure with id {measure_id} not found"
             )
 
-        # Insert chord
-        query = """
-            INSERT INTO Chords (measure_id, beat_position, chord_symbol, roman_numeral,
-                                key_center, function_label, comments, chord_order)
-            OUTPUT INSERTED.id, INSERTED.measure_id, INSERTED.beat_position,
-                   INSERTED.chord_symbol, INSERTED.roman_numeral, INSERTED.key_center,
-                   INSERTED.function_label, INSERTED.comments, INSERTED.chord_order
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        """
-
-        result = db.execute_query(query, (
-            chord.measure_id,
-            float(chord.beat_position),
-            chord.chord_symbol,
-            chord.roman_numeral,
-            chord.key_center,
-            chord.function_label,
-            chord.comments,
-            chord.chord_order
-        ))
-
-        if result:
-            row = result[0]
-            created_chords.append(Chord(
-                id=row['id'],
-                measure_id=row['measure_id'],
-                beat_position=row['beat_position'],
-                chord_symbol=row['chord_symbol'],
-                roman_numeral=row['roman_numeral'],
-                key_center=row['key_center'],
-                function_label=row['function_label'],
-                comments=row['comments'],
-                chord_order=row['chord_order']
+    query = """
+        INSERT INTO Chords (measure_id, beat_position, chord_symbol, roman_numeral,
+                            key_center, function_label, comments, chord_order)
+        OUTPUT INSERTED.id, INSERTED.measure_id, INSERTED.beat_position,
+               INSERTED.chord_symbol, INSERTED.roman_numeral, INSERTED.key_center,
+               INSERTED.function_label, INSERTED.comments, INSERTED.chord_order
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    """
+    with db.transaction() as tx:
+        for chord in bulk_data.chords:
+            result = tx.query(query, (
+                chord.measure_id,
+                float(chord.beat_position),
+                chord.chord_symbol,
+                chord.roman_numeral,
+                chord.key_center,
+                chord.function_label,
+                chord.comments,
+                chord.chord_order
             ))
 
+            if result:
+                row = result[0]
+                created_chords.append(Chord(
+                    id=row['id'],
+                    measure_id=row['measure_id'],
+                    beat_position=row['beat_position'],
+                    chord_symbol=row['chord_symbol'],
+                    roman_numeral=row['roman_numeral'],
+                    key_center=row['key_center'],
+                    function_label=row['function_label'],
+                    comments=row['comments'],
+                    chord_order=row['chord_order']
+                ))
+
+        # One timeline rebuild per song touched
+        for song_id in set(song_of.values()):
+            chord_timeline.rebuild_in(tx, song_id)
+            tx.execute(analysis_cache.INVALIDATE_SQL, (song_id,))
     return created_chords
 
 
@@ -221,7 +231,9 @@ async def update_chord(chord_id: int, chord_update: ChordCreate):
             detail=f"Chord with id {chord_id} not found"
         )
 
-    # Update chord
+    # Update chord (rebuild and invalidate the old song too if the chord moves)
+    song_ids = {chord_timeline.song_of_chord(chord_id, db),
+                chord_timeline.song_of_measure(chord_update.measure_id, db)} - {None}
     query = """
         UPDATE Chords
         SET measure_id = ?, beat_position = ?, chord_symbol = ?, roman_numeral = ?,
@@ -229,17 +241,21 @@ async def update_chord(chord_id: int, chord_update: ChordCreate):
         WHERE id = ?
     """
 
-    db.execute_non_query(query, (
-        chord_update.measure_id,
-        float(chord_update.beat_position),
-        chord_update.chord_symbol,
-        chord_update.roman_numeral,
-        chord_update.key_center,
-        chord_update.function_label,
-        chord_update.comments,
-        chord_update.chord_order,
-        chord_id
-    ))
+    with db.transaction() as tx:
+        tx.execute(query, (
+            chord_update.measure_id,
+            float(chord_update.beat_position),
+            chord_update.chord_symbol,
+            chord_update.roman_numeral,
+            chord_update.key_center,
+            chord_update.function_label,
+            chord_update.comments,
+            chord_update.chord_order,
+            chord_id
+        ))
+        for song_id in song_ids:
+            chord_timeline.rebuild_in(tx, song_id)
+            tx.execute(analysis_cache.INVALIDATE_SQL, (song_id,))
 
     # Return updated chord
     select_query = """
@@ -280,5 +296,9 @@ async def delete_chord(chord_id: int):
         )
 
     # Delete chord
+    song_id = chord_timeline.song_of_chord(chord_id, db)
     query = "DELETE FROM Chords WHERE id = ?"
-    db.execute_non_query(query, (chord_id,))
+    with db.transaction() as tx:
+        tx.execute(query, (chord_id,))
+        chord_timeline.rebuild_in(tx, song_id)
+        tx.execute(analysis_cache.INVALIDATE_SQL, (song_id,))
@@ -7,6 +7,7 @@ from fastapi.responses import Response
 from app.services.score_exporter import export_mscx, export_mscz
 from app.services.analysis_service import analyze_song
 from app.db.connection import DatabaseConnection, get_db
+from app.services import chord_timeline
 import json
 
 logger = logging.getLogger(__name__)
@@ -49,14 +50,7 @@ async def export_musescore(
             tempo = int(tm.group(1))
 
     # Fetch chords with measure/beat info
-    chords_rows = db.execute_query("""
-        SELECT c.chord_symbol, m.measure_number, c.beat_position, c.chord_order
-        FROM Chords c
-        JOIN Measures m ON c.measure_id = m.id
-        JOIN Sections s ON m.section_id = s.id
-        WHERE s.song_id = ?
-        ORDER BY s.section_order, m.measure_number, c.chord_order
-    """, (song_id,))
+    chords_rows = chord_timeline.load(song_id, db)
 
     if not chords_rows:
         raise HTTPException(status_code=404, detail="No chords found for this song")
@@ -95,7 +89,7 @@ async def export_musescore(
         chord_symbols = [c['symbol'] for c in chords]
         try:
             cached = db.execute_query(
-                "SELECT analysis_json, manual_key_override FROM SongAnalysis WHERE song_id = ?",
+                "SELECT manual_key_override FROM SongAnalysis WHERE song_id = ?",
                 (song_id,)
             )
             key_override = None
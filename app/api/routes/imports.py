@@ -5,19 +5,22 @@ Also includes a seed endpoint for jazz standards.
 import os
 import io
 import re
-import hashlib
 import time
 import traceback
 import zipfile
 import tempfile
 import logging
+from itertools import repeat
 from typing import Optional, List, Dict, Any
 
 from fastapi import APIRouter, UploadFile, File, HTTPException, status, Query, Form
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import JSONResponse
-from app.services.score_parser import parse_music_file, ParsedScore, _DURATION_TO_BEATS
-from app.services.midi_parser import parse_midi_file
-from app.services.import_engine import parse_upload_full, save_full_parse
+from app.services.score_parser import ParsedScore, _DURATION_TO_BEATS
+from app.services.import_engine import save_full_parse, write_full_parse
+from app.services import chord_timeline, parse_cache, song_artifacts
+from app.services.batch_import import start_batch_import, job_snapshot
+from app.api.uploads import receive_upload, spool_upload
 from app.db.connection import DatabaseConnection
 from config.settings import Settings
 
@@ -27,6 +30,12 @@ settings = Settings()
 
 SUPPORTED_EXTENSIONS = {'.mid', '.midi', '.mscz', '.mscx', '.musicxml', '.xml', '.mxl'}
 
+_SOURCE_TYPES = {
+    '.mscz': 'MuseScore', '.mscx': 'MuseScore',
+    '.musicxml': 'MusicXML', '.xml': 'MusicXML', '.mxl': 'MusicXML',
+    '.mid': 'MIDI', '.midi': 'MIDI',
+}
+
 
 # ---------------------------------------------------------------------------
 # Helpers
@@ -44,8 +53,22 @@ def _save_score_to_db(
     genre: Optional[str],
     source_filename: str,
     source_type: str,
+    rich_parsed: Optional[dict] = None,
+    base_title: Optional[str] = None,
+    version_number: Optional[int] = None,
 ) -> Dict[str, Any]:
-    """Insert a ParsedScore into the database. Returns a summary dict."""
+    """Insert a ParsedScore into the database. Returns a summary dict.
+
+    The whole score is written as one unit of work: a single connection and
+    transaction, with sections, measures and chords inserted as set-based
+    batches. A failure anywhere rolls back the song instead of leaving an
+    orphan row behind.
+
+    With rich_parsed (from the same parse_upload), the song_* note tables
+    and version fields are written in that same transaction; the summary
+    then carries save_full_parse's counts under "rich", or the traceback
+    under "rich_error" if that part had to be rolled back.
+    """
     song_title = title_override or parsed.title or os.path.splitext(source_filename)[0]
 
     song_query = """
@@ -55,91 +78,115 @@ def _save_score_to_db(
         VALUES (?, ?, ?, ?, ?, ?, ?, ?)
     """
     tempo_str = f"{parsed.tempo} BPM" if parsed.tempo else None
-    song_result = db.execute_query(
-        song_query,
-        (song_title, composer, genre, parsed.key,
-         parsed.time_signature, tempo_str, source_filename, source_type)
-    )
-    song_id = song_result[0]['id']
 
-    # Store section markers and form if parsed from score
-    if hasattr(parsed, 'section_markers') and parsed.section_markers:
-        import json as _json
-        try:
-            db.execute_non_query(
-                "UPDATE Songs SET section_markers_json = ? WHERE id = ?",
-                (_json.dumps(parsed.section_markers), song_id)
-            )
-        except Exception as _e:
-            logger.warning(f"Could not store section_markers_json: {_e}")
-    if hasattr(parsed, 'form') and parsed.form:
-        try:
-            db.execute_non_query(
-                "UPDATE Songs SET form_override = ? WHERE id = ?",
-                (parsed.form, song_id)
+    with db.transaction() as tx:
+        song_result = tx.query(
+            song_query,
+            (song_title, composer, genre, parsed.key,
+             parsed.time_signature, tempo_str, source_filename, source_type)
+        )
+        song_id = song_result[0]['id']
+
+        # Store section markers and form if parsed from score
+        if hasattr(parsed, 'section_markers') and parsed.section_markers:
+            import json as _json
+            try:
+                with tx.savepoint("section_markers"):
+                    song_artifacts.put_in(tx, song_id, song_artifacts.SECTION_MARKERS,
+                                          _json.dumps(parsed.section_markers))
+            except Exception as _e:
+                logger.warning(f"Could not store section markers: {_e}")
+        if hasattr(parsed, 'form') and parsed.form:
+            try:
+                with tx.savepoint("form_override"):
+                    tx.execute(
+                        "UPDATE Songs SET form_override = ? WHERE id = ?",
+                        (parsed.form, song_id)
+                    )
+            except Exception as _e:
+                logger.warning(f"Could not store form: {_e}")
+
+        # HM34 REQ-008: Create sections from rehearsal marks if available, else single "Main"
+        section_marks = getattr(parsed, 'section_markers', None) or []
+        section_map = {}  # measure_number -> section_id
+        if section_marks:
+            sec_rows = tx.insert_many(
+                "Sections", ("song_id", "name", "section_order", "repeat_count"),
+                [(song_id, mark['label'], order, 1)
+                 for order, mark in enumerate(section_marks, start=1)],
+                output=("id", "section_order"),
             )
-        except Exception as _e:
-            logger.warning(f"Could not store form: {_e}")
-
-    # HM34 REQ-008: Create sections from rehearsal marks if available, else single "Main"
-    section_marks = getattr(parsed, 'section_markers', None) or []
-    section_map = {}  # measure_number -> section_id
-    if section_marks:
-        for order, mark in enumerate(section_marks, start=1):
-            sec_res = db.execute_query(
-                "INSERT INTO Sections (song_id, name, section_order, repeat_count) OUTPUT INSERTED.id VALUES (?, ?, ?, 1)",
-                (song_id, mark['label'], order)
+            id_by_order = {r['section_order']: r['id'] for r in sec_rows}
+            for order, mark in enumerate(section_marks, start=1):
+                section_map[mark['measure_number']] = id_by_order[order]
+        if not section_map:
+            sec_res = tx.query(
+                "INSERT INTO Sections (song_id, name, section_order, repeat_count) OUTPUT INSERTED.id VALUES (?, 'Main', 1, 1)",
+                (song_id,)
             )
-            sec_id = sec_res[0]['id']
-            section_map[mark['measure_number']] = sec_id
-    if not section_map:
-        sec_res = db.execute_query(
-            "INSERT INTO Sections (song_id, name, section_order, repeat_count) OUTPUT INSERTED.id VALUES (?, 'Main', 1, 1)",
-            (song_id,)
+            section_map[1] = sec_res[0]['id']
+
+        # Build sorted section boundaries for measure → section lookup
+        section_boundaries = sorted(section_map.keys())
+
+        def _get_section_id(measure_num):
+            sid = section_boundaries[0]
+            for boundary in section_boundaries:
+                if boundary <= measure_num:
+                    sid = boundary
+                else:
+                    break
+            return section_map[sid]
+
+        # One row per distinct measure, IDs mapped back by measure_number
+        measure_numbers = list(dict.fromkeys(c.measure_number for c in parsed.chords))
+        measure_rows = tx.insert_many(
+            "Measures", ("section_id", "measure_number"),
+            [(_get_section_id(m), m) for m in measure_numbers],
+            output=("id", "measure_number"),
         )
-        section_map[1] = sec_res[0]['id']
-
-    # Build sorted section boundaries for measure → section lookup
-    section_boundaries = sorted(section_map.keys())
-
-    def _get_section_id(measure_num):
-        sid = section_boundaries[0]
-        for boundary in section_boundaries:
-            if boundary <= measure_num:
-                sid = boundary
-            else:
-                break
-        return section_map[sid]
-
-    measures_created: Dict[int, int] = {}
-    for chord_data in parsed.chords:
-        m = chord_data.measure_number
-        if m not in measures_created:
-            sec_id = _get_section_id(m)
-            m_res = db.execute_query(
-                "INSERT INTO Measures (section_id, measure_number) OUTPUT INSERTED.id VALUES (?, ?)",
-                (sec_id, m)
-            )
-            measures_created[m] = m_res[0]['id']
-        measure_id = measures_created[m]
-        db.execute_non_query(
-            "INSERT INTO Chords (measure_id, beat_position, chord_symbol, chord_order) VALUES (?, ?, ?, ?)",
-            (measure_id, chord_data.beat_position, chord_data.chord_symbol, chord_data.chord_order)
+        measures_created: Dict[int, int] = {r['measure_number']: r['id'] for r in measure_rows}
+
+        tx.insert_many(
+            "Chords", ("measure_id", "beat_position", "chord_symbol", "chord_order"),
+            [(measures_created[c.measure_number], c.beat_position, c.chord_symbol, c.chord_order)
+             for c in parsed.chords],
         )
+        chord_timeline.rebuild_in(tx, song_id)
 
-    # Save notes to MelodyNotes if available
-    notes_saved = 0
-    if hasattr(parsed, 'notes') and parsed.notes:
-        for note in parsed.notes:
+        # Save notes to MelodyNotes if available
+        notes_saved = 0
+        notes = parsed.notes
+        if len(notes):
             try:
-                dur_beats = _DURATION_TO_BEATS.get(note.duration_type, 1.0)
-                db.execute_non_query(
-                    "INSERT INTO MelodyNotes (song_id, measure_number, beat_position, midi_note, duration, velocity) VALUES (?, ?, ?, ?, ?, ?)",
-                    (song_id, note.measure_number, note.beat_position, note.midi_pitch, dur_beats, 80)
-                )
-                notes_saved += 1
+                with tx.savepoint("melody_notes"):
+                    notes_saved = tx.executemany(
+                        "INSERT INTO MelodyNotes (song_id, measure_number, beat_position, midi_note, duration, velocity) VALUES (?, ?, ?, ?, ?, ?)",
+                        list(zip(repeat(song_id, len(notes)), notes.measure_number.tolist(),
+                                 notes.beat_position.tolist(), notes.midi_pitch.tolist(),
+                                 notes.duration_quarters(_DURATION_TO_BEATS).tolist(), repeat(80)))
+                    )
             except Exception as e:
-                logger.debug("Note insert skip: %s", e)
+                logger.warning("MelodyNotes insert failed for song %d: %s", song_id, e)
+
+        if version_number is not None:
+            try:
+                with tx.savepoint("version_fields"):
+                    tx.execute(
+                        "UPDATE Songs SET base_title = ?, version_number = ? WHERE id = ?",
+                        (base_title, version_number, song_id)
+                    )
+            except Exception as e:
+                logger.debug("Could not set version fields: %s", e)
+
+        rich_result = rich_error = None
+        if rich_parsed is not None:
+            try:
+                with tx.savepoint("rich_notes"):
+                    rich_result = write_full_parse(tx, song_id, rich_parsed, clear_existing=False)
+            except Exception as e:
+                rich_error = traceback.format_exc()
+                logger.error("Rich import failed for song %d: %s", song_id, e)
 
     return {
         "song_id": song_id,
@@ -147,6 +194,8 @@ def _save_score_to_db(
         "measures_created": len(measures_created),
         "chords_created": len(parsed.chords),
         "notes_saved": notes_saved,
+        "rich": rich_result,
+        "rich_error": rich_error,
     }
 
 
@@ -179,14 +228,6 @@ def _compute_version(db: DatabaseConnection, base_title: str) -> int:
         return 1
 
 
-def _compute_file_hashes(content: bytes) -> dict:
-    """Compute MD5 and SHA256 of file content."""
-    return {
-        'md5': hashlib.md5(content).hexdigest(),
-        'sha256': hashlib.sha256(content).hexdigest(),
-    }
-
-
 def _check_duplicate_hash(db: DatabaseConnection, md5: str, base_title: str) -> Optional[str]:
     """Check if same file hash was already imported for this base title. Returns warning or None."""
     try:
@@ -280,19 +321,19 @@ async def reparse_notes(
     if not songs:
         raise HTTPException(status_code=404, detail=f"Song ID {song_id} not found")
 
-    suffix = ext
-    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
-        tmp.write(await file.read())
-        tmp_path = tmp.name
+    upload = await receive_upload(file, settings.max_upload_bytes)
 
     try:
         # Use the new rich import engine for full note extraction
-        with open(tmp_path, 'rb') as f:
-            file_bytes = f.read()
-        rich_parsed = parse_upload_full(file_bytes, file.filename)
+        rich_parsed = parse_cache.parse_full(upload.content, file.filename, upload.sha256)
         rich_result = save_full_parse(song_id, rich_parsed, db)
 
         actual_notes = rich_result.get('actual_notes', 0)
+        if rich_result.get('errors', {}).get('song_notes'):
+            raise HTTPException(
+                status_code=500,
+                detail=f"Could not save notes: {rich_result['errors']['song_notes']}",
+            )
         if actual_notes == 0:
             return {
                 "song_id": song_id,
@@ -306,11 +347,10 @@ async def reparse_notes(
             "lyrics_count": rich_result.get('lyrics_saved', 0),
             "message": f"Extracted {actual_notes} notes and {rich_result.get('lyrics_saved', 0)} lyrics for '{songs[0]['title']}'",
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
-    finally:
-        if os.path.exists(tmp_path):
-            os.unlink(tmp_path)
 
 
 # ---------------------------------------------------------------------------
@@ -323,32 +363,25 @@ async def preview_midi(file: UploadFile = File(...)):
     if _ext(file.filename) not in ('.mid', '.midi'):
         raise HTTPException(status_code=400, detail="File must be .mid or .midi")
 
-    with tempfile.NamedTemporaryFile(delete=False, suffix='.mid') as tmp:
-        tmp.write(await file.read())
-        tmp_path = tmp.name
-
-    try:
-        parsed = parse_midi_file(tmp_path)
-        return {
-            "filename": file.filename,
-            "title": parsed.title or file.filename.rsplit('.', 1)[0],
-            "tempo": parsed.tempo,
-            "time_signature": parsed.time_signature,
-            "total_measures": parsed.total_measures,
-            "chord_count": len(parsed.chords),
-            "chords_preview": [
-                {"measure": c.measure_number, "beat": c.beat_position, "symbol": c.chord_symbol}
-                for c in parsed.chords[:20]
-            ],
-            "all_chords": [
-                {"measure": c.measure_number, "beat": c.beat_position,
-                 "symbol": c.chord_symbol, "midi_notes": c.midi_notes}
-                for c in parsed.chords
-            ],
-        }
-    finally:
-        if os.path.exists(tmp_path):
-            os.unlink(tmp_path)
+    upload = await receive_upload(file, settings.max_upload_bytes)
+    parsed = parse_cache.parse_midi(upload.content, file.filename, upload.sha256)
+    return {
+        "filename": file.filename,
+        "title": parsed.title or file.filename.rsplit('.', 1)[0],
+        "tempo": parsed.tempo,
+        "time_signature": parsed.time_signature,
+        "total_measures": parsed.total_measures,
+        "chord_count": len(parsed.chords),
+        "chords_preview": [
+            {"measure": c.measure_number, "beat": c.beat_position, "symbol": c.chord_symbol}
+            for c in parsed.chords[:20]
+        ],
+        "all_chords": [
+            {"measure": c.measure_number, "beat": c.beat_position,
+             "symbol": c.chord_symbol, "midi_notes": c.midi_notes}
+            for c in parsed.chords
+        ],
+    }
 
 
 @router.post("/midi/import")
@@ -362,12 +395,10 @@ async def import_midi(
     if _ext(file.filename) not in ('.mid', '.midi'):
         raise HTTPException(status_code=400, detail="File must be .mid or .midi")
 
-    with tempfile.NamedTemporaryFile(delete=False, suffix='.mid') as tmp:
-        tmp.write(await file.read())
-        tmp_path = tmp.name
+    upload = await receive_upload(file, settings.max_upload_bytes)
 
     try:
-        parsed = parse_midi_file(tmp_path)
+        parsed = parse_cache.parse_midi(upload.content, file.filename, upload.sha256)
         db = DatabaseConnection(settings)
 
         from app.services.score_parser import ParsedScore, ScoreChord
@@ -397,9 +428,6 @@ async def import_midi(
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to import MIDI: {e}")
-    finally:
-        if os.path.exists(tmp_path):
-            os.unlink(tmp_path)
 
 
 # ---------------------------------------------------------------------------
@@ -416,13 +444,11 @@ async def preview_score(file: UploadFile = File(...)):
             detail=f"Unsupported format '{ext}'. Supported: {', '.join(sorted(SUPPORTED_EXTENSIONS))}"
         )
 
-    content = await file.read()
-    with tempfile.NamedTemporaryFile(delete=False, suffix=ext) as tmp:
-        tmp.write(content)
-        tmp_path = tmp.name
+    upload = await receive_upload(file, settings.max_upload_bytes)
 
     try:
-        parsed = parse_music_file(tmp_path, file.filename)
+        # The full import parse, so confirming the preview is a cache hit
+        parsed = parse_cache.parse_import(upload.content, file.filename, upload.sha256).score
         format_label = {
             '.mscz': 'MuseScore', '.mscx': 'MuseScore XML',
             '.musicxml': 'MusicXML', '.xml': 'MusicXML', '.mxl': 'MusicXML',
@@ -448,9 +474,6 @@ async def preview_score(file: UploadFile = File(...)):
     except Exception as e:
         logger.exception("Error previewing file %s", file.filename)
         raise HTTPException(status_code=500, detail=f"Parse error: {e}")
-    finally:
-        if os.path.exists(tmp_path):
-            os.unlink(tmp_path)
 
 
 @router.post("/score/import")
@@ -465,7 +488,8 @@ async def import_score(
     """Import any supported music file and save to database.
 
     Returns import_id, import_status, note_count, version_number.
-    HTTP 200 on success, 207 on partial, 422 on total parse failure.
+    HTTP 200 on success, 207 on partial, 422 on total parse failure,
+    413 if the upload is over settings.max_upload_bytes.
     """
     ext = _ext(file.filename)
     if ext not in SUPPORTED_EXTENSIONS:
@@ -474,28 +498,20 @@ async def import_score(
             detail=f"Unsupported format '{ext}'. Supported: {', '.join(sorted(SUPPORTED_EXTENSIONS))}"
         )
 
-    tmp_path = None
     t_start = time.monotonic()
+    # Hashed while it streams in; rejected with 413 past the size cap
+    upload = await receive_upload(file, settings.max_upload_bytes)
+    content = upload.content
     db = DatabaseConnection(settings)
 
     try:
-        content = await file.read()
-        with tempfile.NamedTemporaryFile(delete=False, suffix=ext) as tmp:
-            tmp.write(content)
-            tmp_path = tmp.name
-
-        # Compute file hashes
-        hashes = _compute_file_hashes(content)
         import_format = ext.lstrip('.')
         warnings_list = []
 
-        # --- Parse with legacy parser (chords + metadata) ---
-        parsed = parse_music_file(tmp_path, file.filename)
-        source_type = {
-            '.mscz': 'MuseScore', '.mscx': 'MuseScore',
-            '.musicxml': 'MusicXML', '.xml': 'MusicXML', '.mxl': 'MusicXML',
-            '.mid': 'MIDI', '.midi': 'MIDI',
-        }.get(ext, 'Unknown')
+        # --- Parse once: chords/sections and the rich note data ---
+        parsed_import = parse_cache.parse_import(content, file.filename, upload.sha256)
+        parsed = parsed_import.score
+        source_type = _SOURCE_TYPES.get(ext, 'Unknown')
 
         # --- Versioning ---
         song_title = title or parsed.title or os.path.splitext(file.filename)[0]
@@ -505,31 +521,31 @@ async def import_score(
             song_title = f"{base_title} ({version_num})"
 
         # Check for duplicate file hash
-        dup_warning = _check_duplicate_hash(db, hashes['md5'], base_title)
+        dup_warning = _check_duplicate_hash(db, upload.md5, base_title)
         if dup_warning:
             warnings_list.append(dup_warning)
 
-        # --- Create song + chords (legacy path) ---
-        result = _save_score_to_db(db, parsed, song_title, composer, genre, file.filename, source_type)
+        # --- Create song, chords and rich note data in one transaction ---
+        result = _save_score_to_db(
+            db, parsed, song_title, composer, genre, file.filename, source_type,
+            rich_parsed=parsed_import.rich, base_title=base_title, version_number=version_num,
+        )
         song_id = result["song_id"]
-
-        # Set base_title and version_number on the song
-        try:
-            db.execute_non_query(
-                "UPDATE Songs SET base_title = ?, version_number = ? WHERE id = ?",
-                (base_title, version_num, song_id)
-            )
-        except Exception as e:
-            logger.debug("Could not set version fields: %s", e)
+        rich_result = result["rich"]
+        rich_error = parsed_import.rich_error or result["rich_error"]
+        if rich_result:
+            logger.info("Rich import for song %d: %s", song_id, rich_result)
+            for table, err in rich_result.get('errors', {}).items():
+                warnings_list.append(f"Could not save {table}: {err}")
 
         # --- Create import provenance record ---
         import_id = _create_import_record(
             db,
             song_id=song_id,
             original_filename=file.filename,
-            file_size_bytes=len(content),
-            file_hash_md5=hashes['md5'],
-            file_hash_sha256=hashes['sha256'],
+            file_size_bytes=upload.size,
+            file_hash_md5=upload.md5,
+            file_hash_sha256=upload.sha256,
             fs_modified_at=fs_modified_at,
             import_format=import_format,
             import_status='pending',
@@ -537,17 +553,6 @@ async def import_score(
             version_number=version_num,
         )
 
-        # --- Rich note extraction ---
-        rich_result = None
-        rich_error = None
-        try:
-            rich_parsed = parse_upload_full(content, file.filename)
-            rich_result = save_full_parse(song_id, rich_parsed, db)
-            logger.info("Rich import for song %d: %s", song_id, rich_result)
-        except Exception as e:
-            rich_error = traceback.format_exc()
-            logger.error("Rich import failed for song %d: %s", song_id, e)
-
         # --- Determine import status ---
         note_count = rich_result['actual_notes'] if rich_result else 0
         lyric_count = rich_result.get('lyrics_saved', 0) if rich_result else 0
@@ -619,7 +624,7 @@ async def import_score(
             _create_import_record(
                 db,
                 original_filename=file.filename or 'unknown',
-                file_size_bytes=len(content) if 'content' in dir() else None,
+                file_size_bytes=upload.size,
                 import_format=ext.lstrip('.') if ext else None,
                 import_status='failed',
                 import_error_log=traceback.format_exc(),
@@ -628,16 +633,32 @@ async def import_score(
         except Exception:
             pass
         raise HTTPException(status_code=500, detail=f"Import failed: {e}")
-    finally:
-        if tmp_path and os.path.exists(tmp_path):
-            os.unlink(tmp_path)
 
 
 # ---------------------------------------------------------------------------
 # HL-018: Batch import (ZIP of music files or multi-file)
 # ---------------------------------------------------------------------------
 
-@router.post("/batch")
+def _batch_writer(composer: Optional[str], genre: Optional[str], skip_duplicates: bool):
+    """Build the per-file DB writer used by a batch job (runs on the job's writer thread)."""
+    db = DatabaseConnection(settings)
+
+    def write(parsed: ParsedScore, base_name: str) -> Dict[str, Any]:
+        if skip_duplicates and _song_exists(db, parsed.title, parsed.key):
+            return {"status": "skipped", "reason": f"Duplicate: '{parsed.title}' already exists"}
+        source_type = _SOURCE_TYPES.get(_ext(base_name), 'Unknown')
+        saved = _save_score_to_db(db, parsed, None, composer, genre, base_name, source_type)
+        return {
+            "status": "imported",
+            "song_id": saved["song_id"],
+            "title": saved["title"],
+            "chords": saved["chords_created"],
+        }
+
+    return write
+
+
+@router.post("/batch", status_code=status.HTTP_202_ACCEPTED)
 async def batch_import(
     file: UploadFile = File(...),
     composer: Optional[str] = None,
@@ -645,93 +666,59 @@ async def batch_import(
     skip_duplicates: bool = Query(default=True),
 ):
     """
-    Batch import music files from a ZIP archive.
+    Start a batch import of music files from a ZIP archive.
 
     The ZIP may contain any mix of .mscz, .mscx, .musicxml, .mid files.
-    Files are processed sequentially. Duplicates (same title+key) are skipped
-    unless skip_duplicates=false.
+    Files are parsed in parallel worker processes and saved by a single
+    writer. Duplicates (same title+key) are skipped unless skip_duplicates=false.
 
-    Returns a summary: imported / skipped / failed counts and per-file details.
+    Returns 202 with a job_id; poll GET /batch/{job_id} for per-file progress
+    and the final imported / skipped / failed summary.
     """
     if _ext(file.filename) != '.zip':
         raise HTTPException(status_code=400, detail="Batch import requires a .zip file")
 
-    zip_bytes = await file.read()
+    # Spool the upload to disk in chunks; the archive is never held in memory
+    with tempfile.NamedTemporaryFile(delete=False, suffix='.zip') as tmp:
+        zip_path = tmp.name
+        try:
+            await spool_upload(file, tmp, settings.max_batch_upload_bytes)
+        except HTTPException:
+            tmp.close()
+            os.unlink(zip_path)
+            raise
+
     try:
-        zf = zipfile.ZipFile(io.BytesIO(zip_bytes), 'r')
+        with zipfile.ZipFile(zip_path, 'r') as zf:
+            music_files = [
+                name for name in zf.namelist()
+                if _ext(name) in SUPPORTED_EXTENSIONS and not name.startswith('__MACOSX')
+            ]
     except zipfile.BadZipFile:
+        os.unlink(zip_path)
         raise HTTPException(status_code=400, detail="Uploaded file is not a valid ZIP archive")
 
-    music_files = [
-        name for name in zf.namelist()
-        if _ext(name) in SUPPORTED_EXTENSIONS and not name.startswith('__MACOSX')
-    ]
-
     if not music_files:
+        os.unlink(zip_path)
         raise HTTPException(
             status_code=400,
             detail=f"No supported music files found in ZIP. Supported: {', '.join(sorted(SUPPORTED_EXTENSIONS))}"
         )
 
-    db = DatabaseConnection(settings)
-    results = {
-        "total": len(music_files),
-        "imported": 0,
-        "skipped_duplicate": 0,
-        "failed": 0,
-        "files": [],
-    }
-
-    for name in music_files:
-        base_name = os.path.basename(name)
-        ext = _ext(base_name)
-        file_result: Dict[str, Any] = {"filename": base_name, "status": "unknown"}
+    job = await run_in_threadpool(
+        start_batch_import, zip_path, music_files, _batch_writer(composer, genre, skip_duplicates)
+    )
+    logger.info("Batch import job %s started: %d files", job.id, len(music_files))
+    return job.snapshot()
 
-        tmp_path = None
-        try:
-            file_bytes = zf.read(name)
-            with tempfile.NamedTemporaryFile(delete=False, suffix=ext) as tmp:
-                tmp.write(file_bytes)
-                tmp_path = tmp.name
-
-            parsed = parse_music_file(tmp_path, base_name)
-
-            if skip_duplicates and _song_exists(db, parsed.title, parsed.key):
-                file_result["status"] = "skipped"
-                file_result["reason"] = f"Duplicate: '{parsed.title}' already exists"
-                results["skipped_duplicate"] += 1
-            else:
-                source_type = {
-                    '.mscz': 'MuseScore', '.mscx': 'MuseScore',
-                    '.musicxml': 'MusicXML', '.xml': 'MusicXML', '.mxl': 'MusicXML',
-                    '.mid': 'MIDI', '.midi': 'MIDI',
-                }.get(ext, 'Unknown')
-                saved = _save_score_to_db(db, parsed, None, composer, genre, base_name, source_type)
-                file_result["status"] = "imported"
-                file_result["song_id"] = saved["song_id"]
-                file_result["title"] = saved["title"]
-                file_result["chords"] = saved["chords_created"]
-                results["imported"] += 1
 
-        except Exception as e:
-            logger.warning("Batch import failed for %s: %s", base_name, e)
-            file_result["status"] = "failed"
-            file_result["error"] = str(e)
-            results["failed"] += 1
-        finally:
-            if tmp_path and os.path.exists(tmp_path):
-                os.unlink(tmp_path)
-
-        results["files"].append(file_result)
-
-    zf.close()
-
-    summary = (f"Batch complete: {results['imported']} imported, "
-               f"{results['skipped_duplicate']} skipped (duplicate), "
-               f"{results['failed']} failed")
-    results["summary"] = summary
-    logger.info(summary)
-    return results
+@router.get("/batch/{job_id}")
+async def get_batch_import(job_id: str):
+    """Per-file progress of a batch import job (answered by any instance)."""
+    snapshot = await run_in_threadpool(job_snapshot, job_id)
+    if snapshot is None:
+        raise HTTPException(status_code=404, detail=f"Batch job {job_id} not found")
+    return snapshot
 
 
 # ---------------------------------------------------------------------------
@@ -793,6 +780,7 @@ def _save_omr_result(parsed: dict, filename: str, db: DatabaseConnection) -> int
             (measure_id, chord["chord_symbol"], chord.get("beat_position", 1.0),
              chord.get("chord_order", 1))
         )
+    chord_timeline.rebuild(song_id, db)
 
     return song_id
 
@@ -805,8 +793,8 @@ async def omr_preview(file: UploadFile = File(...)):
     suffix = P(file.filename).suffix.lower()
     if suffix not in OMR_ALLOWED:
         raise HTTPException(400, detail=f"Unsupported file type '{suffix}'. Allowed: PDF, JPG, PNG, SVG")
+    file_bytes = (await receive_upload(file, settings.max_upload_bytes)).content
     try:
-        file_bytes = await file.read()
         result = parse_omr_file(file_bytes, file.filename)
         if not result.get("chords"):
             result["warning"] = "No chord symbols detected. Try a cleaner scan or higher resolution image."
@@ -831,9 +819,9 @@ async def omr_import(
     suffix = P(file.filename).suffix.lower()
     if suffix not in OMR_ALLOWED:
         raise HTTPException(400, detail=f"Unsupported file type '{suffix}'. Allowed: PDF, JPG, PNG, SVG")
+    file_bytes = (await receive_upload(file, settings.max_upload_bytes)).content
     db = DatabaseConnection(settings)
     try:
-        file_bytes = await file.read()
         parsed = parse_omr_file(file_bytes, file.filename)
         if title_override:
             parsed["title"] = title_override
@@ -1193,6 +1181,7 @@ async def seed_jazz_standards(
                     (measure_id, float(beat), symbol, measure_chord_order[measure_num])
                 )
                 chord_count += 1
+            chord_timeline.rebuild(song_id, db)
 
             results["imported"] += 1
             results["songs"].append({
@@ -5,6 +5,7 @@ from fastapi import APIRouter, HTTPException, status
 from typing import List
 from app.models import Measure, MeasureCreate, MeasureWithChords, Chord
 from app.db.connection import DatabaseConnection
+from app.services import analysis_cache, chord_timeline
 from config.settings import Settings
 
 router = APIRouter(prefix="/api/v1/measures", tags=["measures"])
@@ -40,6 +41,7 @@ async def create_measure(measure: MeasureCreate):
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to create measure"
         )
+    analysis_cache.invalidate_section(measure.section_id, db)
 
     row = result[0]
     return Measure(
@@ -194,14 +196,20 @@ async def update_measure(measure_id: int, measure_update: MeasureCreate):
             detail=f"Measure with id {measure_id} not found"
         )
 
-    # Update measure
+    # Update measure (rebuild and invalidate the old song too if the measure moves)
+    song_ids = {chord_timeline.song_of_measure(measure_id, db),
+                chord_timeline.song_of_section(measure_update.section_id, db)} - {None}
     query = """
         UPDATE Measures
         SET section_id = ?, measure_number = ?
         WHERE id = ?
     """
 
-    db.execute_non_query(query, (measure_update.section_id, measure_update.measure_number, measure_id))
+    with db.transaction() as tx:
+        tx.execute(query, (measure_update.section_id, measure_update.measure_number, measure_id))
+        for song_id in song_ids:
+            chord_timeline.rebuild_in(tx, song_id)
+            tx.execute(analysis_cache.INVALIDATE_SQL, (song_id,))
 
     # Return updated measure
     select_query = """
@@ -236,5 +244,9 @@ async def delete_measure(measure_id: int):
         )
 
     # Delete measure (chords will cascade)
+    song_id = chord_timeline.song_of_measure(measure_id, db)
     query = "DELETE FROM Measures WHERE id = ?"
-    db.execute_non_query(query, (measure_id,))
+    with db.transaction() as tx:
+        tx.execute(query, (measure_id,))
+        chord_timeline.rebuild_in(tx, song_id)
+        tx.execute(analysis_cache.INVALIDATE_SQL, (song_id,))
@@ -3,7 +3,6 @@ API routes for MIDI keyboard input and rhythm analysis.
 HL-017: Real-time chord identification from MIDI input + rhythm analysis.
 """
 import os
-import tempfile
 import logging
 from typing import List, Optional
 
@@ -12,7 +11,10 @@ from pydantic import BaseModel
 from app.services.midi_parser import identify_chord, NOTE_NAMES
 from app.services.analysis_service import HarmonicAnalyzer
 from app.services.rhythm_analyzer import analyze_rhythm_from_midi
+from app.services import chord_timeline
+from app.api.uploads import receive_upload
 from app.db.connection import DatabaseConnection, get_db
+from config.settings import settings
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/api/v1/midi", tags=["midi"])
@@ -97,20 +99,14 @@ async def analyze_midi_rhythm(
     if ext not in ('.mid', '.midi'):
         raise HTTPException(status_code=400, detail="File must be .mid or .midi")
 
-    content = await file.read()
-    with tempfile.NamedTemporaryFile(delete=False, suffix='.mid') as tmp:
-        tmp.write(content)
-        tmp_path = tmp.name
+    upload = await receive_upload(file, settings.max_upload_bytes)
 
     try:
-        result = analyze_rhythm_from_midi(tmp_path)
+        result = analyze_rhythm_from_midi(upload.content)
         return result
     except Exception as e:
         logger.exception("Rhythm analysis failed for %s", file.filename)
         raise HTTPException(status_code=500, detail=f"Rhythm analysis failed: {e}")
-    finally:
-        if os.path.exists(tmp_path):
-            os.unlink(tmp_path)
 
 
 @router.get("/rhythm/song/{song_id}")
@@ -156,14 +152,7 @@ async def analyze_song_rhythm(
         return result
 
     # Fall back to chord positions for basic rhythm analysis
-    chords = db.execute_query("""
-        SELECT m.measure_number, c.beat_position
-        FROM Chords c
-        JOIN Measures m ON c.measure_id = m.id
-        JOIN Sections s ON m.section_id = s.id
-        WHERE s.song_id = ?
-        ORDER BY s.section_order, m.measure_number, c.chord_order
-    """, (song_id,))
+    chords = chord_timeline.load(song_id, db, ('measure_number', 'beat_position'))
 
     if not chords:
         raise HTTPException(status_code=404, detail="No chord or melody data for rhythm analysis")
@@ -8,6 +8,7 @@ import random
 import json
 from app.models import QuizQuestion, QuizGenerate, QuizSubmission, QuizResult, QuizAttempt
 from app.db.connection import DatabaseConnection
+from app.services import chord_timeline
 from config.settings import Settings
 
 router = APIRouter(prefix="/api/v1/quiz", tags=["quiz"])
@@ -29,31 +30,13 @@ async def generate_quiz(quiz_request: QuizGenerate, user_id: int):
             detail=f"Song with id {quiz_request.song_id} not found"
         )
 
-    # Build query to get all chords for the song (or specific section)
-    if quiz_request.section_id:
-        query = """
-            SELECT c.id, m.measure_number, c.beat_position, c.chord_symbol,
-                   c.roman_numeral, c.key_center, c.chord_order
-            FROM Chords c
-            INNER JOIN Measures m ON c.measure_id = m.id
-            INNER JOIN Sections s ON m.section_id = s.id
-            WHERE s.id = ?
-            ORDER BY m.measure_number, c.chord_order
-        """
-        params = (quiz_request.section_id,)
-    else:
-        query = """
-            SELECT c.id, m.measure_number, c.beat_position, c.chord_symbol,
-                   c.roman_numeral, c.key_center, c.chord_order
-            FROM Chords c
-            INNER JOIN Measures m ON c.measure_id = m.id
-            INNER JOIN Sections s ON m.section_id = s.id
-            WHERE s.song_id = ?
-            ORDER BY s.section_order, m.measure_number, c.chord_order
-        """
-        params = (quiz_request.song_id,)
-
-    result = db.execute_query(query, params)
+    # All chords for the song (or specific section), in progression order
+    result = chord_timeline.load(
+        quiz_request.song_id, db,
+        ('chord_id', 'measure_number', 'beat_position', 'chord_symbol', 'roman_numeral',
+         'key_center', 'chord_order'),
+        section_id=quiz_request.section_id,
+    )
 
     if not result or len(result) == 0:
         raise HTTPException(
@@ -125,7 +108,7 @@ async def generate_quiz(quiz_request: QuizGenerate, user_id: int):
                 "context": context,
                 "options": options,
                 "correct_answer": correct_answer,
-                "chord_id": row['id'],
+                "chord_id": row['chord_id'],
                 "measure_number": row['measure_number'],
                 "beat_position": float(row['beat_position']),
                 "roman_numeral": row['roman_numeral'],
@@ -133,7 +116,7 @@ async def generate_quiz(quiz_request: QuizGenerate, user_id: int):
             })
 
             answers.append({
-                "chord_id": row['id'],
+                "chord_id": row['chord_id'],
                 "correct_answer": correct_answer
             })
 
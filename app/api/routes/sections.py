@@ -7,6 +7,7 @@ from typing import List
 from fastapi import APIRouter, HTTPException, Depends
 from app.models import Section, SectionCreate
 from app.db.connection import DatabaseConnection, get_db
+from app.services import analysis_cache, chord_timeline
 
 
 router = APIRouter(prefix="/api/v1/songs", tags=["sections"])
@@ -57,9 +58,12 @@ async def create_section(
 @router.delete("/{section_id}", status_code=204)
 async def delete_section(section_id: int, db: DatabaseConnection = Depends(get_db)):
     """Delete a section (cascades to measures and chords)."""
-    result = db.execute_non_query("DELETE FROM Sections WHERE id = ?", (section_id,))
-    
-    if result == 0:
-        raise HTTPException(status_code=404, detail="Section not found")
+    song_id = chord_timeline.song_of_section(section_id, db)
+    with db.transaction() as tx:
+        result = tx.execute("DELETE FROM Sections WHERE id = ?", (section_id,))
+        if result == 0:
+            raise HTTPException(status_code=404, detail="Section not found")
+        chord_timeline.rebuild_in(tx, song_id)
+        tx.execute(analysis_cache.INVALIDATE_SQL, (song_id,))
     
     return None
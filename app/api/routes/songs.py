@@ -3,59 +3,109 @@ Songs API Routes
 
 CRUD operations for songs.
 """
-from typing import List
-from fastapi import APIRouter, HTTPException, Depends
+import re
+from typing import List, Optional, Tuple
+from fastapi import APIRouter, HTTPException, Depends, Response
 from app.models import Song, SongCreate, SongUpdate
+from app.db import codec
 from app.db.connection import DatabaseConnection, get_db
+from app.services import analysis_cache, chord_timeline, song_artifacts
 
 
 router = APIRouter(prefix="/api/v1/songs", tags=["songs"])
 
 
+# Songs columns served by the Song model. Large artifacts (source XML,
+# section markers) live in SongArtifacts and are fetched on demand.
+SONG_COLUMNS = (
+    'id', 'title', 'composer', 'arranger', 'original_key', 'tempo_marking', 'genre',
+    'time_signature', 'year_composed', 'notes', 'source_file_name', 'source_file_type',
+    'created_at', 'updated_at', 'has_note_data', 'has_lyrics', 'import_format',
+    'track_count', 'measure_count', 'total_notes', 'version_number', 'base_title',
+)
+_SONG_SELECT = ', '.join(SONG_COLUMNS)
+
+
+# created_at as SQL Server stores it. DATETIME2 keeps 100ns ticks but pyodbc
+# returns microseconds, so a cursor built from the fetched datetime would not
+# equal the stored value and rows tied on created_at would be skipped.
+_CURSOR_CREATED_AT = "CONVERT(varchar(27), created_at, 121) AS cursor_created_at"
+_CURSOR_RE = re.compile(r"(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}(?:\.\d{1,7})?),(\d+)")
+
+
+def _encode_cursor(row: dict) -> str:
+    return f"{row['cursor_created_at']},{row['id']}"
+
+
+def _decode_cursor(cursor: str) -> Tuple[str, int]:
+    """(created_at text for CAST(? AS DATETIME2), id); 400 if malformed."""
+    match = _CURSOR_RE.fullmatch(cursor)
+    if not match:
+        raise HTTPException(status_code=400, detail=f"Invalid cursor: {cursor!r}")
+    return match.group(1), int(match.group(2))
+
+
 @router.get("/", response_model=List[Song])
 async def list_songs(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
     genre: str = None,
+    after: Optional[str] = None,
     db: DatabaseConnection = Depends(get_db)
 ):
     """
-    List all songs with optional filtering.
+    List all songs with optional filtering, newest first.
 
     - **skip**: Number of records to skip (pagination)
     - **limit**: Maximum number of records to return
     - **genre**: Filter by genre (optional)
+    - **after**: Keyset cursor from a previous page's X-Next-Cursor header;
+      returns the songs after it without scanning the skipped rows
+
+    A full page sets X-Next-Cursor to the cursor of its last song.
     """
-    # REQ-017: LEFT JOIN song_imports to surface latest fs_modified_at per song.
-    # Uses subquery to avoid enumerating all Songs columns in GROUP BY.
-    # Default sort by Songs.created_at DESC (most recently imported first).
-    subq = """
-        (SELECT song_id, MAX(fs_modified_at) AS fs_modified_at
-         FROM song_imports
-         GROUP BY song_id) AS si
-    """
-    query = f"""
-        SELECT s.*, si.fs_modified_at
-        FROM Songs s
-        LEFT JOIN {subq} ON si.song_id = s.id
-    """
+    # The page is read from IX_Songs_created_at_id (created_at DESC, id DESC,
+    # covering SONG_COLUMNS); REQ-017's latest fs_modified_at is then looked
+    # up for the page's songs only.
+    where = []
     params = []
-
     if genre:
-        query += " WHERE s.genre = ?"
+        where.append("genre = ?")
         params.append(genre)
+    if after:
+        created_at, song_id = _decode_cursor(after)
+        where.append("(created_at < CAST(? AS DATETIME2) OR "
+                     "(created_at = CAST(? AS DATETIME2) AND id < ?))")
+        params.extend([created_at, created_at, song_id])
 
-    query += " ORDER BY s.created_at DESC OFFSET ? ROWS FETCH NEXT ? ROWS ONLY"
+    query = f"""
+        SELECT p.*, si.fs_modified_at
+        FROM (
+            SELECT {_SONG_SELECT}, {_CURSOR_CREATED_AT}
+            FROM Songs
+            {"WHERE " + " AND ".join(where) if where else ""}
+            ORDER BY created_at DESC, id DESC
+            OFFSET ? ROWS FETCH NEXT ? ROWS ONLY
+        ) p
+        OUTER APPLY (
+            SELECT MAX(fs_modified_at) AS fs_modified_at
+            FROM song_imports WHERE song_id = p.id
+        ) si
+        ORDER BY p.created_at DESC, p.id DESC
+    """
     params.extend([skip, limit])
 
     songs = db.execute_query(query, tuple(params))
+    if songs and len(songs) == limit:
+        response.headers["X-Next-Cursor"] = _encode_cursor(songs[-1])
     return songs
 
 
 @router.get("/{song_id}", response_model=Song)
 async def get_song(song_id: int, db: DatabaseConnection = Depends(get_db)):
     """Get a specific song by ID."""
-    query = "SELECT * FROM Songs WHERE id = ?"
+    query = f"SELECT {_SONG_SELECT} FROM Songs WHERE id = ?"
     songs = db.execute_query(query, (song_id,))
     
     if not songs:
@@ -64,6 +114,15 @@ async def get_song(song_id: int, db: DatabaseConnection = Depends(get_db)):
     return songs[0]
 
 
+@router.get("/{song_id}/raw-xml")
+async def get_song_raw_xml(song_id: int, db: DatabaseConnection = Depends(get_db)):
+    """Source XML stored by a MuseScore/MusicXML import (null if none)."""
+    existing = db.execute_query("SELECT id FROM Songs WHERE id = ?", (song_id,))
+    if not existing:
+        raise HTTPException(status_code=404, detail="Song not found")
+    return {'song_id': song_id, 'raw_xml': song_artifacts.get(song_id, song_artifacts.RAW_XML, db)}
+
+
 @router.post("/", response_model=Song, status_code=201)
 async def create_song(song: SongCreate, db: DatabaseConnection = Depends(get_db)):
     """Create a new song."""
@@ -121,6 +180,7 @@ async def update_song(
     
     query = f"UPDATE Songs SET {', '.join(update_fields)} WHERE id = ?"
     db.execute_non_query(query, tuple(params))
+    analysis_cache.invalidate(song_id, db)
     
     return await get_song(song_id, db)
 
@@ -230,7 +290,11 @@ async def delete_song(song_id: int, db: DatabaseConnection = Depends(get_db)):
 @router.get("/{song_id}/audit")
 async def get_song_audit(song_id: int, db: DatabaseConnection = Depends(get_db)):
     """Get full import audit data for a song, grouped by measure."""
-    songs = db.execute_query("SELECT * FROM Songs WHERE id = ?", (song_id,))
+    songs = db.execute_query("""
+        SELECT title, import_format, total_notes, has_lyrics, has_note_data,
+               track_count, measure_count
+        FROM Songs WHERE id = ?
+    """, (song_id,))
     if not songs:
         raise HTTPException(status_code=404, detail="Song not found")
     song = songs[0]
@@ -468,25 +532,19 @@ async def get_song_notes(
 @router.get("/{song_id}/chords")
 async def get_song_chords(song_id: int, db: DatabaseConnection = Depends(get_db)):
     """HL-036: Get all chords for a song with measure and beat_position fields for playback.
-    Primary source: Chords table (joined via Measures).
+    Primary source: SongChordTimeline (the Chords table in progression order).
     Fallback: SongAnalysis JSON blob (algorithm-analyzed songs without DB chord rows).
     """
-    import json as _json
     songs = db.execute_query("SELECT id FROM Songs WHERE id = ?", (song_id,))
     if not songs:
         raise HTTPException(status_code=404, detail="Song not found")
 
-    # Primary: Chords table
+    # Primary: Chords table, via the timeline
     chords = []
     try:
-        chords = db.execute_query("""
-            SELECT c.id, c.beat_position, c.chord_symbol, c.roman_numeral,
-                   m.measure_number
-            FROM Chords c
-            JOIN Measures m ON c.measure_id = m.id
-            WHERE m.song_id = ?
-            ORDER BY m.measure_number, c.beat_position
-        """, (song_id,))
+        chords = chord_timeline.load(
+            song_id, db, ('chord_id', 'beat_position', 'chord_symbol', 'roman_numeral', 'measure_number')
+        )
     except Exception:
         chords = []
 
@@ -496,7 +554,7 @@ async def get_song_chords(song_id: int, db: DatabaseConnection = Depends(get_db)
             "source": "db",
             "chords": [
                 {
-                    "id": c["id"],
+                    "id": c["chord_id"],
                     "measure": c["measure_number"],
                     "beat_position": float(c.get("beat_position") or 1.0),
                     "symbol": c["chord_symbol"],
@@ -513,7 +571,7 @@ async def get_song_chords(song_id: int, db: DatabaseConnection = Depends(get_db)
             "SELECT analysis_json FROM SongAnalysis WHERE song_id = ?", (song_id,)
         )
         if cached and cached[0].get("analysis_json"):
-            analysis = _json.loads(cached[0]["analysis_json"])
+            analysis = codec.unpack_json(cached[0]["analysis_json"])
             analysis_chords = analysis.get("chords", [])
             if analysis_chords:
                 return {
@@ -552,4 +610,5 @@ async def update_form_override(
         "UPDATE Songs SET form_override = ? WHERE id = ?",
         [form_value or None, song_id]
     )
+    analysis_cache.invalidate(song_id, db)
     return {"song_id": song_id, "form_override": form_value or None}
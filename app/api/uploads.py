@@ -0,0 +1,134 @@
+"""
+Size-capped, stream-hashed reading of multipart uploads.
+
+Starlette parses the whole multipart form (spooling each file to memory,
+then to a temp file past 1 MB) before a route runs, so a cap checked in
+the route only limits what the route keeps, not what the server receives.
+UploadSizeLimitMiddleware enforces the cap while the body is still
+arriving: a multipart request whose Content-Length is over it gets 413
+without its body being read, and a body without one is counted as it is
+received and cut off with 413 once it passes the cap.
+
+Import routes then read the spooled file through receive_upload() instead
+of a bare `await file.read()`: MD5/SHA-256 are updated chunk by chunk and
+the per-file cap is checked again. The parsers take the resulting bytes
+directly (app.services.file_source), so nothing else is written to disk.
+"""
+import hashlib
+from dataclasses import dataclass
+from typing import BinaryIO
+
+from fastapi import HTTPException, UploadFile
+from fastapi.responses import JSONResponse
+
+from config.settings import settings
+
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+
+# Multipart boundaries, part headers and small form fields on top of the file
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+# Routes taking a batch ZIP (settings.max_batch_upload_bytes) rather than one music file
+BATCH_UPLOAD_PATHS = frozenset({"/api/v1/imports/batch"})
+
+
+@dataclass
+class ReceivedUpload:
+    """An upload read into memory, with the hashes taken while it arrived."""
+    filename: str
+    content: bytes
+    md5: str
+    sha256: str
+
+    @property
+    def size(self) -> int:
+        return len(self.content)
+
+
+def _too_large(filename: str, max_bytes: int) -> HTTPException:
+    return HTTPException(
+        status_code=413,
+        detail=f"'{filename}' exceeds the {max_bytes / (1024 * 1024):g} MB upload limit",
+    )
+
+
+def _body_too_large(max_bytes: int) -> HTTPException:
+    return HTTPException(
+        status_code=413,
+        detail=f"Request body exceeds the {max_bytes / (1024 * 1024):g} MB upload limit",
+    )
+
+
+class UploadSizeLimitMiddleware:
+    """ASGI middleware: 413 for a multipart body over the upload cap, before it is spooled."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST":
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope["headers"])
+        if not headers.get(b"content-type", b"").startswith(b"multipart/form-data"):
+            await self.app(scope, receive, send)
+            return
+
+        max_bytes = (settings.max_batch_upload_bytes if scope["path"] in BATCH_UPLOAD_PATHS
+                     else settings.max_upload_bytes)
+        limit = max_bytes + MULTIPART_OVERHEAD_BYTES
+        content_length = headers.get(b"content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > limit:
+            error = _body_too_large(max_bytes)
+            response = JSONResponse({"detail": error.detail}, status_code=error.status_code)
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    # Raised inside the form parse; FastAPI re-raises HTTPException as is
+                    raise _body_too_large(max_bytes)
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+
+async def receive_upload(file: UploadFile, max_bytes: int) -> ReceivedUpload:
+    """Read a received upload in chunks, hashing as it goes; 413 once it passes max_bytes."""
+    if file.size is not None and file.size > max_bytes:
+        raise _too_large(file.filename, max_bytes)
+
+    md5, sha256 = hashlib.md5(), hashlib.sha256()
+    chunks = []
+    received = 0
+    while chunk := await file.read(UPLOAD_CHUNK_BYTES):
+        received += len(chunk)
+        if received > max_bytes:
+            raise _too_large(file.filename, max_bytes)
+        md5.update(chunk)
+        sha256.update(chunk)
+        chunks.append(chunk)
+    return ReceivedUpload(file.filename, b''.join(chunks), md5.hexdigest(), sha256.hexdigest())
+
+
+async def spool_upload(file: UploadFile, dest: BinaryIO, max_bytes: int) -> int:
+    """Copy an upload to an open file in chunks; 413 once it passes max_bytes.
+
+    Returns the number of bytes written.
+    """
+    if file.size is not None and file.size > max_bytes:
+        raise _too_large(file.filename, max_bytes)
+
+    written = 0
+    while chunk := await file.read(UPLOAD_CHUNK_BYTES):
+        written += len(chunk)
+        if written > max_bytes:
+            raise _too_large(file.filename, max_bytes)
+        dest.write(chunk)
+    return written
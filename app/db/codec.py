@@ -0,0 +1,88 @@
+"""
+Compressed VARBINARY storage for large text columns.
+
+SongAnalysis.analysis_json / served_json, rlhf_sessions.algorithm_snapshot
+and SongArtifacts.content hold packed values: one format byte followed by
+the compressed UTF-8 text.
+
+    0x01  gzip
+    0x02  zstd (needs the optional `zstandard` package)
+
+BLOB_CODEC picks the format new values are written in; unpack() reads any
+of them, and also passes plain str through, so a row that predates the
+conversion (NVARCHAR) still reads.
+"""
+import gzip
+import importlib.util
+import json
+import logging
+from functools import lru_cache
+from typing import Any, Optional, Union
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+FORMAT_GZIP = 1
+FORMAT_ZSTD = 2
+
+HAS_ZSTD = importlib.util.find_spec("zstandard") is not None
+
+_GZIP_LEVEL = 6
+_ZSTD_LEVEL = 3
+
+
+@lru_cache(maxsize=1)
+def default_format() -> int:
+    """Format byte for new values (BLOB_CODEC=gzip|zstd; zstd falls back to gzip if unavailable)."""
+    if settings.blob_codec == "zstd":
+        if HAS_ZSTD:
+            return FORMAT_ZSTD
+        logger.warning("BLOB_CODEC=zstd but zstandard is not installed; writing gzip")
+    return FORMAT_GZIP
+
+
+def _zstd():
+    import zstandard  # optional; only loaded once a zstd value is read or written
+    return zstandard
+
+
+def pack(text: Optional[str], fmt: Optional[int] = None) -> Optional[bytes]:
+    """Compress text into a VARBINARY value (None stays None)."""
+    if text is None:
+        return None
+    fmt = fmt or default_format()
+    data = text.encode('utf-8')
+    if fmt == FORMAT_GZIP:
+        body = gzip.compress(data, compresslevel=_GZIP_LEVEL, mtime=0)
+    elif fmt == FORMAT_ZSTD:
+        # zstandard (de)compressor objects are not thread-safe: one per call
+        body = _zstd().ZstdCompressor(level=_ZSTD_LEVEL).compress(data)
+    else:
+        raise ValueError(f"Unknown codec format: {fmt!r}")
+    return bytes((fmt,)) + body
+
+
+def unpack(value: Union[bytes, bytearray, memoryview, str, None]) -> Optional[str]:
+    """Decode a packed value; str (unconverted NVARCHAR) and None pass through."""
+    if value is None or isinstance(value, str):
+        return value
+    value = bytes(value)
+    fmt, body = value[:1], value[1:]
+    if fmt == bytes((FORMAT_GZIP,)):
+        return gzip.decompress(body).decode('utf-8')
+    if fmt == bytes((FORMAT_ZSTD,)):
+        if not HAS_ZSTD:
+            raise RuntimeError("zstd-packed value but the zstandard package is not installed")
+        return _zstd().ZstdDecompressor().decompress(body).decode('utf-8')
+    raise ValueError(f"Unknown codec format byte: {fmt!r}")
+
+
+def pack_json(obj: Any) -> bytes:
+    return pack(json.dumps(obj))
+
+
+def unpack_json(value) -> Any:
+    """The decoded JSON document, or None for an empty value."""
+    text = unpack(value)
+    return json.loads(text) if text else None
@@ -1,10 +1,16 @@
 """
 Database connection for Cloud SQL.
-Uses Secret Manager credentials.
+Uses Secret Manager credentials, resolved once per process (settings.secrets()).
+Connections are reused through a process-wide bounded pool (see app.db.pool).
 """
 import logging
+from contextlib import contextmanager
+from itertools import islice
+from typing import Iterable, Sequence
+
 import pyodbc
 from config.settings import settings
+from app.db.pool import ConnectionPool
 
 logger = logging.getLogger(__name__)
 
@@ -14,10 +20,18 @@ class Database:
 
     def __init__(self):
         self._connection = None
+        self.pool = ConnectionPool(
+            self.get_connection,
+            min_size=settings.db_pool_min_size,
+            max_size=settings.db_pool_max_size,
+            idle_timeout=settings.db_pool_idle_timeout,
+            checkout_timeout=settings.db_pool_checkout_timeout,
+            ping_interval=settings.db_pool_ping_interval,
+        )
 
     @property
     def connection_string(self) -> str:
-        """Build pyodbc connection string for Cloud SQL."""
+        """Build pyodbc connection string for Cloud SQL (from the resolved secrets, no lookups)."""
         return (
             f"DRIVER={{{settings.db_driver}}};"
             f"SERVER={settings.db_server};"
@@ -31,6 +45,15 @@ class Database:
 
     def get_connection(self):
         """Get a new database connection with autocommit enabled."""
+        try:
+            return pyodbc.connect(self.connection_string, autocommit=True)
+        except pyodbc.Error as e:
+            if not _is_login_failure(e):
+                print(f"Database connection failed: {e}")
+                raise
+        # The password may have been rotated since it was resolved: re-fetch it and retry once
+        logger.warning("Database login failed; refreshing the password and retrying")
+        settings.refresh_secrets(password_only=True)
         try:
             return pyodbc.connect(self.connection_string, autocommit=True)
         except pyodbc.Error as e:
@@ -38,41 +61,174 @@ class Database:
             raise
 
     def test_connection(self) -> bool:
-        """Test database connectivity."""
+        """Test database connectivity using a pooled connection."""
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
-            cursor.execute("SELECT 1")
-            cursor.close()
-            conn.close()
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT 1")
+                cursor.close()
             return True
         except Exception as e:
             print(f"Connection test failed: {e}")
             return False
 
 
+def _is_login_failure(error: pyodbc.Error) -> bool:
+    """SQLSTATE 28000: invalid authorization (SQL Server error 18456, login failed)."""
+    return bool(error.args) and error.args[0] == '28000'
+
+
 # Singleton instance
 db = Database()
 
+# Rows sent per executemany round trip; keeps parameter arrays bounded for huge scores
+BULK_CHUNK_SIZE = 1000
+
+# SQL Server caps a single statement at 2100 parameters
+MAX_PARAMS = 2000
+
+
+class Transaction:
+    """Unit of work: statements executed on one connection inside a single transaction."""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.cursor = conn.cursor()
+
+    def execute(self, query: str, params: tuple = None) -> int:
+        """Execute a statement and return rows affected."""
+        if params:
+            self.cursor.execute(query, params)
+        else:
+            self.cursor.execute(query)
+        return self.cursor.rowcount
+
+    def query(self, query: str, params: tuple = None) -> list:
+        """Execute a query and return list of dicts."""
+        self.execute(query, params)
+        columns = [col[0] for col in self.cursor.description] if self.cursor.description else []
+        return [dict(zip(columns, row)) for row in self.cursor.fetchall()]
+
+    def executemany(self, query: str, rows: Iterable[tuple], chunk_size: int = BULK_CHUNK_SIZE) -> int:
+        """Bulk-execute a parameterized statement using fast_executemany, in chunks.
+
+        Returns the number of parameter rows sent.
+        """
+        self.cursor.fast_executemany = True
+        sent = 0
+        it = iter(rows)
+        try:
+            while True:
+                chunk = list(islice(it, chunk_size))
+                if not chunk:
+                    break
+                self.cursor.executemany(query, chunk)
+                sent += len(chunk)
+        finally:
+            self.cursor.fast_executemany = False
+        return sent
+
+    def insert_many(self, table: str, columns: Sequence[str], rows: Sequence[tuple],
+                    output: Sequence[str] = ()) -> list:
+        """Set-based multi-row INSERT ... VALUES (...), (...), optionally with OUTPUT INSERTED.
+
+        Rows are chunked to stay under SQL Server's 1000-row VALUES and
+        2100-parameter limits. OUTPUT rows come back in no guaranteed order,
+        so include the natural-key columns in `output` to map IDs back.
+        """
+        if not rows:
+            return []
+        per_chunk = max(1, min(1000, MAX_PARAMS // len(columns)))
+        placeholder = "(" + ", ".join("?" * len(columns)) + ")"
+        output_clause = (
+            " OUTPUT " + ", ".join(f"INSERTED.{col}" for col in output) if output else ""
+        )
+        returned = []
+        for start in range(0, len(rows), per_chunk):
+            chunk = rows[start:start + per_chunk]
+            sql = (
+                f"INSERT INTO {table} ({', '.join(columns)}){output_clause} "
+                f"VALUES {', '.join([placeholder] * len(chunk))}"
+            )
+            params = tuple(value for row in chunk for value in row)
+            if output:
+                returned.extend(self.query(sql, params))
+            else:
+                self.execute(sql, params)
+        return returned
+
+    @contextmanager
+    def savepoint(self, name: str):
+        """Roll back only this block's work if it raises; the outer transaction continues."""
+        self.cursor.execute(f"SAVE TRANSACTION {name}")
+        try:
+            yield
+        except Exception:
+            self.cursor.execute(f"ROLLBACK TRANSACTION {name}")
+            raise
+
 
 def get_db_connection():
-    """Convenience function for getting a connection."""
+    """Convenience function for getting a (non-pooled) connection."""
     return db.get_connection()
 
 
 class DatabaseConnection:
-    """Database connection wrapper with query execution methods."""
+    """Database connection wrapper with query execution methods.
+
+    Each execute_* call checks a connection out of the shared pool and
+    returns it afterwards. With hold_connection=True the first checkout is
+    kept until close(), so a whole request runs on a single connection.
+    """
 
-    def __init__(self, settings_obj=None):
+    def __init__(self, settings_obj=None, hold_connection: bool = False):
         self._settings = settings_obj or settings
+        self._hold = hold_connection
+        self._held = None
+
+    @contextmanager
+    def _conn(self):
+        if self._held is None and not self._hold:
+            with db.pool.connection() as conn:
+                yield conn
+            return
+        if self._held is None:
+            self._held = db.pool.acquire()
+        try:
+            yield self._held
+        except (pyodbc.OperationalError, pyodbc.InterfaceError):
+            # Link is gone: drop it so the next call checks out a fresh one
+            conn, self._held = self._held, None
+            db.pool.release(conn, discard=True)
+            raise
 
-    def _get_conn(self):
-        return db.get_connection()
+    def close(self):
+        """Return a held connection to the pool."""
+        conn, self._held = self._held, None
+        if conn is not None:
+            db.pool.release(conn)
+
+    @contextmanager
+    def transaction(self):
+        """Run a block of statements on one connection, committed atomically.
+
+        Yields a Transaction; commits when the block exits normally and rolls
+        back if it raises.
+        """
+        with self._conn() as conn:
+            conn.autocommit = False
+            try:
+                yield Transaction(conn)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                conn.autocommit = True
 
     def execute_query(self, query: str, params: tuple = None) -> list:
         """Execute query and return list of dicts."""
-        conn = self._get_conn()
-        try:
+        with self._conn() as conn:
             cursor = conn.cursor()
             if params:
                 cursor.execute(query, params)
@@ -81,13 +237,10 @@ class DatabaseConnection:
             columns = [col[0] for col in cursor.description] if cursor.description else []
             rows = cursor.fetchall()
             return [dict(zip(columns, row)) for row in rows]
-        finally:
-            conn.close()
 
     def execute_scalar(self, query: str, params: tuple = None):
         """Execute query and return first column of first row."""
-        conn = self._get_conn()
-        try:
+        with self._conn() as conn:
             cursor = conn.cursor()
             if params:
                 cursor.execute(query, params)
@@ -95,13 +248,10 @@ class DatabaseConnection:
                 cursor.execute(query)
             row = cursor.fetchone()
             return row[0] if row else None
-        finally:
-            conn.close()
 
     def execute_non_query(self, query: str, params: tuple = None) -> int:
         """Execute non-query (INSERT/UPDATE/DELETE) and return rows affected."""
-        conn = self._get_conn()
-        try:
+        with self._conn() as conn:
             cursor = conn.cursor()
             if params:
                 cursor.execute(query, params)
@@ -110,13 +260,10 @@ class DatabaseConnection:
             affected = cursor.rowcount
             conn.commit()
             return affected
-        finally:
-            conn.close()
 
     def execute_with_commit(self, query: str, params: tuple = None) -> list:
         """Execute query, commit, and return results."""
-        conn = self._get_conn()
-        try:
+        with self._conn() as conn:
             cursor = conn.cursor()
             if params:
                 cursor.execute(query, params)
@@ -126,11 +273,13 @@ class DatabaseConnection:
             rows = cursor.fetchall()
             conn.commit()
             return [dict(zip(columns, row)) for row in rows]
-        finally:
-            conn.close()
 
 
 def get_db():
-    """FastAPI dependency for database connection."""
-    return DatabaseConnection()
+    """FastAPI dependency: one pooled connection, checked out for the whole request."""
+    conn = DatabaseConnection(hold_connection=True)
+    try:
+        yield conn
+    finally:
+        conn.close()
 
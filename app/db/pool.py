@@ -0,0 +1,251 @@
+"""
+Bounded pool of reusable pyodbc connections.
+
+Every Cloud SQL connection is an encrypted TDS session, so opening one per
+statement puts a TLS handshake on the hot path of every request. The pool
+keeps a bounded set of live connections, hands them out LIFO (so the
+least-recently-used ones age out first), pings them on checkout when they
+have been idle for a while, and records wait/checkout metrics for /health.
+"""
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable
+
+import pyodbc
+
+logger = logging.getLogger(__name__)
+
+
+class PoolTimeout(RuntimeError):
+    """Raised when no connection becomes available within the checkout timeout."""
+
+
+class ConnectionPool:
+    """Thread-safe bounded connection pool."""
+
+    def __init__(
+        self,
+        factory: Callable[[], "pyodbc.Connection"],
+        min_size: int = 0,
+        max_size: int = 10,
+        idle_timeout: float = 300.0,
+        checkout_timeout: float = 30.0,
+        ping_interval: float = 5.0,
+    ):
+        if max_size < 1:
+            raise ValueError("max_size must be >= 1")
+        self._factory = factory
+        self.min_size = max(0, min(min_size, max_size))
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.checkout_timeout = checkout_timeout
+        self.ping_interval = ping_interval
+
+        self._idle = deque()  # (connection, last_used_monotonic)
+        self._size = 0        # idle + checked out
+        self._cond = threading.Condition(threading.Lock())
+
+        self._checkouts = 0
+        self._waits = 0
+        self._wait_seconds = 0.0
+        self._max_wait_seconds = 0.0
+        self._timeouts = 0
+        self._created = 0
+        self._discarded = 0
+        self._ping_failures = 0
+
+    # ------------------------------------------------------------------
+    # Checkout / release
+    # ------------------------------------------------------------------
+
+    def acquire(self):
+        """Check out a live connection, waiting up to checkout_timeout."""
+        deadline = time.monotonic() + self.checkout_timeout
+        waited_from = None
+        while True:
+            with self._cond:
+                expired = self._reap_idle_locked()
+            for conn in expired:
+                self._close_quietly(conn)
+            with self._cond:
+                entry = None
+                reserve = False
+                while entry is None and not reserve:
+                    if self._idle:
+                        entry = self._idle.pop()
+                    elif self._size < self.max_size:
+                        self._size += 1
+                        reserve = True
+                    else:
+                        if waited_from is None:
+                            waited_from = time.monotonic()
+                            self._waits += 1
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            self._timeouts += 1
+                            raise PoolTimeout(
+                                f"No database connection available after {self.checkout_timeout:g}s "
+                                f"(pool max_size={self.max_size})"
+                            )
+                        self._cond.wait(remaining)
+
+            if reserve:
+                try:
+                    conn = self._factory()
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+                with self._cond:
+                    self._created += 1
+            else:
+                conn, last_used = entry
+                if time.monotonic() - last_used >= self.ping_interval and not self._ping(conn):
+                    self._discard(conn)
+                    continue
+
+            with self._cond:
+                self._checkouts += 1
+                if waited_from is not None:
+                    waited = time.monotonic() - waited_from
+                    self._wait_seconds += waited
+                    self._max_wait_seconds = max(self._max_wait_seconds, waited)
+            return conn
+
+    def release(self, conn, discard: bool = False):
+        """Return a connection to the pool (or close it if discard=True or it is unusable)."""
+        if not discard:
+            try:
+                if not conn.autocommit:
+                    conn.rollback()
+                    conn.autocommit = True
+            except pyodbc.Error:
+                discard = True
+        if discard:
+            self._discard(conn)
+            return
+        with self._cond:
+            self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self):
+        """Context manager that checks out a connection and always returns it."""
+        conn = self.acquire()
+        broken = False
+        try:
+            yield conn
+        except (pyodbc.OperationalError, pyodbc.InterfaceError):
+            broken = True
+            raise
+        finally:
+            self.release(conn, discard=broken)
+
+    # ------------------------------------------------------------------
+    # Maintenance
+    # ------------------------------------------------------------------
+
+    def fill(self) -> int:
+        """Open connections until min_size are available. Returns the number opened."""
+        opened = 0
+        while True:
+            with self._cond:
+                if self._size >= self.min_size:
+                    return opened
+                self._size += 1
+            try:
+                conn = self._factory()
+            except Exception:
+                with self._cond:
+                    self._size -= 1
+                raise
+            with self._cond:
+                self._created += 1
+                self._idle.appendleft((conn, time.monotonic()))
+                self._cond.notify()
+            opened += 1
+
+    def close_all(self):
+        """Close every idle connection. Checked-out connections close on release."""
+        with self._cond:
+            entries = list(self._idle)
+            self._idle.clear()
+            self._size -= len(entries)
+        for conn, _ in entries:
+            self._close_quietly(conn)
+
+    def stats(self) -> dict:
+        """Snapshot of pool size and checkout/wait metrics."""
+        with self._cond:
+            idle = len(self._idle)
+            return {
+                "size": self._size,
+                "idle": idle,
+                "in_use": self._size - idle,
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+                "checkouts": self._checkouts,
+                "waits": self._waits,
+                "wait_seconds_total": round(self._wait_seconds, 4),
+                "max_wait_seconds": round(self._max_wait_seconds, 4),
+                "timeouts": self._timeouts,
+                "created": self._created,
+                "discarded": self._discarded,
+                "ping_failures": self._ping_failures,
+            }
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+
+    def _reap_idle_locked(self) -> list:
+        """Take connections idle longer than idle_timeout out of the pool, keeping min_size.
+
+        Caller holds the lock and closes the returned connections after
+        releasing it (closing one is a network round trip).
+        """
+        expired = []
+        if not self._idle or self.idle_timeout <= 0:
+            return expired
+        now = time.monotonic()
+        # Oldest entries sit at the left of the deque
+        while self._idle and self._size > self.min_size:
+            conn, last_used = self._idle[0]
+            if now - last_used < self.idle_timeout:
+                break
+            self._idle.popleft()
+            self._size -= 1
+            self._discarded += 1
+            expired.append(conn)
+        return expired
+
+    def _ping(self, conn) -> bool:
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT 1")
+            cursor.fetchone()
+            cursor.close()
+            return True
+        except pyodbc.Error as e:
+            logger.info("Discarding dead pooled connection: %s", e)
+            with self._cond:
+                self._ping_failures += 1
+            return False
+
+    def _discard(self, conn):
+        self._close_quietly(conn)
+        with self._cond:
+            self._size -= 1
+            self._discarded += 1
+            self._cond.notify()
+
+    @staticmethod
+    def _close_quietly(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
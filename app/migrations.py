@@ -1,19 +1,165 @@
 """
 HarmonyLab Database Migrations
 Idempotent schema migrations run at startup.
+
+The schema_version table records the highest migration applied and a
+content hash of each seed data set. run_migrations() reads it in a single
+query: when the recorded version is current and no seed has changed it
+returns straight away, so a scaled-out instance does not probe
+INFORMATION_SCHEMA once per migration. Otherwise only the migrations newer
+than the recorded version run, then the seeds whose content changed.
+
+Migrations can also be run outside the serving process (e.g. as a deploy
+step, with RUN_MIGRATIONS_ON_STARTUP=false on the service):
+
+    python -m app.migrations            # apply pending migrations and seeds
+    python -m app.migrations --status   # recorded vs. current versions
+    python -m app.migrations --force    # re-run every migration and seed
 """
+import argparse
+import hashlib
+import json
 import logging
+import sys
+from typing import Dict, Optional, Tuple
+from app.db import codec
 from app.db.connection import DatabaseConnection
+from app.services import chord_timeline, song_artifacts
 
 logger = logging.getLogger(__name__)
 
+# Highest migration number in _MIGRATIONS; bump it when adding one
+SCHEMA_VERSION = 22
+
+_SCHEMA_ROW = 'schema'
+
+
+class _WarningCounter(logging.Handler):
+    """Counts the warnings migrations log (they catch their own errors)."""
+
+    def __init__(self):
+        super().__init__(logging.WARNING)
+        self.count = 0
+
+    def emit(self, record):
+        self.count += 1
 
-def run_migrations():
-    """Run all idempotent migrations."""
-    db = DatabaseConnection()
-    logger.info("Running database migrations...")
 
-    # Migration 1: SongAnalysis table (cached analysis results)
+def _read_schema_version(db) -> Optional[Dict[str, Tuple[Optional[int], Optional[str]]]]:
+    """{name: (version, content_hash)} from schema_version, or None if it cannot be read."""
+    try:
+        rows = db.execute_query("SELECT name, version, content_hash FROM schema_version")
+    except Exception as e:
+        logger.info(f"  schema_version not readable ({e}); running all migrations.")
+        return None
+    return {row['name']: (row['version'], row['content_hash']) for row in rows}
+
+
+def _record_schema_version(db, name: str, version: Optional[int], content_hash: Optional[str]):
+    db.execute_non_query("""
+        MERGE schema_version AS target
+        USING (SELECT ? AS name) AS source
+        ON target.name = source.name
+        WHEN MATCHED THEN
+            UPDATE SET version = ?, content_hash = ?, applied_at = GETUTCDATE()
+        WHEN NOT MATCHED THEN
+            INSERT (name, version, content_hash) VALUES (?, ?, ?);
+    """, (name, version, content_hash, name, version, content_hash))
+
+
+def _seed_hash(rows) -> str:
+    return hashlib.sha256(json.dumps(rows, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+
+def migration_status(db=None) -> dict:
+    """Recorded schema version and seed hashes against the ones in this build."""
+    db = db or DatabaseConnection()
+    recorded = _read_schema_version(db) or {}
+    seeds = {}
+    for name, rows, _ in _SEEDS:
+        current = _seed_hash(rows())
+        seeds[name] = {'current': recorded.get(f'seed:{name}', (None, None))[1] == current,
+                       'hash': current[:12]}
+    return {
+        'recorded_version': recorded.get(_SCHEMA_ROW, (0, None))[0] or 0,
+        'schema_version': SCHEMA_VERSION,
+        'seeds': seeds,
+    }
+
+
+def run_migrations(force: bool = False) -> dict:
+    """Run pending idempotent migrations, then any seed whose content changed.
+
+    Returns what ran: {'version', 'migrations': [numbers], 'seeds': [names],
+    'warnings': count of migration/seed warnings logged}.
+    With force=True every migration and seed runs regardless of schema_version.
+    """
+    db = DatabaseConnection(hold_connection=True)
+    try:
+        recorded = None if force else _read_schema_version(db)
+        recorded = recorded or {}
+        version = recorded.get(_SCHEMA_ROW, (0, None))[0] or 0
+        pending = [(number, migration) for number, migration in _MIGRATIONS if number > version]
+        seed_hashes = {name: _seed_hash(rows()) for name, rows, _ in _SEEDS}
+        stale = [(name, apply) for name, _, apply in _SEEDS
+                 if recorded.get(f'seed:{name}', (None, None))[1] != seed_hashes[name]]
+        if not pending and not stale:
+            logger.info(f"Schema is current (version {version}); no migrations to run.")
+            return {'version': version, 'migrations': [], 'seeds': [], 'warnings': 0}
+
+        logger.info(f"Running database migrations (recorded version {version}, "
+                    f"current {SCHEMA_VERSION})...")
+        warnings = _WarningCounter()
+        logger.addHandler(warnings)
+        try:
+            _migration_0_schema_version(db)
+            for number, migration in pending:
+                migration(db)
+            if pending and warnings.count == 0:
+                try:
+                    _record_schema_version(db, _SCHEMA_ROW, SCHEMA_VERSION, None)
+                    version = SCHEMA_VERSION
+                except Exception as e:
+                    logger.warning(f"  schema_version warning: {e}")
+            elif pending:
+                logger.warning(f"  {warnings.count} migration warning(s); schema_version left at {version}.")
+
+            applied = []
+            for name, apply in stale:
+                try:
+                    apply(db)
+                    _record_schema_version(db, f'seed:{name}', None, seed_hashes[name])
+                    applied.append(name)
+                except Exception as e:
+                    logger.warning(f"  Seed {name} warning: {e}")
+        finally:
+            logger.removeHandler(warnings)
+
+        logger.info("Migrations complete.")
+        return {'version': version, 'migrations': [number for number, _ in pending], 'seeds': applied,
+                'warnings': warnings.count}
+    finally:
+        db.close()
+
+
+def _migration_0_schema_version(db):
+    """schema_version: applied migration version and seed content hashes."""
+    try:
+        db.execute_non_query("""
+            IF OBJECT_ID('schema_version', 'U') IS NULL
+            CREATE TABLE schema_version (
+                name NVARCHAR(100) NOT NULL PRIMARY KEY,
+                version INT NULL,
+                content_hash NVARCHAR(64) NULL,
+                applied_at DATETIME2 NOT NULL DEFAULT GETUTCDATE()
+            )
+        """)
+    except Exception as e:
+        logger.warning(f"  Migration 0 warning: {e}")
+
+
+def _migration_1_song_analysis(db):
+    """Create SongAnalysis table (cached analysis results)."""
     try:
         count = db.execute_scalar(
             "SELECT COUNT(*) FROM INFORMATION_SCHEMA.TABLES WHERE TABLE_NAME = 'SongAnalysis'"
@@ -41,7 +187,9 @@ def run_migrations():
     except Exception as e:
         logger.warning(f"  Migration 1 warning: {e}")
 
-    # Migration 2: ChordAnalysisOverrides table
+
+def _migration_2_chord_overrides(db):
+    """Create ChordAnalysisOverrides table."""
     try:
         count = db.execute_scalar(
             "SELECT COUNT(*) FROM INFORMATION_SCHEMA.TABLES WHERE TABLE_NAME = 'ChordAnalysisOverrides'"
@@ -72,7 +220,9 @@ def run_migrations():
     except Exception as e:
         logger.warning(f"  Migration 2 warning: {e}")
 
-    # Migration 3: KeyRegions table
+
+def _migration_3_key_regions(db):
+    """Create KeyRegions table."""
     try:
         count = db.execute_scalar(
             "SELECT COUNT(*) FROM INFORMATION_SCHEMA.TABLES WHERE TABLE_NAME = 'KeyRegions'"
@@ -102,7 +252,9 @@ def run_migrations():
     except Exception as e:
         logger.warning(f"  Migration 3 warning: {e}")
 
-    # Migration 4: Users table (for authentication)
+
+def _migration_4_users(db):
+    """Create Users table (for authentication)."""
     try:
         count = db.execute_scalar(
             "SELECT COUNT(*) FROM INFORMATION_SCHEMA.TABLES WHERE TABLE_NAME = 'Users'"
@@ -129,44 +281,6 @@ def run_migrations():
     except Exception as e:
         logger.warning(f"  Migration 4 warning: {e}")
 
-    # Migration 5: Full note data import tables (HL-REIMPORT)
-    _migration_5_note_import_tables(db)
-
-    # Migration 7: RLHF sessions table (HL-006C)
-    _migration_7_rlhf_sessions(db)
-
-    # Migration 8: Songs.form_override column (BV-04)
-    _migration_8_form_override(db)
-
-    # Migration 9: Songs.section_markers_json column (Group E)
-    _migration_9_section_markers(db)
-
-    # Migration 10: Improvisation tables (HL-IMPROV-001)
-    _migration_10_improvisation_tables(db)
-
-    # Migration 11: jazz_theory_docs table (HM13-REQ-001)
-    _migration_11_jazz_theory_docs(db)
-
-    # Migration 12: AI analysis RLHF columns on JazzTheoryPatterns (HM14 HL-055)
-    _migration_12_ai_analysis_columns(db)
-
-    # Migration 13: HarmonicAnalysisExchanges table (HM18)
-    _migration_13_harmonic_analysis_exchanges(db)
-
-    # Migration 14: analysis_rules table (REQ-009 / HM30B)
-    _migration_14_analysis_rules(db)
-
-    # Migration 15: UserPreferences table (HM34 REQ-011)
-    _migration_15_user_preferences(db)
-
-    # Migration 16: key_center_colors column on UserPreferences (HM36 REQ-010)
-    _migration_16_key_center_colors(db)
-
-    # Migration 17: debug_mode column on UserPreferences (HM42 REQ-016)
-    _migration_17_debug_mode(db)
-
-    logger.info("Migrations complete.")
-
 
 def _migration_17_debug_mode(db):
     """Add debug_mode column to UserPreferences (HM42 REQ-016)."""
@@ -580,15 +694,12 @@ def _migration_10_improvisation_tables(db):
                 )
             """)
             logger.info("  Migration 10c: JazzTheoryPatterns table created.")
-
-            # Seed with standard bebop patterns
-            _seed_jazz_theory_patterns(db)
     except Exception as e:
         logger.warning(f"  Migration 10c warning: {e}")
 
 
-def _seed_jazz_theory_patterns(db):
-    """Seed JazzTheoryPatterns with standard jazz vocabulary."""
+def _jazz_theory_patterns() -> list:
+    """Standard jazz vocabulary seeded into JazzTheoryPatterns."""
     patterns = [
         ("bebop_dominant_scale", "dom7", '["1","2","3","4","5","6","b7","7"]',
          "Bebop dominant scale — adds major 7th passing tone between b7 and octave"),
@@ -615,11 +726,18 @@ def _seed_jazz_theory_patterns(db):
         ("honeysuckle_rose", "maj7", '["5","#5","6","#5","5","3","1"]',
          "Honeysuckle Rose motif — chromatic neighbor around 5th and 6th"),
     ]
-    for name, ctx, template, desc in patterns:
-        db.execute_non_query(
+    return patterns
+
+
+def _seed_jazz_theory_patterns(db):
+    """Insert seed patterns that are missing; existing rows keep their RLHF counts."""
+    patterns = _jazz_theory_patterns()
+    with db.transaction() as tx:
+        tx.executemany(
+            "IF NOT EXISTS (SELECT 1 FROM JazzTheoryPatterns WHERE pattern_name = ?) "
             "INSERT INTO JazzTheoryPatterns (pattern_name, chord_context, notes_template) "
             "VALUES (?, ?, ?)",
-            (name, ctx, template)
+            [(name, name, ctx, template) for name, ctx, template, desc in patterns]
         )
     logger.info(f"  Seeded {len(patterns)} jazz theory patterns.")
 
@@ -644,15 +762,14 @@ def _migration_11_jazz_theory_docs(db):
                 )
             """)
             logger.info("  Migration 11: jazz_theory_docs table created.")
-            _seed_jazz_theory_docs(db)
         else:
             logger.info("  Migration 11: jazz_theory_docs table already exists.")
     except Exception as e:
         logger.warning(f"  Migration 11 warning: {e}")
 
 
-def _seed_jazz_theory_docs(db):
-    """Seed jazz_theory_docs with foundational jazz harmony content."""
+def _jazz_theory_docs() -> list:
+    """Foundational jazz harmony content seeded into jazz_theory_docs."""
     docs = [
         (
             "chord-construction",
@@ -999,11 +1116,23 @@ Instead of fast-moving chord changes, modal jazz uses one or two chords per sect
         ),
     ]
 
-    for doc_id, title, content_md, tags in docs:
-        db.execute_non_query(
-            "INSERT INTO jazz_theory_docs (doc_id, title, content_md, tags) VALUES (?, ?, ?, ?)",
-            (doc_id, title, content_md, tags)
-        )
+    return docs
+
+
+def _seed_jazz_theory_docs(db):
+    """Insert or update the seed docs by doc_id (they ship with the app)."""
+    docs = _jazz_theory_docs()
+    with db.transaction() as tx:
+        tx.executemany("""
+            MERGE jazz_theory_docs AS target
+            USING (SELECT ? AS doc_id) AS source
+            ON target.doc_id = source.doc_id
+            WHEN MATCHED THEN
+                UPDATE SET title = ?, content_md = ?, tags = ?, updated_at = GETDATE()
+            WHEN NOT MATCHED THEN
+                INSERT (doc_id, title, content_md, tags) VALUES (?, ?, ?, ?);
+        """, [(doc_id, title, content_md, tags, doc_id, title, content_md, tags)
+              for doc_id, title, content_md, tags in docs])
     logger.info(f"  Seeded {len(docs)} jazz theory docs.")
 
 
@@ -1089,15 +1218,14 @@ def _migration_14_analysis_rules(db):
                 )
             """)
             logger.info("  Migration 14: analysis_rules table created.")
-            _seed_analysis_rules(db)
         else:
             logger.info("  Migration 14: analysis_rules table already exists.")
     except Exception as e:
         logger.warning(f"  Migration 14 warning: {e}")
 
 
-def _seed_analysis_rules(db):
-    """Seed initial analysis rules from Darren session feedback."""
+def _analysis_rules() -> list:
+    """Initial analysis rules from Darren session feedback."""
     rules = [
         (1, 'key_center', 'Find all ii-V progressions first',
          'The first step in harmonic analysis is to identify all ii-V progressions. These are the strongest indicators of key center.'),
@@ -1108,10 +1236,22 @@ def _seed_analysis_rules(db):
         (4, 'pattern', 'iii-vi-ii-V is a turnaround',
          'The progression iii-vi-ii-V is a turnaround. If vi is minor (not dominant), the turnaround is in harmonic minor context.'),
     ]
-    for order, cat, title, text in rules:
-        db.execute_non_query(
-            "INSERT INTO analysis_rules (rule_order, category, title, rule_text) VALUES (?, ?, ?, ?)",
-            (order, cat, title, text)
+    return rules
+
+
+def _seed_analysis_rules(db):
+    """Insert the seed rules into an empty analysis_rules table only.
+
+    Rules are retitled and rewritten through PUT /rules/{id}, so once the
+    table has rows nothing identifies a seed any more; it is left alone.
+    """
+    rules = _analysis_rules()
+    values = ", ".join(["(?, ?, ?, ?)"] * len(rules))
+    with db.transaction() as tx:
+        tx.execute(
+            "IF NOT EXISTS (SELECT 1 FROM analysis_rules) "
+            f"INSERT INTO analysis_rules (rule_order, category, title, rule_text) VALUES {values}",
+            tuple(value for rule in rules for value in rule)
         )
     logger.info(f"  Seeded {len(rules)} analysis rules.")
 
@@ -1158,3 +1298,308 @@ def _migration_16_key_center_colors(db):
             logger.info("  Migration 16: key_center_colors column already exists.")
     except Exception as e:
         logger.warning(f"  Migration 16 warning: {e}")
+
+
+def _migration_18_analysis_cache_columns(db):
+    """Add content_hash and served_json to SongAnalysis (see app.services.analysis_cache).
+
+    Existing rows keep a NULL content_hash, so they are rebuilt on first read.
+    """
+    for column, ddl in (
+        ('content_hash', 'NVARCHAR(80) NULL'),
+        ('served_json', 'NVARCHAR(MAX) NULL'),
+    ):
+        try:
+            count = db.execute_scalar(
+                "SELECT COUNT(*) FROM INFORMATION_SCHEMA.COLUMNS "
+                "WHERE TABLE_NAME = 'SongAnalysis' AND COLUMN_NAME = ?",
+                (column,)
+            )
+            if count == 0:
+                logger.info(f"  Migration 18: Adding SongAnalysis.{column}...")
+                db.execute_non_query(f"ALTER TABLE SongAnalysis ADD {column} {ddl}")
+                logger.info(f"  Migration 18: SongAnalysis.{column} added.")
+            else:
+                logger.info(f"  Migration 18: SongAnalysis.{column} already exists.")
+        except Exception as e:
+            logger.warning(f"  Migration 18 warning: {e}")
+
+
+
+def _migration_19_song_chord_timeline(db):
+    """SongChordTimeline: each song's chords in progression order (see app.services.chord_timeline).
+
+    Rebuilt for every song whenever this runs, so --force also repairs it.
+    """
+    try:
+        count = db.execute_scalar(
+            "SELECT COUNT(*) FROM INFORMATION_SCHEMA.TABLES WHERE TABLE_NAME = 'SongChordTimeline'"
+        )
+        if count == 0:
+            logger.info("  Migration 19: Creating SongChordTimeline table...")
+            db.execute_non_query("""
+                CREATE TABLE SongChordTimeline (
+                    song_id         INT NOT NULL,
+                    seq             INT NOT NULL,
+                    chord_id        INT NOT NULL,
+                    section_id      INT NOT NULL,
+                    section_name    VARCHAR(50) NULL,
+                    section_order   INT NOT NULL,
+                    measure_id      INT NOT NULL,
+                    measure_number  INT NOT NULL,
+                    beat_position   DECIMAL(5,2) NULL,
+                    chord_order     INT NOT NULL,
+                    chord_symbol    VARCHAR(20) NOT NULL,
+                    roman_numeral   VARCHAR(20) NULL,
+                    key_center      VARCHAR(20) NULL,
+                    CONSTRAINT PK_SongChordTimeline PRIMARY KEY CLUSTERED (song_id, seq),
+                    CONSTRAINT FK_SongChordTimeline_Songs FOREIGN KEY (song_id)
+                        REFERENCES Songs(id) ON DELETE CASCADE
+                )
+            """)
+            logger.info("  Migration 19: SongChordTimeline table created.")
+        logger.info("  Migration 19: Rebuilding SongChordTimeline for every song...")
+        with db.transaction() as tx:
+            rows = chord_timeline.rebuild_all_in(tx)
+        logger.info(f"  Migration 19: SongChordTimeline rebuilt ({rows} rows).")
+    except Exception as e:
+        logger.warning(f"  Migration 19 warning: {e}")
+
+# Listing columns carried by IX_Songs_created_at_id (see songs.SONG_COLUMNS)
+_SONG_LISTING_INCLUDE = (
+    'title', 'composer', 'arranger', 'original_key', 'tempo_marking', 'genre',
+    'time_signature', 'year_composed', 'notes', 'source_file_name', 'source_file_type',
+    'updated_at', 'has_note_data', 'has_lyrics', 'import_format', 'track_count',
+    'measure_count', 'total_notes', 'version_number', 'base_title',
+)
+
+# Songs column -> the SongArtifacts kind migration 20 moves it to
+_SONG_ARTIFACT_COLUMNS = (
+    ('raw_xml', song_artifacts.RAW_XML),
+    ('section_markers_json', song_artifacts.SECTION_MARKERS),
+)
+
+
+def _migration_20_song_artifacts(db):
+    """SongArtifacts side store for raw_xml / section markers, plus the song listing index.
+
+    Existing Songs.raw_xml and Songs.section_markers_json values are
+    compressed into SongArtifacts 50 songs at a time and the Songs columns
+    set to NULL, so a re-run only moves values written by older code.
+    """
+    try:
+        count = db.execute_scalar(
+            "SELECT COUNT(*) FROM INFORMATION_SCHEMA.TABLES WHERE TABLE_NAME = 'SongArtifacts'"
+        )
+        if count == 0:
+            logger.info("  Migration 20: Creating SongArtifacts table...")
+            db.execute_non_query("""
+                CREATE TABLE SongArtifacts (
+                    song_id      INT NOT NULL,
+                    kind         VARCHAR(32) NOT NULL,
+                    content      VARBINARY(MAX) NOT NULL,
+                    text_length  INT NOT NULL,
+                    created_at   DATETIME2 NOT NULL DEFAULT GETDATE(),
+                    CONSTRAINT PK_SongArtifacts PRIMARY KEY CLUSTERED (song_id, kind),
+                    CONSTRAINT FK_SongArtifacts_Songs FOREIGN KEY (song_id)
+                        REFERENCES Songs(id) ON DELETE CASCADE
+                )
+            """)
+            logger.info("  Migration 20: SongArtifacts table created.")
+    except Exception as e:
+        logger.warning(f"  Migration 20 warning: {e}")
+        return
+
+    for column, kind in _SONG_ARTIFACT_COLUMNS:
+        try:
+            exists = db.execute_scalar(
+                "SELECT COUNT(*) FROM INFORMATION_SCHEMA.COLUMNS "
+                "WHERE TABLE_NAME = 'Songs' AND COLUMN_NAME = ?",
+                (column,)
+            )
+            if not exists:
+                continue
+            moved = 0
+            while True:
+                rows = db.execute_query(
+                    f"SELECT TOP 50 id, {column} AS text FROM Songs WHERE {column} IS NOT NULL"
+                )
+                if not rows:
+                    break
+                with db.transaction() as tx:
+                    for row in rows:
+                        song_artifacts.put_in(tx, row['id'], kind, row['text'])
+                        tx.execute(f"UPDATE Songs SET {column} = NULL WHERE id = ?", (row['id'],))
+                moved += len(rows)
+            if moved:
+                logger.info(f"  Migration 20: Moved {moved} Songs.{column} values to SongArtifacts.")
+        except Exception as e:
+            logger.warning(f"  Migration 20 ({column}) warning: {e}")
+
+    try:
+        exists = db.execute_scalar(
+            "SELECT COUNT(*) FROM sys.indexes "
+            "WHERE name = 'IX_Songs_created_at_id' AND object_id = OBJECT_ID('Songs')"
+        )
+        if exists == 0:
+            logger.info("  Migration 20: Creating IX_Songs_created_at_id...")
+            db.execute_non_query(
+                "CREATE NONCLUSTERED INDEX IX_Songs_created_at_id ON Songs(created_at DESC, id DESC) "
+                f"INCLUDE ({', '.join(_SONG_LISTING_INCLUDE)})"
+            )
+    except Exception as e:
+        logger.warning(f"  Migration 20 (index) warning: {e}")
+
+
+# (table, key column, NVARCHAR(MAX) column) that migration 21 converts to packed VARBINARY(MAX)
+_PACKED_COLUMNS = (
+    ('SongAnalysis', 'song_id', 'analysis_json'),
+    ('SongAnalysis', 'song_id', 'served_json'),
+    ('rlhf_sessions', 'id', 'algorithm_snapshot'),
+)
+
+
+def _migration_21_packed_columns(db):
+    """Store the analysis caches and RLHF snapshots as packed VARBINARY (see app.db.codec).
+
+    Each column is copied 100 rows at a time into <column>_packed, then
+    the NVARCHAR column is dropped and <column>_packed renamed in its
+    place, so readers keep using the same name. A column already of type
+    varbinary is skipped; an interrupted run resumes from the rows not
+    yet copied. Logs the stored size before and after.
+    """
+    for table, key, column in _PACKED_COLUMNS:
+        packed = f"{column}_packed"
+        try:
+            data_type = db.execute_scalar(
+                "SELECT DATA_TYPE FROM INFORMATION_SCHEMA.COLUMNS "
+                "WHERE TABLE_NAME = ? AND COLUMN_NAME = ?",
+                (table, column)
+            )
+            if data_type is None or data_type == 'varbinary':
+                continue
+            exists = db.execute_scalar(
+                "SELECT COUNT(*) FROM INFORMATION_SCHEMA.COLUMNS "
+                "WHERE TABLE_NAME = ? AND COLUMN_NAME = ?",
+                (table, packed)
+            )
+            if exists == 0:
+                db.execute_non_query(f"ALTER TABLE {table} ADD {packed} VARBINARY(MAX) NULL")
+
+            logger.info(f"  Migration 21: Packing {table}.{column}...")
+            before = after = rows_packed = 0
+            while True:
+                rows = db.execute_query(
+                    f"SELECT TOP 100 {key} AS k, {column} AS text FROM {table} "
+                    f"WHERE {column} IS NOT NULL AND {packed} IS NULL"
+                )
+                if not rows:
+                    break
+                values = [(codec.pack(r['text']), r['k']) for r in rows]
+                with db.transaction() as tx:
+                    tx.executemany(f"UPDATE {table} SET {packed} = ? WHERE {key} = ?", values)
+                before += sum(2 * len(r['text']) for r in rows)  # NVARCHAR is UTF-16
+                after += sum(len(v) for v, _ in values)
+                rows_packed += len(rows)
+
+            with db.transaction() as tx:
+                tx.execute(f"ALTER TABLE {table} DROP COLUMN {column}")
+                tx.execute(f"EXEC sp_rename '{table}.{packed}', '{column}', 'COLUMN'")
+            if rows_packed:
+                logger.info(
+                    f"  Migration 21: {table}.{column}: {rows_packed} rows, "
+                    f"{before / 1e6:.2f} MB -> {after / 1e6:.2f} MB"
+                )
+        except Exception as e:
+            logger.warning(f"  Migration 21 ({table}.{column}) warning: {e}")
+
+
+def _migration_22_batch_import_jobs(db):
+    """BatchImportJobs / BatchImportFiles: batch import progress any instance can report (app.services.batch_import)."""
+    try:
+        count = db.execute_scalar(
+            "SELECT COUNT(*) FROM INFORMATION_SCHEMA.TABLES WHERE TABLE_NAME = 'BatchImportJobs'"
+        )
+        if count == 0:
+            logger.info("  Migration 22: Creating BatchImportJobs table...")
+            db.execute_non_query("""
+                CREATE TABLE BatchImportJobs (
+                    id           CHAR(32) NOT NULL PRIMARY KEY,
+                    status       VARCHAR(20) NOT NULL,
+                    error        NVARCHAR(1000) NULL,
+                    created_at   DATETIME2 NOT NULL DEFAULT SYSUTCDATETIME(),
+                    finished_at  DATETIME2 NULL
+                )
+            """)
+        count = db.execute_scalar(
+            "SELECT COUNT(*) FROM INFORMATION_SCHEMA.TABLES WHERE TABLE_NAME = 'BatchImportFiles'"
+        )
+        if count == 0:
+            logger.info("  Migration 22: Creating BatchImportFiles table...")
+            db.execute_non_query("""
+                CREATE TABLE BatchImportFiles (
+                    job_id       CHAR(32) NOT NULL,
+                    file_index   INT NOT NULL,
+                    filename     NVARCHAR(255) NOT NULL,
+                    status       VARCHAR(20) NOT NULL,
+                    detail_json  NVARCHAR(MAX) NULL,
+                    CONSTRAINT PK_BatchImportFiles PRIMARY KEY CLUSTERED (job_id, file_index),
+                    CONSTRAINT FK_BatchImportFiles_Jobs FOREIGN KEY (job_id)
+                        REFERENCES BatchImportJobs(id) ON DELETE CASCADE
+                )
+            """)
+    except Exception as e:
+        logger.warning(f"  Migration 22 warning: {e}")
+
+
+# (number, migration) in the order they run; a number covers any sub-steps
+# it runs (5 also creates the migration 6 tables)
+_MIGRATIONS = (
+    (1, _migration_1_song_analysis),
+    (2, _migration_2_chord_overrides),
+    (3, _migration_3_key_regions),
+    (4, _migration_4_users),
+    (6, _migration_5_note_import_tables),          # HL-REIMPORT, 5 and 6
+    (7, _migration_7_rlhf_sessions),               # HL-006C
+    (8, _migration_8_form_override),               # BV-04
+    (9, _migration_9_section_markers),             # Group E
+    (10, _migration_10_improvisation_tables),      # HL-IMPROV-001
+    (11, _migration_11_jazz_theory_docs),          # HM13-REQ-001
+    (12, _migration_12_ai_analysis_columns),       # HM14 HL-055
+    (13, _migration_13_harmonic_analysis_exchanges),  # HM18
+    (14, _migration_14_analysis_rules),            # REQ-009 / HM30B
+    (15, _migration_15_user_preferences),          # HM34 REQ-011
+    (16, _migration_16_key_center_colors),         # HM36 REQ-010
+    (17, _migration_17_debug_mode),                # HM42 REQ-016
+    (18, _migration_18_analysis_cache_columns),    # analysis cache
+    (19, _migration_19_song_chord_timeline),       # chord timeline
+    (20, _migration_20_song_artifacts),            # artifact side store, listing index
+    (21, _migration_21_packed_columns),            # compressed analysis / RLHF columns
+    (22, _migration_22_batch_import_jobs),         # shared batch import progress
+)
+
+# (name, seed rows, apply): applied when the SHA-256 of the rows differs
+# from the one recorded in schema_version
+_SEEDS = (
+    ('jazz_theory_patterns', _jazz_theory_patterns, _seed_jazz_theory_patterns),
+    ('jazz_theory_docs', _jazz_theory_docs, _seed_jazz_theory_docs),
+    ('analysis_rules', _analysis_rules, _seed_analysis_rules),
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply HarmonyLab database migrations.")
+    parser.add_argument('--status', action='store_true', help="show recorded vs. current versions and exit")
+    parser.add_argument('--force', action='store_true', help="re-run every migration and seed")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    if args.status:
+        print(json.dumps(migration_status(), indent=2))
+        return
+    result = run_migrations(force=args.force)
+    print(json.dumps(result))
+    sys.exit(1 if result['warnings'] else 0)
+
+
+if __name__ == '__main__':
+    main()
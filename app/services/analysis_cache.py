@@ -0,0 +1,65 @@
+"""
+Content-addressed cache for SongAnalysis.
+
+SongAnalysis holds two cached documents per song:
+
+- analysis_json: the analyzer output with the enrichments (note counts,
+  secondary dominants, transition chords) folded in, stamped with
+  content_hash = "<ANALYZER_VERSION>:<sha256 of the analysis inputs>".
+- served_json: analysis_json with the chord overrides applied, i.e.
+  exactly what GET /analysis/songs/{id} returns.
+
+A request whose served_json is present and stamped with the current
+ANALYZER_VERSION is answered with that one row. Chord, note, key and
+override mutations clear served_json (INVALIDATE_SQL inside the
+mutation's transaction where there is one, else invalidate*()); the next
+request reloads the inputs and rebuilds only if their fingerprint no
+longer matches content_hash (override-only changes just re-apply the
+overrides to analysis_json).
+"""
+import hashlib
+import json
+from typing import Optional
+
+from app.db import codec
+
+# Bump whenever analyzer output changes so old cache rows are rebuilt
+ANALYZER_VERSION = '2'
+
+# Also usable on a Transaction (tx.execute)
+INVALIDATE_SQL = "UPDATE SongAnalysis SET served_json = NULL WHERE song_id = ?"
+
+_INVALIDATE_BY_SECTION = """
+    UPDATE SongAnalysis SET served_json = NULL
+    WHERE song_id = (SELECT song_id FROM Sections WHERE id = ?)
+"""
+
+
+def content_hash(inputs: dict) -> str:
+    """Versioned fingerprint of everything _build_analysis reads."""
+    payload = json.dumps(inputs, sort_keys=True, default=str, separators=(',', ':'))
+    return f"{ANALYZER_VERSION}:{hashlib.sha256(payload.encode('utf-8')).hexdigest()}"
+
+
+def is_current(stamp: Optional[str]) -> bool:
+    """True if a content_hash was written by this ANALYZER_VERSION."""
+    return bool(stamp) and stamp.split(':', 1)[0] == ANALYZER_VERSION
+
+
+def load_served(song_id: int, db) -> Optional[dict]:
+    """The cached response for a song, or None if missing or stale."""
+    rows = db.execute_query(
+        "SELECT served_json, content_hash FROM SongAnalysis WHERE song_id = ?",
+        (song_id,)
+    )
+    if rows and rows[0].get('served_json') and is_current(rows[0].get('content_hash')):
+        return codec.unpack_json(rows[0]['served_json'])
+    return None
+
+
+def invalidate(song_id: int, db) -> None:
+    db.execute_non_query(INVALIDATE_SQL, (song_id,))
+
+
+def invalidate_section(section_id: int, db) -> None:
+    db.execute_non_query(_INVALIDATE_BY_SECTION, (section_id,))
@@ -0,0 +1,114 @@
+"""
+Executor for CPU-bound harmonic analysis.
+
+music21 key detection, ChordSymbol parsing and roman numeral derivation can
+take hundreds of milliseconds for a long tune. Running that inline in an
+async endpoint blocks the event loop, stalling every other request on the
+worker (including /health). Analysis routes hand that work to this executor
+instead and await the result with a per-request timeout.
+
+Mode is configurable (ANALYSIS_EXECUTOR=thread|process). Thread mode keeps
+the loop responsive; process mode also gives true parallelism across cores,
+at the cost of importing music21 once per worker process. Functions and
+arguments submitted in process mode must be picklable.
+"""
+import asyncio
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+class AnalysisTimeout(Exception):
+    """Raised when an analysis task does not finish within its timeout."""
+
+
+class AnalysisExecutor:
+    """Bounded thread/process pool with in-flight and queue-depth metrics."""
+
+    def __init__(self, mode: str = "thread", workers: int = 2, timeout: float = 60.0):
+        if mode not in ("thread", "process"):
+            raise ValueError(f"Unknown analysis executor mode: {mode!r}")
+        self.mode = mode
+        self.workers = max(1, workers)
+        self.timeout = timeout
+        self._executor: Optional[Executor] = None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._max_queue_depth = 0
+        self._completed = 0
+        self._failed = 0
+        self._timeouts = 0
+
+    def _get_executor(self) -> Executor:
+        with self._lock:
+            if self._executor is None:
+                if self.mode == "process":
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.workers,
+                        mp_context=multiprocessing.get_context("spawn"),
+                    )
+                else:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.workers, thread_name_prefix="analysis"
+                    )
+            return self._executor
+
+    async def run(self, fn: Callable[..., Any], *args, timeout: Optional[float] = None) -> Any:
+        """Run fn(*args) on the executor and await it, raising AnalysisTimeout if slow."""
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self._get_executor(), fn, *args)
+        with self._lock:
+            self._in_flight += 1
+            self._max_queue_depth = max(self._max_queue_depth, self._in_flight - self.workers)
+        future.add_done_callback(self._on_done)
+        try:
+            # shield: a timed-out task keeps running to completion, so in_flight stays accurate
+            return await asyncio.wait_for(asyncio.shield(future), timeout or self.timeout)
+        except asyncio.TimeoutError:
+            with self._lock:
+                self._timeouts += 1
+            raise AnalysisTimeout(
+                f"Analysis did not finish within {timeout or self.timeout:g}s"
+            )
+
+    def _on_done(self, future):
+        with self._lock:
+            self._in_flight -= 1
+            if future.cancelled() or future.exception() is not None:
+                self._failed += 1
+            else:
+                self._completed += 1
+
+    def stats(self) -> dict:
+        """Snapshot of executor load."""
+        with self._lock:
+            return {
+                "mode": self.mode,
+                "workers": self.workers,
+                "in_flight": self._in_flight,
+                "queue_depth": max(0, self._in_flight - self.workers),
+                "max_queue_depth": self._max_queue_depth,
+                "completed": self._completed,
+                "failed": self._failed,
+                "timeouts": self._timeouts,
+            }
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+# Singleton instance
+analysis_executor = AnalysisExecutor(
+    mode=settings.analysis_executor_mode,
+    workers=settings.analysis_workers,
+    timeout=settings.analysis_timeout,
+)
@@ -1,13 +1,39 @@
 """
 HarmonyLab Harmonic Analysis Service
-Uses music21 for Roman numeral analysis, key detection, and pattern recognition.
+Roman numeral analysis, key detection, and pattern recognition.
+music21 supplies the Key objects and handles the chord symbols the fast
+paths (roman_numerals, key_detection) do not cover. It is imported where
+it is used, so loading this module (every analysis route does) does not
+load music21; app.startup.warm_up pre-loads it after startup.
 """
-from music21 import roman, key, harmony, stream, chord
-from typing import List, Dict, Optional
+from functools import lru_cache
+from app.services import key_detection, roman_numerals
+from typing import List, Dict, FrozenSet, NamedTuple, Optional, Tuple
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Entries per memo cache. A song uses a few dozen distinct symbols, so this
+# holds the working set of many songs across a dozen or so keys each.
+CHORD_CACHE_SIZE = 4096
+
+
+class ParsedChordSymbol(NamedTuple):
+    """Memoized music21 parse of a raw chord symbol."""
+    normalized: str
+    pitches: Tuple[str, ...]          # nameWithOctave, root position as music21 spells it
+    pitch_classes: FrozenSet[int]
+    error: Optional[str] = None       # set when music21 could not parse the symbol
+
+
+class ChordFunction(NamedTuple):
+    """Memoized roman-numeral analysis of one symbol in one key."""
+    roman: str
+    function: str
+    quality: str
+    is_secondary: bool
+    secondary_target: Optional[str]
+
 
 class HarmonicAnalyzer:
     """Analyze chord progressions using music21."""
@@ -40,6 +66,7 @@ class HarmonicAnalyzer:
             note_measures: Optional list of measure numbers corresponding to midi_notes.
             total_measures: Total measure count for cadence weighting.
         """
+        from music21 import key
 
         # Detect or use override key
         if key_override:
@@ -199,33 +226,22 @@ class HarmonicAnalyzer:
         return analyzed
 
     def _detect_key(self, chords: List[str]) -> tuple:
-        """Auto-detect key from chords."""
+        """Auto-detect key from chords (first 16 parseable symbols)."""
+        from music21 import key
         try:
-            s = stream.Stream()
-            added = 0
+            pitch_class_sets = []
             for symbol in chords:
-                if added >= 16:
+                if len(pitch_class_sets) >= 16:
                     break
-                try:
-                    normalized = self._normalize_chord_symbol(symbol)
-                    if not normalized:
-                        continue
-                    cs = harmony.ChordSymbol(normalized)
-                    # Convert to plain Chord — ChordSymbol objects confuse
-                    # the Krumhansl-Schmuckler algorithm in music21.
-                    c = chord.Chord(cs.pitches)
-                    s.append(c)
-                    added += 1
-                except Exception:
-                    continue
-
-            if added == 0:
+                parsed = parse_chord_symbol(symbol)
+                if parsed.normalized and not parsed.error:
+                    pitch_class_sets.append(parsed.pitch_classes)
+
+            if not pitch_class_sets:
                 logger.warning("No valid chords for key detection")
                 return key.Key('C'), 0.0
 
-            detected = s.analyze('key')
-            conf = getattr(detected, 'correlationCoefficient', 0.5)
-            return detected, conf
+            return self._key_from_histogram(key_detection.pitch_class_histogram(pitch_class_sets))
         except Exception as e:
             logger.warning(f"Key detection failed: {e}")
             return key.Key('C'), 0.0
@@ -238,43 +254,24 @@ class HarmonicAnalyzer:
         HL-006A Change 5: Cadence weighting — notes in last 4 measures
         get 3x weight, root of final chord gets additional 2x.
         """
+        from music21 import key
         try:
-            from music21 import note as m21note, duration as m21dur
-            s = stream.Stream()
-
-            # Determine cadence zone (last 4 measures)
-            max_measure = total_measures
-            if note_measures:
-                max_measure = max(max_measure, max(note_measures))
-            cadence_start = max(1, max_measure - 3)
-
-            for i, midi_pitch in enumerate(midi_notes[:200]):
-                try:
-                    n = m21note.Note(midi_pitch)
-                    # HL-006A Change 5: Cadence weighting
-                    if note_measures and i < len(note_measures):
-                        m = note_measures[i]
-                        if m >= cadence_start:
-                            # 3x weight for last 4 measures (use longer duration as proxy)
-                            n.duration = m21dur.Duration(3.0)
-                            # Extra weight for very last measure
-                            if m == max_measure:
-                                n.duration = m21dur.Duration(6.0)
-                    s.append(n)
-                except Exception:
-                    continue
-
-            if len(s) == 0:
-                logger.warning("No valid notes for key detection")
-                return key.Key('C'), 0.0
-
-            detected = s.analyze('key')
-            conf = getattr(detected, 'correlationCoefficient', 0.5)
-            return detected, conf
+            histogram = key_detection.note_histogram(midi_notes, note_measures, total_measures)
+            return self._key_from_histogram(histogram)
         except Exception as e:
             logger.warning(f"Key detection from notes failed: {e}")
             return key.Key('C'), 0.0
 
+    @staticmethod
+    def _key_from_histogram(histogram) -> tuple:
+        from music21 import key
+        detected = key_detection.detect_key(histogram)
+        if detected is None:
+            logger.warning("No valid notes for key detection")
+            return key.Key('C'), 0.0
+        tonic, mode, conf = detected
+        return key.Key(tonic, mode), conf
+
     # HM14 BUG-2: Relative major/minor tiebreaker using last-measure chords
     RELATIVE_PAIRS = {
         'A minor': 'C major', 'E minor': 'G major', 'D minor': 'F major',
@@ -286,6 +283,7 @@ class HarmonicAnalyzer:
     def _resolve_relative_ambiguity(self, detected_key, chords: List[str]) -> object:
         """If detected key is minor, check if its relative major is a better fit
         based on the last chord of the song (jazz standard final cadence rule)."""
+        from music21 import key
         key_str = str(detected_key)
         if key_str not in self.RELATIVE_PAIRS:
             return detected_key
@@ -321,7 +319,8 @@ class HarmonicAnalyzer:
 
         return detected_key
 
-    def _normalize_chord_symbol(self, symbol: str) -> str:
+    @staticmethod
+    def _normalize_chord_symbol(symbol: str) -> str:
         """Normalize chord symbols for music21 parsing.
 
         Handles standard notation, MuseScore jazz font shorthand, flat notation,
@@ -366,17 +365,51 @@ class HarmonicAnalyzer:
         return root_part + quality
 
     def _analyze_chord(self, symbol: str, index: int) -> Dict:
-        """Analyze single chord."""
+        """Analyze single chord (memoized per symbol and key)."""
+        if self.current_key is not None:
+            result = analyze_chord_in_key(symbol, self.current_key.tonic.name, self.current_key.mode)
+        else:
+            result = self._chord_function(symbol)
+        return {
+            "index": index,
+            "symbol": symbol,
+            "roman": result.roman,
+            "function": result.function,
+            "color": self.FUNCTION_COLORS.get(result.function, self.FUNCTION_COLORS['unknown']),
+            "key_context": str(self.current_key),
+            "is_secondary": result.is_secondary,
+            "secondary_target": result.secondary_target
+        }
+
+    def _chord_function(self, symbol: str, fast: bool = True) -> ChordFunction:
+        """Roman numeral and function of a chord in self.current_key (uncached).
+
+        Tries the table-driven engine in roman_numerals first and only builds
+        music21 objects for symbols it cannot classify (fast=False forces
+        music21; used by the parity check).
+        """
+        quality = self._get_quality_suffix(symbol)
         try:
             # Normalize chord symbol before parsing
             normalized = self._normalize_chord_symbol(symbol)
-            c = harmony.ChordSymbol(normalized)
-            rn = roman.romanNumeralFromChord(c, self.current_key)
+            numeral = None
+            if fast and self.current_key is not None:
+                numeral = roman_numerals.roman_numeral(
+                    normalized, self.current_key.tonic.name, self.current_key.mode)
+
+            if numeral is not None:
+                base, degree = numeral
+                func = self._function_for_degree(degree)
+                jazz_roman = f"{base}{quality}"
+            else:
+                from music21 import harmony, roman
+                c = harmony.ChordSymbol(normalized)
+                rn = roman.romanNumeralFromChord(c, self.current_key)
 
-            func = self._get_function(rn)
+                func = self._get_function(rn)
 
-            # Get jazz-style Roman numeral (not figured bass)
-            jazz_roman = self._format_jazz_roman(rn, c, symbol)
+                # Get jazz-style Roman numeral (not figured bass)
+                jazz_roman = self._format_jazz_roman(rn, c, symbol)
 
             # Check for secondary dominants
             is_secondary = '/' in jazz_roman
@@ -388,16 +421,7 @@ class HarmonicAnalyzer:
                     secondary_target = parts[1]
                 func = 'secondary'
 
-            return {
-                "index": index,
-                "symbol": symbol,
-                "roman": jazz_roman,
-                "function": func,
-                "color": self.FUNCTION_COLORS.get(func, self.FUNCTION_COLORS['unknown']),
-                "key_context": str(self.current_key),
-                "is_secondary": is_secondary,
-                "secondary_target": secondary_target
-            }
+            return ChordFunction(jazz_roman, func, quality, is_secondary, secondary_target)
         except Exception as e:
             logger.warning(f"Could not analyze {symbol}: {e}")
             # Fallback: derive Roman numeral from root note alone
@@ -405,16 +429,7 @@ class HarmonicAnalyzer:
             func = "unknown"
             if fallback_roman != "?":
                 func = "chromatic"  # Best guess when quality unknown
-            return {
-                "index": index,
-                "symbol": symbol,
-                "roman": fallback_roman,
-                "function": func,
-                "color": self.FUNCTION_COLORS.get(func, self.FUNCTION_COLORS['unknown']),
-                "key_context": str(self.current_key),
-                "is_secondary": False,
-                "secondary_target": None
-            }
+            return ChordFunction(fallback_roman, func, quality, False, None)
 
     def _fallback_roman(self, symbol: str) -> str:
         """Derive Roman numeral from root note alone when music21 can't parse."""
@@ -548,7 +563,10 @@ class HarmonicAnalyzer:
 
     def _get_function(self, rn) -> str:
         """Map scale degree to harmonic function."""
-        degree = rn.scaleDegree
+        return self._function_for_degree(rn.scaleDegree)
+
+    @staticmethod
+    def _function_for_degree(degree: int) -> str:
         if degree in [1, 3, 6]:
             return 'tonic'
         elif degree in [2, 4]:
@@ -577,6 +595,59 @@ class HarmonicAnalyzer:
         return patterns
 
 
+@lru_cache(maxsize=CHORD_CACHE_SIZE)
+def parse_chord_symbol(symbol: str) -> ParsedChordSymbol:
+    """Normalize and parse a chord symbol with music21, memoized process-wide.
+
+    Unparseable symbols are cached too (with `error` set) so a bad symbol
+    is not re-parsed on every request.
+    """
+    from music21 import harmony
+    normalized = HarmonicAnalyzer._normalize_chord_symbol(symbol)
+    if not normalized:
+        return ParsedChordSymbol(normalized, (), frozenset())
+    try:
+        cs = harmony.ChordSymbol(normalized)
+    except Exception as e:
+        return ParsedChordSymbol(normalized, (), frozenset(), str(e) or type(e).__name__)
+    return ParsedChordSymbol(
+        normalized,
+        tuple(p.nameWithOctave for p in cs.pitches),
+        frozenset(p.pitchClass for p in cs.pitches),
+    )
+
+
+@lru_cache(maxsize=CHORD_CACHE_SIZE)
+def analyze_chord_in_key(symbol: str, tonic: str, mode: str) -> ChordFunction:
+    """Roman numeral, function and quality suffix of `symbol` in a key, memoized process-wide."""
+    from music21 import key
+    analyzer = HarmonicAnalyzer()
+    analyzer.current_key = key.Key(tonic, mode)
+    return analyzer._chord_function(symbol)
+
+
+def chord_cache_stats() -> Dict:
+    """Hit/miss counters for the chord parse and roman-numeral caches."""
+    stats = {}
+    for name, fn in (('parse', parse_chord_symbol), ('roman', analyze_chord_in_key)):
+        info = fn.cache_info()
+        lookups = info.hits + info.misses
+        stats[name] = {
+            'hits': info.hits,
+            'misses': info.misses,
+            'size': info.currsize,
+            'max_size': info.maxsize,
+            'hit_rate': round(info.hits / lookups, 3) if lookups else None,
+        }
+    return stats
+
+
+def clear_chord_caches():
+    """Empty the chord caches (e.g. after changing normalization rules in a live shell)."""
+    parse_chord_symbol.cache_clear()
+    analyze_chord_in_key.cache_clear()
+
+
 def analyze_song(chords: List[str], key_override: str = None,
                   midi_notes: List[int] = None,
                   note_measures: List[int] = None,
@@ -0,0 +1,328 @@
+"""
+Job-based batch ZIP import for HarmonyLab.
+
+A batch job parses archive members in a process pool (music21/ElementTree
+parsing is CPU-bound and holds the GIL) and hands each ParsedScore to a
+single writer thread through a bounded queue, so DB writes never outrun the
+connection pool and parsed scores never pile up in memory. Members are read
+straight out of the archive on disk one at a time; the archive itself is
+never loaded into memory.
+
+Job and per-file status are written through to the BatchImportJobs /
+BatchImportFiles tables (JobStore), so a poll that lands on another
+instance is answered from the database; the instance running a job also
+keeps it in memory. Poll job_snapshot() (via the imports API) for
+per-file progress.
+
+The work runs after the 202 response, so on Cloud Run the service needs
+CPU always allocated (--no-cpu-throttling); with the default request-based
+allocation the instance is throttled between polls and the import crawls.
+"""
+import json
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+import time
+import uuid
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Dict, List, Optional
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Parsed scores waiting for the writer; parsing blocks once this many are queued
+_WRITER_QUEUE_SIZE = 8
+
+# Finished jobs are forgotten after this many seconds
+_JOB_TTL_SECONDS = 3600
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+_jobs: Dict[str, "BatchImportJob"] = {}
+_jobs_lock = threading.Lock()
+
+
+class BatchImportJob:
+    """Progress of one batch import; snapshot() is what the status endpoint returns."""
+
+    def __init__(self, members: List[str], store: Optional["JobStore"] = None):
+        self.id = uuid.uuid4().hex
+        self.store = store
+        self.status = 'queued'  # queued | running | complete | failed
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.error: Optional[str] = None
+        self.files: List[Dict] = [
+            {"filename": os.path.basename(name), "status": "pending"} for name in members
+        ]
+        self._lock = threading.Lock()
+
+    def update_file(self, index: int, **fields):
+        with self._lock:
+            self.files[index].update(fields)
+            entry = dict(self.files[index])
+        if self.store is not None:
+            self.store.update_file(self.id, index, entry)
+
+    def set_status(self, status: str):
+        self.status = status
+        if status in ('complete', 'failed'):
+            self.finished_at = time.time()
+        if self.store is not None:
+            self.store.update_job(self)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            files = [dict(f) for f in self.files]
+        return _snapshot(self.id, self.status, files, self.error)
+
+
+def _snapshot(job_id: str, status: str, files: List[Dict], error: Optional[str]) -> dict:
+    """Status endpoint body for a job, from its per-file entries."""
+    counts = {"imported": 0, "skipped_duplicate": 0, "failed": 0, "pending": 0}
+    for f in files:
+        if f["status"] == "imported":
+            counts["imported"] += 1
+        elif f["status"] == "skipped":
+            counts["skipped_duplicate"] += 1
+        elif f["status"] == "failed":
+            counts["failed"] += 1
+        else:
+            counts["pending"] += 1
+    processed = len(files) - counts["pending"]
+    result = {
+        "job_id": job_id,
+        "status": status,
+        "total": len(files),
+        "processed": processed,
+        **counts,
+        "files": files,
+    }
+    if status in ('complete', 'failed'):
+        result["summary"] = (f"Batch complete: {counts['imported']} imported, "
+                             f"{counts['skipped_duplicate']} skipped (duplicate), "
+                             f"{counts['failed']} failed")
+    if error:
+        result["error"] = error
+    return result
+
+
+class JobStore:
+    """Write-through persistence of batch jobs (BatchImportJobs / BatchImportFiles).
+
+    A failed write is logged and never fails the import itself.
+    """
+
+    def __init__(self, db=None):
+        if db is None:
+            # Not at module level: parser worker processes import this module
+            from app.db.connection import DatabaseConnection
+            db = DatabaseConnection()
+        self.db = db
+
+    def create(self, job: BatchImportJob):
+        try:
+            with self.db.transaction() as tx:
+                tx.execute(
+                    "DELETE FROM BatchImportJobs WHERE finished_at < DATEADD(second, ?, SYSUTCDATETIME())",
+                    (-_JOB_TTL_SECONDS,)
+                )
+                tx.execute(
+                    "INSERT INTO BatchImportJobs (id, status) VALUES (?, ?)", (job.id, job.status)
+                )
+                tx.executemany(
+                    "INSERT INTO BatchImportFiles (job_id, file_index, filename, status) VALUES (?, ?, ?, ?)",
+                    [(job.id, i, f["filename"], f["status"]) for i, f in enumerate(job.files)]
+                )
+        except Exception as e:
+            logger.warning("Could not persist batch job %s: %s", job.id, e)
+
+    def update_file(self, job_id: str, index: int, entry: Dict):
+        detail = {k: v for k, v in entry.items() if k not in ('filename', 'status')}
+        try:
+            self.db.execute_non_query(
+                "UPDATE BatchImportFiles SET status = ?, detail_json = ? WHERE job_id = ? AND file_index = ?",
+                (entry["status"], json.dumps(detail, default=str) if detail else None, job_id, index)
+            )
+        except Exception as e:
+            logger.warning("Could not persist batch job %s file %d: %s", job_id, index, e)
+
+    def update_job(self, job: BatchImportJob):
+        try:
+            self.db.execute_non_query(
+                "UPDATE BatchImportJobs SET status = ?, error = ?, "
+                "finished_at = CASE WHEN ? = 1 THEN SYSUTCDATETIME() END WHERE id = ?",
+                (job.status, job.error, 1 if job.finished_at else 0, job.id)
+            )
+        except Exception as e:
+            logger.warning("Could not persist batch job %s: %s", job.id, e)
+
+    def load(self, job_id: str) -> Optional[dict]:
+        """Snapshot of a persisted job, or None if unknown."""
+        jobs = self.db.execute_query(
+            "SELECT status, error FROM BatchImportJobs WHERE id = ?", (job_id,)
+        )
+        if not jobs:
+            return None
+        rows = self.db.execute_query(
+            "SELECT filename, status, detail_json FROM BatchImportFiles "
+            "WHERE job_id = ? ORDER BY file_index",
+            (job_id,)
+        )
+        files = [{"filename": r["filename"], "status": r["status"],
+                  **(json.loads(r["detail_json"]) if r["detail_json"] else {})} for r in rows]
+        return _snapshot(job_id, jobs[0]["status"], files, jobs[0]["error"])
+
+
+def get_job(job_id: str) -> Optional[BatchImportJob]:
+    """A job running (or recently run) in this process, or None."""
+    with _jobs_lock:
+        return _jobs.get(job_id)
+
+
+def job_snapshot(job_id: str, store: Optional[JobStore] = None) -> Optional[dict]:
+    """Progress of a batch job from this process, else from the job tables (None if unknown)."""
+    job = get_job(job_id)
+    if job is not None:
+        return job.snapshot()
+    return (store or JobStore()).load(job_id)
+
+
+def start_batch_import(
+    zip_path: str,
+    members: List[str],
+    write: Callable[[object, str], dict],
+    store: Optional[JobStore] = None,
+) -> BatchImportJob:
+    """Start importing `members` of the archive at `zip_path` in the background.
+
+    `write(parsed, filename)` persists one ParsedScore and returns the per-file
+    result fields (must include "status"). It always runs on the single
+    writer thread. The archive file is deleted when the job finishes.
+    Progress is written through to `store` (the job tables by default).
+    """
+    job = BatchImportJob(members, store or JobStore())
+    job.store.create(job)
+    with _jobs_lock:
+        _prune_jobs()
+        _jobs[job.id] = job
+    threading.Thread(
+        target=_run_job, args=(job, zip_path, members, write),
+        name=f"batch-import-{job.id[:8]}", daemon=True,
+    ).start()
+    return job
+
+
+# ---------------------------------------------------------------------------
+# Internals
+# ---------------------------------------------------------------------------
+
+def _worker_count() -> int:
+    return settings.import_workers or os.cpu_count() or 1
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # spawn: forking a threaded server process is unsafe
+            _executor = ProcessPoolExecutor(
+                max_workers=_worker_count(), mp_context=multiprocessing.get_context('spawn')
+            )
+        return _executor
+
+
+def _reset_executor():
+    """Drop a broken pool so the next job starts fresh workers."""
+    global _executor
+    with _executor_lock:
+        broken, _executor = _executor, None
+    if broken is not None:
+        broken.shutdown(wait=False, cancel_futures=True)
+
+
+def _parse_member(zip_path: str, member: str):
+    """Process-pool task: read one archive member and parse it in memory."""
+    from app.services.score_parser import parse_music_file
+
+    with zipfile.ZipFile(zip_path, 'r') as zf:
+        data = zf.read(member)
+    return parse_music_file(data, os.path.basename(member))
+
+
+def _run_job(job: BatchImportJob, zip_path: str, members: List[str], write):
+    job.set_status('running')
+    pending_writes: "queue.Queue" = queue.Queue(maxsize=_WRITER_QUEUE_SIZE)
+    writer = threading.Thread(
+        target=_writer_loop, args=(job, pending_writes, write),
+        name=f"batch-writer-{job.id[:8]}", daemon=True,
+    )
+    writer.start()
+    try:
+        executor = _get_executor()
+        max_in_flight = 2 * _worker_count()
+        remaining = iter(enumerate(members))
+        in_flight = {}
+        while True:
+            for index, member in remaining:
+                job.update_file(index, status="parsing")
+                in_flight[executor.submit(_parse_member, zip_path, member)] = index
+                if len(in_flight) >= max_in_flight:
+                    break
+            if not in_flight:
+                break
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                index = in_flight.pop(future)
+                try:
+                    parsed = future.result()
+                except Exception as e:
+                    logger.warning("Batch import parse failed for %s: %s",
+                                   job.files[index]["filename"], e)
+                    job.update_file(index, status="failed", error=str(e) or type(e).__name__)
+                    continue
+                job.update_file(index, status="writing")
+                pending_writes.put((index, parsed))  # blocks while the writer is behind
+    except Exception as e:
+        logger.exception("Batch import job %s aborted", job.id)
+        job.error = str(e)
+        if isinstance(e, BrokenProcessPool):
+            _reset_executor()
+    finally:
+        pending_writes.put(None)
+        writer.join()
+        if job.error:
+            for index, f in enumerate(job.files):
+                if f["status"] not in ('imported', 'skipped', 'failed'):
+                    job.update_file(index, status="failed", error=f"Job aborted: {job.error}")
+        job.set_status('failed' if job.error else 'complete')
+        if os.path.exists(zip_path):
+            os.unlink(zip_path)
+        logger.info("Batch import job %s: %s", job.id, job.snapshot().get("summary"))
+
+
+def _writer_loop(job: BatchImportJob, pending_writes: "queue.Queue", write):
+    while True:
+        item = pending_writes.get()
+        if item is None:
+            return
+        index, parsed = item
+        filename = job.files[index]["filename"]
+        try:
+            job.update_file(index, **write(parsed, filename))
+        except Exception as e:
+            logger.warning("Batch import failed for %s: %s", filename, e)
+            job.update_file(index, status="failed", error=str(e) or type(e).__name__)
+
+
+def _prune_jobs():
+    """Drop finished jobs past their TTL. Caller holds _jobs_lock."""
+    cutoff = time.time() - _JOB_TTL_SECONDS
+    for job_id in [j.id for j in _jobs.values() if j.finished_at and j.finished_at < cutoff]:
+        del _jobs[job_id]
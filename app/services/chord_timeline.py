@@ -0,0 +1,91 @@
+"""
+Denormalized per-song chord timeline (SongChordTimeline).
+
+Most song-level readers (analysis, transpose, quiz, exports, playback,
+rhythm) want a song's chords in progression order, i.e. the
+Chords -> Measures -> Sections join ordered by section_order,
+measure_number, chord_order. SongChordTimeline stores that result, one row
+per chord with seq = its 0-based position, clustered on (song_id, seq), so
+reading a progression is a single range scan.
+
+The table is derived data. Every write to a song's chords, measures or
+sections rebuilds that song's rows (rebuild, or rebuild_in inside an
+import transaction); a rebuild is one DELETE plus one INSERT ... SELECT.
+`python -m app.migrations --force` rebuilds every song.
+"""
+from typing import Optional
+
+# Columns a reader can select; chord_id is Chords.id
+COLUMNS = (
+    'seq', 'chord_id', 'section_id', 'section_name', 'section_order', 'measure_id',
+    'measure_number', 'beat_position', 'chord_order', 'chord_symbol', 'roman_numeral',
+    'key_center',
+)
+
+_INSERT_SELECT = """
+    INSERT INTO SongChordTimeline (song_id, seq, chord_id, section_id, section_name, section_order,
+                                   measure_id, measure_number, beat_position, chord_order,
+                                   chord_symbol, roman_numeral, key_center)
+    SELECT s.song_id,
+           ROW_NUMBER() OVER (PARTITION BY s.song_id
+                              ORDER BY s.section_order, m.measure_number, c.chord_order, c.id) - 1,
+           c.id, s.id, s.name, s.section_order, m.id, m.measure_number, c.beat_position,
+           c.chord_order, c.chord_symbol, c.roman_numeral, c.key_center
+    FROM Chords c
+    JOIN Measures m ON c.measure_id = m.id
+    JOIN Sections s ON m.section_id = s.id
+"""
+
+
+def rebuild_in(tx, song_id: int) -> int:
+    """Recompute one song's timeline inside the caller's Transaction; returns rows written."""
+    tx.execute("DELETE FROM SongChordTimeline WHERE song_id = ?", (song_id,))
+    return tx.execute(_INSERT_SELECT + "WHERE s.song_id = ?", (song_id,))
+
+
+def rebuild_all_in(tx) -> int:
+    """Recompute every song's timeline (migration 19 backfill)."""
+    tx.execute("DELETE FROM SongChordTimeline")
+    return tx.execute(_INSERT_SELECT)
+
+
+def rebuild(song_id: Optional[int], db) -> None:
+    """Recompute one song's timeline in a single transaction."""
+    if song_id is None:
+        return
+    with db.transaction() as tx:
+        rebuild_in(tx, song_id)
+
+
+def song_of_section(section_id: int, db) -> Optional[int]:
+    return db.execute_scalar("SELECT song_id FROM Sections WHERE id = ?", (section_id,))
+
+
+def song_of_measure(measure_id: int, db) -> Optional[int]:
+    return db.execute_scalar("""
+        SELECT s.song_id FROM Measures m JOIN Sections s ON m.section_id = s.id
+        WHERE m.id = ?
+    """, (measure_id,))
+
+
+def song_of_chord(chord_id: int, db) -> Optional[int]:
+    return db.execute_scalar("""
+        SELECT s.song_id FROM Chords c
+        JOIN Measures m ON c.measure_id = m.id
+        JOIN Sections s ON m.section_id = s.id
+        WHERE c.id = ?
+    """, (chord_id,))
+
+
+def load(song_id: int, db, columns=('chord_symbol', 'measure_number', 'beat_position', 'chord_order'),
+         section_id: Optional[int] = None) -> list:
+    """A song's chords in progression order (optionally one section), as dicts."""
+    unknown = set(columns) - set(COLUMNS)
+    if unknown:
+        raise ValueError(f"Unknown timeline columns: {sorted(unknown)}")
+    query = f"SELECT {', '.join(columns)} FROM SongChordTimeline WHERE song_id = ?"
+    params = (song_id,)
+    if section_id is not None:
+        query += " AND section_id = ?"
+        params += (section_id,)
+    return db.execute_query(query + " ORDER BY seq", params)
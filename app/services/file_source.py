@@ -0,0 +1,37 @@
+"""
+Parser inputs that may or may not be on disk.
+
+parse_music_file, parse_upload_full, parse_midi_file and
+analyze_rhythm_from_midi accept a FileSource: a filesystem path, the raw
+bytes of an upload, or a readable binary file object. Uploads are parsed
+straight from memory instead of being written to a temp file first.
+"""
+import io
+import os
+from typing import BinaryIO, Union
+
+FileSource = Union[str, os.PathLike, bytes, bytearray, memoryview, BinaryIO]
+
+
+def is_path(source: FileSource) -> bool:
+    return isinstance(source, (str, os.PathLike))
+
+
+def as_file(source: FileSource) -> Union[str, os.PathLike, BinaryIO]:
+    """A path as-is, or a binary file object (bytes are wrapped, not copied to disk).
+
+    zipfile.ZipFile and ElementTree.parse take either form.
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return io.BytesIO(source)
+    return source
+
+
+def read_bytes(source: FileSource) -> bytes:
+    """The full contents of source."""
+    if is_path(source):
+        with open(source, 'rb') as fh:
+            return fh.read()
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return bytes(source)
+    return source.read()
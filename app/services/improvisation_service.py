@@ -6,7 +6,7 @@ Uses RLHF feedback from previous iterations to improve quality.
 import json
 import logging
 import os
-from anthropic import Anthropic
+from app.db import codec
 from app.db.connection import DatabaseConnection
 
 logger = logging.getLogger(__name__)
@@ -31,7 +31,7 @@ class ImprovisationService:
         if not analysis or not analysis[0].get("analysis_json"):
             raise ValueError(f"No analysis found for song {song_id}. Run analysis first.")
 
-        analysis_data = json.loads(analysis[0]["analysis_json"])
+        analysis_data = codec.unpack_json(analysis[0]["analysis_json"])
         chords = analysis_data.get("chords", [])
         if not chords:
             raise ValueError(f"No chords found in analysis for song {song_id}.")
@@ -69,6 +69,7 @@ class ImprovisationService:
             prior_feedback, song_title, song_composer, iteration
         )
 
+        from anthropic import Anthropic
         client = Anthropic(api_key=os.environ.get("ANTHROPIC_API_KEY"))
         if not client.api_key:
             raise ValueError("ANTHROPIC_API_KEY not set in environment")
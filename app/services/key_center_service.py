@@ -8,6 +8,10 @@ import re
 import logging
 from typing import List, Dict, Optional, Tuple
 
+import numpy as np
+
+from app.services import key_tracker
+
 logger = logging.getLogger(__name__)
 
 # Chromatic note names (flats preferred for jazz)
@@ -18,6 +22,17 @@ for i, n in enumerate(NOTE_NAMES):
 # Add sharps as aliases
 NOTE_TO_PC.update({'C#': 1, 'D#': 3, 'F#': 6, 'G#': 8, 'A#': 10, 'B#': 0, 'Cb': 11})
 
+# Key tracking (detect_key_centers): window width in chords, score weights,
+# and the cost of a key change (less between relative major/minor)
+KEY_WINDOW = 8
+KEY_FIT_WEIGHT = 4.0
+KEY_HOME_BONUS = 0.5
+KEY_PATTERN_BONUS = 1.0
+PATTERN_REACH = 4
+KEY_SWITCH_PENALTY = 3.0
+KEY_RELATIVE_SWITCH_PENALTY = 1.5
+_TRANSITIONS = key_tracker.transition_penalties(KEY_SWITCH_PENALTY, KEY_RELATIVE_SWITCH_PENALTY)
+
 
 def _parse_chord(symbol: str) -> Optional[Dict]:
     """Parse a chord symbol into root pitch class and quality info."""
@@ -141,11 +156,86 @@ def _are_relative_keys(key1: str, mode1: str, key2: str, mode2: str) -> bool:
     return False
 
 
+def _chord_tones(p: Dict) -> Tuple[int, ...]:
+    """Pitch classes of a parsed chord, from its root and quality flags."""
+    q = p['quality']
+    intervals = [0]
+    if 'sus' in q:
+        intervals.append(2 if 'sus2' in q else 5)
+    elif p['is_minor'] or p['is_half_dim'] or p['is_dim']:
+        intervals.append(3)
+    else:
+        intervals.append(4)
+    if p['is_half_dim'] or p['is_dim'] or 'b5' in q:
+        intervals.append(6)
+    elif '#5' in q or '+' in q or 'aug' in q:
+        intervals.append(8)
+    else:
+        intervals.append(7)
+    if p['is_maj7'] or re.match(r'(maj|Maj|M)(9|11|13)', q):
+        intervals.append(11)
+    elif p['is_dim'] and '7' in q:
+        intervals.append(9)
+    elif p['is_dom7'] or p['is_half_dim'] or (p['is_minor'] and re.search(r'7|9|11|13', q)):
+        intervals.append(10)
+    if '6' in q:
+        intervals.append(9)
+    return tuple(sorted({(p['root_pc'] + iv) % 12 for iv in intervals}))
+
+
+def _key_state_pc(key_name: str) -> Optional[int]:
+    """Pitch class of a key name in jazz (Bb) or music21 (B-) spelling."""
+    return NOTE_TO_PC.get(key_name.replace('-', 'b'))
+
+
+def _track_keys(parsed: List[Optional[Dict]], patterns: List[Dict],
+                chord_key_map: Dict[int, Tuple[str, str]],
+                home_key: str, home_mode: str) -> List[Tuple[str, str]]:
+    """(key, mode) per chord from the Viterbi path over windowed key scores."""
+    n = len(parsed)
+    counts = np.zeros((n, 12))
+    for i, p in enumerate(parsed):
+        if p:
+            counts[i, list(_chord_tones(p))] = 1.0
+    scores = KEY_FIT_WEIGHT * key_tracker.window_fit(counts, KEY_WINDOW)
+
+    # Labels per state: home key spelling first, then pattern spellings, then flats
+    labels = [(NOTE_NAMES[s // 2], 'minor' if s % 2 else 'major') for s in range(24)]
+    for pat in reversed(patterns):
+        pc = _key_state_pc(pat['target_key'])
+        if pc is not None:
+            labels[key_tracker.state_index(pc, 'minor' in pat['mode'])] = (pat['target_key'], pat['mode'])
+    home_pc = _key_state_pc(home_key)
+    if home_pc is not None:
+        home_state = key_tracker.state_index(home_pc, home_mode != 'major')
+        labels[home_state] = (home_key, home_mode)
+        scores[:, home_state] += KEY_HOME_BONUS
+
+    # Bonus for keys with ii-V-I evidence near the chord (once per key)
+    near = np.zeros((n, 24), dtype=bool)
+    for pat in patterns:
+        pc = _key_state_pc(pat['target_key'])
+        if pc is not None:
+            v = pat['indices'][1]
+            near[max(0, v - PATTERN_REACH):v + PATTERN_REACH + 1,
+                 key_tracker.state_index(pc, 'minor' in pat['mode'])] = True
+    scores += KEY_PATTERN_BONUS * near
+
+    forced = np.full(n, -1, dtype=np.int64)
+    for idx, (target, mode) in chord_key_map.items():
+        pc = _key_state_pc(target)
+        if pc is not None:
+            forced[idx] = key_tracker.state_index(pc, 'minor' in mode)
+
+    path = key_tracker.viterbi(scores, _TRANSITIONS, forced)
+    return [chord_key_map.get(i) or labels[s] for i, s in enumerate(path)]
+
+
 def detect_key_centers(chords: List[Dict], detected_key: str = None) -> List[Dict]:
     """Detect key center regions in a chord progression.
 
-    Uses ii-V-I pattern detection plus chord-to-key fitting to identify
-    where key center changes occur. Merges relative major/minor regions
+    Uses ii-V-I pattern detection plus a sliding-window key tracker
+    (app.services.key_tracker) to identify where key center changes occur. Merges relative major/minor regions
     to avoid over-fragmentation.
 
     Args:
@@ -187,72 +277,10 @@ def detect_key_centers(chords: List[Dict], detected_key: str = None) -> List[Dic
             if idx not in chord_key_map:
                 chord_key_map[idx] = (target, mode)
 
-    # Scales for fitting
-    major_scale = {0, 2, 4, 5, 7, 9, 11}
-    h_minor_scale = {0, 2, 3, 5, 7, 8, 11}
-
-    # Collect candidate keys from patterns
-    pattern_keys = []
-    for pat in patterns:
-        pk = (pat['target_key'], pat['mode'])
-        if pk not in pattern_keys:
-            pattern_keys.append(pk)
-
-    if not pattern_keys:
-        pattern_keys.append((home_key, home_mode))
-
-    # Step 2.5: Sliding window key discovery — when pattern detection finds < 2 candidates,
-    # score all 24 keys against windows of chords to discover additional key regions.
-    # This handles songs where chord symbols don't form clean ii-V-I patterns.
-    if len(pattern_keys) < 2 and len(parsed) >= 4:
-        window_size = 4
-        for i in range(0, len(parsed), window_size):
-            window = parsed[i:i + window_size]
-            best_wk, best_score = pattern_keys[0], -1
-            for key_name in NOTE_NAMES:
-                key_pc_val = NOTE_TO_PC[key_name]
-                for mode_name, scale_pcs in [('major', major_scale), ('minor', h_minor_scale)]:
-                    score = sum(
-                        1 for p in window if p and (p['root_pc'] - key_pc_val) % 12 in scale_pcs
-                    )
-                    if score > best_score:
-                        best_score, best_wk = score, (key_name, mode_name)
-            if best_wk not in pattern_keys:
-                pattern_keys.append(best_wk)
-
-    def _chord_fits_key(chord_pc, key_name, mode):
-        key_pc = NOTE_TO_PC.get(key_name, 0)
-        interval = (chord_pc - key_pc) % 12
-        scale = h_minor_scale if 'minor' in mode else major_scale
-        return interval in scale
-
-    # Step 3: Assign each chord to the best-fit key using scoring
-    # Score each candidate key for each chord; prefer home key on ties
-    assignments = []
-    for i, p in enumerate(parsed):
-        if i in chord_key_map:
-            assignments.append(chord_key_map[i])
-        elif p:
-            best = pattern_keys[0]
-            best_score = -1
-            for k, m in pattern_keys:
-                score = 0
-                if _chord_fits_key(p['root_pc'], k, m):
-                    score += 2
-                # Bonus for home key to prevent fragmentation
-                if k == home_key and m == home_mode:
-                    score += 1
-                # Bonus for keys with strong pattern evidence nearby
-                for pat in patterns:
-                    if pat['target_key'] == k and abs(i - pat['indices'][1]) <= 4:
-                        score += 1
-                        break
-                if score > best_score:
-                    best_score = score
-                    best = (k, m)
-            assignments.append(best)
-        else:
-            assignments.append((home_key, home_mode))
+    # Step 3: Assign each chord a key with the sliding-window tracker.
+    # Pattern chords keep their pattern key; the rest follow the best-scoring
+    # key path (window fit + home/pattern bonuses, minus key-change penalties).
+    assignments = _track_keys(parsed, patterns, chord_key_map, home_key, home_mode)
 
     # Step 4: Build raw regions from consecutive same-key assignments
     raw_regions = []
@@ -0,0 +1,85 @@
+"""
+Sliding-window key tracking for chord progressions.
+
+Each chord gets a 24-key score from the chord tones in a window centred on
+it. Window sums come from prefix sums of per-chord pitch-class counts, so
+the whole (chords x 24) score matrix costs O(n) however wide the window is.
+A Viterbi pass then picks the highest-scoring key path with a penalty per
+key change, which turns noisy per-window winners into stable regions.
+
+States follow app.services.key_detection: row 2*pc is pc major, row
+2*pc+1 is pc minor (harmonic minor scale, as key_center_service uses).
+"""
+from typing import Optional
+
+import numpy as np
+
+MAJOR_SCALE = (0, 2, 4, 5, 7, 9, 11)
+HARMONIC_MINOR_SCALE = (0, 2, 3, 5, 7, 8, 11)
+
+
+def _scale_matrix() -> np.ndarray:
+    matrix = np.zeros((24, 12))
+    for pc in range(12):
+        for mode, scale in enumerate((MAJOR_SCALE, HARMONIC_MINOR_SCALE)):
+            matrix[2 * pc + mode, [(pc + step) % 12 for step in scale]] = 1.0
+    return matrix
+
+
+# (24, 12) scale membership per key
+SCALE_MATRIX = _scale_matrix()
+
+
+def state_index(pc: int, minor: bool) -> int:
+    return 2 * (pc % 12) + int(minor)
+
+
+def transition_penalties(switch: float, relative: float) -> np.ndarray:
+    """(24, 24) cost of moving between keys; relative major/minor moves cost `relative`."""
+    penalties = np.full((24, 24), switch)
+    np.fill_diagonal(penalties, 0.0)
+    for pc in range(12):
+        major, minor = state_index(pc, False), state_index(pc + 9, True)
+        penalties[major, minor] = penalties[minor, major] = relative
+    return penalties
+
+
+def window_fit(counts: np.ndarray, window: int) -> np.ndarray:
+    """(n, 24) share of the chord tones in a `window`-chord span around each chord
+    that belong to each key's scale (0 where the span has no tones)."""
+    n = len(counts)
+    prefix = np.zeros((n + 1, 12))
+    np.cumsum(counts, axis=0, out=prefix[1:])
+    starts = np.arange(n) - window // 2
+    lo = np.clip(starts, 0, n)
+    hi = np.clip(starts + window, 0, n)
+    windowed = prefix[hi] - prefix[lo]
+    in_scale = windowed @ SCALE_MATRIX.T
+    totals = windowed.sum(axis=1, keepdims=True)
+    return np.divide(in_scale, totals, out=np.zeros_like(in_scale), where=totals > 0)
+
+
+def viterbi(scores: np.ndarray, penalties: np.ndarray,
+            forced: Optional[np.ndarray] = None) -> np.ndarray:
+    """State per row maximising total score minus transition penalties.
+
+    `forced` (optional, -1 = free) pins rows to a given state.
+    """
+    n, states = scores.shape
+    if forced is not None:
+        pinned = forced >= 0
+        scores = np.where(pinned[:, None], -1e9, scores)
+        scores[pinned, forced[pinned]] = 0.0
+    columns = np.arange(states)
+    back = np.zeros((n, states), dtype=np.int64)
+    best = scores[0].copy()
+    for i in range(1, n):
+        candidates = best[:, None] - penalties
+        back[i] = candidates.argmax(axis=0)
+        best = candidates[back[i], columns] + scores[i]
+    state = int(best.argmax())
+    path = [state]
+    for row in back[:0:-1].tolist():
+        state = row[state]
+        path.append(state)
+    return np.array(path[::-1], dtype=np.int64)
@@ -0,0 +1,207 @@
+"""
+Single-pass MIDI decoding into a columnar note table.
+
+decode_midi() walks every track of a MIDI file once and returns a
+MidiEventTable: one row per sounding note (onset/offset tick, pitch,
+velocity, channel, track) as NumPy arrays, plus the tempo and
+time-signature events and track names. parse_midi_file's chord and note
+extraction and analyze_rhythm_from_midi all read this table instead of
+re-walking (or mido.merge_tracks-copying) the file.
+
+Rows are in merged-track order: by onset tick, then track, then position
+within the track (the order mido.merge_tracks would produce).
+
+TickIndex turns ticks into (measure, beat, seconds) using every
+time-signature and tempo change in the file, so pieces that change meter
+get the right measure numbers. Beats are quarter notes counted from 1,
+the same unit the MuseScore parser uses.
+"""
+from dataclasses import dataclass, field
+from typing import List, Tuple, Union
+
+import numpy as np
+
+from app.services.file_source import FileSource, as_file, is_path
+
+
+@dataclass
+class MidiEventTable:
+    """Columnar view of a MIDI file's notes and meta events."""
+    ticks_per_beat: int
+    onset: np.ndarray      # int64 tick of the note-on
+    offset: np.ndarray     # int64 tick of the note-off (onset + 1 beat if never released)
+    pitch: np.ndarray      # uint8 MIDI note number
+    velocity: np.ndarray   # uint8 note-on velocity
+    channel: np.ndarray    # uint8
+    track: np.ndarray      # int16 track index
+    # (tick, microseconds per beat) / (tick, numerator, denominator), in file order
+    tempos: List[Tuple[int, int]] = field(default_factory=list)
+    time_signatures: List[Tuple[int, int, int]] = field(default_factory=list)
+    track_names: List[str] = field(default_factory=list)
+
+    def __len__(self) -> int:
+        return len(self.onset)
+
+    def track_onsets(self, track_index: int) -> np.ndarray:
+        """Onset ticks of one track's notes, in order."""
+        return self.onset[self.track == track_index]
+
+
+def decode_midi(source: FileSource) -> MidiEventTable:
+    """Decode a MIDI file (path, bytes or binary file object) into a
+    MidiEventTable in one pass over its messages.
+
+    Note-offs (or note-ons with velocity 0) close the latest open note of
+    the same pitch on the same track and channel; a note still open at the
+    end of its track lasts one beat.
+    """
+    from mido import MidiFile
+    midi = MidiFile(source) if is_path(source) else MidiFile(file=as_file(source))
+    tpb = midi.ticks_per_beat
+
+    onsets: List[int] = []
+    offsets: List[int] = []
+    pitches: List[int] = []
+    velocities: List[int] = []
+    channels: List[int] = []
+    tracks: List[int] = []
+    tempos: List[Tuple[int, int]] = []
+    time_signatures: List[Tuple[int, int, int]] = []
+    track_names: List[str] = []
+
+    for track_index, track in enumerate(midi.tracks):
+        track_names.append(track.name)
+        tick = 0
+        open_notes = {}  # (channel, pitch) -> row
+        for msg in track:
+            tick += msg.time
+            kind = msg.type
+            if kind == 'note_on' and msg.velocity > 0:
+                open_notes[(msg.channel, msg.note)] = len(onsets)
+                onsets.append(tick)
+                offsets.append(-1)
+                pitches.append(msg.note)
+                velocities.append(msg.velocity)
+                channels.append(msg.channel)
+                tracks.append(track_index)
+            elif kind == 'note_off' or kind == 'note_on':
+                row = open_notes.pop((msg.channel, msg.note), None)
+                if row is not None:
+                    offsets[row] = max(tick, onsets[row] + 1)
+            elif kind == 'set_tempo':
+                tempos.append((tick, msg.tempo))
+            elif kind == 'time_signature':
+                time_signatures.append((tick, msg.numerator, msg.denominator))
+
+    onset = np.array(onsets, dtype=np.int64)
+    offset = np.array(offsets, dtype=np.int64)
+    unreleased = offset < 0
+    offset[unreleased] = onset[unreleased] + tpb
+    track = np.array(tracks, dtype=np.int16)
+
+    # Rows were appended track by track; lexsort is stable, so equal
+    # (onset, track) keys keep their order within the track
+    order = np.lexsort((track, onset))
+    return MidiEventTable(
+        ticks_per_beat=tpb,
+        onset=onset[order],
+        offset=offset[order],
+        pitch=np.array(pitches, dtype=np.uint8)[order],
+        velocity=np.array(velocities, dtype=np.uint8)[order],
+        channel=np.array(channels, dtype=np.uint8)[order],
+        track=track[order],
+        tempos=tempos,
+        time_signatures=time_signatures,
+        track_names=track_names,
+    )
+
+
+DEFAULT_TEMPO = 500000  # microseconds per beat (120 BPM), the SMF default
+
+
+def _last_per_tick(events: list) -> list:
+    """Sort meta events by tick; of several at the same tick, the last one wins."""
+    by_tick = {}
+    for event in sorted(events, key=lambda e: e[0]):
+        by_tick[event[0]] = event
+    return list(by_tick.values())
+
+
+@dataclass(frozen=True)
+class TickIndex:
+    """Tick -> (measure, beat, seconds) lookup built from a file's meta events.
+
+    Meter and tempo are stored as segments (start tick plus what holds
+    until the next change); locate() binary-searches them. A time signature
+    that lands mid-measure closes that measure early and starts measure
+    counting afresh at its tick.
+    """
+    ticks_per_beat: int
+    meter_tick: np.ndarray      # int64 start tick of each meter segment
+    meter_measure: np.ndarray   # int64 measure number at the segment start
+    measure_ticks: np.ndarray   # float64 ticks per measure in the segment
+    meters: List[Tuple[int, int]]
+    tempo_tick: np.ndarray      # int64 start tick of each tempo segment
+    tempo_seconds: np.ndarray   # float64 seconds elapsed at the segment start
+    tempo_rate: np.ndarray      # float64 seconds per tick in the segment
+    tempos: List[int]           # microseconds per beat
+
+    @classmethod
+    def from_events(cls, events: MidiEventTable) -> 'TickIndex':
+        tpb = events.ticks_per_beat
+
+        # The first meter and tempo also cover any ticks before them
+        meters = _last_per_tick(events.time_signatures) or [(0, 4, 4)]
+        meters[0] = (0,) + meters[0][1:]
+        meter_tick = np.array([tick for tick, _, _ in meters], dtype=np.int64)
+        measure_ticks = np.array([tpb * 4 * num / den for _, num, den in meters],
+                                 dtype=np.float64)
+        # Measures opened by each segment; a partial last measure still counts
+        spans = np.ceil(np.diff(meter_tick) / measure_ticks[:-1]).astype(np.int64)
+        meter_measure = np.concatenate(([1], 1 + np.cumsum(spans)))
+
+        tempos = _last_per_tick(events.tempos) or [(0, DEFAULT_TEMPO)]
+        tempos[0] = (0,) + tempos[0][1:]
+        tempo_tick = np.array([tick for tick, _ in tempos], dtype=np.int64)
+        tempo_rate = np.array([usec for _, usec in tempos], dtype=np.float64) / (1e6 * tpb)
+        tempo_seconds = np.concatenate(([0.0], np.cumsum(np.diff(tempo_tick) * tempo_rate[:-1])))
+
+        return cls(
+            ticks_per_beat=tpb,
+            meter_tick=meter_tick,
+            meter_measure=meter_measure,
+            measure_ticks=measure_ticks,
+            meters=[(num, den) for _, num, den in meters],
+            tempo_tick=tempo_tick,
+            tempo_seconds=tempo_seconds,
+            tempo_rate=tempo_rate,
+            tempos=[usec for _, usec in tempos],
+        )
+
+    def prevailing_meter(self, end_tick: int) -> Tuple[int, int]:
+        """The meter in force for the most ticks before ``end_tick`` (so a
+        one-bar pickup in 1/4 doesn't label a 4/4 piece)."""
+        bounds = np.clip(np.append(self.meter_tick[1:], end_tick), 0, None)
+        spans = np.clip(bounds - self.meter_tick, 0, None)
+        totals = {}
+        for meter, span in zip(self.meters, spans.tolist()):
+            totals[meter] = totals.get(meter, 0) + span
+        return max(totals, key=totals.get)
+
+    def locate(
+        self, ticks: Union[np.ndarray, List[int]],
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Measure numbers (1-based), beat positions (quarter notes from 1)
+        and seconds from the start for an array of ticks."""
+        ticks = np.asarray(ticks, dtype=np.int64)
+
+        seg = np.searchsorted(self.meter_tick, ticks, side='right') - 1
+        rel = ticks - self.meter_tick[seg]
+        length = self.measure_ticks[seg]
+        into = np.floor(rel / length)
+        measures = self.meter_measure[seg] + into.astype(np.int64)
+        beats = (rel - into * length) / self.ticks_per_beat + 1
+
+        seg = np.searchsorted(self.tempo_tick, ticks, side='right') - 1
+        seconds = self.tempo_seconds[seg] + (ticks - self.tempo_tick[seg]) * self.tempo_rate[seg]
+        return measures, beats, seconds
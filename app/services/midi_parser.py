@@ -1,7 +1,7 @@
 """
 MIDI Parser Service
 
-Uses the `mido` library to:
+Uses the `mido` library (via app.services.midi_events) to:
 1. Parse MIDI files
 2. Extract chord data from chord tracks
 3. Detect time signature and tempo
@@ -11,12 +11,17 @@ Supports both block-chord and arpeggiated MIDI styles via a configurable
 time-window chord grouping algorithm.
 """
 import logging
-import mido
-from mido import MidiFile, tempo2bpm
-from typing import Any, List, Optional, Tuple, Dict
-from pydantic import BaseModel
+from functools import lru_cache
+from typing import List, Optional, Tuple, Dict
+from pydantic import BaseModel, ConfigDict, Field
 from collections import defaultdict
 
+import numpy as np
+
+from app.services.file_source import FileSource
+from app.services.midi_events import MidiEventTable, TickIndex, decode_midi
+from app.services.note_table import NoteTable
+
 logger = logging.getLogger(__name__)
 
 # ---------------------------------------------------------------------------
@@ -30,15 +35,6 @@ DEFAULT_CHORD_WINDOW_BEATS: float = 2.0
 MIN_NOTES_FOR_CHORD: int = 2
 
 
-class NoteData(BaseModel):
-    """Individual note data from MIDI."""
-    measure_number: int
-    beat_position: float
-    midi_pitch: int
-    duration_beats: float
-    velocity: int
-
-
 class ChordData(BaseModel):
     """Parsed chord data from MIDI."""
     measure_number: int
@@ -58,12 +54,14 @@ class SectionData(BaseModel):
 
 class ParsedSong(BaseModel):
     """Complete parsed song data."""
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
     title: Optional[str]
     tempo: Optional[int]
     time_signature: str
     total_measures: int
     chords: List[ChordData]
-    notes: List[NoteData] = []
+    notes: NoteTable = Field(default_factory=NoteTable.empty)
 
 
 # Standard chord templates (intervals from root in semitones)
@@ -176,6 +174,10 @@ def identify_chord(
     - Duration weighting: weight pitch classes by note duration
     - Beat position weighting: weight by beat position
 
+    The template matching is precomputed in _chord_table() (see
+    _build_chord_table), indexed by bass and pitch-class mask; the
+    weights are only computed to pick between several exact matches.
+
     Args:
         notes: List of MIDI note numbers.
         note_details: Optional list of dicts with 'midi_pitch', 'duration_beats',
@@ -186,7 +188,36 @@ def identify_chord(
     if not notes:
         return ("", "", False)
 
-    # Build weighted pitch class profile (Changes 3 & 4)
+    mask = 0
+    for n in ([nd['midi_pitch'] for nd in note_details] if note_details else notes):
+        mask |= 1 << (n % 12)
+    bass_pc = min(notes) % 12
+    if mask & (mask - 1) == 0:
+        return (NOTE_NAMES[mask.bit_length() - 1], "", False)
+
+    exact, result = _chord_table()[bass_pc * 4096 + mask]
+    if not exact:
+        return result
+
+    # Exact template matches: the dominant pitch class by weight gets +20
+    if len(exact) == 1:
+        best_score, best_root_pc, best_type = exact[0]
+    else:
+        weighted_root_pc = _weighted_root(notes, note_details)
+        best_score = -1
+        for score, root_pc, chord_type in exact:
+            if root_pc == weighted_root_pc:
+                score += 20
+            if score > best_score:
+                best_score, best_root_pc, best_type = score, root_pc, chord_type
+    # A lone dim/aug/sus triad yields to a rootless 7th reading, if there is one
+    if result and best_type in _ROOTLESS_OVERRIDABLE:
+        return result
+    return (NOTE_NAMES[best_root_pc], best_type, False)
+
+
+def _weighted_root(notes: List[int], note_details: Optional[List[Dict]]) -> int:
+    """Pitch class with the most weight (Changes 3 & 4); first seen wins ties."""
     pc_weights: Dict[int, float] = defaultdict(float)
     if note_details:
         for nd in note_details:
@@ -197,17 +228,136 @@ def identify_chord(
     else:
         for n in notes:
             pc_weights[n % 12] += 1.0
+    return max(pc_weights, key=pc_weights.get)
+
+
+def _rotate(mask: int, semitones: int) -> int:
+    """Transpose a 12-bit pitch-class mask up by `semitones`."""
+    semitones %= 12
+    return ((mask << semitones) | (mask >> (12 - semitones))) & 0xFFF
+
+
+def _build_chord_table() -> List[tuple]:
+    """Precompute identify_chord for every (bass pitch class, pitch-class mask).
+
+    Entry ``bass * 4096 + mask`` is ``(exact, result)``:
+    - exact: ``(score, root_pc, chord_type)`` per exact template match, in
+      _classify_scan's root/template order, scored without the +20
+      weighted-root bonus (the only input this table does not cover);
+      result is then the rootless match that replaces a dim/aug/sus triad,
+      or None.
+    - no exact match: ``()`` and the final (root, type, is_rootless).
+
+    Built by enumerating template rotations and their subsets rather than
+    scanning all 49152 inputs; test_chord_table.py checks it against
+    _classify_scan for every mask, bass and weighted root.
+    """
+    templates = []
+    for chord_type, template in _TEMPLATES_MOD12.items():
+        tmask = 0
+        for interval in template:
+            tmask |= 1 << interval
+        templates.append((chord_type, tmask, len(template), chord_type in _7TH_OR_EXTENSION))
+
+    exact: List[list] = [[] for _ in range(4096)]    # (root, order, type, size, jazz)
+    subsets: List[list] = [[] for _ in range(4096)]  # (root, order, type, size, jazz)
+    rootless: List[Optional[tuple]] = [None] * 4096  # (score, result)
+    for root_pc in range(12):
+        for order, (chord_type, tmask, size, jazz) in enumerate(templates):
+            full = _rotate(tmask, root_pc)
+            exact[full].append((root_pc, order, chord_type, size, jazz))
+            # Subsets that keep the root and have >= 3 pitch classes
+            rest = full & ~(1 << root_pc)
+            sub = rest
+            while True:
+                mask = sub | (1 << root_pc)
+                if bin(mask).count('1') >= 3:
+                    subsets[mask].append((root_pc, order, chord_type, size, jazz))
+                if sub == 0:
+                    break
+                sub = (sub - 1) & rest
+            # Rootless: every template tone but the (absent) root
+            if jazz and size >= 4:
+                score = 1100 + size * 10
+                if rootless[rest] is None or score > rootless[rest][0]:
+                    rootless[rest] = (score, (NOTE_NAMES[root_pc], chord_type, True))
+    for mask in range(4096):
+        exact[mask].sort(key=lambda c: c[:2])
+        subsets[mask].sort(key=lambda c: c[:2])
+
+    table: List[tuple] = [None] * (12 * 4096)
+    for mask in range(1, 4096):
+        rootless_result = rootless[mask][1] if rootless[mask] else None
+        num_pcs = bin(mask).count('1')
+        for bass_pc in range(12):
+            if exact[mask]:
+                table[bass_pc * 4096 + mask] = (tuple(
+                    (1000 + size * 10 + (50 if root_pc == bass_pc else 0) + (100 if jazz else 0),
+                     root_pc, chord_type)
+                    for root_pc, _, chord_type, size, jazz in exact[mask]
+                ), rootless_result)
+                continue
+            result = rootless_result
+            if result is None:
+                best_score = -1
+                for root_pc, _, chord_type, size, jazz in subsets[mask]:
+                    score = (int(num_pcs / size * 100) + size
+                             + (10 if root_pc == bass_pc else 0) + (50 if jazz else 0))
+                    if score > best_score:
+                        best_score = score
+                        result = (NOTE_NAMES[root_pc], chord_type, False)
+            if result is None and num_pcs == 2:
+                result = _fallback_chord([pc for pc in range(12) if mask >> pc & 1], bass_pc)
+            elif result is None and num_pcs > 2:
+                # _fallback_chord's last resort: bass as root, minor if it has a minor third
+                minor = mask >> ((bass_pc + 3) % 12) & 1
+                result = (NOTE_NAMES[bass_pc], "m" if minor else "", False)
+            table[bass_pc * 4096 + mask] = ((), result)
+    return table
+
+
+def _fallback_chord(pitch_classes: List[int], bass_pc: int) -> Tuple[str, str, bool]:
+    """Dyad and bass-note fallbacks when no template matches."""
+    # ----- Fallback for 2-note dyads -----
+    if len(pitch_classes) == 2:
+        interval = (pitch_classes[1] - pitch_classes[0]) % 12
+        if interval == 7:
+            return (NOTE_NAMES[pitch_classes[0]], "", False)
+        elif interval == 5:
+            return (NOTE_NAMES[pitch_classes[1]], "", False)
+        elif interval == 4:
+            return (NOTE_NAMES[pitch_classes[0]], "", False)
+        elif interval == 3:
+            return (NOTE_NAMES[pitch_classes[0]], "m", False)
+        elif interval == 8:
+            return (NOTE_NAMES[pitch_classes[1]], "", False)
+        elif interval == 9:
+            return (NOTE_NAMES[pitch_classes[1]], "m", False)
+
+    # ----- Last resort: bass note as root -----
+    root_name = NOTE_NAMES[bass_pc]
+    intervals_from_bass = sorted(set((pc - bass_pc) % 12 for pc in pitch_classes))
+    if 3 in intervals_from_bass:
+        return (root_name, "m", False)
+    elif 4 in intervals_from_bass:
+        return (root_name, "", False)
+    return (root_name, "", False)
 
-    pitch_classes = sorted(pc_weights.keys())
+
+def _classify_scan(
+    pitch_classes: List[int], bass_pc: int, weighted_root_pc: int,
+) -> Tuple[str, str, bool]:
+    """Reference template scan behind _chord_table() (HL-006A v1.1).
+
+    Tries every pitch class as a candidate root against every template.
+    Kept for test_chord_table.py and as the readable form of the rules.
+    """
+    pitch_classes = sorted(pitch_classes)
     num_pcs = len(pitch_classes)
-    bass_pc = min(notes) % 12
 
     if num_pcs < 2:
         return (NOTE_NAMES[pitch_classes[0]], "", False)
 
-    # Find the dominant pitch class by weight (candidate for root)
-    weighted_root_pc = max(pc_weights, key=pc_weights.get)
-
     # ----- Try every pitch class as a candidate root -----
     best_root: Optional[str] = None
     best_type = ""
@@ -278,41 +428,32 @@ def identify_chord(
     if best_root:
         return (best_root, best_type, best_rootless)
 
-    # ----- Fallback for 2-note dyads -----
-    if num_pcs == 2:
-        interval = (pitch_classes[1] - pitch_classes[0]) % 12
-        if interval == 7:
-            return (NOTE_NAMES[pitch_classes[0]], "", False)
-        elif interval == 5:
-            return (NOTE_NAMES[pitch_classes[1]], "", False)
-        elif interval == 4:
-            return (NOTE_NAMES[pitch_classes[0]], "", False)
-        elif interval == 3:
-            return (NOTE_NAMES[pitch_classes[0]], "m", False)
-        elif interval == 8:
-            return (NOTE_NAMES[pitch_classes[1]], "", False)
-        elif interval == 9:
-            return (NOTE_NAMES[pitch_classes[1]], "m", False)
+    return _fallback_chord(pitch_classes, bass_pc)
 
-    # ----- Last resort: bass note as root -----
-    root_name = NOTE_NAMES[bass_pc]
-    intervals_from_bass = sorted(set((pc - bass_pc) % 12 for pc in pitch_classes))
-    if 3 in intervals_from_bass:
-        return (root_name, "m", False)
-    elif 4 in intervals_from_bass:
-        return (root_name, "", False)
-    return (root_name, "", False)
+
+# Triads that a rootless 7th reading overrides (best exact score is < 1130)
+_ROOTLESS_OVERRIDABLE = ('dim', 'aug', 'sus2', 'sus4')
+
+@lru_cache(maxsize=1)
+def _chord_table() -> List[tuple]:
+    """(exact matches, result) per bass * 4096 + pitch-class mask.
+
+    Built on first use rather than at import (about 0.1s), so the API
+    process does not pay for it until a MIDI file is parsed or
+    app.startup.warm_up builds it.
+    """
+    return _build_chord_table()
 
 
 def parse_midi_file(
-    file_path: str,
+    file_path: FileSource,
     chord_window_beats: float = DEFAULT_CHORD_WINDOW_BEATS,
 ) -> ParsedSong:
     """
     Parse a MIDI file and extract chord progressions.
 
     Args:
-        file_path: Path to MIDI file.
+        file_path: Path to MIDI file, or its bytes / a binary file object.
         chord_window_beats: Size of the grouping window in beats.
             Notes whose onsets fall within this window are treated as
             belonging to the same chord.  Larger values help arpeggiated
@@ -322,36 +463,25 @@ def parse_midi_file(
     Returns:
         ParsedSong with all extracted data.
     """
-    midi = MidiFile(file_path)
+    # One pass over the file; chords and notes are both read from this table.
+    # All tracks are combined: many MIDI files split RH melody and LH
+    # bass/chords across tracks, and the chord algorithm needs the full
+    # harmonic picture.
+    events = decode_midi(file_path)
 
     # ------------------------------------------------------------------
-    # Extract tempo and time-signature from the first track that has them
+    # Tempo and meter maps; the song is labelled with the opening tempo
+    # and the meter that covers most of it
     # ------------------------------------------------------------------
-    tempo = 120  # Default BPM
-    time_sig_num = 4
-    time_sig_denom = 4
-
-    for track in midi.tracks:
-        for msg in track:
-            if msg.type == 'set_tempo':
-                tempo = int(tempo2bpm(msg.tempo))
-            elif msg.type == 'time_signature':
-                time_sig_num = msg.numerator
-                time_sig_denom = msg.denominator
+    from mido import tempo2bpm
+    index = TickIndex.from_events(events)
+    tempo = int(tempo2bpm(index.tempos[0]))
+    end_tick = int(events.offset.max()) if len(events) else 0
+    time_sig_num, time_sig_denom = index.prevailing_meter(end_tick)
 
     time_signature = f"{time_sig_num}/{time_sig_denom}"
 
-    # ------------------------------------------------------------------
-    # Merge all tracks into a single combined track for chord extraction.
-    # Many MIDI files split RH melody and LH bass/chords across tracks;
-    # combining them gives the algorithm the full harmonic picture.
-    # ------------------------------------------------------------------
-    merged_track = mido.merge_tracks(midi.tracks)
-    total_note_count = sum(
-        1 for msg in merged_track
-        if msg.type == 'note_on' and msg.velocity > 0
-    )
-
+    total_note_count = len(events)
     if total_note_count == 0:
         logger.warning("MIDI file contains no note events — returning empty song")
         return ParsedSong(
@@ -363,19 +493,18 @@ def parse_midi_file(
         )
 
     # ------------------------------------------------------------------
-    # Extract chords using the windowed algorithm (merged tracks)
+    # Extract chords using the windowed algorithm (all tracks)
     # ------------------------------------------------------------------
-    chords_data = extract_chords_from_track(
-        merged_track,
-        midi.ticks_per_beat,
-        time_sig_num,
+    chords_data = extract_chords_from_events(
+        events,
+        index,
         chord_window_beats=chord_window_beats,
     )
 
     if not chords_data:
         logger.warning(
             "MIDI chord extraction produced 0 chords. "
-            "Merged tracks had %d note-on events. "
+            "All tracks had %d note-on events. "
             "Consider adjusting chord_window_beats (current: %.2f).",
             total_note_count,
             chord_window_beats,
@@ -383,17 +512,12 @@ def parse_midi_file(
 
     # ------------------------------------------------------------------
     # Extract individual notes (HL-006E: needed for note count badges)
-    # Also use merged track so all voices appear in note data.
     # ------------------------------------------------------------------
-    notes_data = extract_notes_from_track(
-        merged_track,
-        midi.ticks_per_beat,
-        time_sig_num,
-    )
+    notes_data = extract_notes_from_events(events, index)
 
     total_measures = max(
         max((c.measure_number for c in chords_data), default=0),
-        max((n.measure_number for n in notes_data), default=0),
+        int(notes_data.measure_number.max(initial=0)),
     )
 
     return ParsedSong(
@@ -409,93 +533,75 @@ def parse_midi_file(
 # -----------------------------------------------------------------------
 # Core chord-extraction algorithm (time-window grouping)
 # -----------------------------------------------------------------------
-def extract_chords_from_track(
-    track,
-    ticks_per_beat: int,
-    beats_per_measure: int,
+def extract_chords_from_events(
+    events: MidiEventTable,
+    index: TickIndex,
     *,
     chord_window_beats: float = DEFAULT_CHORD_WINDOW_BEATS,
 ) -> List[ChordData]:
-    """Extract chord data from a MIDI track using time-window grouping.
+    """Extract chord data from decoded MIDI notes using time-window grouping.
 
     Instead of requiring notes to arrive at the *exact* same tick, this
-    algorithm collects every ``note_on`` whose onset falls within a
-    sliding window of ``chord_window_beats`` beats.  When the window
-    closes (i.e. a new note arrives *outside* the current window), the
+    algorithm collects every note whose onset falls within a sliding
+    window of ``chord_window_beats`` beats.  When the window closes
+    (i.e. a new note arrives *outside* the current window), the
     accumulated notes are identified as a chord and emitted.
 
     This handles both block-chord voicings (Corcovado-style) and
-    arpeggiated passages (Bach BWV 846-style).
+    arpeggiated passages (Bach BWV 846-style). Chords are placed by the
+    window's first onset, looked up in ``index``.
     """
+    if not len(events):
+        return []
+
+    ticks_per_beat = events.ticks_per_beat
     window_ticks = int(ticks_per_beat * chord_window_beats)
 
-    # Collect all events with absolute times for duration computation
-    all_events: List[Tuple[int, Any]] = []
-    current_time = 0
-    for msg in track:
-        current_time += msg.time
-        all_events.append((current_time, msg))
-
-    # Build note-on events and a duration map
-    note_events: List[Tuple[int, int, int]] = []  # (onset_tick, midi_note, velocity)
-    # Track note-off times for duration computation
-    note_on_times: Dict[int, int] = {}  # pitch → onset_tick
-    note_durations: Dict[Tuple[int, int], float] = {}  # (onset_tick, pitch) → duration_beats
-
-    for tick, msg in all_events:
-        if msg.type == 'note_on' and msg.velocity > 0:
-            note_events.append((tick, msg.note, msg.velocity))
-            note_on_times[msg.note] = tick
-        elif msg.type == 'note_off' or (msg.type == 'note_on' and msg.velocity == 0):
-            if msg.note in note_on_times:
-                onset = note_on_times.pop(msg.note)
-                dur_ticks = max(tick - onset, 1)
-                note_durations[(onset, msg.note)] = dur_ticks / ticks_per_beat
-
-    if not note_events:
-        return []
+    # HL-006A: beat position and duration of every note, for weighting
+    onsets = events.onset.tolist()
+    pitches = events.pitch.tolist()
+    measures, beats, _ = index.locate(events.onset)
+    measures = measures.tolist()
+    beat_positions = beats.tolist()
+    durations = ((events.offset - events.onset) / ticks_per_beat).tolist()
 
     # ------------------------------------------------------------------
     # Group notes whose onsets fall within the same window
     # ------------------------------------------------------------------
     chords: List[ChordData] = []
-    window_start = note_events[0][0]
+    window_start = onsets[0]
+    window_first = 0  # row of the window's first note
     window_notes: List[int] = []
     window_details: List[Dict] = []  # HL-006A: note details for weighted analysis
 
-    def _flush_window(window_start_tick: int) -> None:
+    def _flush_window(first_row: int) -> None:
         """Emit a chord from the current window if enough notes exist."""
         if len(window_notes) < MIN_NOTES_FOR_CHORD:
             return
         root, chord_type, is_rootless = identify_chord(window_notes[:], window_details[:])
         if not root:
             return
-        beats_elapsed = window_start_tick / ticks_per_beat
-        measure_number = int(beats_elapsed / beats_per_measure) + 1
-        beat_position = (beats_elapsed % beats_per_measure) + 1
         chords.append(ChordData(
-            measure_number=measure_number,
-            beat_position=round(beat_position, 2),
+            measure_number=measures[first_row],
+            beat_position=round(beat_positions[first_row], 2),
             chord_symbol=f"{root}{chord_type}",
             midi_notes=window_notes[:],
             is_rootless=is_rootless,
         ))
 
-    for onset, note, velocity in note_events:
+    for row, (onset, note, beat_pos, dur) in enumerate(
+        zip(onsets, pitches, beat_positions, durations)
+    ):
         if onset - window_start >= window_ticks and window_notes:
             # Current note is outside the window — flush accumulated notes
-            _flush_window(window_start)
+            _flush_window(window_first)
             window_notes = []
             window_details = []
-            window_start = onset
+            window_start, window_first = onset, row
         elif not window_notes:
-            window_start = onset
+            window_start, window_first = onset, row
 
         window_notes.append(note)
-        # HL-006A: Compute beat position and duration for weighting
-        beats_elapsed = onset / ticks_per_beat
-        beat_pos = (beats_elapsed % beats_per_measure) + 1
-        dur = note_durations.get((onset, note), 1.0)
         window_details.append({
             'midi_pitch': note,
             'duration_beats': dur,
@@ -503,7 +609,7 @@ def extract_chords_from_track(
         })
 
     # Flush the final window
-    _flush_window(window_start)
+    _flush_window(window_first)
 
     return chords
 
@@ -511,58 +617,27 @@ def extract_chords_from_track(
 # -----------------------------------------------------------------------
 # Individual note extraction (HL-006E)
 # -----------------------------------------------------------------------
-def extract_notes_from_track(
-    track,
-    ticks_per_beat: int,
-    beats_per_measure: int,
-) -> List[NoteData]:
-    """Extract individual notes with onset, duration, and velocity from a MIDI track.
-
-    Pairs note_on/note_off events to compute durations. Returns one NoteData
-    per sounding note (velocity > 0).
+def extract_notes_from_events(
+    events: MidiEventTable,
+    index: TickIndex,
+) -> NoteTable:
+    """Individual notes with position, duration, and velocity from decoded MIDI.
+
+    Returns a NoteTable row per sounding note, sorted by measure, beat and
+    pitch. Notes never released last one beat (see decode_midi).
     """
-    # Build (absolute_tick, msg) list
-    events: List[Tuple[int, Any]] = []
-    current_time = 0
-    for msg in track:
-        current_time += msg.time
-        events.append((current_time, msg))
-
-    # Pair note-on → note-off for duration
-    active: Dict[int, Tuple[int, int]] = {}  # pitch → (onset_tick, velocity)
-    notes: List[NoteData] = []
-
-    for tick, msg in events:
-        if msg.type == 'note_on' and msg.velocity > 0:
-            active[msg.note] = (tick, msg.velocity)
-        elif msg.type == 'note_off' or (msg.type == 'note_on' and msg.velocity == 0):
-            if msg.note in active:
-                onset_tick, velocity = active.pop(msg.note)
-                duration_ticks = max(tick - onset_tick, 1)
-                beats_elapsed = onset_tick / ticks_per_beat
-                measure_number = int(beats_elapsed / beats_per_measure) + 1
-                beat_position = (beats_elapsed % beats_per_measure) + 1
-                duration_beats = duration_ticks / ticks_per_beat
-                notes.append(NoteData(
-                    measure_number=measure_number,
-                    beat_position=round(beat_position, 4),
-                    midi_pitch=msg.note,
-                    duration_beats=round(duration_beats, 4),
-                    velocity=velocity,
-                ))
-
-    # Flush notes still active at end of track (assume duration = 1 beat)
-    for pitch, (onset_tick, velocity) in active.items():
-        beats_elapsed = onset_tick / ticks_per_beat
-        measure_number = int(beats_elapsed / beats_per_measure) + 1
-        beat_position = (beats_elapsed % beats_per_measure) + 1
-        notes.append(NoteData(
-            measure_number=measure_number,
-            beat_position=round(beat_position, 4),
-            midi_pitch=pitch,
-            duration_beats=1.0,
-            velocity=velocity,
-        ))
-
-    notes.sort(key=lambda n: (n.measure_number, n.beat_position, n.midi_pitch))
-    return notes
+    if not len(events):
+        return NoteTable.empty()
+
+    measures, beats, _ = index.locate(events.onset)
+    beat_positions = np.round(beats, 4)
+    durations = np.round((events.offset - events.onset) / events.ticks_per_beat, 4)
+
+    order = np.lexsort((events.pitch, beat_positions, measures))
+    return NoteTable(
+        measure_number=measures[order],
+        beat_position=beat_positions[order],
+        midi_pitch=events.pitch[order],
+        duration_beats=durations[order],
+        velocity=events.velocity[order],
+    )
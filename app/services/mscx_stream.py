@@ -0,0 +1,169 @@
+"""
+Streaming MuseScore (.mscx) reader.
+
+score_parser (ParsedScore) and import_engine (rich note parse) both read
+MuseScore XML through scan_mscx: one ElementTree iterparse pass that hands
+each <Measure> to the callers' visitors as soon as its end tag is read and
+then drops it from the tree. Memory is bounded by the largest measure, not
+by the whole score, and there are no whole-tree './/' searches. The
+document-level facts both parsers need (program version, title, the first
+time signature, key signature and tempo, part names) are collected into
+an MscxHeader on the way through.
+
+A visitor is any callable taking (staff, measure): staff is a StaffRef
+for measures that are direct children of a <Staff>, or None for measures
+found anywhere else; measure is the complete <Measure> element, valid
+only for the duration of the call.
+"""
+import io
+import os
+import zipfile
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Optional
+
+from app.services.file_source import FileSource, as_file, read_bytes
+
+_TIME_SIG_FIELDS = ('sigN', 'sigD', 'numerator', 'denominator')
+_KEY_SIG_FIELDS = ('accidental', 'concertKey', 'idx')
+
+
+@dataclass(frozen=True)
+class StaffRef:
+    """A <Staff> that holds measures."""
+    index: int            # order among measure-holding staves, by first measure
+    in_main_score: bool   # direct child of the document's first <Score>
+
+
+@dataclass
+class MscxHeader:
+    """Document-level values, each taken from the first matching element."""
+    program_version: Optional[str] = None
+    meta_tags: Dict[str, Optional[str]] = field(default_factory=dict)  # name -> text
+    title_text: Optional[str] = None          # first <Title><text>
+    time_sig: Optional[Dict[str, str]] = None  # child texts of the first <TimeSig>
+    tempo_text: Optional[str] = None           # <tempo> of the first <Tempo>
+    key_sig: Optional[Dict[str, str]] = None   # child texts of the first <KeySig>
+    track_names: List[str] = field(default_factory=list)  # one per <Part>
+
+    @property
+    def uses_tpc_roots(self) -> bool:
+        """MuseScore 4.5+ numbers Harmony roots by tonal pitch class, earlier by semitone."""
+        if not self.program_version:
+            return False
+        try:
+            parts = [int(p) for p in self.program_version.split('.')]
+            return parts[0] > 4 or (parts[0] == 4 and len(parts) > 1 and parts[1] >= 5)
+        except (ValueError, IndexError):
+            return False
+
+
+Visitor = Callable[[Optional[StaffRef], ET.Element], None]
+
+
+def read_mscx(source: FileSource, filename: str) -> bytes:
+    """The .mscx XML bytes of a .mscx file or of the first .mscx inside a .mscz."""
+    if os.path.splitext(filename.lower())[1] != '.mscz':
+        return read_bytes(source)
+    try:
+        with zipfile.ZipFile(as_file(source), 'r') as zf:
+            mscx_names = [n for n in zf.namelist() if n.lower().endswith('.mscx')]
+            if not mscx_names:
+                raise ValueError("No .mscx file found inside the .mscz archive")
+            return zf.read(mscx_names[0])
+    except zipfile.BadZipFile:
+        raise ValueError(".mscz file appears to be corrupt or not a valid ZIP archive")
+
+
+def _child_texts(elem: ET.Element, names: Iterable[str]) -> Dict[str, str]:
+    return {name: elem.findtext(name) for name in names}
+
+
+# End tags _scan acts on; every other element only passes through the stack
+_HANDLED_END_TAGS = frozenset((
+    'Measure', 'TimeSig', 'Tempo', 'KeySig', 'metaTag', 'Title', 'programVersion', 'Part',
+))
+
+
+def _scan(stream, visitors: List[Visitor], header: MscxHeader) -> MscxHeader:
+    stack: List[ET.Element] = []
+    push, pop = stack.append, stack.pop
+    staves: Dict[int, StaffRef] = {}   # id(<Staff>) -> ref
+    first_score = None
+    time_sig_seen = tempo_seen = key_sig_seen = title_seen = False
+
+    for event, elem in ET.iterparse(stream, events=('start', 'end')):
+        if event == 'start':
+            tag = elem.tag
+            if tag == 'Measure':
+                if stack and stack[-1].tag == 'Staff' and id(stack[-1]) not in staves:
+                    in_main = len(stack) > 1 and stack[-2] is first_score
+                    staves[id(stack[-1])] = StaffRef(len(staves), in_main)
+            elif tag == 'Score' and first_score is None:
+                first_score = elem
+            push(elem)
+            continue
+
+        pop()
+        tag = elem.tag
+        if tag not in _HANDLED_END_TAGS:
+            continue
+        parent = stack[-1] if stack else None
+        if tag == 'Measure':
+            staff = staves.get(id(parent)) if parent is not None and parent.tag == 'Staff' else None
+            for visit in visitors:
+                visit(staff, elem)
+            if parent is not None:
+                del parent[-1]  # just closed, so it is the parent's last child
+        elif tag == 'TimeSig':
+            if not time_sig_seen:
+                time_sig_seen = True
+                header.time_sig = _child_texts(elem, _TIME_SIG_FIELDS)
+        elif tag == 'Tempo':
+            if not tempo_seen:
+                tempo_seen = True
+                header.tempo_text = elem.findtext('tempo')
+        elif tag == 'KeySig':
+            if not key_sig_seen:
+                key_sig_seen = True
+                header.key_sig = _child_texts(elem, _KEY_SIG_FIELDS)
+        elif tag == 'metaTag':
+            header.meta_tags.setdefault(elem.get('name'), elem.text)
+        elif tag == 'Title':
+            text_el = elem.find('text')
+            if text_el is not None and not title_seen:
+                title_seen = True
+                header.title_text = text_el.text
+        elif tag == 'programVersion':
+            if header.program_version is None:
+                header.program_version = (elem.text or '').strip() or None
+        else:  # Part
+            header.track_names.append(
+                elem.findtext('.//trackName')
+                or elem.findtext('.//Instrument/longName')
+                or f"Track {len(header.track_names) + 1}"
+            )
+            if parent is not None:
+                del parent[-1]
+    return header
+
+
+def scan_mscx(xml_data: bytes, visitors: List[Visitor],
+              header: Optional[MscxHeader] = None) -> MscxHeader:
+    """Stream xml_data once, calling every visitor for each <Measure>.
+
+    Header values are filled in as they are read, so a visitor holding the
+    header passed in here already sees the part names when staves arrive.
+
+    Raises:
+        ValueError: If the XML is malformed.
+    """
+    try:
+        xml_data.decode('utf-8')
+    except UnicodeDecodeError:
+        # Undecodable bytes were always replaced rather than rejected
+        xml_data = xml_data.decode('utf-8', errors='replace').encode('utf-8')
+    try:
+        return _scan(io.BytesIO(xml_data), visitors, header or MscxHeader())
+    except ET.ParseError as e:
+        raise ValueError(f"Could not parse MuseScore XML: {e}")
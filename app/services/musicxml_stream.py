@@ -0,0 +1,393 @@
+"""
+Streaming MusicXML (.musicxml / .xml / .mxl) reader.
+
+score_parser used to build a full music21 Score for every MusicXML upload
+(converter.parse, then analyze('key') and two recurse() sweeps) only to
+read a title, meter, tempo and the first part's <harmony> elements.
+scan_musicxml reads the same facts in one ElementTree iterparse pass over
+score-partwise XML, handling each <measure> when its end tag arrives and
+clearing it, so memory is bounded by the largest measure:
+
+  - title from work/work-title, first time signature and tempo mark
+  - chord symbols of the first part with music21's figures, measure
+    numbers and beat positions (so imports match the music21 path)
+  - the first part's notes (first staff) as a NoteTable, with beats from
+    <divisions> offsets: 1.0 + quarter notes into the measure
+  - a duration-weighted pitch-class histogram of every part, for
+    key_detection.detect_key (the same algorithm as analyze('key'))
+
+Anything the reader does not reproduce exactly (score-timewise, chord
+symbols spelled by <function> or <inversion> alone) raises
+Unsupported, and the caller falls back to music21.
+"""
+import io
+import zipfile
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from app.services.file_source import FileSource, as_file, read_bytes
+from app.services.note_table import NoteTable, duration_types
+
+_STEP_SEMITONES = {'C': 0, 'D': 2, 'E': 4, 'F': 5, 'G': 7, 'A': 9, 'B': 11}
+
+# music21 accidental spelling in a pitch name, by <alter> / <root-alter> value
+_ALTER_NAMES = {
+    0.0: '', 1.0: '#', -1.0: '-', 2.0: '##', -2.0: '--', 3.0: '###', -3.0: '---',
+    0.5: '~', -0.5: '`', 1.5: '#~', -1.5: '-`',
+}
+
+# <kind> -> the abbreviation music21's ChordSymbol.figure uses: the first
+# entry of harmony.CHORD_TYPES, after harmony.CHORD_ALIASES. Other kinds
+# ('other', misspellings) get the bare root, as in music21.
+_KIND_FIGURES = {
+    'major': '', 'minor': 'm', 'augmented': '+', 'diminished': 'dim',
+    'dominant-seventh': '7', 'major-seventh': 'maj7', 'minor-major-seventh': 'mM7',
+    'minor-seventh': 'm7', 'augmented-major-seventh': '+M7', 'augmented-seventh': '7+',
+    'half-diminished-seventh': 'ø7', 'diminished-seventh': 'o7',
+    'seventh-flat-five': 'dom7dim5', 'major-sixth': '6', 'minor-sixth': 'm6',
+    'major-ninth': 'M9', 'dominant-ninth': '9', 'minor-major-ninth': 'mM9',
+    'minor-ninth': 'm9', 'augmented-major-ninth': '+M9', 'augmented-dominant-ninth': '9#5',
+    'half-diminished-ninth': 'ø9', 'half-diminished-minor-ninth': 'øb9',
+    'diminished-ninth': 'o9', 'diminished-minor-ninth': 'ob9',
+    'dominant-11th': '11', 'major-11th': 'M11', 'minor-major-11th': 'mM11',
+    'minor-11th': 'm11', 'augmented-major-11th': '+M11', 'augmented-11th': '+11',
+    'half-diminished-11th': 'ø11', 'diminished-11th': 'o11',
+    'major-13th': 'M13', 'dominant-13th': '13', 'minor-major-13th': 'mM13',
+    'minor-13th': 'm13', 'augmented-major-13th': '+M13', 'augmented-dominant-13th': '+13',
+    'half-diminished-13th': 'ø13', 'suspended-second': 'sus2', 'suspended-fourth': 'sus',
+    'suspended-fourth-seventh': '7sus', 'Neapolitan': 'N6', 'Italian': 'It+6',
+    'French': 'Fr+6', 'German': 'Gr+6', 'pedal': 'pedal', 'power': 'power',
+    'Tristan': 'tristan',
+    # CHORD_ALIASES
+    'dominant': '7', 'major-minor': 'mM7', 'half-diminished': 'ø7',
+}
+
+# <type> note values under the names the rest of HarmonyLab uses
+_NOTE_TYPES = {
+    'breve': 'breve', 'long': 'longa', 'whole': 'whole', 'half': 'half',
+    'quarter': 'quarter', 'eighth': 'eighth', '16th': '16th', '32nd': '32nd',
+    '64th': '64th',
+}
+
+
+class Unsupported(Exception):
+    """The document needs music21's full parser."""
+
+
+@dataclass
+class MusicXmlScore:
+    """What score_parser needs from a MusicXML document."""
+    title: Optional[str] = None
+    time_signature: Optional[str] = None   # first <time>, 'N/D'
+    tempo: Optional[float] = None          # first metronome mark or <sound tempo>
+    chords: List[Tuple[int, float, str, int]] = field(default_factory=list)  # (measure, beat, figure, order)
+    notes: NoteTable = field(default_factory=NoteTable.empty)
+    pitch_classes: np.ndarray = field(default_factory=lambda: np.zeros(12))  # quarter notes per pc
+
+
+def read_musicxml(source: FileSource, filename: str = '') -> bytes:
+    """XML bytes of a MusicXML file, or of the rootfile of a compressed .mxl
+    (named in META-INF/container.xml)."""
+    data = read_bytes(source)
+    if data[:2] != b'PK':
+        return data
+    try:
+        with zipfile.ZipFile(as_file(data)) as zf:
+            names = zf.namelist()
+            member = None
+            if 'META-INF/container.xml' in names:
+                container = ET.fromstring(zf.read('META-INF/container.xml'))
+                rootfile = next(container.iter('rootfile'), None)
+                if rootfile is not None:
+                    member = rootfile.get('full-path')
+            if member not in names:
+                member = next((n for n in names if not n.startswith('META-INF')
+                               and n.lower().endswith(('.xml', '.musicxml'))), None)
+            if member is None:
+                raise ValueError("No MusicXML score found inside the .mxl archive")
+            return zf.read(member)
+    except zipfile.BadZipFile:
+        raise ValueError(".mxl file appears to be corrupt or not a valid ZIP archive")
+
+
+def _root_tag(xml_data: bytes) -> str:
+    for _, elem in ET.iterparse(io.BytesIO(xml_data), events=('start',)):
+        return elem.tag
+    return ''
+
+
+def _pitch_name(step: Optional[str], alter: Optional[str]) -> str:
+    """music21 Pitch.name for a root-step / bass-step and its alter."""
+    step = (step or '').strip().upper()
+    if step not in _STEP_SEMITONES:
+        raise Unsupported(f"chord step {step!r}")
+    try:
+        return step + _ALTER_NAMES[float(alter) if alter and alter.strip() else 0.0]
+    except (KeyError, ValueError):
+        raise Unsupported(f"chord alter {alter!r}")
+
+
+def chord_figure(harmony: ET.Element) -> Optional[str]:
+    """ChordSymbol.figure of the chord music21 builds from a <harmony>."""
+    kind_el = harmony.find('kind')
+    kind = (kind_el.text or '').strip() if kind_el is not None else ''
+    if kind == 'none':
+        return kind_el.get('text') or 'N.C.'
+    root = harmony.find('root')
+    if root is None or not kind:
+        raise Unsupported("harmony without <root> and <kind>")
+    if harmony.find('inversion') is not None and harmony.find('bass') is None:
+        raise Unsupported("harmony <inversion> without <bass>")
+    step_el = root.find('root-step')
+    step = step_el.text if step_el is not None and step_el.text else (
+        step_el.get('text') if step_el is not None else None)
+    root_name = _pitch_name(step, root.findtext('root-alter'))
+
+    figure = root_name + _KIND_FIGURES.get(kind, '')
+    bass = harmony.find('bass')
+    if bass is not None:
+        bass_name = _pitch_name(bass.findtext('bass-step'), bass.findtext('bass-alter'))
+        if bass_name != root_name:
+            figure += '/' + bass_name
+    for degree in harmony.iterfind('degree'):
+        try:
+            value = int(degree.findtext('degree-value'))
+            alter_text = degree.findtext('degree-alter')
+            alter = int(alter_text) if alter_text is not None else None
+        except (TypeError, ValueError):
+            raise Unsupported("harmony <degree> values")
+        prefix = ('#' if alter > 0 else 'b') * abs(alter) if alter is not None else ''
+        figure += f" {degree.findtext('degree-type')} {prefix}{value}"
+    return figure
+
+
+def _beat_groups(beats: str, beat_type: int) -> Tuple[int, ...]:
+    """Beat lengths in beat-type units, as music21's default beat sequence groups them."""
+    if '+' in beats:
+        return tuple(int(b) for b in beats.split('+'))
+    count = int(beats)
+    if count % 3 == 0 and (count > 3 or beat_type >= 8):
+        return (3,) * (count // 3)   # compound meter: dotted beats
+    return (1,) * count
+
+
+class _Meter:
+    def __init__(self, beats: str = '4', beat_type: int = 4):
+        self.unit = 4.0 / beat_type                 # quarter notes per beat-type unit
+        self.groups = _beat_groups(beats, beat_type)
+        self.bar_quarters = sum(self.groups) * self.unit
+
+    def beat(self, offset: float) -> float:
+        """1-based beat (with fraction) of a quarter-note offset into the bar."""
+        units = offset / self.unit
+        start = 0
+        for number, size in enumerate(self.groups, start=1):
+            if units < start + size or number == len(self.groups):
+                return number + (units - start) / size
+            start += size
+        return 1.0 + units
+
+
+def _duration(elem: ET.Element, divisions: float) -> float:
+    text = elem.findtext('duration')
+    return float(text) / divisions if text else 0.0
+
+
+class _PartReader:
+    """Per-part state across measures: divisions, meter, pickup padding."""
+
+    def __init__(self, index: int, scan: '_Scan'):
+        self.index = index
+        self.scan = scan
+        self.divisions = 1.0
+        self.meter = _Meter()
+        self.measure_count = 0
+        self.last_was_short = False
+
+    def measure(self, measure: ET.Element) -> None:
+        self.measure_count += 1
+        scan = self.scan
+        first_part = self.index == 0
+        cursor = high = last_start = 0.0
+        harmonies = []
+
+        for child in measure:
+            tag = child.tag
+            if tag == 'note':
+                if child.find('grace') is not None:
+                    continue
+                length = _duration(child, self.divisions)
+                in_chord = child.find('chord') is not None
+                start = last_start if in_chord else cursor
+                pitch = child.find('pitch')
+                if pitch is not None and length > 0:
+                    midi = _midi(pitch)
+                    scan.pitch_weights[midi % 12] += length
+                    if first_part and child.findtext('staff', '1') == '1':
+                        note_type = _NOTE_TYPES.get((child.findtext('type') or '').strip())
+                        scan.note_rows.append((
+                            self.measure_count, round(1.0 + start, 4), midi, length,
+                            note_type, _voice(child), 64,
+                        ))
+                if not in_chord:
+                    last_start = start
+                    cursor = start + length
+                    high = max(high, cursor)
+            elif tag == 'backup':
+                cursor = max(0.0, cursor - _duration(child, self.divisions))
+            elif tag == 'forward':
+                cursor += _duration(child, self.divisions)
+                high = max(high, cursor)
+            elif tag == 'attributes':
+                self._attributes(child)
+            elif tag == 'harmony':
+                if first_part and child.findtext('staff', '1') == '1':
+                    offset = cursor + _duration_of(child.findtext('offset'), self.divisions)
+                    harmonies.append((offset, chord_figure(child)))
+            elif tag == 'direction':
+                if scan.tempo is None:
+                    scan.tempo = _direction_tempo(child)
+            elif tag == 'sound':
+                if scan.tempo is None and child.get('tempo'):
+                    scan.tempo = float(child.get('tempo'))
+
+        padding = self._padding(high)
+        if harmonies:
+            harmonies.sort(key=lambda h: h[0])
+            for order, (offset, figure) in enumerate(harmonies, start=1):
+                if figure:
+                    beat = round(self.meter.beat(offset + padding), 2)
+                    scan.chords.append((self.measure_count, beat, figure, order))
+
+    def _attributes(self, attributes: ET.Element) -> None:
+        divisions = attributes.findtext('divisions')
+        if divisions:
+            self.divisions = float(divisions)
+        time = attributes.find('time')
+        if time is not None:
+            beats, beat_type = time.findall('beats'), time.findall('beat-type')
+            if not beats:
+                return  # senza-misura
+            if len(beats) > 1 or len(beat_type) != 1:
+                raise Unsupported("composite <time> with several beat types")
+            try:
+                self.meter = _Meter(beats[0].text.strip(), int(beat_type[0].text))
+            except (AttributeError, ValueError):
+                raise Unsupported("unreadable <time>")
+            if self.scan.time_signature is None:
+                numerator = sum(self.meter.groups) if '+' in beats[0].text else beats[0].text.strip()
+                self.scan.time_signature = f"{numerator}/{beat_type[0].text.strip()}"
+
+    def _padding(self, high: float) -> float:
+        """Anacrusis padding music21 gives this measure (chord beats count from it)."""
+        bar = self.meter.bar_quarters
+        if high == 0:
+            self.last_was_short = False  # empty measure: music21 fills it with a rest
+            return 0.0
+        if self.measure_count == 1 or self.last_was_short:
+            self.last_was_short = False
+            return bar - high if high < bar else 0.0
+        self.last_was_short = high < bar
+        return 0.0
+
+
+def _duration_of(text: Optional[str], divisions: float) -> float:
+    return float(text) / divisions if text else 0.0
+
+
+def _midi(pitch: ET.Element) -> int:
+    step = (pitch.findtext('step') or '').strip()
+    alter = pitch.findtext('alter')
+    octave = int(pitch.findtext('octave') or 4)
+    return (octave + 1) * 12 + _STEP_SEMITONES[step] + (round(float(alter)) if alter else 0)
+
+
+def _voice(note: ET.Element) -> int:
+    try:
+        return int(note.findtext('voice') or 1)
+    except ValueError:
+        return 1
+
+
+def _direction_tempo(direction: ET.Element) -> Optional[float]:
+    metronome = direction.find('direction-type/metronome')
+    if metronome is not None:
+        per_minute = metronome.findtext('per-minute')
+        try:
+            return float(per_minute) if per_minute else None
+        except ValueError:
+            return None
+    sound = direction.find('sound')
+    if sound is not None and sound.get('tempo'):
+        return float(sound.get('tempo'))
+    return None
+
+
+class _Scan:
+    def __init__(self):
+        self.time_signature: Optional[str] = None
+        self.tempo: Optional[float] = None
+        self.chords: list = []
+        self.note_rows: list = []
+        self.pitch_weights = [0.0] * 12
+
+
+def _note_table(rows: list) -> NoteTable:
+    if not rows:
+        return NoteTable.empty()
+    table = NoteTable.from_rows(rows)
+    untyped = np.equal(table.duration_type, None)
+    if untyped.any():
+        table.duration_type[untyped] = duration_types(table.duration_beats[untyped])
+    return table
+
+
+def scan_musicxml(xml_data: bytes) -> MusicXmlScore:
+    """Read a score-partwise document in one streaming pass.
+
+    Raises:
+        Unsupported: If the document needs music21 (see module docstring).
+        ValueError: If the XML is malformed.
+    """
+    try:
+        root_tag = _root_tag(xml_data)
+        if root_tag != 'score-partwise':
+            raise Unsupported(f"root tag {root_tag!r}")
+        scan = _Scan()
+        title = movement_title = None
+        part: Optional[_PartReader] = None
+        parts = 0
+        for event, elem in ET.iterparse(io.BytesIO(xml_data), events=('start', 'end')):
+            tag = elem.tag
+            if event == 'start':
+                if tag == 'part':
+                    part = _PartReader(parts, scan)
+                continue
+            if tag == 'measure':
+                if part is not None:
+                    part.measure(elem)
+                elem.clear()
+            elif tag == 'part':
+                parts += 1
+                part = None
+                elem.clear()
+            elif tag == 'work-title':
+                title = (elem.text or '').strip() or None
+            elif tag == 'movement-title':
+                movement_title = (elem.text or '').strip() or None
+    except ET.ParseError as e:
+        raise ValueError(f"Could not parse MusicXML: {e}")
+    except (KeyError, ValueError, TypeError, ZeroDivisionError) as e:
+        raise Unsupported(f"{type(e).__name__}: {e}")
+
+    return MusicXmlScore(
+        title=None if title == movement_title else title,
+        time_signature=scan.time_signature,
+        tempo=scan.tempo,
+        chords=scan.chords,
+        notes=_note_table(scan.note_rows),
+        pitch_classes=np.asarray(scan.pitch_weights, dtype=np.float64),
+    )
@@ -0,0 +1,97 @@
+"""
+Struct-of-arrays note container for score imports.
+
+A NoteTable holds every parsed note as parallel NumPy columns instead of
+one object per note. The MIDI parser fills it straight from the decoded
+event arrays, the MuseScore parser from plain row tuples, and the DB
+writers (_save_score_to_db, save_full_parse) zip its columns into
+parameter tuples, so a large piano file no longer allocates a Pydantic
+model, a dataclass and a 19-key dict per note on the way to the database.
+"""
+from typing import Iterable, List, Sequence, Tuple
+
+import numpy as np
+
+# Quantized note value for a length in beats (quarter notes); a note
+# gets the longest value it reaches
+_DURATION_THRESHOLDS = np.array([0.1875, 0.375, 0.75, 1.5, 3.0])
+_DURATION_NAMES = np.array(['32nd', '16th', 'eighth', 'quarter', 'half', 'whole'], dtype=object)
+
+# (measure_number, beat_position, midi_pitch, duration_beats, duration_type, voice, velocity)
+NoteRow = Tuple[int, float, int, float, str, int, int]
+
+
+def duration_types(duration_beats: np.ndarray) -> np.ndarray:
+    """Note value names ('quarter', 'eighth', ...) for lengths in beats."""
+    return _DURATION_NAMES[np.searchsorted(_DURATION_THRESHOLDS, duration_beats, side='right')]
+
+
+class NoteTable:
+    """Parsed notes as parallel columns, one row per note.
+
+    duration_type is an object array of note value names (the handful of
+    distinct strings are shared, not copied per note); duration_beats is
+    the actual length, including dots or the MIDI note-off distance.
+    """
+    __slots__ = ('measure_number', 'beat_position', 'midi_pitch', 'duration_beats',
+                 'duration_type', 'voice', 'velocity')
+
+    def __init__(
+        self,
+        measure_number: Sequence[int],
+        beat_position: Sequence[float],
+        midi_pitch: Sequence[int],
+        duration_beats: Sequence[float],
+        duration_type: Sequence[str] = None,
+        voice: Sequence[int] = None,
+        velocity: Sequence[int] = None,
+    ):
+        self.measure_number = np.asarray(measure_number, dtype=np.int32)
+        self.beat_position = np.asarray(beat_position, dtype=np.float64)
+        self.midi_pitch = np.asarray(midi_pitch, dtype=np.int16)
+        self.duration_beats = np.asarray(duration_beats, dtype=np.float64)
+        count = len(self.measure_number)
+        self.duration_type = (duration_types(self.duration_beats) if duration_type is None
+                              else np.asarray(duration_type, dtype=object))
+        self.voice = (np.ones(count, dtype=np.int16) if voice is None
+                      else np.asarray(voice, dtype=np.int16))
+        self.velocity = (np.full(count, 64, dtype=np.int16) if velocity is None
+                         else np.asarray(velocity, dtype=np.int16))
+
+    @classmethod
+    def empty(cls) -> 'NoteTable':
+        return cls([], [], [], [])
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[NoteRow]) -> 'NoteTable':
+        """Build from (measure, beat, pitch, duration_beats, duration_type, voice, velocity) tuples."""
+        rows = list(rows)
+        if not rows:
+            return cls.empty()
+        return cls(*zip(*rows))
+
+    @classmethod
+    def concat(cls, tables: List['NoteTable']) -> 'NoteTable':
+        return cls(*(np.concatenate([getattr(t, col) for t in tables]) for col in cls.__slots__))
+
+    def __len__(self) -> int:
+        return len(self.measure_number)
+
+    def __repr__(self) -> str:
+        return f"NoteTable({len(self)} notes)"
+
+    def take(self, rows) -> 'NoteTable':
+        """A new table of the selected rows (boolean mask or index array)."""
+        return NoteTable(*(getattr(self, col)[rows] for col in self.__slots__))
+
+    def shifted(self, measures: int) -> 'NoteTable':
+        """A copy moved ``measures`` bars later (repeat expansion)."""
+        table = self.take(slice(None))
+        table.measure_number = table.measure_number + measures
+        return table
+
+    def duration_quarters(self, lengths: dict, default: float = 1.0) -> np.ndarray:
+        """Per-note lengths looked up by duration_type name (e.g. _DURATION_TO_BEATS)."""
+        names, inverse = np.unique(self.duration_type.astype(str), return_inverse=True)
+        return np.array([lengths.get(name, default) for name in names],
+                        dtype=np.float64)[inverse.reshape(-1)]
@@ -0,0 +1,219 @@
+"""
+Content-addressed cache of file parse results.
+
+Parsing is the expensive part of an import (a whole MuseScore or MusicXML
+document, mido over a MIDI file). Uploads are already SHA-256 hashed as
+they arrive, so a result is stored under
+
+    sha256(PARSER_VERSION, kind, filename, content sha256)
+
+and a re-import, a preview followed by the real import, or reparse-notes
+on the same bytes loads it instead of parsing again. The filename is part
+of the key because it supplies the default title and picks the format.
+
+Entries are zlib-compressed pickles in a local directory
+(settings.parse_cache_dir), bounded by settings.parse_cache_max_bytes
+(off unless PARSE_CACHE_DIR is set, since /tmp is in-memory on Cloud Run):
+once a write pushes the directory past the bound, least-recently-used
+entries (a hit refreshes an entry's mtime) are deleted down to 80% of
+it. Writes go through a temp file and os.replace, so concurrent workers
+never see a torn entry. The directory is written only by this service;
+do not point it at shared or untrusted storage, since entries are pickles.
+"""
+import hashlib
+import logging
+import os
+import pickle
+import tempfile
+import threading
+import zlib
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever a parser's output changes so stale entries stop matching
+PARSER_VERSION = '3'
+
+_SUFFIX = '.pkl.z'
+
+
+class ParseCache:
+    """Size-bounded, LRU-evicted directory of compressed parse results."""
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._size: Optional[int] = None  # bytes on disk, scanned lazily
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    @staticmethod
+    def key(kind: str, filename: str, sha256: str) -> str:
+        material = '\0'.join((PARSER_VERSION, kind, filename, sha256))
+        return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + _SUFFIX)
+
+    def get(self, key: str) -> Optional[Any]:
+        if not self.enabled:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as fh:
+                value = pickle.loads(zlib.decompress(fh.read()))
+            os.utime(path)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except Exception as e:
+            logger.debug("Dropping unreadable parse cache entry %s: %s", key, e)
+            self._discard(path)
+            self.misses += 1
+            return None
+        self.hits += 1
+        return value
+
+    def put(self, key: str, value: Any) -> None:
+        if not self.enabled:
+            return
+        try:
+            blob = zlib.compress(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), 1)
+            if len(blob) > self.max_bytes:
+                return
+            os.makedirs(self.directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as fh:
+                fh.write(blob)
+            os.replace(tmp_path, self._path(key))
+        except Exception as e:
+            logger.warning("Could not write parse cache entry %s: %s", key, e)
+            return
+        with self._lock:
+            if self._size is None:
+                self._size = self._scan_size()
+            else:
+                self._size += len(blob)
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def clear(self) -> None:
+        with self._lock:
+            for entry in self._entries():
+                self._discard(entry.path)
+            self._size = 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'entries': len(self._entries()),
+            'bytes': self._scan_size(),
+            'max_bytes': self.max_bytes,
+        }
+
+    def _entries(self) -> list:
+        try:
+            return [e for e in os.scandir(self.directory) if e.name.endswith(_SUFFIX)]
+        except FileNotFoundError:
+            return []
+
+    def _scan_size(self) -> int:
+        total = 0
+        for entry in self._entries():
+            try:
+                total += entry.stat().st_size
+            except FileNotFoundError:
+                pass  # evicted by another worker
+        return total
+
+    def _evict(self) -> None:
+        """Delete least-recently-used entries until the cache is at 80% of its bound."""
+        stats = []
+        for entry in self._entries():
+            try:
+                st = entry.stat()
+            except FileNotFoundError:
+                continue
+            stats.append((st.st_mtime, st.st_size, entry.path))
+        stats.sort()
+        total = sum(size for _, size, _ in stats)
+        target = int(self.max_bytes * 0.8)
+        removed = 0
+        for _, size, path in stats:
+            if total <= target:
+                break
+            if self._discard(path):
+                total -= size
+                removed += 1
+        self._size = total
+        if removed:
+            logger.info("Parse cache evicted %d entries (%d bytes left)", removed, total)
+
+    @staticmethod
+    def _discard(path: str) -> bool:
+        try:
+            os.unlink(path)
+            return True
+        except FileNotFoundError:
+            return False
+
+
+_cache: Optional[ParseCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_parse_cache() -> ParseCache:
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                from config.settings import settings
+                _cache = ParseCache(settings.parse_cache_dir, settings.parse_cache_max_bytes)
+    return _cache
+
+
+def cached_parse(
+    kind: str,
+    parse: Callable[[bytes, str], Any],
+    content: bytes,
+    filename: str,
+    sha256: Optional[str] = None,
+) -> Any:
+    """parse(content, filename), or its stored result for the same bytes and name.
+
+    Pass the upload's sha256 when it is already known (receive_upload
+    computes it while reading) to avoid hashing the content again.
+    """
+    cache = get_parse_cache()
+    if not cache.enabled:
+        return parse(content, filename)
+    key = cache.key(kind, filename, sha256 or hashlib.sha256(content).hexdigest())
+    value = cache.get(key)
+    if value is None:
+        value = parse(content, filename)
+        cache.put(key, value)
+    return value
+
+
+def parse_full(content: bytes, filename: str, sha256: Optional[str] = None) -> dict:
+    """parse_upload_full (rich note dict) through the cache."""
+    from app.services.import_engine import parse_upload_full
+    return cached_parse('full', parse_upload_full, content, filename, sha256)
+
+
+def parse_import(content: bytes, filename: str, sha256: Optional[str] = None):
+    """parse_upload (ParsedImport: score and rich parse together) through the cache."""
+    from app.services.import_engine import parse_upload
+    return cached_parse('import', parse_upload, content, filename, sha256)
+
+
+def parse_midi(content: bytes, filename: str, sha256: Optional[str] = None):
+    """parse_midi_file (ParsedSong) through the cache."""
+    from app.services.midi_parser import parse_midi_file
+    return cached_parse('midi', lambda data, _name: parse_midi_file(data), content, filename, sha256)
@@ -124,45 +124,44 @@ def analyze_rhythm(
     }
 
 
-def analyze_rhythm_from_midi(file_path: str) -> Dict:
+def analyze_rhythm_from_midi(file_path) -> Dict:
     """Analyze rhythm from a MIDI file.
 
     Args:
-        file_path: Path to the MIDI file.
+        file_path: Path to the MIDI file, or its bytes / a binary file object.
 
     Returns:
         Dict with per-track rhythm analysis.
     """
-    from mido import MidiFile
+    from app.services.midi_events import decode_midi
 
-    mid = MidiFile(file_path)
-    tpb = mid.ticks_per_beat
+    return analyze_rhythm_from_events(decode_midi(file_path))
+
+
+def analyze_rhythm_from_events(events) -> Dict:
+    """Analyze rhythm from an already-decoded MidiEventTable.
+
+    Reports the meter that covers most of the piece (4/4 if none).
+    """
+    from app.services.midi_events import TickIndex
+
+    tpb = events.ticks_per_beat
 
     # Extract time signature
-    time_sig_n, time_sig_d = 4, 4
-    for track in mid.tracks:
-        for msg in track:
-            if msg.type == 'time_signature':
-                time_sig_n = msg.numerator
-                time_sig_d = msg.denominator
-                break
+    end_tick = int(events.offset.max()) if len(events) else 0
+    time_sig_n, time_sig_d = TickIndex.from_events(events).prevailing_meter(end_tick)
 
     # Collect note onsets from all tracks
     all_onsets = []
     track_analyses = []
 
-    for i, track in enumerate(mid.tracks):
-        onsets = []
-        abs_time = 0
-        for msg in track:
-            abs_time += msg.time
-            if msg.type == 'note_on' and msg.velocity > 0:
-                onsets.append(abs_time)
+    for i, name in enumerate(events.track_names):
+        onsets = events.track_onsets(i).tolist()
 
         if len(onsets) >= 4:
             analysis = analyze_rhythm(onsets, tpb, time_sig_n, time_sig_d)
             analysis['track_index'] = i
-            analysis['track_name'] = track.name or f'Track {i}'
+            analysis['track_name'] = name or f'Track {i}'
             track_analyses.append(analysis)
             all_onsets.extend(onsets)
 
@@ -0,0 +1,105 @@
+"""
+Table-driven roman numerals for chord symbols.
+
+Computes the same numeral and scale degree music21's
+roman.romanNumeralFromChord() yields for a lead-sheet chord symbol, from
+the root's letter and accidental, the chord's third and the key alone, so
+HarmonicAnalyzer can skip building ChordSymbol/RomanNumeral objects for
+the common case.
+
+Only qualities listed in QUALITY_THIRDS are classified. Anything else
+(unknown qualities, slash chords, symbols music21 cannot parse, modal
+keys) returns None and the caller falls back to music21. test_roman_parity.py checks every
+root spelling x quality x key against music21.
+"""
+import re
+from typing import Optional, Tuple
+
+LETTERS = 'CDEFGAB'
+LETTER_PC = {'C': 0, 'D': 2, 'E': 4, 'F': 5, 'G': 7, 'A': 9, 'B': 11}
+ACCIDENTAL_ALTER = {'': 0, '#': 1, '-': -1, '##': 2, '--': -2}
+ALTER_PREFIX = {-2: 'bb', -1: 'b', 0: '', 1: '#', 2: '##'}
+
+# Semitones above the tonic for each scale step; music21 spells numerals
+# relative to the natural minor scale in minor keys
+SCALE_STEPS = {
+    'major': (0, 2, 4, 5, 7, 9, 11),
+    'minor': (0, 2, 3, 5, 7, 8, 10),
+}
+
+ROMAN = ('I', 'II', 'III', 'IV', 'V', 'VI', 'VII')
+
+# Quality (as _normalize_chord_symbol leaves it) -> chord has a major third.
+# Upper-case numerals need a major third; minor/diminished chords and chords
+# without a third (sus, power, 6/9) get lower case, as in music21.
+# Deliberately absent: dominant chords with a flat fifth (music21 may call
+# them French sixths, and spells raised vi/vii differently for them), m7#5,
+# and anything music21 cannot parse (maj9, 7alt, ...), which must keep
+# going through the music21 path and its fallback.
+QUALITY_THIRDS = {
+    '': True, 'M': True, 'maj': True, '6': True, 'add9': True, 'add2': True,
+    '6add9': True, 'aug': True, '+': True,
+    '7': True, '9': True, '11': True, '13': True, '7add13': True,
+    '7b9': True, '7#9': True, '7#11': True, '7#5': True, '7+': True,
+    '+7': True, 'aug7': True, '7b13': True, '9#5': True, '9#11': True,
+    '11b9': True, '13b9': True, '13#11': True, '7b9b13': True, '7#9b13': True,
+    '7b9#11': True, '7#9#5': True, '7b9#5': True,
+    'maj7': True, 'M7': True, 'M9': True, 'Maj9': True, 'Maj13': True,
+    'maj7#11': True, 'maj7#5': True,
+    'm': False, 'min': False, 'm6': False, 'madd9': False,
+    'm7': False, 'min7': False, 'm9': False, 'm11': False, 'min11': False,
+    'm13': False, 'min13': False, 'm7b9': False, 'm7add11': False,
+    'mM7': False, 'minmaj7': False,
+    'dim': False, 'o': False, 'dim7': False, 'm7b5': False, 'ø7': False,
+    'm9b5': False, 'm11b5': False, 'm13b5': False,
+    'sus': False, 'sus2': False, 'sus4': False, '7sus': False, '7sus4': False,
+    'sus4b9': False, '7sus4b9': False, '5': False, '69': False,
+}
+
+_ROOT_RE = re.compile(r'^([A-G])(##|--|#|-)?(.*)$')
+
+
+def parse_key(tonic: str, mode: str) -> Optional[Tuple[int, int, str]]:
+    """(tonic letter index, tonic pitch class, mode) for a music21 tonic name, or None."""
+    if mode not in SCALE_STEPS:
+        return None
+    m = _ROOT_RE.match(tonic)
+    if not m or m.group(3):
+        return None
+    letter = m.group(1)
+    return LETTERS.index(letter), (LETTER_PC[letter] + ACCIDENTAL_ALTER[m.group(2) or '']) % 12, mode
+
+
+def roman_numeral(normalized: str, tonic: str, mode: str) -> Optional[Tuple[str, int]]:
+    """(numeral, scale degree) for a normalized chord symbol in a key.
+
+    Matches RomanNumeral.romanNumeral / .scaleDegree from music21's
+    romanNumeralFromChord. Returns None when the symbol is outside the
+    table (caller should fall back to music21).
+    """
+    key_info = parse_key(tonic, mode)
+    if key_info is None:
+        return None
+    m = _ROOT_RE.match(normalized)
+    if not m:
+        return None
+    # Slash chords are left to music21: a bass outside the chord changes
+    # which note it treats as the third
+    major_third = QUALITY_THIRDS.get(m.group(3))
+    if major_third is None:
+        return None
+
+    tonic_letter, tonic_pc, mode = key_info
+    letter = m.group(1)
+    step = (LETTERS.index(letter) - tonic_letter) % 7
+    root_pc = LETTER_PC[letter] + ACCIDENTAL_ALTER[m.group(2) or '']
+    alter = (root_pc - tonic_pc - SCALE_STEPS[mode][step] + 6) % 12 - 6
+    if mode == 'minor' and step >= 5 and alter > 0:
+        # music21 reads vi/vii in minor as raised by default: one sharp is
+        # dropped, except on minor-third chords on a raised step
+        alter = 1 if alter == 2 or not major_third else 0
+    prefix = ALTER_PREFIX.get(alter)
+    if prefix is None:
+        return None
+    numeral = ROMAN[step] if major_third else ROMAN[step].lower()
+    return prefix + numeral, step + 1
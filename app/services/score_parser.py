@@ -5,13 +5,18 @@ Supports .mscz, .mscx (MuseScore), .musicxml/.xml (MusicXML), and .mid/.midi (MI
 Extracts chord symbols, key, time signature, and tempo from any supported format.
 """
 import os
-import zipfile
 import tempfile
 import xml.etree.ElementTree as ET
 import logging
 from dataclasses import dataclass, field
 from typing import Optional, List, Dict
 
+from app.services.file_source import FileSource
+from app.services.key_detection import detect_key
+from app.services.mscx_stream import MscxHeader, StaffRef, read_mscx, scan_mscx
+from app.services.musicxml_stream import Unsupported, read_musicxml, scan_musicxml
+from app.services.note_table import NoteRow, NoteTable
+
 logger = logging.getLogger(__name__)
 
 # MuseScore root-note numbering — two systems exist:
@@ -42,15 +47,6 @@ class ScoreChord:
     chord_order: int
 
 
-@dataclass
-class ScoreNote:
-    measure_number: int
-    beat_position: float
-    midi_pitch: int
-    duration_type: str  # e.g. "quarter", "half", "eighth"
-    voice: int = 1
-
-
 # Duration type → beat fraction (assuming quarter = 1 beat in 4/4)
 _DURATION_TO_BEATS = {
     'whole': 4.0, 'half': 2.0, 'quarter': 1.0, 'eighth': 0.5,
@@ -73,7 +69,7 @@ class ParsedScore:
     time_signature: Optional[str]
     tempo: Optional[int]
     chords: List[ScoreChord] = field(default_factory=list)
-    notes: List[ScoreNote] = field(default_factory=list)
+    notes: NoteTable = field(default_factory=NoteTable.empty)
     repeats: List[tuple] = field(default_factory=list)  # (start_measure, end_measure)
     barlines: List[ScoreBarline] = field(default_factory=list)
     has_pickup: bool = False
@@ -85,11 +81,12 @@ class ParsedScore:
 # Public entry point
 # ---------------------------------------------------------------------------
 
-def parse_music_file(file_path: str, filename: str) -> ParsedScore:
+def parse_music_file(file_path: FileSource, filename: str) -> ParsedScore:
     """Parse any supported music file format and return structured data.
 
     Args:
-        file_path: Absolute path to the (temp) file on disk.
+        file_path: Path to the file on disk, or the upload's bytes / a
+                   binary file object (parsed in memory, no temp file).
         filename:  Original filename (used to determine format).
 
     Returns:
@@ -117,121 +114,48 @@ def parse_music_file(file_path: str, filename: str) -> ParsedScore:
 # MuseScore (.mscz / .mscx)
 # ---------------------------------------------------------------------------
 
-def _parse_mscz(file_path: str, filename: str) -> ParsedScore:
+def _parse_mscz(file_path: FileSource, filename: str) -> ParsedScore:
     """Unzip .mscz and parse the .mscx inside."""
-    try:
-        with zipfile.ZipFile(file_path, 'r') as zf:
-            mscx_names = [n for n in zf.namelist() if n.lower().endswith('.mscx')]
-            if not mscx_names:
-                raise ValueError("No .mscx file found inside the .mscz archive")
-            xml_bytes = zf.read(mscx_names[0])
-    except zipfile.BadZipFile:
-        raise ValueError(".mscz file appears to be corrupt or not a valid ZIP archive")
-
     base_title = os.path.splitext(filename)[0]
-    return _parse_mscx_content(xml_bytes.decode('utf-8', errors='replace'), base_title)
+    return _parse_mscx_content(read_mscx(file_path, filename), base_title)
 
 
-def _parse_mscx(file_path: str, filename: str) -> ParsedScore:
+def _parse_mscx(file_path: FileSource, filename: str) -> ParsedScore:
     """Parse .mscx MuseScore XML directly."""
-    with open(file_path, 'r', encoding='utf-8', errors='replace') as fh:
-        content = fh.read()
     base_title = os.path.splitext(filename)[0]
-    return _parse_mscx_content(content, base_title)
-
-
-def _parse_mscx_content(xml_content: str, default_title: str) -> ParsedScore:
-    """Extract title, key, time sig, tempo, and chord symbols from MuseScore XML."""
-    try:
-        root = ET.fromstring(xml_content)
-    except ET.ParseError as e:
-        raise ValueError(f"Could not parse MuseScore XML: {e}")
-
-    # --- Detect MuseScore version to choose root-note mapping ---
-    # 4.4.x and earlier: chromatic root numbering
-    # 4.5.x+: TPC (Tonal Pitch Class) numbering
-    use_tpc = False
-    ver_el = root.find('.//programVersion')
-    ms_version = ver_el.text.strip() if ver_el is not None and ver_el.text else None
-    if ms_version:
-        try:
-            parts = [int(p) for p in ms_version.split('.')]
-            if parts[0] > 4 or (parts[0] == 4 and len(parts) > 1 and parts[1] >= 5):
-                use_tpc = True
-        except (ValueError, IndexError):
-            pass
-    root_map = _TPC_ROOT if use_tpc else _CHROMATIC_ROOT
-    logger.info("MuseScore version=%s root_map=%s", ms_version, 'TPC' if use_tpc else 'chromatic')
-
-    # --- Title ---
-    title = default_title
-    for tag in ('metaTag[@name="workTitle"]', 'metaTag[@name="title"]'):
-        el = root.find(f'.//{tag}')
-        if el is not None and el.text and el.text.strip():
-            title = el.text.strip()
-            break
-    if title == default_title:
-        el = root.find('.//Title/text')
-        if el is not None and el.text and el.text.strip():
-            title = el.text.strip()
-
-    # --- Time signature ---
-    time_sig = "4/4"
-    ts_el = root.find('.//TimeSig')
-    if ts_el is not None:
-        beats = ts_el.findtext('sigN') or ts_el.findtext('numerator') or '4'
-        beat_type = ts_el.findtext('sigD') or ts_el.findtext('denominator') or '4'
-        time_sig = f"{beats}/{beat_type}"
-
-    # --- Tempo ---
-    tempo_val = None
-    tempo_el = root.find('.//Tempo')
-    if tempo_el is not None:
-        raw = tempo_el.findtext('tempo')
-        if raw:
-            try:
-                tempo_val = int(float(raw) * 60)  # MuseScore stores beats/sec
-            except (ValueError, TypeError):
-                pass
-
-    # --- Key signature ---
-    key_str = None
-    ks_el = root.find('.//KeySig')
-    if ks_el is not None:
-        acc_text = ks_el.findtext('accidental') or ks_el.findtext('idx') or '0'
-        try:
-            acc = int(acc_text)
-            key_str = _SHARP_KEYS.get(acc) or _FLAT_KEYS.get(acc)
-        except (ValueError, TypeError):
-            pass
-
-    # --- Chord symbols ---
-    # MuseScore stores chord symbols as <Harmony> elements inside measures.
-    # MuseScore 4 wraps measure content in <voice> elements, so Harmony may be
-    # a grandchild (or deeper) of Measure. Use iter() to find at any depth.
-    # MuseScore 4.6+ wraps name/root inside <harmonyInfo> subelement.
-    #
-    # BUG-007 fix: Use first Staff only to avoid counting measures from
-    # multiple staves (piano grand staff = 2x measures via root.iter).
-    chords: List[ScoreChord] = []
-    measure_num = 0
-    measures_scanned = 0
-    measures_with_harmony = 0
-
-    # BUG-019 fix: MuseScore 4.6.x adds part-definition <Staff> elements (no id or id
-    # but no Measure children) before content staves. Prefer the first Staff that
-    # has at least one Measure child, then fall back by id or any Staff.
-    chord_staff = (root.find('.//Staff[Measure]')
-                   or root.find('.//Staff[@id]')
-                   or root.find('.//Staff'))
-    chord_root = chord_staff if chord_staff is not None else root
-
-    for measure in chord_root.iter('Measure'):
-        measure_num += 1
-        measures_scanned += 1
+    return _parse_mscx_content(read_mscx(file_path, filename), base_title)
+
+
+class _MscxStaff:
+    """Chords, notes, barlines and rehearsal marks read from one staff, measure by measure."""
+
+    def __init__(self):
+        self.measure_count = 0
+        self.measures_with_harmony = 0
+        self.harmonies = []  # (measure, chord_order, name, root number text)
+        self.note_rows: List[NoteRow] = []
+        self.repeats = []
+        self.barlines = []
+        self.repeat_start = None
+        self.has_pickup = False
+        self.section_markers = []
+
+    def add_measure(self, measure: ET.Element) -> None:
+        self.measure_count += 1
+        measure_num = self.measure_count
+        self._add_harmony(measure, measure_num)
+        self._add_notes(measure, measure_num)
+        self._add_barlines(measure, measure_num)
+        self._add_section_markers(measure, measure_num)
+
+    def _add_harmony(self, measure: ET.Element, measure_num: int) -> None:
+        # MuseScore stores chord symbols as <Harmony> elements inside measures.
+        # MuseScore 4 wraps measure content in <voice> elements, so Harmony may be
+        # a grandchild (or deeper) of Measure. Use iter() to find at any depth.
+        # MuseScore 4.6+ wraps name/root inside <harmonyInfo> subelement.
+        # Root numbers are mapped to names in _parse_mscx_content, once the
+        # MuseScore version is known.
         chord_order = 1
-        harmony_in_measure = 0
-
         for elem in measure.iter('Harmony'):
             # Try direct children first, then <harmonyInfo> wrapper (4.6+)
             name_el = elem.find('name')
@@ -247,111 +171,23 @@ def _parse_mscx_content(xml_content: str, default_title: str) -> ParsedScore:
             chord_name = (name_el.text or '').strip()
             if not chord_name:
                 continue
-
-            # Skip "N.C." (no chord) markers from root prepending
-            if chord_name == 'N.C.':
-                chords.append(ScoreChord(
-                    measure_number=measure_num,
-                    beat_position=1.0,
-                    chord_symbol='N.C.',
-                    chord_order=chord_order,
-                ))
-                chord_order += 1
-                harmony_in_measure += 1
-                continue
-
-            # Root note (numeric) - prepend if the name doesn't already include it
-            if root_num_text is not None:
-                try:
-                    root_note = root_map.get(int(root_num_text), '')
-                    if root_note and not chord_name[0].isupper():
-                        chord_name = root_note + chord_name
-                    elif root_note and chord_name in ('maj', 'min', 'dim', 'aug'):
-                        chord_name = root_note + chord_name
-                except (ValueError, TypeError):
-                    pass
-
-            chords.append(ScoreChord(
-                measure_number=measure_num,
-                beat_position=1.0,
-                chord_symbol=chord_name,
-                chord_order=chord_order,
-            ))
+            self.harmonies.append((measure_num, chord_order, chord_name, root_num_text))
             chord_order += 1
-            harmony_in_measure += 1
-
-        if harmony_in_measure > 0:
-            measures_with_harmony += 1
-            logger.debug("Measure %d: %d harmony element(s)", measure_num, harmony_in_measure)
-
-    # HM31B BUG-007: Fill empty measures by carrying forward the previous chord.
-    # Jazz lead sheets omit chord symbols in measures where the harmony continues.
-    # Without this, measures like M2 in "O Barquinho" are missing from HarmonyLab.
-    if chords and measures_scanned > 0:
-        measures_with_chords = {c.measure_number for c in chords}
-        last_chord_symbol = None
-        filled = 0
-        for m_num in range(1, measures_scanned + 1):
-            if m_num in measures_with_chords:
-                # Update last known chord (use first chord in the measure)
-                for c in chords:
-                    if c.measure_number == m_num:
-                        last_chord_symbol = c.chord_symbol
-                        break
-            elif last_chord_symbol is not None:
-                # Carry forward previous chord into empty measure
-                chords.append(ScoreChord(
-                    measure_number=m_num,
-                    beat_position=1.0,
-                    chord_symbol=last_chord_symbol,
-                    chord_order=1,
-                ))
-                filled += 1
-        if filled:
-            # Re-sort by measure number to maintain order
-            chords.sort(key=lambda c: (c.measure_number, c.chord_order))
-            logger.info("BUG-007 fix: filled %d empty measures with carried-forward chords", filled)
-
-    logger.debug("score_parser: %s — %d measures extracted, %d chords",
-                 default_title, measures_scanned, len(chords))
-    logger.info(
-        "MuseScore parse complete: measures_scanned=%d measures_with_harmony=%d total_chords=%d",
-        measures_scanned, measures_with_harmony, len(chords)
-    )
-    if len(chords) == 0:
-        logger.warning(
-            "No chord symbols found in MuseScore file. "
-            "This file may not contain explicit chord symbols (Harmony elements). "
-            "Export as .mid from MuseScore for note-based chord analysis."
-        )
 
-    # --- Note extraction ---
-    # MuseScore <Chord> elements (rhythm events) contain <Note> children with <pitch>.
-    # Track beat position by accumulating durations within each measure/voice.
-    #
-    # MuseScore 4 format: <voice> is a CONTAINER element (direct child of Measure)
-    #   <Measure><voice><Chord>...</Chord></voice></Measure>
-    # MuseScore 3 format: <voice> is a TEXT element INSIDE Chord (voice number)
-    #   <Measure><Chord><voice>0</voice>...</Chord></Measure>
-    # We must detect which format by checking if direct children named 'voice'
-    # have sub-elements (container) vs only text (indicator).
-    notes: List[ScoreNote] = []
-    note_measure_num = 0
-
-    # Use first Staff element to avoid duplicate measures from multi-staff scores
-    # BUG-019 fix: prefer Staff with Measure children (content staff) over part-definition staves
-    first_staff = (root.find('.//Staff[Measure]')
-                   or root.find('.//Staff[@id]')
-                   or root.find('.//Staff'))
-    note_root = first_staff if first_staff is not None else root
-    logger.debug("Note extraction: searching from <%s>, first_staff found=%s",
-                 note_root.tag, first_staff is not None)
-
-    for measure in note_root.iter('Measure'):
-        note_measure_num += 1
-
-        # Detect voice containers: direct children of Measure named 'voice'
-        # that themselves contain child elements (Chord, Rest, etc.)
+        if chord_order > 1:
+            self.measures_with_harmony += 1
+            logger.debug("Measure %d: %d harmony element(s)", measure_num, chord_order - 1)
+
+    def _add_notes(self, measure: ET.Element, measure_num: int) -> None:
+        # MuseScore <Chord> elements (rhythm events) contain <Note> children with <pitch>.
+        # Track beat position by accumulating durations within each measure/voice.
+        #
+        # MuseScore 4 format: <voice> is a CONTAINER element (direct child of Measure)
+        #   <Measure><voice><Chord>...</Chord></voice></Measure>
+        # MuseScore 3 format: <voice> is a TEXT element INSIDE Chord (voice number)
+        #   <Measure><Chord><voice>0</voice>...</Chord></Measure>
+        # We must detect which format by checking if direct children named 'voice'
+        # have sub-elements (container) vs only text (indicator).
         voice_containers = [
             el for el in measure if el.tag == 'voice' and len(el) > 0
         ]
@@ -360,7 +196,7 @@ def _parse_mscx_content(xml_content: str, default_title: str) -> ParsedScore:
             # No voice container wrappers — MuseScore 3 or flat format.
             # Chord/Rest are direct children of Measure.
             voice_containers = [measure]
-            if note_measure_num == 1:
+            if measure_num == 1:
                 direct_tags = [el.tag for el in measure]
                 logger.debug("No voice containers in measure 1, direct children: %s", direct_tags)
 
@@ -392,31 +228,19 @@ def _parse_mscx_content(xml_content: str, default_title: str) -> ParsedScore:
                         if pitch_el is not None and pitch_el.text:
                             try:
                                 midi_pitch = int(pitch_el.text)
-                                notes.append(ScoreNote(
-                                    measure_number=note_measure_num,
-                                    beat_position=round(beat_pos, 2),
-                                    midi_pitch=midi_pitch,
-                                    duration_type=dur_type,
-                                    voice=voice_idx,
+                                self.note_rows.append((
+                                    measure_num, round(beat_pos, 2), midi_pitch,
+                                    dur_beats, dur_type, voice_idx, 64,
                                 ))
                             except (ValueError, TypeError):
                                 pass
 
                 beat_pos += dur_beats
 
-    logger.info("Note extraction: %d notes from %d measures", len(notes), note_measure_num)
-
-    # --- Repeat detection ---
-    repeats = []
-    barlines = []
-    repeat_start = None
-    has_pickup = False
-    re_measure_num = 0
-    for measure in (first_staff if first_staff is not None else root).iter('Measure'):
-        re_measure_num += 1
+    def _add_barlines(self, measure: ET.Element, measure_num: int) -> None:
         # Check for pickup/anacrusis
         if measure.get('implicit') == 'yes' or measure.get('number') == '0':
-            has_pickup = True
+            self.has_pickup = True
         for barline in measure.findall('barline') + list(measure.iter('BarLine')):
             location = barline.get('location', 'right')
             # Check for repeat signs
@@ -424,52 +248,20 @@ def _parse_mscx_content(xml_content: str, default_title: str) -> ParsedScore:
             if repeat_el is not None:
                 direction = repeat_el.get('direction', '')
                 if direction == 'forward':
-                    repeat_start = re_measure_num
-                    barlines.append(ScoreBarline(re_measure_num, 'repeat-forward', 'left'))
+                    self.repeat_start = measure_num
+                    self.barlines.append(ScoreBarline(measure_num, 'repeat-forward', 'left'))
                 elif direction == 'backward':
-                    repeats.append((repeat_start or 1, re_measure_num))
-                    repeat_start = None
-                    barlines.append(ScoreBarline(re_measure_num, 'repeat-backward', 'right'))
+                    self.repeats.append((self.repeat_start or 1, measure_num))
+                    self.repeat_start = None
+                    self.barlines.append(ScoreBarline(measure_num, 'repeat-backward', 'right'))
             # Check for bar styles (double bar, final bar)
             style_el = barline.find('bar-style') or barline.find('subtype')
             if style_el is not None and style_el.text:
                 style = style_el.text.strip()
                 if style in ('light-heavy', 'light-light', 'heavy-light', 'double', 'final'):
-                    barlines.append(ScoreBarline(re_measure_num, style, location))
-
-    # --- Expand repeats into chords/notes ---
-    if repeats:
-        expanded_chords = list(chords)
-        expanded_notes = list(notes)
-        for rstart, rend in repeats:
-            repeat_chords = [c for c in chords if rstart <= c.measure_number <= rend]
-            repeat_notes = [n for n in notes if rstart <= n.measure_number <= rend]
-            offset = rend  # append after original
-            for c in repeat_chords:
-                expanded_chords.append(ScoreChord(
-                    measure_number=c.measure_number + offset,
-                    beat_position=c.beat_position,
-                    chord_symbol=c.chord_symbol,
-                    chord_order=c.chord_order,
-                ))
-            for n in repeat_notes:
-                expanded_notes.append(ScoreNote(
-                    measure_number=n.measure_number + offset,
-                    beat_position=n.beat_position,
-                    midi_pitch=n.midi_pitch,
-                    duration_type=n.duration_type,
-                    voice=n.voice,
-                ))
-        chords = expanded_chords
-        notes = expanded_notes
-        logger.info("Repeat expansion: %d repeats, total chords=%d notes=%d",
-                     len(repeats), len(chords), len(notes))
+                    self.barlines.append(ScoreBarline(measure_num, style, location))
 
-    # --- Rehearsal mark / section marker extraction ---
-    section_markers = []
-    sm_measure_num = 0
-    for measure in (first_staff if first_staff is not None else root).iter('Measure'):
-        sm_measure_num += 1
+    def _add_section_markers(self, measure: ET.Element, measure_num: int) -> None:
         # MuseScore uses <RehearsalText> or <Text> with <subtype>Rehearsal</subtype>
         for frame in measure.iter():
             tag = frame.tag
@@ -477,7 +269,7 @@ def _parse_mscx_content(xml_content: str, default_title: str) -> ParsedScore:
                 text_el = frame.find('text') or frame.find('Text') or frame
                 label = (text_el.text or '').strip() if text_el is not None else ''
                 if label:
-                    section_markers.append({'label': label, 'measure_number': sm_measure_num})
+                    self.section_markers.append({'label': label, 'measure_number': measure_num})
             elif tag == 'Text':
                 subtype = frame.find('subtype')
                 if subtype is not None and subtype.text in ('Rehearsal', 'rehearsalMark'):
@@ -487,18 +279,193 @@ def _parse_mscx_content(xml_content: str, default_title: str) -> ParsedScore:
                         # Try direct .text on the Text element
                         label = (frame.text or '').strip()
                     if label:
-                        section_markers.append({'label': label, 'measure_number': sm_measure_num})
+                        self.section_markers.append({'label': label, 'measure_number': measure_num})
+
+
+class _MscxScoreVisitor:
+    """scan_mscx visitor collecting the ParsedScore staff.
+
+    BUG-007 fix: Use first Staff only to avoid counting measures from
+    multiple staves (piano grand staff = 2x measures).
+    BUG-019 fix: MuseScore 4.6.x adds part-definition <Staff> elements (no
+    Measure children) before content staves; only staves holding measures
+    count, and measures outside any Staff are the fallback.
+    """
+
+    def __init__(self):
+        self.first_staff: Optional[_MscxStaff] = None
+        self.loose: Optional[_MscxStaff] = None
+
+    def __call__(self, staff: Optional[StaffRef], measure: ET.Element) -> None:
+        if staff is None:
+            if self.loose is None:
+                self.loose = _MscxStaff()
+            self.loose.add_measure(measure)
+        elif staff.index == 0:
+            if self.first_staff is None:
+                self.first_staff = _MscxStaff()
+            self.first_staff.add_measure(measure)
+
+    def staff(self) -> _MscxStaff:
+        return self.first_staff or self.loose or _MscxStaff()
+
+
+def _resolve_chord_name(chord_name: str, root_num_text: Optional[str], root_map: Dict[int, str]) -> str:
+    """Prepend the numeric Harmony root when the name does not already include it."""
+    # "N.C." (no chord) markers are kept as-is
+    if chord_name == 'N.C.' or root_num_text is None:
+        return chord_name
+    try:
+        root_note = root_map.get(int(root_num_text), '')
+        if root_note and not chord_name[0].isupper():
+            chord_name = root_note + chord_name
+        elif root_note and chord_name in ('maj', 'min', 'dim', 'aug'):
+            chord_name = root_note + chord_name
+    except (ValueError, TypeError):
+        pass
+    return chord_name
+
+
+def _parse_mscx_content(xml_data: bytes, default_title: str) -> ParsedScore:
+    """Extract title, key, time sig, tempo, and chord symbols from MuseScore XML."""
+    visitor = _MscxScoreVisitor()
+    header = scan_mscx(xml_data, [visitor])
+    return _score_from_mscx(header, visitor.staff(), default_title)
+
+
+def _score_from_mscx(header: MscxHeader, staff: _MscxStaff, default_title: str) -> ParsedScore:
+    # --- Detect MuseScore version to choose root-note mapping ---
+    # 4.4.x and earlier: chromatic root numbering
+    # 4.5.x+: TPC (Tonal Pitch Class) numbering
+    use_tpc = header.uses_tpc_roots
+    root_map = _TPC_ROOT if use_tpc else _CHROMATIC_ROOT
+    logger.info("MuseScore version=%s root_map=%s", header.program_version, 'TPC' if use_tpc else 'chromatic')
+
+    # --- Title ---
+    title = default_title
+    for name in ('workTitle', 'title'):
+        text = header.meta_tags.get(name)
+        if text and text.strip():
+            title = text.strip()
+            break
+    if title == default_title and header.title_text and header.title_text.strip():
+        title = header.title_text.strip()
+
+    # --- Time signature ---
+    time_sig = "4/4"
+    ts = header.time_sig
+    if ts is not None:
+        beats = ts['sigN'] or ts['numerator'] or '4'
+        beat_type = ts['sigD'] or ts['denominator'] or '4'
+        time_sig = f"{beats}/{beat_type}"
+
+    # --- Tempo ---
+    tempo_val = None
+    if header.tempo_text:
+        try:
+            tempo_val = int(float(header.tempo_text) * 60)  # MuseScore stores beats/sec
+        except (ValueError, TypeError):
+            pass
+
+    # --- Key signature ---
+    key_str = None
+    if header.key_sig is not None:
+        acc_text = header.key_sig['accidental'] or header.key_sig['idx'] or '0'
+        try:
+            acc = int(acc_text)
+            key_str = _SHARP_KEYS.get(acc) or _FLAT_KEYS.get(acc)
+        except (ValueError, TypeError):
+            pass
+
+    # --- Chord symbols ---
+    chords: List[ScoreChord] = [
+        ScoreChord(
+            measure_number=measure_num,
+            beat_position=1.0,
+            chord_symbol=_resolve_chord_name(name, root_num_text, root_map),
+            chord_order=chord_order,
+        )
+        for measure_num, chord_order, name, root_num_text in staff.harmonies
+    ]
+    measures_scanned = staff.measure_count
+
+    # HM31B BUG-007: Fill empty measures by carrying forward the previous chord.
+    # Jazz lead sheets omit chord symbols in measures where the harmony continues.
+    # Without this, measures like M2 in "O Barquinho" are missing from HarmonyLab.
+    if chords and measures_scanned > 0:
+        first_chord_by_measure = {}
+        for c in chords:
+            first_chord_by_measure.setdefault(c.measure_number, c.chord_symbol)
+        last_chord_symbol = None
+        filled = 0
+        for m_num in range(1, measures_scanned + 1):
+            if m_num in first_chord_by_measure:
+                # Update last known chord (use first chord in the measure)
+                last_chord_symbol = first_chord_by_measure[m_num]
+            elif last_chord_symbol is not None:
+                # Carry forward previous chord into empty measure
+                chords.append(ScoreChord(
+                    measure_number=m_num,
+                    beat_position=1.0,
+                    chord_symbol=last_chord_symbol,
+                    chord_order=1,
+                ))
+                filled += 1
+        if filled:
+            # Re-sort by measure number to maintain order
+            chords.sort(key=lambda c: (c.measure_number, c.chord_order))
+            logger.info("BUG-007 fix: filled %d empty measures with carried-forward chords", filled)
+
+    logger.debug("score_parser: %s — %d measures extracted, %d chords",
+                 default_title, measures_scanned, len(chords))
+    logger.info(
+        "MuseScore parse complete: measures_scanned=%d measures_with_harmony=%d total_chords=%d",
+        measures_scanned, staff.measures_with_harmony, len(chords)
+    )
+    if len(chords) == 0:
+        logger.warning(
+            "No chord symbols found in MuseScore file. "
+            "This file may not contain explicit chord symbols (Harmony elements). "
+            "Export as .mid from MuseScore for note-based chord analysis."
+        )
+
+    # --- Notes ---
+    notes = NoteTable.from_rows(staff.note_rows)
+    logger.info("Note extraction: %d notes from %d measures", len(notes), measures_scanned)
+
+    # --- Expand repeats into chords/notes ---
+    repeats = staff.repeats
+    if repeats:
+        expanded_chords = list(chords)
+        expanded_notes = [notes]
+        for rstart, rend in repeats:
+            repeat_chords = [c for c in chords if rstart <= c.measure_number <= rend]
+            in_repeat = (notes.measure_number >= rstart) & (notes.measure_number <= rend)
+            offset = rend  # append after original
+            for c in repeat_chords:
+                expanded_chords.append(ScoreChord(
+                    measure_number=c.measure_number + offset,
+                    beat_position=c.beat_position,
+                    chord_symbol=c.chord_symbol,
+                    chord_order=c.chord_order,
+                ))
+            expanded_notes.append(notes.take(in_repeat).shifted(offset))
+        chords = expanded_chords
+        notes = NoteTable.concat(expanded_notes)
+        logger.info("Repeat expansion: %d repeats, total chords=%d notes=%d",
+                     len(repeats), len(chords), len(notes))
 
     # --- Form detection ---
-    total_measures = max((c.measure_number for c in chords), default=0) if chords else note_measure_num
+    section_markers = staff.section_markers
+    total_measures = max((c.measure_number for c in chords), default=0) if chords else measures_scanned
     form = _detect_form(total_measures, repeats, section_markers)
 
     logger.info("Parsed MuseScore file: title=%r key=%r time_sig=%r chords=%d notes=%d form=%s sections=%d",
                 title, key_str, time_sig, len(chords), len(notes), form, len(section_markers))
     return ParsedScore(title=title, key=key_str, time_signature=time_sig,
                        tempo=tempo_val, chords=chords, notes=notes,
-                       repeats=repeats, barlines=barlines,
-                       has_pickup=has_pickup, form=form,
+                       repeats=repeats, barlines=staff.barlines,
+                       has_pickup=staff.has_pickup, form=form,
                        section_markers=section_markers)
 
 
@@ -536,16 +503,51 @@ def _detect_form(total_measures: int, repeats: list, section_markers: list = Non
 # MusicXML (.musicxml / .xml / .mxl)
 # ---------------------------------------------------------------------------
 
-def _parse_musicxml(file_path: str, filename: str) -> ParsedScore:
+def _parse_musicxml(file_path: FileSource, filename: str) -> ParsedScore:
+    """Parse MusicXML with the streaming reader (musicxml_stream), falling
+    back to music21 for documents the reader does not handle."""
+    xml_data = read_musicxml(file_path, filename)
+    try:
+        doc = scan_musicxml(xml_data)
+    except Unsupported as e:
+        logger.info("MusicXML %r needs music21 (%s)", filename, e)
+        return _parse_musicxml_music21(xml_data, filename)
+
+    detected = detect_key(doc.pitch_classes)
+    chords = [
+        ScoreChord(measure_number=measure, beat_position=beat, chord_symbol=figure, chord_order=order)
+        for measure, beat, figure, order in doc.chords
+    ]
+    title = doc.title or os.path.splitext(filename)[0]
+    key_str = f"{detected[0]} {detected[1]}" if detected else None
+    time_sig = doc.time_signature or "4/4"
+    logger.info("Parsed MusicXML: title=%r key=%r time_sig=%r chords=%d notes=%d",
+                title, key_str, time_sig, len(chords), len(doc.notes))
+    return ParsedScore(title=title, key=key_str, time_signature=time_sig,
+                       tempo=int(doc.tempo) if doc.tempo else None,
+                       chords=chords, notes=doc.notes)
+
+
+def _parse_musicxml_music21(xml_data: bytes, filename: str) -> ParsedScore:
     """Parse MusicXML using music21."""
     try:
-        from music21 import converter, harmony, meter
+        from music21 import harmony, meter
         from music21 import tempo as m21tempo
+        from music21.musicxml import xmlToM21
     except ImportError:
         raise ValueError("music21 is required for MusicXML parsing but is not installed")
 
     try:
-        score = converter.parse(file_path)
+        # Hand music21 the parsed tree (its parseData only takes UTF-8 text)
+        importer = xmlToM21.MusicXMLImporter()
+        importer.xmlRoot = ET.fromstring(xml_data)
+        if importer.xmlRoot.tag != 'score-partwise':
+            raise ValueError(f"Cannot parse MusicXML not in score-partwise "
+                             f"(root tag '{importer.xmlRoot.tag}')")
+        importer.xmlRootToScore(importer.xmlRoot, importer.stream)
+        score = importer.stream
+    except ValueError:
+        raise
     except Exception as e:
         raise ValueError(f"music21 could not parse the file: {e}")
 
@@ -617,7 +619,7 @@ def _parse_musicxml(file_path: str, filename: str) -> ParsedScore:
 # MIDI (.mid / .midi) — delegates to existing mido-based parser
 # ---------------------------------------------------------------------------
 
-def _parse_midi(file_path: str, filename: str) -> ParsedScore:
+def _parse_midi(file_path: FileSource, filename: str) -> ParsedScore:
     """Parse MIDI using the existing mido-based parser."""
     from app.services.midi_parser import parse_midi_file
 
@@ -636,36 +638,12 @@ def _parse_midi(file_path: str, filename: str) -> ParsedScore:
         for i, c in enumerate(midi.chords)
     ]
 
-    # Convert MIDI notes to ScoreNote for song_notes population (HL-006E)
-    def _beats_to_duration_type(beats: float) -> str:
-        if beats >= 3.0:
-            return 'whole'
-        elif beats >= 1.5:
-            return 'half'
-        elif beats >= 0.75:
-            return 'quarter'
-        elif beats >= 0.375:
-            return 'eighth'
-        elif beats >= 0.1875:
-            return '16th'
-        return '32nd'
-
-    notes = [
-        ScoreNote(
-            measure_number=n.measure_number,
-            beat_position=n.beat_position,
-            midi_pitch=n.midi_pitch,
-            duration_type=_beats_to_duration_type(n.duration_beats),
-            voice=1,
-        )
-        for n in midi.notes
-    ]
-
+    # The parser's NoteTable feeds song_notes population as-is (HL-006E)
     return ParsedScore(
         title=title,
         key=None,
         time_signature=midi.time_signature,
         tempo=midi.tempo,
         chords=chords,
-        notes=notes,
+        notes=midi.notes,
     )
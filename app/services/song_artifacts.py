@@ -0,0 +1,55 @@
+"""
+Large per-song artifacts kept out of the Songs row (SongArtifacts).
+
+The decoded source XML of a MuseScore/MusicXML import and the parsed
+rehearsal-mark list used to live in Songs.raw_xml and
+Songs.section_markers_json. Any `SELECT *` on Songs then dragged them through
+pyodbc with every listing page. They are stored here instead, one row per
+(song_id, kind), packed by app.db.codec, and read only by the endpoints
+that need them.
+"""
+from typing import Optional
+
+from app.db import codec
+
+RAW_XML = 'raw_xml'
+SECTION_MARKERS = 'section_markers'
+KINDS = (RAW_XML, SECTION_MARKERS)
+
+
+def _check_kind(kind: str) -> None:
+    if kind not in KINDS:
+        raise ValueError(f"Unknown song artifact kind: {kind!r}")
+
+
+def put_in(tx, song_id: int, kind: str, text: Optional[str]) -> None:
+    """Store (or, for None/empty text, remove) one artifact inside the caller's Transaction."""
+    _check_kind(kind)
+    if not text:
+        tx.execute("DELETE FROM SongArtifacts WHERE song_id = ? AND kind = ?", (song_id, kind))
+        return
+    blob = codec.pack(text)
+    params = (blob, len(text), song_id, kind)
+    updated = tx.execute(
+        "UPDATE SongArtifacts SET content = ?, text_length = ? WHERE song_id = ? AND kind = ?",
+        params,
+    )
+    if not updated:
+        tx.execute(
+            "INSERT INTO SongArtifacts (content, text_length, song_id, kind) VALUES (?, ?, ?, ?)",
+            params,
+        )
+
+
+def put(song_id: int, kind: str, text: Optional[str], db) -> None:
+    with db.transaction() as tx:
+        put_in(tx, song_id, kind, text)
+
+
+def get(song_id: int, kind: str, db) -> Optional[str]:
+    """The decoded artifact, or None if the song has none of this kind."""
+    _check_kind(kind)
+    blob = db.execute_scalar(
+        "SELECT content FROM SongArtifacts WHERE song_id = ? AND kind = ?", (song_id, kind)
+    )
+    return codec.unpack(blob)
@@ -0,0 +1,159 @@
+"""
+Startup timeline and background warm-up for the API process.
+
+A Cloud Run cold start pays for everything main.py does before uvicorn
+accepts traffic. `timeline` records each startup phase (module imports,
+migrations, pool fill) as an offset from when this module was imported,
+plus how long the process had already been running by then (interpreter
+and uvicorn start-up), and GET /health/startup returns it so a cold start
+can be profiled on the deployed service.
+
+Heavy dependencies (music21, anthropic, mido, the Secret Manager client,
+the MIDI chord table) are loaded where they are first used, so the import
+phase does not include them. warm_up() then loads the ones requests need
+most, music21 and the chord caches, on a background thread once the
+server is ready (settings.startup_warmup), so neither the import phase
+nor the first analysis request pays for them.
+"""
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Chord symbols parsed during warm-up: the qualities most lead sheets use, on every root
+_WARMUP_ROOTS = ('C', 'Db', 'D', 'Eb', 'E', 'F', 'F#', 'G', 'Ab', 'A', 'Bb', 'B')
+_WARMUP_QUALITIES = ('', 'm', '7', 'maj7', 'm7', 'm7b5', 'dim7')
+
+
+def _process_age() -> Optional[float]:
+    """Seconds since this process started (Linux /proc), or None."""
+    try:
+        with open('/proc/self/stat') as fh:
+            # Field 22 is the start time in clock ticks since boot; fields
+            # after the parenthesised command name are space-separated
+            start_ticks = int(fh.read().rsplit(')', 1)[1].split()[19])
+        with open('/proc/uptime') as fh:
+            uptime = float(fh.read().split()[0])
+        return max(0.0, uptime - start_ticks / os.sysconf('SC_CLK_TCK'))
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class StartupTimeline:
+    """Named phases with start offsets and durations, in milliseconds."""
+
+    def __init__(self):
+        self._origin = time.perf_counter()
+        self._process_age = _process_age()
+        self._phases: List[Dict] = []
+        self._lock = threading.Lock()
+
+    def _ms(self, t: float) -> float:
+        return round((t - self._origin) * 1000, 1)
+
+    def _record(self, name: str, start: float, end: float, error: Optional[str] = None) -> None:
+        entry = {'name': name, 'start_ms': self._ms(start), 'duration_ms': round((end - start) * 1000, 1)}
+        if error:
+            entry['error'] = error
+        with self._lock:
+            self._phases.append(entry)
+
+    @contextmanager
+    def phase(self, name: str):
+        """Time the body as phase `name`; an exception is recorded and re-raised."""
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception as e:
+            self._record(name, start, time.perf_counter(), f"{type(e).__name__}: {e}")
+            raise
+        self._record(name, start, time.perf_counter())
+
+    def since_origin(self, name: str) -> None:
+        """Record a phase that began when this module was imported and ends now."""
+        self._record(name, self._origin, time.perf_counter())
+
+    def mark(self, name: str) -> None:
+        """Record an instant (e.g. 'ready')."""
+        now = time.perf_counter()
+        self._record(name, now, now)
+
+    def offset_of(self, name: str) -> Optional[float]:
+        """End offset (ms) of the first phase called `name`."""
+        with self._lock:
+            for entry in self._phases:
+                if entry['name'] == name:
+                    return round(entry['start_ms'] + entry['duration_ms'], 1)
+        return None
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            phases = [dict(entry) for entry in self._phases]
+        return {
+            'process_age_at_import_ms': (round(self._process_age * 1000, 1)
+                                         if self._process_age is not None else None),
+            'ready_ms': self.offset_of('ready'),
+            'warmup': _warmup_state,
+            'phases': phases,
+        }
+
+
+timeline = StartupTimeline()
+
+_warmup_state = 'not started'   # 'not started' | 'running' | 'done' | 'failed'
+_warmup_lock = threading.Lock()
+
+
+def warm_up() -> None:
+    """Import music21, build the MIDI chord table and fill the chord caches.
+
+    Each step is its own 'warmup.*' phase; a failing step is logged and
+    the rest still run.
+    """
+    def load_music21():
+        from music21 import harmony, key, roman  # noqa: F401
+
+    def build_chord_table():
+        from app.services.midi_parser import _chord_table
+        _chord_table()
+
+    def fill_chord_caches():
+        from app.services.analysis_service import analyze_chord_in_key, parse_chord_symbol
+        for root in _WARMUP_ROOTS:
+            for quality in _WARMUP_QUALITIES:
+                parse_chord_symbol(root + quality)
+        # The diatonic sevenths of C major and A minor exercise the roman-numeral path
+        for symbol in ('Cmaj7', 'Dm7', 'Em7', 'Fmaj7', 'G7', 'Am7', 'Bm7b5', 'E7'):
+            analyze_chord_in_key(symbol, 'C', 'major')
+            analyze_chord_in_key(symbol, 'A', 'minor')
+
+    global _warmup_state
+    _warmup_state = 'running'
+    failed = False
+    for name, step in (('warmup.music21', load_music21),
+                       ('warmup.chord_table', build_chord_table),
+                       ('warmup.chord_caches', fill_chord_caches)):
+        try:
+            with timeline.phase(name):
+                step()
+        except Exception as e:
+            failed = True
+            logger.warning("Startup warm-up step %s failed (non-fatal): %s", name, e)
+    _warmup_state = 'failed' if failed else 'done'
+    logger.info("Startup warm-up %s at %.0fms", _warmup_state, timeline.offset_of('warmup.chord_caches') or 0)
+
+
+def start_warm_up() -> Optional[threading.Thread]:
+    """Run warm_up() on a daemon thread, once per process."""
+    global _warmup_state
+    with _warmup_lock:
+        if _warmup_state != 'not started':
+            return None
+        _warmup_state = 'running'
+        thread = threading.Thread(target=warm_up, name='startup-warmup', daemon=True)
+        thread.start()
+        return thread
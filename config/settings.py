@@ -3,71 +3,231 @@ HarmonyLab Settings - Cloud-First Configuration
 Loads secrets from Google Secret Manager (production)
 Falls back to environment variables (CI/CD)
 """
+import importlib.util
+import logging
 import os
+import tempfile
+import threading
+import time
+from dataclasses import dataclass, replace
 from functools import lru_cache
-from typing import Optional
+from typing import Optional, Tuple
 
-# Only import secretmanager if available (not required in CI/CD)
+logger = logging.getLogger(__name__)
+
+# secretmanager is optional (not required in CI/CD). It is only imported when
+# a secret is missing from the environment: the client library takes ~0.2s
+# to import, and Cloud Run injects secrets as env vars.
 try:
-    from google.cloud import secretmanager
-    HAS_SECRET_MANAGER = True
+    HAS_SECRET_MANAGER = importlib.util.find_spec("google.cloud.secretmanager") is not None
 except ImportError:
     HAS_SECRET_MANAGER = False
 
 
-def get_secret(secret_id: str, project_id: str = "super-flashcards-475210") -> str:
-    """
-    Fetch secret from Google Secret Manager.
-    Falls back to environment variable if Secret Manager unavailable.
-    """
+def _lookup_secret(secret_id: str, project_id: str) -> Tuple[Optional[str], str]:
+    """Return (value, source) with source 'env', 'secret_manager' or 'missing'."""
     # Environment variable takes precedence (for Cloud Run injection)
     # Check full name first (HARMONYLAB_DB_SERVER), then short name (DB_SERVER)
     env_key = secret_id.upper().replace("-", "_")
     env_value = os.getenv(env_key)
     if env_value:
-        return env_value.strip()
+        return env_value.strip(), "env"
     # Check short env var name (strip prefix)
     short_key = env_key.split("_", 1)[-1] if "_" in env_key else env_key
     env_value = os.getenv(short_key)
     if env_value:
-        return env_value.strip()
+        return env_value.strip(), "env"
     
     # Try Secret Manager
     if HAS_SECRET_MANAGER:
         try:
+            from google.cloud import secretmanager
             client = secretmanager.SecretManagerServiceClient()
             name = f"projects/{project_id}/secrets/{secret_id}/versions/latest"
             response = client.access_secret_version(request={"name": name})
-            return response.payload.data.decode("UTF-8").strip()
+            return response.payload.data.decode("UTF-8").strip(), "secret_manager"
         except Exception as e:
             print(f"Warning: Could not fetch secret {secret_id}: {e}")
-    
-    # Final fallback for local development
-    raise ValueError(f"Secret {secret_id} not found in environment or Secret Manager")
+    return None, "missing"
+
+
+def get_secret(secret_id: str, project_id: str = "super-flashcards-475210") -> str:
+    """
+    Fetch secret from Google Secret Manager.
+    Falls back to environment variable if Secret Manager unavailable.
+    """
+    value, _ = _lookup_secret(secret_id, project_id)
+    if value is None:
+        # Final fallback for local development
+        raise ValueError(f"Secret {secret_id} not found in environment or Secret Manager")
+    return value
+
+
+@dataclass(frozen=True)
+class SecretResolution:
+    """How one secret was resolved: where from and how long it took."""
+    name: str
+    source: str          # 'env' | 'secret_manager' | 'default' | 'missing'
+    duration_ms: float
+
+
+@dataclass(frozen=True)
+class SecretsSnapshot:
+    """Secrets resolved once per process; Settings serves every access from here.
+
+    A secret that could not be resolved is None (the matching Settings
+    property raises ValueError, as get_secret does).
+    """
+    db_server: Optional[str]
+    db_name: Optional[str]
+    db_user: Optional[str]
+    db_password: Optional[str]
+    jwt_secret_key: str
+    google_client_id: Optional[str]
+    google_client_secret: Optional[str]
+    anthropic_api_key: Optional[str]
+    resolutions: Tuple[SecretResolution, ...]
+    resolved_at: float                 # time.monotonic()
+    password_resolved_at: float        # time.monotonic(), moves on TTL rotation
+
+    def report(self) -> list:
+        """Per-secret source and resolution time, without the values."""
+        return [{"name": r.name, "source": r.source, "duration_ms": r.duration_ms}
+                for r in self.resolutions]
+
+
+# Settings attribute -> secret id suffix (after the "harmonylab-" prefix)
+_PREFIXED_SECRETS = (
+    ("db_server", "db-server"),
+    ("db_name", "db-name"),
+    ("db_user", "db-user"),
+    ("db_password", "db-password"),
+    ("jwt_secret_key", "jwt-secret"),
+    ("google_client_id", "google-client-id"),
+    ("google_client_secret", "google-client-secret"),
+)
 
 
 class Settings:
-    """Application settings loaded from Secret Manager."""
+    """Application settings loaded from Secret Manager.
+
+    Secrets are resolved together on first use into an immutable
+    SecretsSnapshot and served from it, so reading db_password for every
+    new connection does not go back to Secret Manager. refresh_secrets()
+    re-resolves them all; the database password is also re-fetched once it
+    is older than db_password_ttl (when it came from Secret Manager).
+    """
     
     def __init__(self):
         self._project_id = "super-flashcards-475210"
         self._prefix = "harmonylab"
+        self._secrets: Optional[SecretsSnapshot] = None
+        self._secrets_lock = threading.Lock()
+        self._dev_jwt_secret: Optional[str] = None
+
+    def _resolve(self, secret_id: str) -> Tuple[Optional[str], SecretResolution]:
+        start = time.perf_counter()
+        value, source = _lookup_secret(secret_id, self._project_id)
+        return value, SecretResolution(secret_id, source, round((time.perf_counter() - start) * 1000, 1))
+
+    def _resolve_all(self) -> SecretsSnapshot:
+        values, resolutions = {}, []
+        for attr, suffix in _PREFIXED_SECRETS:
+            values[attr], resolution = self._resolve(f"{self._prefix}-{suffix}")
+            resolutions.append(resolution)
+        values["anthropic_api_key"], resolution = self._resolve("anthropic-api-key")
+        resolutions.append(resolution)
+
+        # Local development fallbacks (previously applied on every access)
+        if values["jwt_secret_key"] is None:
+            fallback = os.getenv("JWT_SECRET_KEY")
+            if not fallback:
+                # One random key per process, so tokens survive a refresh
+                import secrets
+                if self._dev_jwt_secret is None:
+                    self._dev_jwt_secret = secrets.token_urlsafe(32)
+                fallback = self._dev_jwt_secret
+            values["jwt_secret_key"] = fallback
+            resolutions[4] = replace(resolutions[4], source="default")
+        for attr, env_key, index in (("google_client_id", "GOOGLE_CLIENT_ID", 5),
+                                     ("google_client_secret", "GOOGLE_CLIENT_SECRET", 6)):
+            if values[attr] is None and os.getenv(env_key):
+                values[attr] = os.getenv(env_key)
+                resolutions[index] = replace(resolutions[index], source="env")
+
+        now = time.monotonic()
+        return SecretsSnapshot(resolutions=tuple(resolutions), resolved_at=now,
+                               password_resolved_at=now, **values)
+
+    def _rotate_password(self, snapshot: SecretsSnapshot) -> SecretsSnapshot:
+        value, resolution = self._resolve(f"{self._prefix}-db-password")
+        if value is None:
+            # Transient lookup failure: keep the previous password and its source, so
+            # _password_expired still retries Secret Manager after the next TTL
+            logger.warning("Could not re-fetch %s; keeping the previous password", resolution.name)
+            return replace(snapshot, password_resolved_at=time.monotonic())
+        resolutions = tuple(resolution if r.name == resolution.name else r for r in snapshot.resolutions)
+        return replace(snapshot, db_password=value, resolutions=resolutions,
+                       password_resolved_at=time.monotonic())
+
+    def secrets(self) -> SecretsSnapshot:
+        """The resolved secrets, resolving them on first call."""
+        snapshot = self._secrets
+        if snapshot is not None and not self._password_expired(snapshot):
+            return snapshot
+        with self._secrets_lock:
+            snapshot = self._secrets
+            if snapshot is None:
+                snapshot = self._secrets = self._resolve_all()
+                logger.info("Resolved %d secrets in %.0fms", len(snapshot.resolutions),
+                            sum(r.duration_ms for r in snapshot.resolutions))
+            elif self._password_expired(snapshot):
+                snapshot = self._secrets = self._rotate_password(snapshot)
+            return snapshot
+
+    def _password_expired(self, snapshot: SecretsSnapshot) -> bool:
+        ttl = self.db_password_ttl
+        if ttl <= 0:
+            return False
+        # An env var cannot change under a running process; only re-fetch from Secret Manager
+        source = next(r.source for r in snapshot.resolutions if r.name.endswith("-db-password"))
+        return source == "secret_manager" and time.monotonic() - snapshot.password_resolved_at > ttl
+
+    def refresh_secrets(self, password_only: bool = False) -> SecretsSnapshot:
+        """Re-resolve the secrets now (e.g. after a rotation or a failed login)."""
+        with self._secrets_lock:
+            if password_only and self._secrets is not None:
+                self._secrets = self._rotate_password(self._secrets)
+            else:
+                self._secrets = self._resolve_all()
+            return self._secrets
+
+    def _required(self, attr: str, suffix: str) -> str:
+        value = getattr(self.secrets(), attr)
+        if value is None:
+            raise ValueError(f"Secret {self._prefix}-{suffix} not found in environment or Secret Manager")
+        return value
     
     @property
     def db_server(self) -> str:
-        return get_secret(f"{self._prefix}-db-server", self._project_id)
+        return self._required("db_server", "db-server")
     
     @property
     def db_name(self) -> str:
-        return get_secret(f"{self._prefix}-db-name", self._project_id)
+        return self._required("db_name", "db-name")
     
     @property
     def db_user(self) -> str:
-        return get_secret(f"{self._prefix}-db-user", self._project_id)
+        return self._required("db_user", "db-user")
     
     @property
     def db_password(self) -> str:
-        return get_secret(f"{self._prefix}-db-password", self._project_id)
+        return self._required("db_password", "db-password")
+
+    @property
+    def db_password_ttl(self) -> float:
+        """Seconds before a Secret Manager database password is re-fetched (0 = never)."""
+        return float(os.getenv("DB_PASSWORD_TTL", "3600"))
     
     @property
     def db_driver(self) -> str:
@@ -77,6 +237,96 @@ class Settings:
         # Local Windows development
         return os.getenv("DB_DRIVER", "ODBC Driver 17 for SQL Server")
     
+    @property
+    def db_pool_min_size(self) -> int:
+        """Connections kept open even when idle."""
+        return int(os.getenv("DB_POOL_MIN_SIZE", "1"))
+
+    @property
+    def db_pool_max_size(self) -> int:
+        """Upper bound on concurrently open connections per process."""
+        return int(os.getenv("DB_POOL_MAX_SIZE", "10"))
+
+    @property
+    def db_pool_idle_timeout(self) -> float:
+        """Seconds an idle connection may sit in the pool before it is closed."""
+        return float(os.getenv("DB_POOL_IDLE_TIMEOUT", "300"))
+
+    @property
+    def db_pool_checkout_timeout(self) -> float:
+        """Seconds to wait for a free connection before giving up."""
+        return float(os.getenv("DB_POOL_CHECKOUT_TIMEOUT", "30"))
+
+    @property
+    def db_pool_ping_interval(self) -> float:
+        """Idle seconds after which a connection is pinged on checkout."""
+        return float(os.getenv("DB_POOL_PING_INTERVAL", "5"))
+
+    @property
+    def max_upload_bytes(self) -> int:
+        """Largest single music-file upload accepted (413 beyond this)."""
+        return int(float(os.getenv("MAX_UPLOAD_MB", "25")) * 1024 * 1024)
+
+    @property
+    def max_batch_upload_bytes(self) -> int:
+        """Largest batch-import ZIP accepted (spooled to disk, not memory)."""
+        return int(float(os.getenv("MAX_BATCH_UPLOAD_MB", "500")) * 1024 * 1024)
+
+    @property
+    def parse_cache_dir(self) -> str:
+        """Directory for cached parse results, keyed by file SHA-256."""
+        return os.getenv("PARSE_CACHE_DIR") or os.path.join(tempfile.gettempdir(), "harmonylab-parse-cache")
+
+    @property
+    def parse_cache_max_bytes(self) -> int:
+        """Size bound for the parse cache; LRU entries are evicted past it (0 disables).
+
+        Off by default unless PARSE_CACHE_DIR is set (64 MB then): the default
+        directory is under /tmp, which on Cloud Run is in-memory and counts
+        against the instance's memory limit.
+        """
+        default = "64" if os.getenv("PARSE_CACHE_DIR") else "0"
+        return int(float(os.getenv("PARSE_CACHE_MB", default)) * 1024 * 1024)
+
+    @property
+    def import_workers(self) -> int:
+        """Parser processes for batch imports (0 = one per CPU).
+
+        Batch jobs keep running after their 202 response, so on Cloud Run the
+        service must have CPU always allocated (--no-cpu-throttling).
+        """
+        return int(os.getenv("IMPORT_WORKERS", "0"))
+
+    @property
+    def analysis_executor_mode(self) -> str:
+        """Where CPU-bound analysis runs: 'thread' or 'process'."""
+        return os.getenv("ANALYSIS_EXECUTOR", "thread").lower()
+
+    @property
+    def analysis_workers(self) -> int:
+        """Concurrent analysis tasks per process."""
+        return int(os.getenv("ANALYSIS_WORKERS", "2"))
+
+    @property
+    def analysis_timeout(self) -> float:
+        """Seconds an analysis request may take before returning 504."""
+        return float(os.getenv("ANALYSIS_TIMEOUT", "60"))
+
+    @property
+    def blob_codec(self) -> str:
+        """Compression for packed VARBINARY columns (app.db.codec): 'gzip' or 'zstd'."""
+        return os.getenv("BLOB_CODEC", "gzip").lower()
+
+    @property
+    def run_migrations_on_startup(self) -> bool:
+        """Apply pending migrations in the startup handler (off when a deploy step runs python -m app.migrations)."""
+        return os.getenv("RUN_MIGRATIONS_ON_STARTUP", "true").lower() == "true"
+
+    @property
+    def startup_warmup(self) -> bool:
+        """Pre-load music21 and the chord caches in the background once the server is up."""
+        return os.getenv("STARTUP_WARMUP", "true").lower() == "true"
+
     @property
     def debug(self) -> bool:
         return os.getenv("DEBUG", "false").lower() == "true"
@@ -106,33 +356,25 @@ class Settings:
     @property
     def jwt_secret_key(self) -> str:
         """Secret key for JWT tokens."""
-        try:
-            return get_secret(f"{self._prefix}-jwt-secret", self._project_id)
-        except ValueError:
-            # Fallback for local development
-            import secrets
-            return os.getenv("JWT_SECRET_KEY", secrets.token_urlsafe(32))
+        return self.secrets().jwt_secret_key
 
     @property
     def google_client_id(self) -> Optional[str]:
         """Google OAuth Client ID."""
-        try:
-            return get_secret(f"{self._prefix}-google-client-id", self._project_id)
-        except ValueError:
-            return os.getenv("GOOGLE_CLIENT_ID")
+        return self.secrets().google_client_id
 
     @property
     def google_client_secret(self) -> Optional[str]:
         """Google OAuth Client Secret."""
-        try:
-            return get_secret(f"{self._prefix}-google-client-secret", self._project_id)
-        except ValueError:
-            return os.getenv("GOOGLE_CLIENT_SECRET")
+        return self.secrets().google_client_secret
 
     @property
     def anthropic_api_key(self) -> str:
         """Anthropic API key for Vision OMR."""
-        return get_secret("anthropic-api-key", self._project_id)
+        value = self.secrets().anthropic_api_key
+        if value is None:
+            raise ValueError("Secret anthropic-api-key not found in environment or Secret Manager")
+        return value
 
     @property
     def omr_model(self) -> str:
@@ -5,12 +5,14 @@ Main entry point for the Harmony Lab API server.
 """
 import logging
 import traceback
+from app.startup import start_warm_up, timeline  # first, so the timeline covers every import below
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from starlette.middleware.sessions import SessionMiddleware
 from uvicorn.middleware.proxy_headers import ProxyHeadersMiddleware
 from config.settings import settings
+from app.api.uploads import UploadSizeLimitMiddleware
 
 # Import routes
 from app.api.routes import songs, sections, vocabulary, measures, chords, progress, quiz, imports, analysis, exports, midi_input, riffs, improvisation, rules, preferences
@@ -41,6 +43,10 @@ async def general_exception_handler(request: Request, exc: Exception):
         }
     )
 
+# Upload size cap, enforced while a multipart body arrives (innermost, so a
+# 413 still passes through CORS)
+app.add_middleware(UploadSizeLimitMiddleware)
+
 # Proxy headers middleware — trust X-Forwarded-Proto from Cloud Run load balancer
 app.add_middleware(ProxyHeadersMiddleware, trusted_hosts="*")
 
@@ -58,8 +64,14 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],  # song list keyset cursor
 )
 
+# Resolve every secret once, up front; the session key below and each new
+# database connection read them from this snapshot
+with timeline.phase("secrets"):
+    settings.secrets()
+
 # Session middleware (required for OAuth state storage)
 # same_site="none" required for OAuth redirect flow from Google
 app.add_middleware(
@@ -72,12 +84,38 @@ app.add_middleware(
 
 @app.on_event("startup")
 async def startup_event():
-    """Run migrations on startup."""
+    """Run migrations on startup, then warm up in the background once ready."""
+    # A no-op single query once schema_version is current (see app.migrations)
+    if settings.run_migrations_on_startup:
+        try:
+            with timeline.phase("migrations"):
+                from app.migrations import run_migrations
+                run_migrations()
+        except Exception as e:
+            logger.warning(f"Migration warning (non-fatal): {e}")
+
+    # Pre-open the pool's minimum connections so first requests skip the handshake
     try:
-        from app.migrations import run_migrations
-        run_migrations()
+        with timeline.phase("db_pool"):
+            from app.db.connection import db
+            db.pool.fill()
     except Exception as e:
-        logger.warning(f"Migration warning (non-fatal): {e}")
+        logger.warning(f"Connection pool warm-up failed (non-fatal): {e}")
+
+    # Startup handlers finish just before uvicorn starts accepting connections
+    timeline.mark("ready")
+    logger.info(f"Startup ready at {timeline.offset_of('ready'):.0f}ms")
+    if settings.startup_warmup:
+        start_warm_up()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Close pooled database connections and stop analysis workers."""
+    from app.db.connection import db
+    from app.services.analysis_executor import analysis_executor
+    analysis_executor.shutdown()
+    db.pool.close_all()
 
 
 @app.get("/")
@@ -95,6 +133,8 @@ async def root():
 async def health_check():
     """Health check endpoint for Cloud Run."""
     from app.db.connection import db
+    from app.services.analysis_executor import analysis_executor
+    from app.services.analysis_service import chord_cache_stats
 
     try:
         db_ok = db.test_connection()
@@ -107,10 +147,20 @@ async def health_check():
         "service": "harmonylab",
         "component": "backend",
         "version": VERSION,
-        "canary": "PINEAPPLE-HM41"
+        "canary": "PINEAPPLE-HM41",
+        "db_pool": db.pool.stats(),
+        "analysis_executor": analysis_executor.stats(),
+        "chord_cache": chord_cache_stats(),
     }
 
 
+@app.get("/health/startup")
+async def startup_profile():
+    """Startup phase timeline (ms since main.py began importing), warm-up state,
+    and where each secret was resolved from and how long it took."""
+    return {**timeline.snapshot(), "secrets": settings.secrets().report()}
+
+
 # Include routers
 app.include_router(songs.router)
 app.include_router(sections.router)
@@ -127,6 +177,7 @@ app.include_router(riffs.router)
 app.include_router(improvisation.router)
 app.include_router(rules.router)
 app.include_router(preferences.router)
+timeline.since_origin("imports")
 
 
 if __name__ == "__main__":
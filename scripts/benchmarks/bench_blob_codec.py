@@ -0,0 +1,112 @@
+"""
+Benchmark: space and latency of packed VARBINARY columns vs NVARCHAR(MAX).
+
+Offline, packs the analysis documents of a few standards (and, with
+--xml, a score's source XML) in each available format and reports stored
+size against the NVARCHAR (UTF-16) size and the pack / unpack time per
+document. With --from-db it reports the actual stored sizes of the packed
+columns and times reading N cached analyses, as get_analysis does.
+
+    python scripts/benchmarks/bench_blob_codec.py
+    python scripts/benchmarks/bench_blob_codec.py --xml score.mscx
+    python scripts/benchmarks/bench_blob_codec.py --from-db 50
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from app.db import codec
+from app.services.analysis_service import analyze_song
+
+PROGRESSIONS = {
+    'Autumn Leaves': 'Cm7 F7 Bbmaj7 Ebmaj7 Am7b5 D7 Gm Gm Cm7 F7 Bbmaj7 Ebmaj7 Am7b5 D7 Gm Gm '
+                     'Am7b5 D7 Gm Gm Cm7 F7 Bbmaj7 Ebmaj7 Am7b5 D7 Gm7 C7 Fm7 Bb7 Am7b5 D7 Gm',
+    'All The Things You Are': 'Fm7 Bbm7 Eb7 Abmaj7 Dbmaj7 G7 Cmaj7 Cmaj7 Cm7 Fm7 Bb7 Ebmaj7 '
+                              'Abmaj7 D7 Gmaj7 Gmaj7 Am7 D7 Gmaj7 Gmaj7 F#m7 B7 Emaj7 C7 '
+                              'Fm7 Bbm7 Eb7 Abmaj7 Dbmaj7 Dbm7 Cm7 Bdim7 Bbm7 Eb7 Abmaj7',
+    'Giant Steps': 'Bmaj7 D7 Gmaj7 Bb7 Ebmaj7 Am7 D7 Gmaj7 Bb7 Ebmaj7 F#7 Bmaj7 Fm7 Bb7 '
+                   'Ebmaj7 Am7 D7 Gmaj7 C#m7 F#7 Bmaj7 Fm7 Bb7 Ebmaj7 C#m7 F#7',
+    'Rhythm Changes': 'Bb6 G7 Cm7 F7 Bb6 G7 Cm7 F7 Fm7 Bb7 Ebmaj7 Ebm7 Dm7 G7 Cm7 F7 Bb6 '
+                      'D7 D7 G7 G7 C7 C7 F7 F7',
+}
+
+FORMAT_NAMES = {codec.FORMAT_GZIP: 'gzip', codec.FORMAT_ZSTD: 'zstd'}
+
+
+def timed(fn, arg, repeat: int) -> float:
+    """Best-of-3 seconds per call."""
+    best = float('inf')
+    for _ in range(3):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            fn(arg)
+        best = min(best, (time.perf_counter() - start) / repeat)
+    return best
+
+
+def report(label: str, texts: list, repeat: int) -> None:
+    nvarchar = sum(2 * len(t) for t in texts)
+    print(f"{label}: {len(texts)} documents, NVARCHAR {nvarchar / 1024:.1f} KB")
+    formats = [codec.FORMAT_GZIP] + ([codec.FORMAT_ZSTD] if codec.HAS_ZSTD else [])
+    for fmt in formats:
+        packed = [codec.pack(t, fmt) for t in texts]
+        size = sum(len(p) for p in packed)
+        pack_s = sum(timed(lambda t: codec.pack(t, fmt), t, repeat) for t in texts) / len(texts)
+        unpack_s = sum(timed(codec.unpack, p, repeat) for p in packed) / len(packed)
+        print(f"  {FORMAT_NAMES[fmt]:5}: {size / 1024:8.1f} KB ({nvarchar / size:5.1f}x smaller)  "
+              f"pack {pack_s * 1e6:7.0f} us  unpack {unpack_s * 1e6:7.0f} us per document")
+    if not codec.HAS_ZSTD:
+        print("  zstd : zstandard not installed")
+
+
+def db_report(limit: int) -> None:
+    from app.db.connection import DatabaseConnection
+    db = DatabaseConnection()
+    for table, column in (('SongAnalysis', 'analysis_json'), ('SongAnalysis', 'served_json'),
+                          ('rlhf_sessions', 'algorithm_snapshot'), ('SongArtifacts', 'content')):
+        row = db.execute_query(
+            f"SELECT COUNT({column}) AS n, SUM(CAST(DATALENGTH({column}) AS BIGINT)) AS bytes "
+            f"FROM {table}"
+        )[0]
+        print(f"{table}.{column}: {row['n']} values, {(row['bytes'] or 0) / 1e6:.2f} MB stored")
+
+    songs = db.execute_query(
+        "SELECT TOP (?) song_id FROM SongAnalysis WHERE analysis_json IS NOT NULL ORDER BY song_id",
+        (limit,)
+    )
+    if not songs:
+        return
+    start = time.perf_counter()
+    fetched = 0
+    for song in songs:
+        value = db.execute_scalar("SELECT analysis_json FROM SongAnalysis WHERE song_id = ?",
+                                  (song['song_id'],))
+        fetched += len(value)
+        codec.unpack_json(value)
+    elapsed = time.perf_counter() - start
+    print(f"read + decode: {len(songs)} analyses, {fetched / 1024:.1f} KB over the wire, "
+          f"{elapsed / len(songs) * 1e3:.2f} ms each")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--xml', help="also pack this score's source XML (.mscx / .musicxml)")
+    parser.add_argument('--repeat', type=int, default=20, help="timed calls per document")
+    parser.add_argument('--from-db', type=int, metavar='N', help="report stored sizes and read N analyses")
+    args = parser.parse_args()
+
+    docs = [json.dumps(analyze_song(changes.split())) for changes in PROGRESSIONS.values()]
+    report("analysis_json", docs, args.repeat)
+    if args.xml:
+        with open(args.xml, encoding='utf-8', errors='replace') as f:
+            report("raw_xml", [f.read()], max(1, args.repeat // 10))
+    if args.from_db:
+        db_report(args.from_db)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""
+Benchmark: song analysis throughput with a cold vs warm chord-symbol cache.
+
+Runs analyze_song over a corpus of chord progressions. The first pass
+starts from empty caches; later passes reuse the parsed symbols and
+roman numerals, which is the steady state of a running API process.
+
+    python scripts/benchmarks/bench_chord_cache.py                # built-in standards
+    python scripts/benchmarks/bench_chord_cache.py --passes 5
+    python scripts/benchmarks/bench_chord_cache.py --from-db 50   # first 50 songs in the DB
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from app.services.analysis_service import analyze_song, chord_cache_stats, clear_chord_caches
+
+# Chord changes of a few jazz standards (A sections / full forms, lead-sheet spelling)
+STANDARDS = {
+    'Autumn Leaves': 'Cm7 F7 Bbmaj7 Ebmaj7 Am7b5 D7 Gm Gm Cm7 F7 Bbmaj7 Ebmaj7 Am7b5 D7 Gm Gm '
+                     'Am7b5 D7 Gm Gm Cm7 F7 Bbmaj7 Ebmaj7 Am7b5 D7 Gm7 C7 Fm7 Bb7 Am7b5 D7 Gm',
+    'Blue Bossa': 'Cm7 Cm7 Fm7 Fm7 Dm7b5 G7 Cm7 Cm7 Ebm7 Ab7 Dbmaj7 Dbmaj7 Dm7b5 G7 Cm7 Dm7b5 G7',
+    'All The Things You Are': 'Fm7 Bbm7 Eb7 Abmaj7 Dbmaj7 G7 Cmaj7 Cmaj7 Cm7 Fm7 Bb7 Ebmaj7 '
+                              'Abmaj7 D7 Gmaj7 Gmaj7 Am7 D7 Gmaj7 Gmaj7 F#m7 B7 Emaj7 C7 '
+                              'Fm7 Bbm7 Eb7 Abmaj7 Dbmaj7 Dbm7 Cm7 Bdim7 Bbm7 Eb7 Abmaj7',
+    'Rhythm Changes': 'Bb6 G7 Cm7 F7 Bb6 G7 Cm7 F7 Fm7 Bb7 Ebmaj7 Ebm7 Dm7 G7 Cm7 F7 Bb6 '
+                      'D7 D7 G7 G7 C7 C7 F7 F7',
+    'Blues in F': 'F7 Bb7 F7 Cm7 F7 Bb7 Bdim7 F7 D7 Gm7 C7 F7 D7 Gm7 C7',
+    'Giant Steps': 'Bmaj7 D7 Gmaj7 Bb7 Ebmaj7 Am7 D7 Gmaj7 Bb7 Ebmaj7 F#7 Bmaj7 Fm7 Bb7 '
+                   'Ebmaj7 Am7 D7 Gmaj7 C#m7 F#7 Bmaj7 Fm7 Bb7 Ebmaj7 C#m7 F#7',
+    'Solar': 'Cm6 Cm6 Gm7 C7 Fmaj7 Fmaj7 Fm7 Bb7 Ebmaj7 Ebm7 Ab7 Dbmaj7 Dm7b5 G7',
+    'Take The A Train': 'C6 C6 D7b5 D7b5 Dm7 G7 C6 Dm7 G7 C6 C6 D7b5 D7b5 Dm7 G7 C6 C6 '
+                        'Fmaj7 Fmaj7 Fmaj7 Fmaj7 D7 D7 Dm7 G7',
+}
+
+
+def builtin_corpus() -> list:
+    return [(name, changes.split()) for name, changes in STANDARDS.items()]
+
+
+def db_corpus(limit: int) -> list:
+    from app.db.connection import DatabaseConnection
+    db = DatabaseConnection()
+    songs = db.execute_query("SELECT TOP (?) id, title FROM Songs ORDER BY id", (limit,))
+    corpus = []
+    for song in songs:
+        chords = db.execute_query("""
+            SELECT c.chord_symbol
+            FROM Chords c
+            JOIN Measures m ON c.measure_id = m.id
+            JOIN Sections s ON m.section_id = s.id
+            WHERE s.song_id = ?
+            ORDER BY s.section_order, m.measure_number, c.chord_order
+        """, (song['id'],))
+        if chords:
+            corpus.append((song['title'], [c['chord_symbol'] for c in chords]))
+    return corpus
+
+
+def run_pass(corpus: list) -> float:
+    start = time.perf_counter()
+    for _, chords in corpus:
+        analyze_song(chords)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--passes', type=int, default=3, help="warm passes after the cold one")
+    parser.add_argument('--from-db', type=int, metavar='N', help="analyze the first N songs in the DB")
+    args = parser.parse_args()
+
+    corpus = db_corpus(args.from_db) if args.from_db else builtin_corpus()
+    if not corpus:
+        print("No songs to analyze")
+        return
+    total_chords = sum(len(c) for _, c in corpus)
+    distinct = len({s for _, c in corpus for s in c})
+    print(f"Corpus: {len(corpus)} songs, {total_chords} chords, {distinct} distinct symbols")
+
+    clear_chord_caches()
+    cold = run_pass(corpus)
+    print(f"cold  : {len(corpus) / cold:8.1f} songs/sec ({cold:.3f}s)")
+
+    warm = min(run_pass(corpus) for _ in range(max(1, args.passes)))
+    print(f"warm  : {len(corpus) / warm:8.1f} songs/sec ({warm:.3f}s)  x{cold / warm:.1f}")
+
+    for name, st in chord_cache_stats().items():
+        print(f"{name:6}: {st['hits']} hits, {st['misses']} misses, "
+              f"{st['size']}/{st['max_size']} entries, hit rate {st['hit_rate']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""
+Microbenchmark: identify_chord windows/sec, template scan vs lookup table.
+
+The scan column is the previous implementation (weights, then
+_classify_scan over every root x template); the table column is
+identify_chord as shipped. Windows are seeded random voicings of real
+chord templates (some rootless, some with passing tones), with
+duration/beat details like parse_midi_file passes.
+
+    python scripts/benchmarks/bench_chord_table.py
+    python scripts/benchmarks/bench_chord_table.py --windows 50000 --repeat 5
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from collections import defaultdict
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from app.services import midi_parser
+from app.services.midi_parser import CHORD_TEMPLATES, identify_chord
+
+
+def scan_identify(notes, note_details):
+    pc_weights = defaultdict(float)
+    for nd in note_details:
+        pc_weights[nd['midi_pitch'] % 12] += (
+            midi_parser._duration_weight(nd['duration_beats'])
+            * midi_parser._beat_weight(nd['beat_position'])
+        )
+    weighted_root_pc = max(pc_weights, key=pc_weights.get)
+    return midi_parser._classify_scan(list(pc_weights), min(notes) % 12, weighted_root_pc)
+
+
+def make_windows(count: int, seed: int = 0) -> list:
+    rng = random.Random(seed)
+    templates = list(CHORD_TEMPLATES.values())
+    windows = []
+    for _ in range(count):
+        root = 48 + rng.randrange(12)
+        notes = [root + interval for interval in rng.choice(templates)]
+        if rng.random() < 0.2:
+            notes = notes[1:]  # rootless
+        if rng.random() < 0.3:
+            notes.append(root + rng.randrange(12, 24))  # passing tone
+        details = [{'midi_pitch': n,
+                    'duration_beats': rng.choice((0.25, 0.5, 1.0, 2.0)),
+                    'beat_position': rng.choice((1.0, 1.5, 2.0, 3.0, 4.0))}
+                   for n in notes]
+        windows.append((notes, details))
+    return windows
+
+
+def timed(fn, windows, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for notes, details in windows:
+            fn(notes, details)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--windows', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    midi_parser._build_chord_table()
+    build = time.perf_counter() - start
+
+    windows = make_windows(args.windows)
+    slow = timed(scan_identify, windows, args.repeat)
+    fast = timed(identify_chord, windows, args.repeat)
+    print(f"table build: {build * 1000:.1f}ms ({len(midi_parser._chord_table())} entries)")
+    print(f"{'':6}  {'windows/s':>12}")
+    print(f"{'scan':6}  {args.windows / slow:12,.0f}")
+    print(f"{'table':6}  {args.windows / fast:12,.0f}  x{slow / fast:.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""
+Microbenchmark: key detection from notes, music21 Stream vs NumPy histogram.
+
+The music21 column is the analyzer's previous implementation (Stream of
+Note objects, cadence weighting as durations, s.analyze('key')).
+
+    python scripts/benchmarks/bench_key_detection.py
+    python scripts/benchmarks/bench_key_detection.py --sizes 200 5000 --repeat 20
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from music21 import duration, note, stream
+
+from app.services import key_detection
+
+
+def music21_detect(midi_notes, note_measures):
+    s = stream.Stream()
+    max_measure = max(note_measures)
+    cadence_start = max(1, max_measure - 3)
+    for midi_pitch, m in zip(midi_notes, note_measures):
+        n = note.Note(midi_pitch)
+        if m >= cadence_start:
+            n.duration = duration.Duration(6.0 if m == max_measure else 3.0)
+        s.append(n)
+    return s.analyze('key')
+
+
+def numpy_detect(midi_notes, note_measures):
+    return key_detection.detect_key(key_detection.note_histogram(midi_notes, note_measures))
+
+
+def timed(fn, args, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[200, 1000, 5000])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    scale = [0, 2, 4, 5, 7, 9, 11]
+    print(f"{'notes':>7}  {'music21':>10}  {'numpy':>10}  speedup")
+    for size in args.sizes:
+        midi_notes = [60 + rng.choice(scale) + 12 * rng.randrange(-1, 2) for _ in range(size)]
+        note_measures = [i // 8 + 1 for i in range(size)]
+        slow = timed(music21_detect, (midi_notes, note_measures), max(1, args.repeat // 2))
+        fast = timed(numpy_detect, (midi_notes, note_measures), args.repeat * 20)
+        print(f"{size:7d}  {slow * 1000:8.2f}ms  {fast * 1000:8.3f}ms  x{slow / fast:.0f}")
+
+
+if __name__ == '__main__':
+    main()
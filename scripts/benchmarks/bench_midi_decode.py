@@ -0,0 +1,137 @@
+"""
+Benchmark: MIDI import decoding, multi-pass mido pipeline vs decode_midi.
+
+The legacy column reproduces what a MIDI upload used to cost before
+chords, notes and rhythm shared one decode: MidiFile parsed twice
+(parse_midi_file and analyze_rhythm_from_midi), a tempo/time-signature
+walk, mido.merge_tracks, and the chord and note walks over the merged
+track. The single-pass column is decode_midi plus the array-backed
+extractors and rhythm analysis over the same table. identify_chord runs
+in both, so the chord table is built before timing.
+
+    python scripts/benchmarks/bench_midi_decode.py
+    python scripts/benchmarks/bench_midi_decode.py --tracks 32 --notes 5000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+import mido
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from app.services import midi_parser
+from app.services.midi_events import TickIndex, decode_midi
+from app.services.rhythm_analyzer import analyze_rhythm, analyze_rhythm_from_events
+
+
+def make_midi(path: str, tracks: int, notes: int, seed: int = 0) -> None:
+    """Write a type-1 file: a conductor track plus `tracks` note tracks."""
+    rng = random.Random(seed)
+    mid = mido.MidiFile(ticks_per_beat=480)
+    conductor = mido.MidiTrack()
+    conductor.append(mido.MetaMessage('time_signature', numerator=4, denominator=4))
+    conductor.append(mido.MetaMessage('set_tempo', tempo=500000))
+    mid.tracks.append(conductor)
+    for k in range(tracks):
+        track = mido.MidiTrack()
+        track.append(mido.MetaMessage('track_name', name=f'Part {k + 1}'))
+        events, tick = [], 0
+        for _ in range(notes):
+            tick += rng.choice((0, 120, 240, 480))
+            pitch = rng.randrange(36, 96)
+            events.append((tick, 'note_on', pitch, rng.randrange(40, 120)))
+            events.append((tick + rng.choice((60, 120, 240, 480)), 'note_off', pitch, 0))
+        events.sort(key=lambda e: e[0])
+        last = 0
+        for at, kind, pitch, velocity in events:
+            track.append(mido.Message(kind, note=pitch, velocity=velocity,
+                                      channel=k % 16, time=at - last))
+            last = at
+        mid.tracks.append(track)
+    mid.save(path)
+
+
+def legacy(path: str) -> None:
+    mid = mido.MidiFile(path)
+    tpb = mid.ticks_per_beat
+    num = 4
+    for track in mid.tracks:
+        for msg in track:
+            if msg.type == 'time_signature':
+                num = msg.numerator
+    merged = mido.merge_tracks(mid.tracks)
+
+    # Chord and note walks over the merged track, as the old extractors did
+    tick, window_start, window = 0, 0, []
+    active = {}
+    for msg in merged:
+        tick += msg.time
+        if msg.type == 'note_on' and msg.velocity > 0:
+            if window and tick - window_start >= tpb:
+                midi_parser.identify_chord(window)
+                window = []
+            if not window:
+                window_start = tick
+            window.append(msg.note)
+            active[msg.note] = tick
+        elif msg.type in ('note_off', 'note_on'):
+            active.pop(msg.note, None)
+    if window:
+        midi_parser.identify_chord(window)
+
+    # analyze_rhythm_from_midi re-read the file
+    rhythm = mido.MidiFile(path)
+    onsets = []
+    for track in rhythm.tracks:
+        tick = 0
+        for msg in track:
+            tick += msg.time
+            if msg.type == 'note_on' and msg.velocity > 0:
+                onsets.append(tick)
+    analyze_rhythm(onsets, tpb, num, 4)
+
+
+def single_pass(path: str) -> None:
+    events = decode_midi(path)
+    index = TickIndex.from_events(events)
+    midi_parser.extract_chords_from_events(events, index)
+    midi_parser.extract_notes_from_events(events, index)
+    analyze_rhythm_from_events(events)
+
+
+def timed(fn, path: str, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(path)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--tracks', type=int, default=16)
+    parser.add_argument('--notes', type=int, default=5000, help='notes per track')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    midi_parser._chord_table()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.mid')
+        make_midi(path, args.tracks, args.notes)
+        print(f"{args.tracks} tracks x {args.notes} notes, "
+              f"{os.path.getsize(path) / 1024:.0f} KiB")
+        slow = timed(legacy, path, args.repeat)
+        fast = timed(single_pass, path, args.repeat)
+
+    print(f"{'':12}  {'seconds':>8}")
+    print(f"{'multi-pass':12}  {slow:8.3f}")
+    print(f"{'single-pass':12}  {fast:8.3f}  x{slow / fast:.1f}")
+
+
+if __name__ == '__main__':
+    main()
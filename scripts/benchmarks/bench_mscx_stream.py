@@ -0,0 +1,146 @@
+"""
+Benchmark: MuseScore parsing, ElementTree tree vs streaming scan (mscx_stream).
+
+Generates an orchestral MuseScore 4 score (many staves, two voices,
+harmony, lyrics, dynamics, ties) and parses it the way an import does:
+parse_music_file for the ParsedScore, parse_upload_full for the rich note
+dicts. Reports best wall time and tracemalloc peak for each. Run it
+before and after the streaming change (e.g. from a git worktree of the
+older commit) to compare; --save writes the generated .mscz for reuse.
+
+    python scripts/benchmarks/bench_mscx_stream.py
+    python scripts/benchmarks/bench_mscx_stream.py --staves 40 --measures 400
+"""
+import argparse
+import io
+import os
+import random
+import sys
+import time
+import tracemalloc
+import zipfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from app.services.import_engine import parse_upload_full
+from app.services.score_parser import parse_music_file
+
+_DURATIONS = [('quarter', 1.0), ('eighth', 0.5), ('half', 2.0)]
+_DYNAMICS = [('p', 49), ('mf', 80), ('f', 96)]
+
+
+def _voice(rng: random.Random, staff: int, measure: int, voice: int, low: int) -> list:
+    out = ['<voice>']
+    if measure == 1 and voice == 0:
+        out.append('<KeySig><concertKey>-2</concertKey></KeySig>'
+                   '<TimeSig><sigN>4</sigN><sigD>4</sigD></TimeSig>')
+        if staff == 0:
+            out.append('<Tempo><tempo>2</tempo><text>Allegro</text></Tempo>')
+    if staff == 0 and voice == 0:
+        out.append(f'<Harmony><harmonyInfo><root>{14 + measure % 7}</root>'
+                   f'<name>{"m7" if measure % 2 else "7"}</name></harmonyInfo></Harmony>')
+        if measure % 16 == 1:
+            out.append(f'<RehearsalMark><text>{chr(65 + (measure // 16) % 4)}</text></RehearsalMark>')
+    if voice == 0 and measure % 8 == 1:
+        marking, velocity = rng.choice(_DYNAMICS)
+        out.append(f'<Dynamic><subtype>{marking}</subtype><velocity>{velocity}</velocity></Dynamic>')
+    beats = 0.0
+    while beats < 4.0:
+        name, length = rng.choice(_DURATIONS)
+        if beats + length > 4.0:
+            name, length = 'quarter', 1.0
+        beats += length
+        if voice == 1 and rng.random() < 0.3:
+            out.append(f'<Rest><durationType>{name}</durationType></Rest>')
+            continue
+        out.append(f'<Chord><durationType>{name}</durationType>')
+        if staff == 0 and voice == 0:
+            out.append(f'<Lyrics><syllabic>single</syllabic><text>la{measure}</text></Lyrics>')
+        for _ in range(rng.choice((1, 1, 2, 3))):
+            pitch = low + rng.randrange(24)
+            out.append(f'<Note><pitch>{pitch}</pitch><tpc>{14 + pitch % 12}</tpc>')
+            if rng.random() < 0.05:
+                out.append('<Spanner type="Tie"><Tie></Tie><next><location>'
+                           '<fractions>1/4</fractions></location></next></Spanner>')
+            out.append('</Note>')
+        out.append('<Articulation><subtype>articStaccatoAbove</subtype></Articulation>'
+                   if rng.random() < 0.1 else '')
+        out.append('</Chord>')
+    out.append('</voice>')
+    return out
+
+
+def make_orchestral_mscx(staves: int, measures: int, seed: int = 0) -> bytes:
+    """A MuseScore 4 .mscx with part definitions followed by `staves` content staves."""
+    rng = random.Random(seed)
+    out = ['<?xml version="1.0" encoding="UTF-8"?>\n<museScore version="4.20">',
+           '<programVersion>4.2.1</programVersion><Score>',
+           '<metaTag name="workTitle">Orchestral Benchmark</metaTag>']
+    for s in range(staves):
+        out.append(f'<Part id="{s + 1}"><Staff id="{s + 1}"><StaffType group="pitched"/></Staff>'
+                   f'<trackName>Instrument {s + 1}</trackName>'
+                   f'<Instrument><longName>Instrument {s + 1}</longName></Instrument></Part>')
+    for s in range(staves):
+        low = 36 + (s * 7) % 36
+        out.append(f'<Staff id="{s + 1}">')
+        if s == 0:
+            out.append('<VBox><Text><style>title</style><text>Orchestral Benchmark</text></Text></VBox>')
+        for m in range(1, measures + 1):
+            out.append('<Measure>')
+            for v in range(2):
+                out.extend(_voice(rng, s, m, v, low))
+            out.append('</Measure>')
+        out.append('</Staff>')
+    out.append('</Score></museScore>')
+    return ''.join(out).encode('utf-8')
+
+
+def as_mscz(mscx: bytes) -> bytes:
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, 'w', zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr('score.mscx', mscx)
+    return buf.getvalue()
+
+
+def measure(fn, repeat: int):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    del result
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--staves', type=int, default=24)
+    parser.add_argument('--measures', type=int, default=200)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--save', help="also write the generated score to this .mscz path")
+    args = parser.parse_args()
+
+    data = as_mscz(make_orchestral_mscx(args.staves, args.measures))
+    if args.save:
+        with open(args.save, 'wb') as fh:
+            fh.write(data)
+
+    rows = [
+        ('parse_music_file', lambda: parse_music_file(data, 'bench.mscz')),
+        ('parse_upload_full', lambda: parse_upload_full(data, 'bench.mscz')),
+    ]
+    notes = len(parse_upload_full(data, 'bench.mscz')['notes'])
+    print(f"{args.staves} staves x {args.measures} measures, {len(data) / 2**20:.1f} MiB .mscz, "
+          f"{notes} notes/rests")
+    print(f"{'':18}  {'seconds':>8}  {'peak MiB':>9}")
+    for label, fn in rows:
+        seconds, peak = measure(fn, args.repeat)
+        print(f"{label:18}  {seconds:8.3f}  {peak / 2**20:9.1f}")
+
+
+if __name__ == '__main__':
+    main()
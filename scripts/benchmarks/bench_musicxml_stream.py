@@ -0,0 +1,129 @@
+"""
+Benchmark: MusicXML parsing, music21 vs the streaming reader (musicxml_stream).
+
+Generates a multi-part lead sheet (a melody part with a chord symbol per
+beat pair, plus accompaniment parts with chords and backups) and parses it
+with parse_music_file, which now streams it, and with the music21 path it
+replaced (_parse_musicxml_music21). Reports best CPU time and tracemalloc
+peak for each, for plain .musicxml and compressed .mxl.
+
+    python scripts/benchmarks/bench_musicxml_stream.py
+    python scripts/benchmarks/bench_musicxml_stream.py --parts 8 --measures 400
+    python scripts/benchmarks/bench_musicxml_stream.py --musicxml score.mxl
+"""
+import argparse
+import io
+import logging
+import os
+import random
+import sys
+import time
+import tracemalloc
+import warnings
+import zipfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from app.services.musicxml_stream import read_musicxml
+from app.services.score_parser import _parse_musicxml_music21, parse_music_file
+
+_STEPS = 'CDEFGAB'
+_KINDS = ('major', 'minor', 'dominant', 'major-seventh', 'minor-seventh', 'half-diminished')
+
+
+def _note(rng: random.Random, low: int, duration: int, kind: str, chord: bool = False) -> str:
+    step = rng.choice(_STEPS)
+    alter = '<alter>-1</alter>' if rng.random() < 0.15 else ''
+    return (f'<note>{"<chord/>" if chord else ""}<pitch><step>{step}</step>{alter}'
+            f'<octave>{low + rng.randrange(2)}</octave></pitch><duration>{duration}</duration>'
+            f'<voice>1</voice><type>{kind}</type></note>')
+
+
+def make_lead_sheet_musicxml(parts: int, measures: int, seed: int = 0) -> bytes:
+    """score-partwise MusicXML: `parts` parts of 4/4 measures, chord symbols in part 1."""
+    rng = random.Random(seed)
+    out = ['<?xml version="1.0" encoding="UTF-8"?>\n<score-partwise version="4.0">',
+           '<work><work-title>MusicXML Benchmark</work-title></work><part-list>']
+    out.extend(f'<score-part id="P{p}"><part-name>Part {p}</part-name></score-part>'
+               for p in range(1, parts + 1))
+    out.append('</part-list>')
+    for p in range(1, parts + 1):
+        out.append(f'<part id="P{p}">')
+        for m in range(1, measures + 1):
+            out.append(f'<measure number="{m}">')
+            if m == 1:
+                out.append('<attributes><divisions>4</divisions><key><fifths>-2</fifths></key>'
+                           '<time><beats>4</beats><beat-type>4</beat-type></time></attributes>')
+                if p == 1:
+                    out.append('<direction><direction-type><metronome><beat-unit>quarter</beat-unit>'
+                               '<per-minute>120</per-minute></metronome></direction-type>'
+                               '<sound tempo="120"/></direction>')
+            for half in range(2):
+                if p == 1:
+                    out.append(f'<harmony><root><root-step>{rng.choice(_STEPS)}</root-step></root>'
+                               f'<kind>{rng.choice(_KINDS)}</kind></harmony>')
+                    out.extend(_note(rng, 4, 2, 'eighth') for _ in range(4))
+                else:
+                    out.append(_note(rng, 3, 8, 'half'))
+                    out.extend(_note(rng, 3, 8, 'half', chord=True) for _ in range(2))
+            if p > 1:
+                out.append('<backup><duration>16</duration></backup>')
+                out.extend(_note(rng, 2, 4, 'quarter') for _ in range(4))
+            out.append('</measure>')
+        out.append('</part>')
+    out.append('</score-partwise>')
+    return ''.join(out).encode('utf-8')
+
+
+def as_mxl(xml: bytes) -> bytes:
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, 'w', zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr('META-INF/container.xml',
+                    '<container><rootfiles><rootfile full-path="score.xml"/></rootfiles></container>')
+        zf.writestr('score.xml', xml)
+    return buf.getvalue()
+
+
+def measure(fn, repeat: int):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.process_time()
+        fn()
+        best = min(best, time.process_time() - start)
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--parts', type=int, default=4)
+    parser.add_argument('--measures', type=int, default=200)
+    parser.add_argument('--musicxml', help="a .musicxml/.mxl file to include")
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+    warnings.simplefilter('ignore')
+
+    xml = make_lead_sheet_musicxml(args.parts, args.measures)
+    inputs = [('bench.musicxml', xml), ('bench.mxl', as_mxl(xml))]
+    if args.musicxml:
+        with open(args.musicxml, 'rb') as fh:
+            inputs.append((os.path.basename(args.musicxml), fh.read()))
+
+    print(f"{args.parts} parts x {args.measures} measures, {len(xml) / 2**20:.1f} MiB MusicXML")
+    print(f"{'file':20}  {'reader':8}  {'cpu s':>7}  {'peak MiB':>9}")
+    for name, data in inputs:
+        rows = [
+            ('music21', lambda: _parse_musicxml_music21(read_musicxml(data, name), name)),
+            ('stream', lambda: parse_music_file(data, name)),
+        ]
+        for label, fn in rows:
+            seconds, peak = measure(fn, args.repeat)
+            print(f"{name:20}  {label:8}  {seconds:7.3f}  {peak / 2**20:9.1f}")
+
+
+if __name__ == '__main__':
+    main()
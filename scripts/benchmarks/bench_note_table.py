@@ -0,0 +1,153 @@
+"""
+Benchmark: MIDI notes to song_notes rows, per-note objects vs NoteTable.
+
+Both columns run parse_midi_file on the same file. The legacy column then
+rebuilds the object chain notes used to take on their way to the DB: a validated
+Pydantic model per note (midi_parser), a ScoreNote dataclass per note
+(score_parser._parse_midi), a 19-key dict per note (parse_upload_full),
+and finally the parameter tuples. The NoteTable column is
+parse_upload_full + _rich_rows as shipped. Reports best wall time and
+tracemalloc peak for each.
+
+    python scripts/benchmarks/bench_note_table.py
+    python scripts/benchmarks/bench_note_table.py --notes 50000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import dataclass
+
+import mido
+from pydantic import BaseModel
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from app.services import midi_parser
+from app.services.import_engine import _rich_rows, midi_to_note_name, parse_upload_full
+from app.services.score_parser import _DURATION_TO_BEATS
+
+
+class LegacyNoteData(BaseModel):
+    measure_number: int
+    beat_position: float
+    midi_pitch: int
+    duration_beats: float
+    velocity: int
+
+
+@dataclass
+class LegacyScoreNote:
+    measure_number: int
+    beat_position: float
+    midi_pitch: int
+    duration_type: str
+    voice: int = 1
+
+
+def _beats_to_duration_type(beats: float) -> str:
+    if beats >= 3.0:
+        return 'whole'
+    elif beats >= 1.5:
+        return 'half'
+    elif beats >= 0.75:
+        return 'quarter'
+    elif beats >= 0.375:
+        return 'eighth'
+    elif beats >= 0.1875:
+        return '16th'
+    return '32nd'
+
+
+def make_piano_midi(path: str, notes: int, seed: int = 0) -> None:
+    """Two-hand piano file: right-hand melody and left-hand chords."""
+    rng = random.Random(seed)
+    mid = mido.MidiFile(ticks_per_beat=480)
+    for hand, low in enumerate((60, 36)):
+        track = mido.MidiTrack()
+        events, tick = [], 0
+        for _ in range(notes // 2):
+            tick += rng.choice((0, 0, 240, 480)) if hand else rng.choice((120, 240, 480))
+            pitch = low + rng.randrange(24)
+            events.append((tick, 'note_on', pitch, rng.randrange(40, 110)))
+            events.append((tick + rng.choice((120, 240, 480, 960)), 'note_off', pitch, 0))
+        events.sort(key=lambda e: e[0])
+        last = 0
+        for at, kind, pitch, velocity in events:
+            track.append(mido.Message(kind, note=pitch, velocity=velocity, time=at - last))
+            last = at
+        mid.tracks.append(track)
+    mid.save(path)
+
+
+def legacy_rows(path: str) -> list:
+    table = midi_parser.parse_midi_file(path).notes
+    models = [
+        LegacyNoteData(measure_number=m, beat_position=b, midi_pitch=p, duration_beats=d, velocity=v)
+        for m, b, p, d, v in zip(table.measure_number.tolist(), table.beat_position.tolist(),
+                                 table.midi_pitch.tolist(), table.duration_beats.tolist(),
+                                 table.velocity.tolist())
+    ]
+    score_notes = [
+        LegacyScoreNote(n.measure_number, n.beat_position, n.midi_pitch,
+                        _beats_to_duration_type(n.duration_beats))
+        for n in models
+    ]
+    dicts = [{
+        'track_num': 0, 'track_name': 'Track 1', 'voice': n.voice,
+        'measure_num': n.measure_number, 'beat': n.beat_position,
+        'offset_quarters': 0, 'midi_pitch': n.midi_pitch,
+        'note_name': midi_to_note_name(n.midi_pitch),
+        'duration_quarters': _DURATION_TO_BEATS.get(n.duration_type, 1.0),
+        'duration_type': n.duration_type, 'dot_count': 0,
+        'velocity': 64, 'is_rest': False, 'is_grace': False,
+        'tie_type': None, 'stem_direction': None, 'notehead_type': None,
+        'fingering': None, 'articulations': [],
+    } for n in score_notes]
+    return _rich_rows(1, {'notes': dicts})['song_notes']
+
+
+def table_rows(path: str) -> list:
+    with open(path, 'rb') as f:
+        parsed = parse_upload_full(f.read(), 'bench.mid')
+    return _rich_rows(1, parsed)['song_notes']
+
+
+def measure(fn, path: str, repeat: int):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        rows = fn(path)
+        best = min(best, time.perf_counter() - start)
+    del rows
+    tracemalloc.start()
+    rows = fn(path)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best, peak, len(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--notes', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    midi_parser._chord_table()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'piano.mid')
+        make_piano_midi(path, args.notes)
+        slow = measure(legacy_rows, path, args.repeat)
+        fast = measure(table_rows, path, args.repeat)
+
+    print(f"{slow[2]} notes")
+    print(f"{'':10}  {'seconds':>8}  {'peak MiB':>9}")
+    print(f"{'objects':10}  {slow[0]:8.3f}  {slow[1] / 2**20:9.1f}")
+    print(f"{'NoteTable':10}  {fast[0]:8.3f}  {fast[1] / 2**20:9.1f}")
+
+
+if __name__ == '__main__':
+    main()
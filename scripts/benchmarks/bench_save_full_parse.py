@@ -0,0 +1,101 @@
+"""
+Benchmark: rich note persistence, per-row inserts vs batched save_full_parse.
+
+Needs a reachable database (same env vars / secrets as the API). Creates a
+scratch song, writes the same parse both ways, prints rows/sec, then deletes
+the scratch song.
+
+    python scripts/benchmarks/bench_save_full_parse.py                # synthetic 3000 notes
+    python scripts/benchmarks/bench_save_full_parse.py --notes 20000
+    python scripts/benchmarks/bench_save_full_parse.py --file score.mscz
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from app.db.connection import DatabaseConnection
+from app.services.import_engine import (
+    _INSERT_SQL, _RICH_TABLES, _rich_rows, midi_to_note_name,
+    parse_upload_full, save_full_parse,
+)
+
+
+def synthetic_parse(note_count: int) -> dict:
+    notes = []
+    for i in range(note_count):
+        pitch = 48 + (i * 7) % 36
+        notes.append({
+            'track_num': i % 4, 'track_name': f"Track {i % 4 + 1}", 'voice': 1,
+            'measure_num': i // 16 + 1, 'beat': float(i % 4 + 1), 'offset_quarters': 0,
+            'midi_pitch': pitch, 'note_name': midi_to_note_name(pitch),
+            'duration_quarters': 0.25, 'duration_type': '16th', 'dot_count': 0,
+            'velocity': 80, 'is_rest': False, 'is_grace': False, 'tie_type': None,
+            'stem_direction': None, 'notehead_type': None, 'fingering': None,
+            'articulations': [],
+        })
+    lyrics = [{'measure_num': m, 'beat': 1.0, 'syllable': 'la', 'syllabic': None, 'verse_num': 1}
+              for m in range(1, note_count // 16 + 1)]
+    return {
+        'metadata': {'title': 'bench', 'track_count': 4, 'measure_count': note_count // 16},
+        'notes': notes, 'lyrics': lyrics, 'dynamics': [], 'tempos': [],
+        'time_signatures': [{'measure_num': 1, 'numerator': 4, 'denominator': 4}],
+        'key_signatures': [], 'chord_symbols': [], 'text_marks': [],
+        'import_format': 'bench', 'raw_xml': None,
+    }
+
+
+def legacy_save(song_id: int, parsed: dict, db: DatabaseConnection) -> int:
+    """The pre-batching write path: one execute_non_query per row."""
+    for table in _RICH_TABLES:
+        db.execute_non_query(f"DELETE FROM {table} WHERE song_id = ?", (song_id,))
+    written = 0
+    for table, rows in _rich_rows(song_id, parsed).items():
+        for row in rows:
+            db.execute_non_query(_INSERT_SQL[table], row)
+            written += 1
+    return written
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument('--notes', type=int, default=3000, help="synthetic note count")
+    ap.add_argument('--file', help="parse this score instead of synthetic data")
+    ap.add_argument('--skip-legacy', action='store_true', help="only time the batched path")
+    args = ap.parse_args()
+
+    if args.file:
+        with open(args.file, 'rb') as f:
+            parsed = parse_upload_full(f.read(), os.path.basename(args.file))
+    else:
+        parsed = synthetic_parse(args.notes)
+    total_rows = sum(len(r) for r in _rich_rows(0, parsed).values())
+
+    db = DatabaseConnection()
+    song_id = db.execute_query(
+        "INSERT INTO Songs (title, source_file_type) OUTPUT INSERTED.id VALUES (?, 'Benchmark')",
+        ('__bench_save_full_parse__',)
+    )[0]['id']
+    try:
+        if not args.skip_legacy:
+            t0 = time.perf_counter()
+            legacy_save(song_id, parsed, db)
+            legacy = time.perf_counter() - t0
+            print(f"per-row : {total_rows} rows in {legacy:8.2f}s  = {total_rows / legacy:10.0f} rows/s")
+
+        t0 = time.perf_counter()
+        result = save_full_parse(song_id, parsed, db)
+        batched = time.perf_counter() - t0
+        print(f"batched : {total_rows} rows in {batched:8.2f}s  = {total_rows / batched:10.0f} rows/s")
+        if result['errors']:
+            print(f"errors  : {result['errors']}")
+        if not args.skip_legacy:
+            print(f"speedup : {legacy / batched:.1f}x")
+    finally:
+        db.execute_non_query("DELETE FROM Songs WHERE id = ?", (song_id,))
+
+
+if __name__ == '__main__':
+    main()
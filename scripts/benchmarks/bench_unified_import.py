@@ -0,0 +1,68 @@
+"""
+Benchmark: import parsing, two parses vs one (parse_upload).
+
+import_score used to run parse_music_file for chords/sections and then
+parse_upload_full for the note tables, parsing every upload twice (for
+MusicXML and MIDI, parse_upload_full called parse_music_file again).
+parse_upload produces both from one parse. Reports best CPU time per
+format for each.
+
+    python scripts/benchmarks/bench_unified_import.py
+    python scripts/benchmarks/bench_unified_import.py --staves 8 --notes 20000
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from bench_mscx_stream import as_mscz, make_orchestral_mscx
+from bench_note_table import make_piano_midi
+from app.services import midi_parser
+from app.services.import_engine import parse_upload, parse_upload_full
+from app.services.score_parser import parse_music_file
+
+
+def best_cpu(fn, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.process_time()
+        fn()
+        best = min(best, time.process_time() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--staves', type=int, default=4)
+    parser.add_argument('--measures', type=int, default=200)
+    parser.add_argument('--notes', type=int, default=10000, help="notes in the generated MIDI file")
+    parser.add_argument('--musicxml', help="a .musicxml/.mxl file to include")
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+    midi_parser._chord_table()
+
+    mscx = make_orchestral_mscx(args.staves, args.measures)
+    inputs = [('bench.mscx', mscx), ('bench.mscz', as_mscz(mscx))]
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.mid')
+        make_piano_midi(path, args.notes)
+        with open(path, 'rb') as fh:
+            inputs.append(('bench.mid', fh.read()))
+    if args.musicxml:
+        with open(args.musicxml, 'rb') as fh:
+            inputs.append((os.path.basename(args.musicxml), fh.read()))
+
+    print(f"{'file':24}  {'two parses':>10}  {'one parse':>9}  {'ratio':>5}")
+    for name, data in inputs:
+        two = best_cpu(lambda: (parse_music_file(data, name), parse_upload_full(data, name)), args.repeat)
+        one = best_cpu(lambda: parse_upload(data, name), args.repeat)
+        print(f"{name:24}  {two:10.3f}  {one:9.3f}  {one / two:5.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,186 @@
+"""Batch import job lifecycle (app.services.batch_import).
+
+Drives start_batch_import over a ZIP holding good MusicXML members, a
+corrupt one and one the writer reports as a duplicate, with a stub write
+and JobStore over a fake connection holding the BatchImportJobs /
+BatchImportFiles rows. Checks the imported / skipped / failed counts in
+snapshot(), that the snapshot loaded from the job tables (what another
+instance answers a poll with) matches, and that the archive is deleted.
+
+    python test_batch_import.py
+"""
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+import zipfile
+from contextlib import contextmanager
+sys.path.insert(0, os.path.dirname(__file__))
+logging.disable(logging.WARNING)
+os.environ['IMPORT_WORKERS'] = '1'
+
+from app.services import batch_import
+
+failures = 0
+
+
+def check(label, got, expected):
+    global failures
+    if got == expected:
+        print(f"  PASS: {label}")
+    else:
+        failures += 1
+        print(f"  FAIL: {label}: got {got!r}, expected {expected!r}")
+
+
+class FakeTransaction:
+    def __init__(self, db):
+        self.db = db
+
+    def execute(self, query, params=()):
+        if query.startswith("DELETE"):
+            return 0
+        job_id, status = params
+        self.db.jobs[job_id] = {"status": status, "error": None, "finished": False}
+        return 1
+
+    def executemany(self, query, rows):
+        for job_id, index, filename, status in rows:
+            self.db.files[(job_id, index)] = {"filename": filename, "status": status,
+                                              "detail_json": None}
+        return len(rows)
+
+
+class FakeDb:
+    """The two job tables as dicts, answering the statements JobStore issues."""
+
+    def __init__(self):
+        self.jobs = {}
+        self.files = {}
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def transaction(self):
+        with self.lock:
+            yield FakeTransaction(self)
+
+    def execute_non_query(self, query, params=()):
+        with self.lock:
+            if query.startswith("UPDATE BatchImportFiles"):
+                status, detail, job_id, index = params
+                self.files[(job_id, index)].update(status=status, detail_json=detail)
+            else:
+                status, error, finished, job_id = params
+                self.jobs[job_id].update(status=status, error=error, finished=bool(finished))
+        return 1
+
+    def execute_query(self, query, params=()):
+        job_id, = params
+        with self.lock:
+            if "FROM BatchImportJobs" in query:
+                return [dict(self.jobs[job_id])] if job_id in self.jobs else []
+            return [dict(row) for (j, _), row in sorted(self.files.items()) if j == job_id]
+
+
+def musicxml(title, chords):
+    measures = ''.join(
+        f'<measure number="{n}">'
+        + ('<attributes><divisions>1</divisions><key><fifths>0</fifths></key>'
+           '<time><beats>4</beats><beat-type>4</beat-type></time></attributes>' if n == 1 else '')
+        + f'<harmony><root><root-step>{root}</root-step></root><kind>{kind}</kind></harmony>'
+        + '<note><pitch><step>C</step><octave>4</octave></pitch><duration>4</duration>'
+          '<voice>1</voice><type>whole</type></note></measure>'
+        for n, (root, kind) in enumerate(chords, start=1)
+    )
+    return ('<?xml version="1.0" encoding="UTF-8"?><score-partwise version="3.1">'
+            f'<work><work-title>{title}</work-title></work>'
+            '<part-list><score-part id="P1"><part-name>Piano</part-name></score-part></part-list>'
+            f'<part id="P1">{measures}</part></score-partwise>')
+
+
+members = {
+    'charts/one.musicxml': musicxml('One', [('D', 'minor-seventh'), ('G', 'dominant'), ('C', 'major-seventh')]),
+    'charts/two.musicxml': musicxml('Two', [('F', 'major'), ('C', 'dominant')]),
+    'charts/dupe.musicxml': musicxml('Dupe', [('A', 'minor')]),
+    'charts/broken.musicxml': '<score-partwise><part id="P1"><measure',
+}
+
+
+class BrokenDb(FakeDb):
+    @contextmanager
+    def transaction(self):
+        raise RuntimeError("database unavailable")
+        yield
+
+    def execute_non_query(self, query, params=()):
+        raise RuntimeError("database unavailable")
+
+
+written = []
+
+
+def write(parsed, filename):
+    written.append((filename, parsed.title, threading.current_thread().name))
+    if filename == 'dupe.musicxml':
+        return {"status": "skipped", "reason": "duplicate"}
+    return {"status": "imported", "song_id": len(written), "chords": len(parsed.chords)}
+
+
+def main():
+    tmp = tempfile.NamedTemporaryFile(suffix='.zip', delete=False)
+    tmp.close()
+    with zipfile.ZipFile(tmp.name, 'w') as zf:
+        for name, text in members.items():
+            zf.writestr(name, text)
+
+    print("\n=== Job lifecycle ===")
+    db = FakeDb()
+    store = batch_import.JobStore(db)
+    job = batch_import.start_batch_import(tmp.name, list(members), write, store=store)
+    check("persisted as queued or running", db.jobs[job.id]["status"] in ('queued', 'running'), True)
+    check("one row per member", sum(1 for j, _ in db.files if j == job.id), 4)
+
+    deadline = time.time() + 120
+    while job.status not in ('complete', 'failed') and time.time() < deadline:
+        time.sleep(0.1)
+
+    snap = job.snapshot()
+    check("job complete", snap["status"], 'complete')
+    check("counts", (snap["total"], snap["processed"], snap["imported"], snap["skipped_duplicate"],
+                     snap["failed"], snap["pending"]), (4, 4, 2, 1, 1, 0))
+    by_name = {f["filename"]: f for f in snap["files"]}
+    check("parse failure recorded", (by_name['broken.musicxml']["status"],
+                                     bool(by_name['broken.musicxml'].get("error"))), ('failed', True))
+    check("writer fields kept", by_name['one.musicxml'].get("chords"), 3)
+    check("summary", snap["summary"], "Batch complete: 2 imported, 1 skipped (duplicate), 1 failed")
+    check("write called for parsed members only", sorted(w[0] for w in written),
+          ['dupe.musicxml', 'one.musicxml', 'two.musicxml'])
+    check("writes on one thread", len({w[2] for w in written}), 1)
+    check("archive deleted", os.path.exists(tmp.name), False)
+
+    print("\n=== Poll answered from the job tables ===")
+    check("table status", (db.jobs[job.id]["status"], db.jobs[job.id]["finished"]), ('complete', True))
+    check("loaded snapshot matches", store.load(job.id), snap)
+    batch_import._jobs.pop(job.id)
+    check("job_snapshot falls back to the store", batch_import.job_snapshot(job.id, store), snap)
+    check("unknown job", batch_import.job_snapshot('0' * 32, store), None)
+
+    print("\n=== Store failures never fail the import ===")
+    with zipfile.ZipFile(tmp.name, 'w') as zf:
+        zf.writestr('charts/one.musicxml', members['charts/one.musicxml'])
+    job = batch_import.start_batch_import(tmp.name, ['charts/one.musicxml'], write,
+                                          store=batch_import.JobStore(BrokenDb()))
+    deadline = time.time() + 120
+    while job.status not in ('complete', 'failed') and time.time() < deadline:
+        time.sleep(0.1)
+    check("imported despite the store", (job.status, job.snapshot()["imported"]), ('complete', 1))
+
+    batch_import._reset_executor()
+    print(f"\n{'ALL PASS' if failures == 0 else f'{failures} FAILURES'}")
+    return failures
+
+
+if __name__ == '__main__':  # parser workers are spawned and import this module
+    sys.exit(1 if main() else 0)
@@ -0,0 +1,156 @@
+"""Packed VARBINARY columns (app.db.codec) and the migration that converts them.
+
+Round-trips analysis documents through every available format, checks that
+an unconverted NVARCHAR value (str) still reads, and runs migration 21
+against a fake connection holding SongAnalysis / rlhf_sessions rows: every
+row is packed once, the packed column takes the old one's name, and an
+interrupted run resumes without re-packing.
+
+    python test_blob_codec.py
+"""
+import json
+import os
+import sys
+from contextlib import contextmanager
+sys.path.insert(0, os.path.dirname(__file__))
+
+import logging
+logging.disable(logging.INFO)
+
+from app import migrations
+from app.db import codec
+from app.services.analysis_service import analyze_song
+
+failures = 0
+
+
+def check(label, got, expected):
+    global failures
+    if got == expected:
+        print(f"  PASS: {label}")
+    else:
+        failures += 1
+        print(f"  FAIL: {label}: got {got!r}, expected {expected!r}")
+
+
+class FakeTransaction:
+    def __init__(self, db):
+        self.db = db
+
+    def execute(self, query, params=None):
+        self.db.statements.append(query)
+        if 'sp_rename' in query:
+            parts = query.split("'")   # EXEC sp_rename 'table.column_packed', 'column', 'COLUMN'
+            table, column = parts[1].split('.')[0], parts[3]
+            self.db.types[(table, column)] = 'varbinary'
+        return 0
+
+    def executemany(self, query, rows):
+        table = query.split()[1]
+        column = query.split()[3]
+        for value, key in rows:
+            self.db.tables[table][key][column] = value
+        return len(rows)
+
+
+class FakeDb:
+    """SongAnalysis and rlhf_sessions as dicts of rows keyed by their key column."""
+
+    def __init__(self, tables, types=None):
+        self.tables = tables
+        self.types = types or {}
+        self.statements = []
+
+    def execute_scalar(self, query, params=None):
+        table, column = params
+        if 'DATA_TYPE' in query:
+            return self.types.get((table, column), 'nvarchar')
+        return int(any(column in row for row in self.tables[table].values()))
+
+    def execute_non_query(self, query, params=None):
+        table, column = query.split()[2], query.split()[4]
+        for row in self.tables[table].values():
+            row.setdefault(column, None)
+        return 0
+
+    def execute_query(self, query, params=None):
+        words = query.split()
+        table, column = words[words.index('FROM') + 1], words[6]
+        packed = words[-3]
+        rows = [{'k': k, 'text': row[column]} for k, row in self.tables[table].items()
+                if row[column] is not None and row.get(packed) is None]
+        return rows[:100]
+
+    @contextmanager
+    def transaction(self):
+        yield FakeTransaction(self)
+
+
+STANDARD = ('Fm7 Bbm7 Eb7 Abmaj7 Dbmaj7 G7 Cmaj7 Cmaj7 Cm7 Fm7 Bb7 Ebmaj7 Abmaj7 D7 Gmaj7 '
+            'Gmaj7 Am7 D7 Gmaj7 Gmaj7 F#m7 B7 Emaj7 C7 Fm7 Bbm7 Eb7 Abmaj7 Dbmaj7 Dbm7 Cm7 '
+            'Bdim7 Bbm7 Eb7 Abmaj7').split()
+
+print("\n=== Round trip ===")
+analysis = analyze_song(STANDARD)
+text = json.dumps(analysis)
+formats = [codec.FORMAT_GZIP] + ([codec.FORMAT_ZSTD] if codec.HAS_ZSTD else [])
+if not codec.HAS_ZSTD:
+    print("  (zstandard not installed: zstd format not exercised)")
+for fmt in formats:
+    blob = codec.pack(text, fmt)
+    check(f"format {fmt} round trip", codec.unpack(blob), text)
+    check(f"format {fmt} byte first", blob[0], fmt)
+    check(f"format {fmt} under a quarter of NVARCHAR", len(blob) < 2 * len(text) // 4, True)
+check("default format is gzip", codec.default_format(), codec.FORMAT_GZIP)
+check("json helpers", codec.unpack_json(codec.pack_json(analysis)), json.loads(text))
+check("memoryview accepted", codec.unpack(memoryview(codec.pack('{"a": 1}'))), '{"a": 1}')
+check("deterministic", codec.pack(text) == codec.pack(text), True)
+check("unconverted NVARCHAR value reads", codec.unpack_json(text), json.loads(text))
+check("None passes through", (codec.pack(None), codec.unpack(None), codec.unpack_json(None)),
+      (None, None, None))
+check("empty string kept", codec.unpack(codec.pack('')), '')
+try:
+    codec.unpack(b'\x07junk')
+    check("unknown format byte rejected", False, True)
+except ValueError:
+    check("unknown format byte rejected", True, True)
+
+print("\n=== Migration 21 ===")
+docs = {i: json.dumps(analyze_song(STANDARD[i % 7:])) for i in range(1, 251)}
+tables = {
+    'SongAnalysis': {i: {'analysis_json': docs[i], 'served_json': docs[i] if i % 2 else None}
+                     for i in docs},
+    'rlhf_sessions': {f"s{i}": {'algorithm_snapshot': docs[i]} for i in range(1, 6)},
+}
+db = FakeDb(tables)
+migrations._migration_21_packed_columns(db)
+analysis_rows = tables['SongAnalysis']
+check("every analysis_json packed",
+      all(codec.unpack(r['analysis_json_packed']) == docs[k] for k, r in analysis_rows.items()), True)
+check("served_json packed where present",
+      [k for k, r in analysis_rows.items() if r['served_json_packed'] is not None],
+      [k for k in docs if k % 2])
+check("snapshots packed", all(codec.unpack(r['algorithm_snapshot_packed']) == docs[int(k[1:])]
+                              for k, r in tables['rlhf_sessions'].items()), True)
+check("columns swapped", sorted(db.types.values()), ['varbinary'] * 3)
+check("old column dropped before rename",
+      [s.split()[0] for s in db.statements[:2]], ['ALTER', 'EXEC'])
+
+print("\n=== Interrupted and re-run ===")
+tables = {
+    'SongAnalysis': {i: {'analysis_json': docs[i], 'served_json': None,
+                         'analysis_json_packed': b'already' if i <= 200 else None,
+                         'served_json_packed': None} for i in docs},
+    'rlhf_sessions': {},
+}
+db = FakeDb(tables, types={('rlhf_sessions', 'algorithm_snapshot'): 'varbinary'})
+migrations._migration_21_packed_columns(db)
+rows = tables['SongAnalysis']
+check("copied rows not re-packed", all(rows[i]['analysis_json_packed'] == b'already' for i in range(1, 201)),
+      True)
+check("remaining rows packed", all(codec.unpack(rows[i]['analysis_json_packed']) == docs[i]
+                                   for i in range(201, 251)), True)
+check("converted column skipped", [s for s in db.statements if 'rlhf_sessions' in s], [])
+
+print(f"\n{'ALL PASS' if failures == 0 else f'{failures} FAILURES'}")
+sys.exit(1 if failures else 0)
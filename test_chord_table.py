@@ -0,0 +1,86 @@
+"""Parity check: identify_chord's lookup table vs the template scan.
+
+Checks _chord_table() against midi_parser._classify_scan for every
+pitch-class mask x bass pitch class x weighted root, then runs
+identify_chord on seeded random voicings (with and without duration/beat
+details) against the scan.
+
+    python test_chord_table.py
+"""
+import os
+import random
+import sys
+from collections import defaultdict
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app.services import midi_parser
+from app.services.midi_parser import _classify_scan, identify_chord
+
+
+def reference_identify(notes, note_details=None):
+    """identify_chord as it was before the table: weights, then the full scan."""
+    if not notes:
+        return ("", "", False)
+    pc_weights = defaultdict(float)
+    if note_details:
+        for nd in note_details:
+            pc_weights[nd['midi_pitch'] % 12] += (
+                midi_parser._duration_weight(nd.get('duration_beats', 1.0))
+                * midi_parser._beat_weight(nd.get('beat_position', 1.0))
+            )
+    else:
+        for n in notes:
+            pc_weights[n % 12] += 1.0
+    weighted_root_pc = max(pc_weights, key=pc_weights.get)
+    return _classify_scan(list(pc_weights), min(notes) % 12, weighted_root_pc)
+
+
+def exhaustive() -> int:
+    failures = checked = 0
+    for mask in range(1, 4096):
+        pcs = [pc for pc in range(12) if mask >> pc & 1]
+        for bass_pc in range(12):
+            for weighted_root_pc in pcs:
+                # Notes: the weighted root twice so it dominates, bass lowest
+                notes = [60 + pc for pc in pcs] + [60 + weighted_root_pc] + [36 + bass_pc]
+                details = [{'midi_pitch': n, 'duration_beats': 1.0, 'beat_position': 2.0}
+                           for n in notes[:-1]]
+                expected = _classify_scan(pcs, bass_pc, weighted_root_pc)
+                got = identify_chord(notes, details)
+                checked += 1
+                if got != expected:
+                    failures += 1
+                    if failures <= 20:
+                        print(f"  FAIL: pcs={pcs} bass={bass_pc} weighted={weighted_root_pc}: "
+                              f"table {got}  scan {expected}")
+    print(f"  {checked} mask/bass/weighted-root cases checked")
+    return failures
+
+
+def random_voicings(count: int) -> int:
+    rng = random.Random(4096)
+    failures = 0
+    for _ in range(count):
+        notes = [rng.randrange(36, 84) for _ in range(rng.randrange(1, 9))]
+        details = None
+        if rng.random() < 0.7:
+            details = [{'midi_pitch': n,
+                        'duration_beats': rng.choice((0.125, 0.5, 1.0, 1.5, 2.0, 4.0)),
+                        'beat_position': rng.choice((1.0, 1.5, 2.0, 2.5, 3.0, 4.0))}
+                       for n in notes]
+        expected = reference_identify(notes, details)
+        got = identify_chord(notes, details)
+        if got != expected:
+            failures += 1
+            print(f"  FAIL: {notes} details={bool(details)}: table {got}  scan {expected}")
+    print(f"  {count} random voicings checked")
+    return failures
+
+
+if __name__ == '__main__':
+    print("=== _chord_table() vs _classify_scan, every mask/bass/weighted root ===")
+    total = exhaustive()
+    print("\n=== identify_chord on random voicings ===")
+    total += random_voicings(20000)
+    print(f"\n{'ALL PASS' if total == 0 else f'{total} FAILURES'}")
+    sys.exit(1 if total else 0)
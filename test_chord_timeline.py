@@ -0,0 +1,259 @@
+"""SongChordTimeline (app.services.chord_timeline) against the join it replaces.
+
+Runs the rebuild and load SQL on an in-memory SQLite copy of the Songs /
+Sections / Measures / Chords tables: the timeline must list every song's
+chords in exactly the order of the old Chords -> Measures -> Sections join
+(section_order, measure_number, chord_order), with seq as the position,
+and stay so after chord, measure and section edits. Drives the chord and
+measure update / delete routes and the section delete: a failed rebuild
+rolls the write back with it, and the song's cached analysis is cleared
+in the same transaction. Also checks that no route still runs the
+three-way progression join.
+
+    python test_chord_timeline.py
+"""
+import glob
+import os
+import random
+import re
+import sqlite3
+import sys
+from contextlib import contextmanager
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app.services import chord_timeline
+
+failures = 0
+
+
+def check(label, got, expected):
+    global failures
+    if got == expected:
+        print(f"  PASS: {label}")
+    else:
+        failures += 1
+        print(f"  FAIL: {label}: got {got!r}, expected {expected!r}")
+
+
+class Tx:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def execute(self, query, params=()):
+        return self.conn.execute(query, params).rowcount
+
+
+class SqliteDb:
+    """The DatabaseConnection methods chord_timeline uses, on sqlite3."""
+
+    def __init__(self):
+        self.conn = sqlite3.connect(':memory:', isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript("""
+            CREATE TABLE Sections (id INTEGER PRIMARY KEY, song_id INT, name TEXT, section_order INT);
+            CREATE TABLE Measures (id INTEGER PRIMARY KEY, section_id INT, measure_number INT,
+                                   created_at TEXT DEFAULT CURRENT_TIMESTAMP);
+            CREATE TABLE Chords (id INTEGER PRIMARY KEY, measure_id INT, beat_position REAL,
+                                 chord_symbol TEXT, roman_numeral TEXT, key_center TEXT, chord_order INT,
+                                 function_label TEXT, comments TEXT);
+            CREATE TABLE SongAnalysis (song_id INT PRIMARY KEY, served_json TEXT);
+            CREATE TABLE SongChordTimeline (
+                song_id INT, seq INT, chord_id INT, section_id INT, section_name TEXT,
+                section_order INT, measure_id INT, measure_number INT, beat_position REAL,
+                chord_order INT, chord_symbol TEXT, roman_numeral TEXT, key_center TEXT,
+                PRIMARY KEY (song_id, seq));
+        """)
+
+    def execute_query(self, query, params=()):
+        return [dict(r) for r in self.conn.execute(query, params).fetchall()]
+
+    def execute_scalar(self, query, params=()):
+        row = self.conn.execute(query, params).fetchone()
+        return row[0] if row else None
+
+    def execute_non_query(self, query, params=()):
+        return self.conn.execute(query, params).rowcount
+
+    @contextmanager
+    def transaction(self):
+        self.conn.execute("BEGIN")
+        try:
+            yield Tx(self.conn)
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+
+
+class BrokenTimelineTx(Tx):
+    def execute(self, query, params=()):
+        if 'INSERT INTO SongChordTimeline' in query:
+            raise sqlite3.OperationalError("timeline insert failed")
+        return super().execute(query, params)
+
+
+class BrokenTimelineDb(SqliteDb):
+    """Shares another SqliteDb's tables; every timeline rebuild fails."""
+
+    def __init__(self, db):
+        self.conn = db.conn
+
+    @contextmanager
+    def transaction(self):
+        with SqliteDb.transaction(self) as tx:
+            yield BrokenTimelineTx(tx.conn)
+
+
+def joined(db, song_id):
+    """The query the readers used to run."""
+    return db.execute_query("""
+        SELECT c.chord_symbol, m.measure_number, c.beat_position, c.chord_order
+        FROM Chords c
+        JOIN Measures m ON c.measure_id = m.id
+        JOIN Sections s ON m.section_id = s.id
+        WHERE s.song_id = ?
+        ORDER BY s.section_order, m.measure_number, c.chord_order
+    """, (song_id,))
+
+
+db = SqliteDb()
+rng = random.Random(7)
+symbols = ['Cmaj7', 'Dm7', 'G7', 'Am7', 'Fmaj7', 'Bm7b5', 'E7']
+for song_id in (1, 2, 3):
+    # Sections and measures inserted out of order, as edits leave them
+    orders = rng.sample(range(1, 5), 3)
+    for order in orders:
+        section_id = db.conn.execute("INSERT INTO Sections (song_id, name, section_order) VALUES (?, ?, ?)",
+                                     (song_id, f"S{order}", order)).lastrowid
+        for number in rng.sample(range(1, 9), 5):
+            measure_id = db.conn.execute("INSERT INTO Measures (section_id, measure_number) VALUES (?, ?)",
+                                         (section_id, number)).lastrowid
+            for chord_order in rng.sample(range(1, 4), rng.randint(1, 3)):
+                db.conn.execute("INSERT INTO Chords (measure_id, beat_position, chord_symbol, chord_order) "
+                                "VALUES (?, ?, ?, ?)",
+                                (measure_id, float(chord_order * 2 - 1), rng.choice(symbols), chord_order))
+
+print("\n=== Rebuild matches the join ===")
+for song_id in (1, 2, 3):
+    chord_timeline.rebuild(song_id, db)
+for song_id in (1, 2, 3):
+    check(f"song {song_id} progression", chord_timeline.load(song_id, db), joined(db, song_id))
+seqs = [r['seq'] for r in chord_timeline.load(2, db, ('seq',))]
+check("seq is the 0-based position", seqs, list(range(len(seqs))))
+
+print("\n=== Backfill ===")
+db.conn.execute("DELETE FROM SongChordTimeline")
+with db.transaction() as tx:
+    written = chord_timeline.rebuild_all_in(tx)
+check("every chord written", written, db.execute_scalar("SELECT COUNT(*) FROM Chords"))
+check("song 3 after backfill", chord_timeline.load(3, db), joined(db, 3))
+
+print("\n=== Edits ===")
+chord_id = db.execute_scalar("SELECT MIN(chord_id) FROM SongChordTimeline WHERE song_id = 1")
+song_id = chord_timeline.song_of_chord(chord_id, db)
+db.conn.execute("UPDATE Chords SET chord_symbol = 'F#7' WHERE id = ?", (chord_id,))
+chord_timeline.rebuild(song_id, db)
+check("chord edit", chord_timeline.load(1, db), joined(db, 1))
+measure_id = db.execute_scalar("SELECT measure_id FROM SongChordTimeline WHERE song_id = 1 AND seq = 0")
+db.conn.execute("UPDATE Measures SET measure_number = 99 WHERE id = ?", (measure_id,))
+chord_timeline.rebuild(chord_timeline.song_of_measure(measure_id, db), db)
+check("measure renumbered to the end", chord_timeline.load(1, db), joined(db, 1))
+section_id = db.execute_scalar("SELECT section_id FROM SongChordTimeline WHERE song_id = 2 AND seq = 0")
+song_id = chord_timeline.song_of_section(section_id, db)
+db.conn.execute("DELETE FROM Chords WHERE measure_id IN (SELECT id FROM Measures WHERE section_id = ?)",
+                (section_id,))
+db.conn.execute("DELETE FROM Measures WHERE section_id = ?", (section_id,))
+db.conn.execute("DELETE FROM Sections WHERE id = ?", (section_id,))
+chord_timeline.rebuild(song_id, db)
+check("section deleted", chord_timeline.load(2, db), joined(db, 2))
+check("one section", {r['section_id'] for r in chord_timeline.load(3, db, ('section_id',), section_id=section_id)},
+      set())
+other = db.execute_scalar("SELECT MIN(section_id) FROM SongChordTimeline WHERE song_id = 3")
+check("section filter", {r['section_id'] for r in chord_timeline.load(3, db, ('section_id',), section_id=other)},
+      {other})
+try:
+    chord_timeline.load(1, db, ('chord_symbol', 'comments'))
+    check("unknown column rejected", None, 'ValueError')
+except ValueError:
+    check("unknown column rejected", True, True)
+
+print("\n=== Route writes commit with their rebuild ===")
+import asyncio
+from app.api.routes import chords, measures, sections
+from app.models import ChordCreate, MeasureCreate
+
+
+def cache_all():
+    db.conn.execute("DELETE FROM SongAnalysis")
+    db.conn.executemany("INSERT INTO SongAnalysis VALUES (?, 'cached')", [(1,), (2,), (3,)])
+
+
+def cached():
+    """Songs whose served analysis is still cached."""
+    return [r['song_id'] for r in db.execute_query(
+        "SELECT song_id FROM SongAnalysis WHERE served_json IS NOT NULL ORDER BY song_id")]
+
+
+def route(module, handler, *args, db_for_route=None):
+    module.DatabaseConnection = lambda *_: db_for_route or db
+    return asyncio.run(handler(*args))
+
+
+row = chord_timeline.load(1, db, ('chord_id', 'measure_id', 'chord_order'))[0]
+update = ChordCreate(measure_id=row['measure_id'], beat_position=3, chord_symbol='Bb7',
+                     chord_order=row['chord_order'])
+cache_all()
+route(chords, chords.update_chord, row['chord_id'], update)
+check("chord update", chord_timeline.load(1, db), joined(db, 1))
+check("chord update invalidates its song", cached(), [2, 3])
+target = db.execute_scalar("SELECT MIN(measure_id) FROM SongChordTimeline WHERE song_id = 3")
+moved = ChordCreate(measure_id=target, beat_position=1, chord_symbol='Bb7', chord_order=9)
+cache_all()
+route(chords, chords.update_chord, row['chord_id'], moved)
+check("chord moved between songs", (chord_timeline.load(1, db), chord_timeline.load(3, db)),
+      (joined(db, 1), joined(db, 3)))
+check("move invalidates both songs", cached(), [2])
+measure_id = db.execute_scalar("SELECT MIN(measure_id) FROM SongChordTimeline WHERE song_id = 1")
+section_id = db.execute_scalar("SELECT section_id FROM Measures WHERE id = ?", (measure_id,))
+cache_all()
+route(measures, measures.update_measure, measure_id, MeasureCreate(section_id=section_id, measure_number=0))
+check("measure update", chord_timeline.load(1, db), joined(db, 1))
+check("measure update invalidates its song", cached(), [2, 3])
+
+before = chord_timeline.load(1, db)
+chord_id = db.execute_scalar("SELECT MAX(chord_id) FROM SongChordTimeline WHERE song_id = 1")
+cache_all()
+try:
+    route(chords, chords.delete_chord, chord_id, db_for_route=BrokenTimelineDb(db))
+except sqlite3.OperationalError:
+    pass
+check("failed rebuild rolls the delete back",
+      (db.execute_scalar("SELECT COUNT(*) FROM Chords WHERE id = ?", (chord_id,)), chord_timeline.load(1, db)),
+      (1, before))
+check("failed delete keeps the cache", cached(), [1, 2, 3])
+route(chords, chords.delete_chord, chord_id)
+check("chord delete", (chord_timeline.load(1, db), cached()), (joined(db, 1), [2, 3]))
+cache_all()
+route(measures, measures.delete_measure, measure_id)
+check("measure delete", (chord_timeline.load(1, db), cached()), (joined(db, 1), [2, 3]))
+section_id = db.execute_scalar("SELECT MIN(section_id) FROM SongChordTimeline WHERE song_id = 3")
+try:
+    asyncio.run(sections.delete_section(section_id, BrokenTimelineDb(db)))
+except sqlite3.OperationalError:
+    pass
+check("failed rebuild rolls the section delete back",
+      db.execute_scalar("SELECT COUNT(*) FROM Sections WHERE id = ?", (section_id,)), 1)
+cache_all()
+asyncio.run(sections.delete_section(section_id, db))
+check("section delete", (chord_timeline.load(3, db), cached()), (joined(db, 3), [1, 2]))
+
+print("\n=== Readers use the timeline ===")
+progression_join = re.compile(r"JOIN Sections s ON m\.section_id = s\.id\s+WHERE s\.song_id = \?\s+"
+                                r"ORDER BY s\.section_order, m\.measure_number, c\.chord_order")
+offenders = [os.path.basename(p) for p in glob.glob(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                                 'app', 'api', 'routes', '*.py'))
+             if progression_join.search(open(p, encoding='utf-8').read())]
+check("no route runs the progression join", offenders, [])
+
+print(f"\n{'ALL PASS' if failures == 0 else f'{failures} FAILURES'}")
+sys.exit(1 if failures else 0)
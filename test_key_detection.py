@@ -0,0 +1,127 @@
+"""Agreement check: NumPy key detection vs music21 Stream.analyze('key').
+
+Feeds the same notes (with the same cadence weighting, expressed as note
+durations) to music21 and to app.services.key_detection, for seeded
+synthetic melodies in every key plus chromatic noise, and for chord
+progressions. Key and correlation coefficient must match.
+
+    python test_key_detection.py
+"""
+import logging
+import os
+import random
+import sys
+sys.path.insert(0, os.path.dirname(__file__))
+logging.disable(logging.WARNING)
+
+from music21 import chord, duration, note, stream
+from app.services import key_detection
+from app.services.analysis_service import parse_chord_symbol
+
+MAJOR_STEPS = [0, 2, 4, 5, 7, 9, 11]
+HARMONIC_MINOR_STEPS = [0, 2, 3, 5, 7, 8, 11]
+
+
+def music21_key_from_notes(midi_notes, note_measures, total_measures=0):
+    """Reference: the Stream-based detection the analyzer used before, without the 200-note cap."""
+    s = stream.Stream()
+    max_measure = max(total_measures, max(note_measures)) if note_measures else total_measures
+    cadence_start = max(1, max_measure - 3)
+    for i, midi_pitch in enumerate(midi_notes):
+        n = note.Note(midi_pitch)
+        if note_measures and i < len(note_measures):
+            m = note_measures[i]
+            if m >= cadence_start:
+                n.duration = duration.Duration(3.0)
+                if m == max_measure:
+                    n.duration = duration.Duration(6.0)
+        s.append(n)
+    k = s.analyze('key')
+    return k.tonic.name, k.mode, k.correlationCoefficient
+
+
+def music21_key_from_chords(symbols):
+    s = stream.Stream()
+    for symbol in symbols:
+        parsed = parse_chord_symbol(symbol)
+        if parsed.normalized and not parsed.error:
+            s.append(chord.Chord(list(parsed.pitches)))
+    k = s.analyze('key')
+    return k.tonic.name, k.mode, k.correlationCoefficient
+
+
+def synthetic_melody(rng, tonic, minor, length, chromatic=0.1):
+    steps = HARMONIC_MINOR_STEPS if minor else MAJOR_STEPS
+    notes, measures = [], []
+    for i in range(length):
+        if rng.random() < chromatic:
+            pc = rng.randrange(12)
+        else:
+            pc = (tonic + rng.choice(steps)) % 12
+        notes.append(48 + pc + 12 * rng.randrange(3))
+        measures.append(i // rng.choice((4, 6, 8)) + 1)
+    measures.sort()
+    return notes, measures
+
+
+def compare(label, expected, got):
+    tonic, mode, r = expected
+    ok = got is not None and got[0] == tonic and got[1] == mode and abs(got[2] - r) < 1e-9
+    if not ok:
+        print(f"  FAIL: {label}: music21 {tonic} {mode} r={r:.6f}  numpy {got}")
+    return ok
+
+
+if __name__ == '__main__':
+    rng = random.Random(846)
+    passed = failed = 0
+
+    print("=== note-based detection ===")
+    for tonic in range(12):
+        for minor in (False, True):
+            for length in (8, 60, 199, 450, 1500):
+                for chromatic in (0.05, 0.35):
+                    notes, measures = synthetic_melody(rng, tonic, minor, length, chromatic)
+                    expected = music21_key_from_notes(notes, measures)
+                    got = key_detection.detect_key(key_detection.note_histogram(notes, measures))
+                    label = f"pc={tonic} {'minor' if minor else 'major'} n={length} chrom={chromatic}"
+                    if compare(label, expected, got):
+                        passed += 1
+                    else:
+                        failed += 1
+    # Unweighted (no measure data)
+    for _ in range(40):
+        notes = [rng.randrange(36, 96) for _ in range(rng.randrange(5, 400))]
+        if compare("random unweighted", music21_key_from_notes(notes, None),
+                   key_detection.detect_key(key_detection.note_histogram(notes))):
+            passed += 1
+        else:
+            failed += 1
+    print(f"  {passed} passed, {failed} failed")
+
+    print("\n=== chord-based detection ===")
+    progressions = [
+        'Cm7 F7 Bbmaj7 Ebmaj7 Am7b5 D7 Gm Gm',
+        'Dm7 G7 Cmaj7 Cmaj7 Dm7 G7 Cmaj7 A7',
+        'Fm7 Bbm7 Eb7 Abmaj7 Dbmaj7 G7 Cmaj7 Cmaj7',
+        'Bmaj7 D7 Gmaj7 Bb7 Ebmaj7 Am7 D7 Gmaj7',
+        'Cm6 Cm6 Gm7 C7 Fmaj7 Fmaj7 Fm7 Bb7',
+        'F7 Bb7 F7 Cm7 F7 Bb7 Bdim7 F7 D7 Gm7 C7 F7',
+        'Am Dm E7 Am F Dm E7 Am',
+        'C^7 D-7 G7(b9) N.C. Bbm7b5 F#ø7 Xyz C/E Eb+',
+    ]
+    chord_passed = chord_failed = 0
+    for prog in progressions:
+        symbols = prog.split()
+        parsed = [parse_chord_symbol(s) for s in symbols]
+        pcs = [p.pitch_classes for p in parsed if p.normalized and not p.error]
+        got = key_detection.detect_key(key_detection.pitch_class_histogram(pcs))
+        if compare(prog, music21_key_from_chords(symbols), got):
+            chord_passed += 1
+        else:
+            chord_failed += 1
+    print(f"  {chord_passed} passed, {chord_failed} failed")
+
+    total_failed = failed + chord_failed
+    print(f"\n{'ALL PASS' if total_failed == 0 else f'{total_failed} FAILURES'}")
+    sys.exit(1 if total_failed else 0)
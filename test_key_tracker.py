@@ -0,0 +1,156 @@
+"""Sliding-window key tracker (app.services.key_tracker) and detect_key_centers.
+
+Checks window_fit against a direct per-window count on hand-built and
+random pitch-class matrices, and viterbi against an exhaustive search over
+every path (with and without forced rows). Then runs detect_key_centers on
+a ii-V-I progression through three keys, a tritone-away excursion and an
+all-N.C. input.
+
+    python test_key_tracker.py
+"""
+import itertools
+import logging
+import os
+import sys
+sys.path.insert(0, os.path.dirname(__file__))
+logging.disable(logging.WARNING)
+
+import numpy as np
+from app.services import key_tracker
+from app.services.key_center_service import detect_key_centers
+
+failures = 0
+
+
+def check(label, got, expected):
+    global failures
+    if got == expected:
+        print(f"  PASS: {label}")
+    else:
+        failures += 1
+        print(f"  FAIL: {label}: got {got!r}, expected {expected!r}")
+
+
+def close(a, b):
+    return bool(np.allclose(a, b))
+
+
+def counts_of(*chords):
+    """(n, 12) pitch-class counts, one row per chord (a tuple of pitch classes; () = N.C.)."""
+    counts = np.zeros((len(chords), 12))
+    for i, pcs in enumerate(chords):
+        counts[i, list(pcs)] = 1.0
+    return counts
+
+
+def direct_fit(counts, window):
+    """Reference: sum the window around each row and score every key's scale."""
+    n = len(counts)
+    fit = np.zeros((n, 24))
+    for i in range(n):
+        start = i - window // 2
+        tones = counts[max(start, 0):max(min(start + window, n), 0)].sum(axis=0)
+        if tones.sum():
+            fit[i] = key_tracker.SCALE_MATRIX @ tones / tones.sum()
+    return fit
+
+
+def path_score(path, scores, penalties):
+    return (sum(scores[i, s] for i, s in enumerate(path))
+            - sum(penalties[a, b] for a, b in zip(path, path[1:])))
+
+
+def exhaustive(scores, penalties, forced=None):
+    n, states = scores.shape
+    paths = [p for p in itertools.product(range(states), repeat=n)
+             if forced is None or all(f < 0 or p[i] == f for i, f in enumerate(forced))]
+    return max(paths, key=lambda p: path_score(p, scores, penalties))
+
+
+C, E, G, A = 0, 4, 7, 9
+C_MAJOR, A_MINOR = key_tracker.state_index(C, False), key_tracker.state_index(A, True)
+
+print("\n=== Scale matrix and penalties ===")
+check("C major scale", np.flatnonzero(key_tracker.SCALE_MATRIX[C_MAJOR]).tolist(), [0, 2, 4, 5, 7, 9, 11])
+check("A harmonic minor scale", np.flatnonzero(key_tracker.SCALE_MATRIX[A_MINOR]).tolist(),
+      [0, 2, 4, 5, 8, 9, 11])
+penalties = key_tracker.transition_penalties(2.0, 0.5)
+check("stay / relative / other",
+      (penalties[C_MAJOR, C_MAJOR], penalties[C_MAJOR, A_MINOR], penalties[A_MINOR, C_MAJOR],
+       penalties[C_MAJOR, key_tracker.state_index(G, False)]), (0.0, 0.5, 0.5, 2.0))
+
+print("\n=== window_fit ===")
+triad = counts_of((C, E, G))
+fit = key_tracker.window_fit(triad, 1)
+check("C triad fits C major", fit[0, C_MAJOR], 1.0)
+check("C triad in A harmonic minor (no G)", round(fit[0, A_MINOR], 4), round(2 / 3, 4))
+counts = counts_of((C, E, G), (), (6, 10, 1))
+fit = key_tracker.window_fit(counts, 1)
+check("N.C. row scores 0", fit[1].tolist(), [0.0] * 24)
+fit = key_tracker.window_fit(counts, 3)
+check("window clipped at the start", fit[0, C_MAJOR], 1.0)
+check("window spans both triads", fit[1, C_MAJOR], 0.5)
+check("window clipped at the end", close(fit[2], key_tracker.window_fit(counts_of((6, 10, 1)), 1)[0]), True)
+rng = np.random.default_rng(11)
+random_counts = (rng.random((40, 12)) < 0.3).astype(float)
+random_counts[[3, 17, 18]] = 0.0   # N.C. rows
+for window in (1, 2, 4, 7, 60):
+    check(f"window {window} matches the direct count",
+          close(key_tracker.window_fit(random_counts, window), direct_fit(random_counts, window)), True)
+
+print("\n=== viterbi ===")
+penalties = np.array([[0.0, 1.0, 1.0], [1.0, 0.0, 1.0], [1.0, 1.0, 0.0]])
+scores = np.array([[1.0, 0.0, 0.0], [1.0, 0.0, 0.0], [0.2, 0.9, 0.0], [1.0, 0.0, 0.0]])
+check("one-row blip smoothed over", key_tracker.viterbi(scores, penalties).tolist(), [0, 0, 0, 0])
+scores = np.array([[1.0, 0.0, 0.0], [1.0, 0.0, 0.0], [0.0, 1.0, 0.0], [0.0, 1.0, 0.0], [0.0, 1.0, 0.0]])
+check("lasting change followed", key_tracker.viterbi(scores, penalties).tolist(), [0, 0, 1, 1, 1])
+forced = np.array([-1, 2, -1, -1, -1])
+check("forced row pinned", key_tracker.viterbi(scores, penalties, forced).tolist(), [0, 2, 1, 1, 1])
+check("forced rows leave the input alone", scores[1].tolist(), [1.0, 0.0, 0.0])
+check("single row", key_tracker.viterbi(np.array([[0.1, 0.7, 0.2]]), penalties).tolist(), [1])
+for trial in range(20):
+    scores = rng.random((6, 3))
+    forced = np.where(rng.random(6) < 0.3, rng.integers(0, 3, 6), -1) if trial % 2 else None
+    best = key_tracker.viterbi(scores, penalties, forced)
+    expected = exhaustive(scores, penalties, forced)
+    if not np.isclose(path_score(best, scores, penalties), path_score(expected, scores, penalties)) \
+            or (forced is not None and any(f >= 0 and best[i] != f for i, f in enumerate(forced))):
+        check(f"random trial {trial} is optimal", best.tolist(), list(expected))
+        break
+else:
+    check("20 random trials optimal (forced rows respected)", True, True)
+
+print("\n=== detect_key_centers ===")
+
+
+def progression(symbols):
+    return [{'symbol': s, 'measure': i + 1, 'beat': 1} for i, s in enumerate(symbols.split())]
+
+
+def regions(chords, detected_key=None):
+    return [(r['start_index'], r['end_index'], r['key_center'], r['mode'])
+            for r in detect_key_centers(chords, detected_key)]
+
+
+three_keys = progression("Dm7 G7 Cmaj7 Cmaj7 Gm7 C7 Fmaj7 Fmaj7 Am7 D7 Gmaj7 Gmaj7")
+found = regions(three_keys)
+check("three keys in order", [(k, m) for _, _, k, m in found], [('C', 'major'), ('F', 'major'), ('G', 'major')])
+check("regions cover every chord once",
+      [i for start, end, _, _ in found for i in range(start, end + 1)], list(range(12)))
+key_of = {i: k for start, end, k, _ in found for i in range(start, end + 1)}
+check("each ii-V-I inside its key", [key_of[i] for i in (0, 1, 2, 4, 5, 6, 8, 9, 10)],
+      ['C'] * 3 + ['F'] * 3 + ['G'] * 3)
+check("pattern-backed regions are confident",
+      {r['confidence'] for r in detect_key_centers(three_keys)}, {0.8})
+excursion = regions(progression("Dm7 G7 Cmaj7 Cmaj7 Ebm7 Ab7 Dbmaj7 Dbmaj7 Dm7 G7 Cmaj7 Cmaj7"))
+check("excursion to Db and back", [k for _, _, k, _ in excursion], ['C', 'Db', 'C'])
+check("excursion starts on its ii", [s for s, _, k, _ in excursion if k == 'Db'], [4])
+
+no_chords = progression("N.C. N.C. N.C. N.C.")
+check("all N.C.: one default region", regions(no_chords), [(0, 3, 'C', 'major')])
+check("all N.C.: low confidence", [r['confidence'] for r in detect_key_centers(no_chords)], [0.5])
+check("all N.C.: detected key used", regions(no_chords, 'Eb major'), [(0, 3, 'Eb', 'major')])
+check("empty input", detect_key_centers([]), [])
+
+print(f"\n{'ALL PASS' if failures == 0 else f'{failures} FAILURES'}")
+sys.exit(1 if failures else 0)
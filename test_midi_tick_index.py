@@ -0,0 +1,117 @@
+"""Meter- and tempo-change handling in MIDI import (TickIndex).
+
+Writes small MIDI files with mido and checks measure/beat/seconds lookups
+and parse_midi_file's measure numbers across time-signature changes.
+
+    python test_midi_tick_index.py
+"""
+import os
+import sys
+import tempfile
+sys.path.insert(0, os.path.dirname(__file__))
+
+import mido
+
+from app.services.midi_events import TickIndex, decode_midi
+from app.services.midi_parser import parse_midi_file
+
+TPB = 480
+failures = 0
+
+
+def check(label, got, expected):
+    global failures
+    if got == expected:
+        print(f"  PASS: {label}")
+    else:
+        failures += 1
+        print(f"  FAIL: {label}: got {got!r}, expected {expected!r}")
+
+
+def write_midi(path, meta, notes):
+    """meta: [(tick, MetaMessage)]; notes: [(tick, pitch, beats)] on one track."""
+    mid = mido.MidiFile(ticks_per_beat=TPB)
+    conductor = mido.MidiTrack()
+    last = 0
+    for tick, msg in meta:
+        conductor.append(msg.copy(time=tick - last))
+        last = tick
+    events = []
+    for tick, pitch, beats in notes:
+        events.append((tick, 'note_on', pitch))
+        events.append((tick + int(beats * TPB), 'note_off', pitch))
+    events.sort(key=lambda e: (e[0], e[1] == 'note_on'))
+    track = mido.MidiTrack()
+    last = 0
+    for tick, kind, pitch in events:
+        track.append(mido.Message(kind, note=pitch, velocity=80, time=tick - last))
+        last = tick
+    mid.tracks.extend([conductor, track])
+    mid.save(path)
+
+
+def ts(num, den):
+    return mido.MetaMessage('time_signature', numerator=num, denominator=den)
+
+
+def tempo(bpm):
+    return mido.MetaMessage('set_tempo', tempo=mido.bpm2tempo(bpm))
+
+
+with tempfile.TemporaryDirectory() as tmp:
+    print("=== Meter changes: two bars of 4/4, two of 3/4, then 6/8 ===")
+    path = os.path.join(tmp, 'meters.mid')
+    bar3 = 8 * TPB           # 3/4 starts at measure 3
+    bar5 = bar3 + 6 * TPB    # 6/8 starts at measure 5
+    write_midi(
+        path,
+        [(0, ts(4, 4)), (0, tempo(120)), (bar3, ts(3, 4)), (bar3, tempo(60)), (bar5, ts(6, 8))],
+        [(0, 60, 1), (0, 64, 1), (0, 67, 1),            # m1 b1
+         (6 * TPB, 62, 1),                             # m2 b3
+         (bar3, 65, 1), (bar3, 69, 1), (bar3, 72, 1),  # m3 b1
+         (bar3 + 5 * TPB, 67, 1),                      # m4 b3
+         (bar5 + TPB // 2, 60, 1),                     # m5 b1.5
+         (bar5 + 3 * TPB, 64, 1)],                     # m6 b1
+    )
+    events = decode_midi(path)
+    index = TickIndex.from_events(events)
+    measures, beats, seconds = index.locate(events.onset)
+    check("measures", measures.tolist(), [1, 1, 1, 2, 3, 3, 3, 4, 5, 6])
+    check("beats", beats.tolist(), [1.0, 1.0, 1.0, 3.0, 1.0, 1.0, 1.0, 3.0, 1.5, 1.0])
+    # 8 beats at 120 BPM = 4s, then 60 BPM
+    check("seconds", [round(s, 3) for s in seconds.tolist()],
+          [0.0, 0.0, 0.0, 3.0, 4.0, 4.0, 4.0, 9.0, 10.5, 13.0])
+
+    song = parse_midi_file(path, chord_window_beats=1.0)
+    check("note measures", song.notes.measure_number.tolist(), [1, 1, 1, 2, 3, 3, 3, 4, 5, 6])
+    check("chord positions", [(c.measure_number, c.beat_position) for c in song.chords],
+          [(1, 1.0), (3, 1.0)])
+    check("total measures", song.total_measures, 6)
+    check("tempo label (opening)", song.tempo, 120)
+
+    print("\n=== Mid-bar meter change and pickup bar ===")
+    path = os.path.join(tmp, 'pickup.mid')
+    # A 1/4 pickup bar, then 4/4; the 3/4 change lands 2 beats into measure 4
+    change = TPB + 2 * 4 * TPB + 2 * TPB
+    write_midi(
+        path,
+        [(0, ts(1, 4)), (TPB, ts(4, 4)), (change, ts(3, 4))],
+        [(0, 67, 1), (TPB, 60, 4), (change - TPB, 62, 1), (change, 64, 1), (change + 3 * TPB, 65, 1)],
+    )
+    events = decode_midi(path)
+    index = TickIndex.from_events(events)
+    measures, beats, _ = index.locate(events.onset)
+    check("measures", measures.tolist(), [1, 2, 4, 5, 6])
+    check("beats", beats.tolist(), [1.0, 1.0, 2.0, 1.0, 1.0])
+    song = parse_midi_file(path)
+    check("time signature label (prevailing)", song.time_signature, "4/4")
+
+    print("\n=== No meta events: 4/4 at 120 BPM ===")
+    path = os.path.join(tmp, 'plain.mid')
+    write_midi(path, [], [(0, 60, 1), (4 * TPB, 62, 1)])
+    song = parse_midi_file(path)
+    check("defaults", (song.tempo, song.time_signature), (120, "4/4"))
+    check("measures", song.notes.measure_number.tolist(), [1, 2])
+
+print(f"\n{'ALL PASS' if failures == 0 else f'{failures} FAILURES'}")
+sys.exit(1 if failures else 0)
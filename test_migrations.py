@@ -0,0 +1,152 @@
+"""schema_version fast path for run_migrations (app.migrations).
+
+Runs the migrations against a fake connection that records every
+statement and answers the existence probes as "already there". Checks that
+a current schema costs one query, that only migrations newer than the
+recorded version run, that seeds re-apply only when their content hash
+changes, and that a migration warning keeps the recorded version.
+
+    python test_migrations.py
+"""
+import os
+import sys
+from contextlib import contextmanager
+sys.path.insert(0, os.path.dirname(__file__))
+
+import logging
+logging.disable(logging.INFO)
+
+from app import migrations
+
+failures = 0
+
+
+def check(label, got, expected):
+    global failures
+    if got == expected:
+        print(f"  PASS: {label}")
+    else:
+        failures += 1
+        print(f"  FAIL: {label}: got {got!r}, expected {expected!r}")
+
+
+class FakeTransaction:
+    def __init__(self, db):
+        self.db = db
+
+    def execute(self, query, params=None):
+        self.db.statements.append(('tx_execute', query, params))
+        return 0
+
+    def executemany(self, query, rows):
+        rows = list(rows)
+        self.db.statements.append(('executemany', query, len(rows)))
+        return len(rows)
+
+
+class FakeDb:
+    """Every table and column exists; schema_version lives in a dict."""
+
+    def __init__(self, schema_version=None, fail_on=None):
+        self.schema_version = schema_version   # None: table missing
+        self.fail_on = fail_on
+        self.statements = []
+
+    def execute_query(self, query, params=None):
+        self.statements.append(('query', query, params))
+        if 'FROM schema_version' in query:
+            if self.schema_version is None:
+                raise RuntimeError("Invalid object name 'schema_version'")
+            return [{'name': name, 'version': v, 'content_hash': h}
+                    for name, (v, h) in self.schema_version.items()]
+        return []
+
+    def execute_scalar(self, query, params=None):
+        self.statements.append(('scalar', query, params))
+        if self.fail_on and self.fail_on in query:
+            raise RuntimeError("probe failed")
+        return 1
+
+    def execute_non_query(self, query, params=None):
+        self.statements.append(('non_query', query, params))
+        if 'CREATE TABLE schema_version' in query and self.schema_version is None:
+            self.schema_version = {}
+        if 'MERGE schema_version' in query:
+            name, version, content_hash = params[:3]
+            self.schema_version[name] = (version, content_hash)
+        return 1
+
+    @contextmanager
+    def transaction(self):
+        yield FakeTransaction(self)
+
+    def close(self):
+        pass
+
+
+def run(db, **kwargs):
+    migrations.DatabaseConnection = lambda **_: db
+    return migrations.run_migrations(**kwargs)
+
+
+def probes(db):
+    return sum(1 for kind, _, _ in db.statements if kind == 'scalar')
+
+
+print("\n=== First run (no schema_version table) ===")
+db = FakeDb()
+result = run(db)
+check("every migration runs", result['migrations'], [n for n, _ in migrations._MIGRATIONS])
+check("every seed applied", result['seeds'], ['jazz_theory_patterns', 'jazz_theory_docs', 'analysis_rules'])
+check("version recorded", db.schema_version['schema'][0], migrations.SCHEMA_VERSION)
+check("seed hashes recorded", sorted(k for k in db.schema_version if k.startswith('seed:')),
+      ['seed:analysis_rules', 'seed:jazz_theory_docs', 'seed:jazz_theory_patterns'])
+seed_inserts = [q for kind, q, _ in db.statements if kind == 'executemany']
+check("seeds only insert what is missing",
+      all('IF NOT EXISTS' in q or 'MERGE jazz_theory_docs' in q for q in seed_inserts), True)
+rule_seed = [q for kind, q, _ in db.statements if kind == 'tx_execute' and 'INSERT INTO analysis_rules' in q]
+check("rules seeded into an empty table only (titles are editable)",
+      [q.startswith("IF NOT EXISTS (SELECT 1 FROM analysis_rules) ") for q in rule_seed], [True])
+
+print("\n=== Current schema ===")
+current = FakeDb(dict(db.schema_version))
+result = run(current)
+check("nothing runs", (result['migrations'], result['seeds']), ([], []))
+check("a single query", [kind for kind, _, _ in current.statements], ['query'])
+
+print("\n=== Behind by three migrations ===")
+behind = dict(db.schema_version, schema=(19, None))
+db = FakeDb(behind)
+result = run(db)
+check("only newer migrations run", result['migrations'], [20, 21, 22])
+check("only their probes", probes(db), 4 + 6 + 2)
+check("version brought up to date", db.schema_version['schema'][0], migrations.SCHEMA_VERSION)
+check("unchanged seeds skipped", result['seeds'], [])
+
+print("\n=== Changed seed ===")
+changed = dict(current.schema_version, **{'seed:analysis_rules': (None, 'old-hash')})
+db = FakeDb(changed)
+result = run(db)
+check("only the changed seed runs", (result['migrations'], result['seeds']), ([], ['analysis_rules']))
+check("no INFORMATION_SCHEMA probes", probes(db), 0)
+
+print("\n=== Migration warning ===")
+db = FakeDb(dict(current.schema_version, schema=(17, None)), fail_on="'SongAnalysis'")
+result = run(db)
+check("warning counted", result['warnings'] >= 1, True)
+check("version left behind", db.schema_version['schema'][0], 17)
+
+print("\n=== Force ===")
+db = FakeDb(dict(current.schema_version))
+result = run(db, force=True)
+check("force re-runs everything", (len(result['migrations']), len(result['seeds'])),
+      (len(migrations._MIGRATIONS), len(migrations._SEEDS)))
+
+print("\n=== Status ===")
+status = migrations.migration_status(FakeDb(dict(current.schema_version, schema=(12, None))))
+check("status", (status['recorded_version'], status['schema_version'],
+                 all(s['current'] for s in status['seeds'].values())),
+      (12, migrations.SCHEMA_VERSION, True))
+
+print(f"\n{'ALL PASS' if failures == 0 else f'{failures} FAILURES'}")
+sys.exit(1 if failures else 0)
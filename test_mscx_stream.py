@@ -0,0 +1,119 @@
+"""Streaming MuseScore parsing (mscx_stream.scan_mscx) through both parsers.
+
+Checks staff selection (part definitions, grand staff, MuseScore 3 excerpt
+scores, measures outside any staff), header values, dynamics, and that
+both parse_music_file and parse_upload_full read the same .mscz, and that
+parse_upload gives the same results from a single scan.
+
+    python test_mscx_stream.py
+"""
+import io
+import os
+import sys
+import zipfile
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app.services.import_engine import parse_upload, parse_upload_full
+from app.services.mscx_stream import scan_mscx
+from app.services.score_parser import parse_music_file
+
+failures = 0
+
+
+def check(label, got, expected):
+    global failures
+    if got == expected:
+        print(f"  PASS: {label}")
+    else:
+        failures += 1
+        print(f"  FAIL: {label}: got {got!r}, expected {expected!r}")
+
+
+def measure(pitches, harmony=None, extra=''):
+    chords = ''.join(
+        f'<Chord><durationType>quarter</durationType><Note><pitch>{p}</pitch></Note></Chord>'
+        for p in pitches
+    )
+    harm = f'<Harmony><root>{harmony[0]}</root><name>{harmony[1]}</name></Harmony>' if harmony else ''
+    return f'<Measure><voice>{harm}{extra}{chords}</voice></Measure>'
+
+
+GRAND_STAFF = f"""<?xml version="1.0" encoding="UTF-8"?>
+<museScore version="4.20"><programVersion>4.2.1</programVersion><Score>
+<metaTag name="workTitle">Grand</metaTag>
+<Part id="1"><Staff id="1"/><Staff id="2"/><trackName>Piano</trackName></Part>
+<Staff id="1">
+{measure([60, 62], (14, 'maj7'), '<KeySig><accidental>-1</accidental></KeySig>'
+         '<TimeSig><sigN>3</sigN><sigD>4</sigD></TimeSig>'
+         '<Dynamic><subtype>mf</subtype><velocity>80</velocity></Dynamic>')}
+{measure([64], (19, 'm7'))}
+</Staff>
+<Staff id="2">{measure([48])}{measure([43])}</Staff>
+</Score></museScore>""".encode('utf-8')
+
+print("\n=== Grand staff with part definitions ===")
+score = parse_music_file(GRAND_STAFF, 'grand.mscx')
+check("title", score.title, 'Grand')
+check("key / time signature", (score.key, score.time_signature), ('F', '3/4'))
+check("chords from first content staff",
+      [(c.measure_number, c.chord_symbol) for c in score.chords], [(1, 'Cmaj7'), (2, 'Fm7')])
+check("notes from first content staff only", score.notes.midi_pitch.tolist(), [60, 62, 64])
+rich = parse_upload_full(GRAND_STAFF, 'grand.mscx')
+check("rich tracks", rich['metadata']['track_count'], 2)
+check("rich measure count", rich['metadata']['measure_count'], 2)
+check("rich notes by track",
+      [(n['track_num'], n['midi_pitch']) for n in rich['notes']],
+      [(0, 60), (0, 62), (0, 64), (1, 48), (1, 43)])
+check("track name from Part", rich['notes'][0]['track_name'], 'Piano')
+check("dynamics", rich['dynamics'],
+      [{'track_num': 0, 'measure_num': 1, 'beat': 1.0, 'dynamic': 'mf', 'velocity': 80}])
+check("raw_xml kept as bytes", rich['raw_xml'], GRAND_STAFF)
+
+print("\n=== .mscz read by both parsers ===")
+buf = io.BytesIO()
+with zipfile.ZipFile(buf, 'w') as zf:
+    zf.writestr('grand.mscx', GRAND_STAFF)
+mscz = buf.getvalue()
+check("parse_music_file", parse_music_file(mscz, 'grand.mscz').notes.midi_pitch.tolist(), [60, 62, 64])
+check("parse_upload_full format", parse_upload_full(mscz, 'grand.mscz')['import_format'], 'mscz')
+
+print("\n=== parse_upload: one scan for both ===")
+both = parse_upload(mscz, 'grand.mscz')
+check("score matches parse_music_file", repr(both.score), repr(parse_music_file(mscz, 'grand.mscz')))
+check("rich matches parse_upload_full", repr(both.rich), repr(parse_upload_full(mscz, 'grand.mscz')))
+check("no rich error", both.rich_error, None)
+bad_sig = GRAND_STAFF.replace(b'<sigN>3</sigN>', b'<sigN>x</sigN>')
+partial = parse_upload(bad_sig, 'bad_sig.mscx')
+check("score survives a rich parse failure", (partial.score.time_signature, partial.rich),
+      ('x/4', None))
+check("rich failure reported", 'ValueError' in (partial.rich_error or ''), True)
+
+print("\n=== MuseScore 3 excerpt scores are not extra tracks ===")
+WITH_EXCERPT = f"""<museScore version="3.02"><programVersion>3.6.2</programVersion><Score>
+<Staff id="1">{measure([60])}</Staff>
+<Score><Staff id="1">{measure([72])}</Staff></Score>
+</Score></museScore>""".encode('utf-8')
+rich = parse_upload_full(WITH_EXCERPT, 'excerpt.mscx')
+check("main score staff only", [n['midi_pitch'] for n in rich['notes']], [60])
+
+print("\n=== Measures outside any staff ===")
+LOOSE = f"<museScore><Score>{measure([65])}{measure([67])}</Score></museScore>".encode('utf-8')
+check("score notes", parse_music_file(LOOSE, 'loose.mscx').notes.midi_pitch.tolist(), [65, 67])
+check("rich notes", [n['midi_pitch'] for n in parse_upload_full(LOOSE, 'loose.mscx')['notes']], [65, 67])
+
+print("\n=== Measures are dropped once visited ===")
+sizes = []
+scan_mscx(GRAND_STAFF, [lambda staff, m: sizes.append(len(m))])
+check("each measure complete when visited", sizes, [1, 1, 1, 1])
+
+print("\n=== Malformed input ===")
+try:
+    parse_music_file(b'<museScore><Score>', 'bad.mscx')
+    check("ValueError", None, 'ValueError')
+except ValueError as e:
+    check("ValueError", str(e).startswith('Could not parse MuseScore XML'), True)
+latin1 = GRAND_STAFF.replace(b'Grand</metaTag>', b'Gr\xe4nd</metaTag>')
+check("undecodable bytes replaced", parse_music_file(latin1, 'x.mscx').title, 'Gr�nd')
+
+print(f"\n{'ALL PASS' if failures == 0 else f'{failures} FAILURES'}")
+sys.exit(1 if failures else 0)
@@ -0,0 +1,205 @@
+"""Streaming MusicXML reader (musicxml_stream) vs the music21 path.
+
+parse_music_file reads MusicXML with musicxml_stream.scan_musicxml and
+only falls back to music21 for documents the reader does not reproduce.
+These checks parse the same documents both ways: title, key, time
+signature and every chord symbol (figure, measure, beat, order) must
+match, across chord kinds, slash basses and degrees, pickups, compound
+meters, <offset>/<backup>, multi-staff parts and compressed .mxl. Also
+checks the notes the reader adds and the fallback cases.
+
+    python test_musicxml_reader.py
+"""
+import io
+import logging
+import os
+import sys
+import warnings
+import zipfile
+sys.path.insert(0, os.path.dirname(__file__))
+logging.disable(logging.WARNING)
+warnings.simplefilter('ignore')
+
+from app.services.musicxml_stream import Unsupported, read_musicxml, scan_musicxml
+from app.services.score_parser import _parse_musicxml_music21, parse_music_file
+
+failures = 0
+
+
+def check(label, got, expected):
+    global failures
+    if got == expected:
+        print(f"  PASS: {label}")
+    else:
+        failures += 1
+        print(f"  FAIL: {label}: got {got!r}, expected {expected!r}")
+
+
+def note(step, octave=4, dur=2, kind='quarter', alter=0, extra='', staff=None):
+    alter_el = f'<alter>{alter}</alter>' if alter else ''
+    staff_el = f'<staff>{staff}</staff>' if staff else ''
+    return (f'<note>{extra}<pitch><step>{step}</step>{alter_el}<octave>{octave}</octave></pitch>'
+            f'<duration>{dur}</duration><voice>1</voice><type>{kind}</type>{staff_el}</note>')
+
+
+def harmony(root, kind, alter=None, bass=None, degrees=(), offset=None, text=None, staff=None):
+    out = [f'<harmony><root><root-step>{root}</root-step>']
+    if alter is not None:
+        out.append(f'<root-alter>{alter}</root-alter>')
+    out.append('</root>')
+    out.append(f'<kind text="{text}">{kind}</kind>' if text else f'<kind>{kind}</kind>')
+    if bass:
+        out.append(f'<bass><bass-step>{bass[0]}</bass-step><bass-alter>{bass[1]}</bass-alter></bass>')
+    for value, alter_by, kind_of in degrees:
+        out.append(f'<degree><degree-value>{value}</degree-value><degree-alter>{alter_by}'
+                   f'</degree-alter><degree-type>{kind_of}</degree-type></degree>')
+    if offset is not None:
+        out.append(f'<offset>{offset}</offset>')
+    if staff:
+        out.append(f'<staff>{staff}</staff>')
+    out.append('</harmony>')
+    return ''.join(out)
+
+
+def attributes(beats='4', beat_type=4, divisions=2, staves=1):
+    return (f'<attributes><divisions>{divisions}</divisions><key><fifths>0</fifths></key>'
+            f'<time><beats>{beats}</beats><beat-type>{beat_type}</beat-type></time>'
+            f'<staves>{staves}</staves></attributes>')
+
+
+def score(*parts, title='Test Tune', head=''):
+    part_list = ''.join(f'<score-part id="P{i}"><part-name>P{i}</part-name></score-part>'
+                        for i in range(1, len(parts) + 1))
+    body = ''.join(f'<part id="P{i}">{"".join(p)}</part>' for i, p in enumerate(parts, start=1))
+    return (f'<?xml version="1.0" encoding="UTF-8"?><score-partwise version="4.0">'
+            f'<work><work-title>{title}</work-title></work>{head}'
+            f'<part-list>{part_list}</part-list>{body}</score-partwise>').encode('utf-8')
+
+
+def summary(parsed):
+    return (parsed.title, parsed.key, parsed.time_signature,
+            [(c.measure_number, c.beat_position, c.chord_symbol, c.chord_order) for c in parsed.chords])
+
+
+def same_as_music21(label, data, filename='test.musicxml'):
+    xml = read_musicxml(data, filename)
+    scan_musicxml(xml)  # must not need the fallback
+    check(label, summary(parse_music_file(data, filename)), summary(_parse_musicxml_music21(xml, filename)))
+
+
+def measure(number, *content):
+    return f'<measure number="{number}">{"".join(content)}</measure>'
+
+
+print("\n=== Chord figures ===")
+kinds = [
+    ('C', 'major', {}), ('D', 'minor', {'alter': 0}), ('E', 'dominant', {'alter': -1}),
+    ('F', 'major-seventh', {'alter': 1}), ('G', 'half-diminished', {}),
+    ('A', 'diminished-seventh', {'alter': -1}), ('B', 'suspended-fourth', {'alter': -1}),
+    ('C', 'major-minor', {}), ('D', 'augmented-seventh', {}), ('E', 'power', {}),
+    ('F', 'other', {}), ('G', 'major', {'bass': ('B', 0)}), ('A', 'minor-seventh', {'bass': ('G', 0)}),
+    ('C', 'dominant', {'degrees': [(9, -1, 'add'), (5, 1, 'alter')]}),
+    ('C', 'major', {'bass': ('C', 0), 'degrees': [(2, 0, 'add')]}),
+    ('D', 'dominant-13th', {'text': '13'}), ('E', 'minor-major', {}),
+]
+bars = [measure(1, attributes(), *(harmony(r, k, **kw) for r, k, kw in kinds[:4]), note('C', dur=8, kind='whole'))]
+for i in range(4, len(kinds), 2):
+    bars.append(measure(len(bars) + 1, *(harmony(r, k, **kw) + note('E', dur=4, kind='half')
+                                         for r, k, kw in kinds[i:i + 2])))
+bars.append(measure(len(bars) + 1, '<harmony><kind text="N.C.">none</kind></harmony>',
+                    note('G', dur=8, kind='whole')))
+same_as_music21("figures, orders and beats", score(bars))
+
+print("\n=== Beat positions ===")
+pickup = [
+    measure(0, attributes('3', 4), note('G', dur=2), harmony('C', 'major'), note('G', dur=2)),
+    measure(1, harmony('F', 'major'), note('A', dur=4, kind='half'), harmony('G', 'dominant'), note('B')),
+]
+same_as_music21("pickup measure", score(pickup))
+compound = [measure(1, attributes('6', 8, divisions=4),
+                    *(note('C', dur=2, kind='eighth') + (harmony('D', 'minor') if i == 3 else '')
+                      for i in range(6)))]
+same_as_music21("6/8 beats", score(compound))
+additive = [measure(1, attributes('3+2', 8, divisions=4), harmony('C', 'major'),
+                    *(note('C', dur=2, kind='eighth') + (harmony('G', 'major') if i == 1 else '')
+                      for i in range(5)))]
+same_as_music21("3+2/8 beats", score(additive))
+offsets = [measure(1, attributes(), note('C'), harmony('E', 'minor', offset=1), note('D'),
+                   note('E', dur=4, kind='half'), '<backup><duration>8</duration></backup>',
+                   harmony('A', 'minor'), note('A', 3, dur=8, kind='whole'),
+                   note('C', dur=8, kind='whole', extra='<chord/>'))]
+same_as_music21("<offset> and <backup>", score(offsets))
+
+print("\n=== Parts and staves ===")
+piano = [measure(1, attributes(staves=2), harmony('C', 'major'), note('E', dur=8, kind='whole', staff=1),
+                 '<backup><duration>8</duration></backup>',
+                 harmony('G', 'major', staff=2), note('C', 3, dur=8, kind='whole', staff=2))]
+bass = [measure(1, attributes(), harmony('D', 'minor'), note('A', 2, dur=8, kind='whole'))]
+two_parts = score(piano, bass)
+same_as_music21("chords from the first part's first staff", two_parts)
+parsed = parse_music_file(two_parts, 'two.musicxml')
+check("notes from the first part's first staff", parsed.notes.midi_pitch.tolist(), [64])
+
+print("\n=== Notes ===")
+melody = [measure(1, attributes(), note('C'), note('E', extra='<chord/>'), note('G'),
+                  '<note><rest/><duration>2</duration><voice>1</voice><type>quarter</type></note>',
+                  note('B', alter=-1, dur=3, kind='quarter'),
+                  note('D', 5, dur=1, kind='eighth')),
+          measure(2, note('C', 5, dur=8, kind='whole'),
+                  '<note><grace/><pitch><step>D</step><octave>5</octave></pitch><type>eighth</type></note>')]
+notes = parse_music_file(score(melody), 'melody.musicxml').notes
+check("measures", notes.measure_number.tolist(), [1, 1, 1, 1, 1, 2])
+check("beats from divisions", notes.beat_position.tolist(), [1.0, 1.0, 2.0, 4.0, 5.5, 1.0])
+check("pitches (chord tones, alters, grace notes skipped)",
+      notes.midi_pitch.tolist(), [60, 64, 67, 70, 74, 72])
+check("durations", notes.duration_beats.tolist(), [1.0, 1.0, 1.0, 1.5, 0.5, 4.0])
+check("duration types", notes.duration_type.tolist(),
+      ['quarter', 'quarter', 'quarter', 'quarter', 'eighth', 'whole'])
+
+print("\n=== Header values ===")
+head = '<movement-title>Movement</movement-title>'
+tempo = [measure(1, attributes('3', 4),
+                 '<direction><direction-type><metronome><beat-unit>quarter</beat-unit>'
+                 '<per-minute>132.5</per-minute></metronome></direction-type></direction>',
+                 note('D', dur=6, kind='half'))]
+parsed = parse_music_file(score(tempo, head=head), 'tempo.musicxml')
+check("work title, meter, metronome tempo", (parsed.title, parsed.time_signature, parsed.tempo),
+      ('Test Tune', '3/4', 132))
+parsed = parse_music_file(score(tempo, title='Movement', head=head), 'Same Title.musicxml')
+check("work title equal to the movement title is ignored", parsed.title, 'Same Title')
+sound = [measure(1, attributes(), '<direction><sound tempo="96"/></direction>', note('C', dur=8, kind='whole'))]
+check("tempo from <sound tempo>", parse_music_file(score(sound), 's.musicxml').tempo, 96)
+same_as_music21("key from the notes of every part", score(melody, bass))
+
+print("\n=== Compressed .mxl ===")
+buf = io.BytesIO()
+with zipfile.ZipFile(buf, 'w', zipfile.ZIP_DEFLATED) as zf:
+    zf.writestr('META-INF/container.xml',
+                '<container><rootfiles><rootfile full-path="score/tune.xml"/></rootfiles></container>')
+    zf.writestr('score/tune.xml', score(pickup))
+same_as_music21(".mxl rootfile", buf.getvalue(), 'tune.mxl')
+
+print("\n=== music21 fallback ===")
+inversion = [measure(1, attributes(), '<harmony><root><root-step>C</root-step></root><kind>major</kind>'
+                     '<inversion>1</inversion></harmony>', note('C', dur=8, kind='whole'))]
+try:
+    scan_musicxml(score(inversion))
+    check("<inversion> without <bass> needs music21", None, 'Unsupported')
+except Unsupported:
+    check("<inversion> without <bass> needs music21", True, True)
+check("fallback result", [c.chord_symbol for c in parse_music_file(score(inversion), 'inv.musicxml').chords],
+      ['C/E'])
+timewise = b'<score-timewise><part-list/></score-timewise>'
+try:
+    parse_music_file(timewise, 'timewise.musicxml')
+    check("score-timewise rejected", None, 'ValueError')
+except ValueError as e:
+    check("score-timewise rejected", 'score-partwise' in str(e), True)
+try:
+    parse_music_file(b'<score-partwise><part>', 'bad.musicxml')
+    check("malformed XML", None, 'ValueError')
+except ValueError:
+    check("malformed XML", True, True)
+
+print(f"\n{'ALL PASS' if failures == 0 else f'{failures} FAILURES'}")
+sys.exit(1 if failures else 0)
@@ -0,0 +1,89 @@
+"""Content-addressed parse cache (app.services.parse_cache).
+
+Checks hits and misses for identical bytes, that the filename and parser
+version are part of the key, LRU eviction under the size bound, and that
+a corrupt entry is treated as a miss.
+
+    python test_parse_cache.py
+"""
+import os
+import sys
+import tempfile
+import time
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app.services import parse_cache
+from app.services.parse_cache import ParseCache, cached_parse
+
+failures = 0
+
+
+def check(label, got, expected):
+    global failures
+    if got == expected:
+        print(f"  PASS: {label}")
+    else:
+        failures += 1
+        print(f"  FAIL: {label}: got {got!r}, expected {expected!r}")
+
+
+calls = []
+
+
+def fake_parse(content, filename):
+    calls.append(filename)
+    return {'title': os.path.splitext(filename)[0], 'size': len(content), 'notes': list(content)}
+
+
+with tempfile.TemporaryDirectory() as tmp:
+    print("\n=== Hits and misses ===")
+    parse_cache._cache = ParseCache(os.path.join(tmp, 'a'), 1024 * 1024)
+    first = cached_parse('score', fake_parse, b'abc', 'song.mscx')
+    second = cached_parse('score', fake_parse, b'abc', 'song.mscx')
+    check("second parse served from cache", calls, ['song.mscx'])
+    check("cached value round-trips", second, first)
+    check("cached value is a copy", second is first, False)
+    cached_parse('score', fake_parse, b'abd', 'song.mscx')
+    cached_parse('score', fake_parse, b'abc', 'other.mscx')
+    cached_parse('full', fake_parse, b'abc', 'song.mscx')
+    check("bytes, filename and kind are all in the key", len(calls), 4)
+    check("stats", {k: parse_cache._cache.stats()[k] for k in ('hits', 'misses', 'entries')},
+          {'hits': 1, 'misses': 4, 'entries': 4})
+
+    print("\n=== Parser version ===")
+    old_version = parse_cache.PARSER_VERSION
+    parse_cache.PARSER_VERSION = old_version + '-next'
+    try:
+        cached_parse('score', fake_parse, b'abc', 'song.mscx')
+        check("version bump misses", len(calls), 5)
+    finally:
+        parse_cache.PARSER_VERSION = old_version
+
+    print("\n=== Eviction ===")
+    cache = ParseCache(os.path.join(tmp, 'b'), 3000)
+    blob = os.urandom(900)  # incompressible, so each entry is ~1 KB on disk
+    now = time.time()
+    for i in range(3):
+        cache.put(f'k{i}', blob)
+        os.utime(cache._path(f'k{i}'), (now - 100 + i, now - 100 + i))
+    cache.get('k0')  # k0 becomes most recently used
+    cache.put('k3', blob)
+    present = sorted(e.name.split('.')[0] for e in cache._entries())
+    check("least recently used entries evicted", present, ['k0', 'k3'])
+    check("within bound", cache.stats()['bytes'] <= 3000, True)
+
+    print("\n=== Corrupt entry ===")
+    with open(cache._path('k0'), 'wb') as fh:
+        fh.write(b'not a cache entry')
+    check("corrupt entry is a miss", cache.get('k0'), None)
+    check("corrupt entry removed", os.path.exists(cache._path('k0')), False)
+
+    print("\n=== Disabled ===")
+    parse_cache._cache = ParseCache(os.path.join(tmp, 'c'), 0)
+    cached_parse('score', fake_parse, b'abc', 'song.mscx')
+    cached_parse('score', fake_parse, b'abc', 'song.mscx')
+    check("PARSE_CACHE_MB=0 always parses", len(calls), 7)
+    check("nothing written", os.path.exists(os.path.join(tmp, 'c')), False)
+
+print(f"\n{'ALL PASS' if failures == 0 else f'{failures} FAILURES'}")
+sys.exit(1 if failures else 0)
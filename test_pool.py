@@ -0,0 +1,157 @@
+"""Bounded connection pool (app.db.pool.ConnectionPool) with a fake factory.
+
+Checks that checkout blocks at max_size and raises PoolTimeout once the
+checkout timeout passes, that a connection failing its ping (pyodbc.Error)
+is discarded and replaced, that idle connections are reaped down to
+min_size and closed outside the pool lock, and that release() rolls back a
+connection left in a transaction (discarding it if the rollback fails).
+
+    python test_pool.py
+"""
+import os
+import sys
+import threading
+import time
+sys.path.insert(0, os.path.dirname(__file__))
+
+import pyodbc
+from app.db.pool import ConnectionPool, PoolTimeout
+
+failures = 0
+
+
+def check(label, got, expected):
+    global failures
+    if got == expected:
+        print(f"  PASS: {label}")
+    else:
+        failures += 1
+        print(f"  FAIL: {label}: got {got!r}, expected {expected!r}")
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def execute(self, query):
+        if self.conn.dead:
+            raise pyodbc.Error('08S01', 'Communication link failure')
+
+    def fetchone(self):
+        return (1,)
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, pool_ref, number):
+        self.pool_ref = pool_ref
+        self.number = number
+        self.autocommit = True
+        self.dead = False
+        self.rollback_fails = False
+        self.rollbacks = 0
+        self.closed = False
+        self.closed_under_lock = None
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def rollback(self):
+        self.rollbacks += 1
+        if self.rollback_fails:
+            raise pyodbc.Error('08S01', 'Communication link failure')
+
+    def close(self):
+        self.closed = True
+        lock = self.pool_ref[0]._cond
+        free = lock.acquire(blocking=False)
+        if free:
+            lock.release()
+        self.closed_under_lock = not free
+
+
+def make_pool(**kwargs):
+    pool_ref, opened = [], []
+
+    def factory():
+        conn = FakeConnection(pool_ref, len(opened) + 1)
+        opened.append(conn)
+        return conn
+
+    pool = ConnectionPool(factory, **kwargs)
+    pool_ref.append(pool)
+    return pool, opened
+
+
+print("\n=== max_size and PoolTimeout ===")
+pool, opened = make_pool(max_size=2, checkout_timeout=0.2)
+a, b = pool.acquire(), pool.acquire()
+check("two connections opened", (len(opened), pool.stats()['in_use']), (2, 2))
+start = time.monotonic()
+try:
+    pool.acquire()
+    check("third checkout times out", None, 'PoolTimeout')
+except PoolTimeout:
+    check("third checkout times out", True, True)
+check("waited for the checkout timeout", time.monotonic() - start >= 0.2, True)
+check("timeout counted", (pool.stats()['timeouts'], pool.stats()['waits']), (1, 1))
+
+pool.checkout_timeout = 5
+got = []
+waiter = threading.Thread(target=lambda: got.append(pool.acquire()))
+waiter.start()
+time.sleep(0.1)
+check("checkout blocks at max_size", got, [])
+pool.release(a)
+waiter.join(2)
+check("released connection handed to the waiter", got, [a])
+check("no connection opened past max_size", (len(opened), pool.stats()['size']), (2, 2))
+
+print("\n=== Ping failure ===")
+pool, opened = make_pool(max_size=2, ping_interval=0)
+conn = pool.acquire()
+pool.release(conn)
+conn.dead = True
+replacement = pool.acquire()
+check("dead connection replaced", (replacement is conn, replacement.number), (False, 2))
+check("dead connection closed", conn.closed, True)
+stats = pool.stats()
+check("ping failure counted", (stats['ping_failures'], stats['discarded'], stats['size']), (1, 1, 1))
+pool.release(replacement)
+check("live connection passes its ping", pool.acquire() is replacement, True)
+
+print("\n=== Idle reaping ===")
+pool, opened = make_pool(min_size=1, max_size=4, idle_timeout=0.05, ping_interval=60)
+conns = [pool.acquire() for _ in range(3)]
+for conn in conns:
+    pool.release(conn)
+check("three idle", pool.stats()['idle'], 3)
+time.sleep(0.1)
+kept = pool.acquire()
+check("reaped down to min_size", (pool.stats()['size'], sum(c.closed for c in opened)), (1, 2))
+check("most recently used kept", kept is conns[-1], True)
+check("closed outside the pool lock", [c.closed_under_lock for c in opened if c.closed], [False, False])
+pool.release(kept)
+time.sleep(0.1)
+check("min_size never reaped", (pool.acquire() is kept, kept.closed), (True, False))
+
+print("\n=== Release rolls back an open transaction ===")
+pool, opened = make_pool(max_size=2, ping_interval=60)
+conn = pool.acquire()
+conn.autocommit = False
+pool.release(conn)
+check("rolled back and autocommit restored", (conn.rollbacks, conn.autocommit), (1, True))
+check("returned to the pool", (pool.stats()['idle'], pool.acquire() is conn), (1, True))
+conn.autocommit = False
+conn.rollback_fails = True
+pool.release(conn)
+check("failed rollback discards", (conn.closed, pool.stats()['size'], pool.stats()['discarded']),
+      (True, 0, 1))
+conn = pool.acquire()
+pool.release(conn)
+check("autocommit connection not rolled back", conn.rollbacks, 0)
+
+print(f"\n{'ALL PASS' if failures == 0 else f'{failures} FAILURES'}")
+sys.exit(1 if failures else 0)
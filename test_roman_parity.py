@@ -0,0 +1,90 @@
+"""Parity check: table-driven roman numerals vs music21.
+
+Compares app.services.roman_numerals against roman.romanNumeralFromChord
+for every root spelling x table quality x key, then compares full
+HarmonicAnalyzer chord output with the fast engine on and off for a set
+of real lead-sheet symbols.
+
+    python test_roman_parity.py            # all 30 music21 key spellings (slow, ~10 min)
+    python test_roman_parity.py --quick    # a handful of keys
+"""
+import logging
+import os
+import sys
+sys.path.insert(0, os.path.dirname(__file__))
+logging.disable(logging.WARNING)
+
+from music21 import harmony, key, roman
+from app.services.analysis_service import HarmonicAnalyzer
+from app.services.roman_numerals import QUALITY_THIRDS, roman_numeral
+
+ROOTS = [letter + acc for letter in 'CDEFGAB' for acc in ('', '#', '-')]
+ALL_KEYS = (
+    [(t, 'major') for t in ('C', 'G', 'D', 'A', 'E', 'B', 'F#', 'C#', 'F', 'B-', 'E-', 'A-', 'D-', 'G-', 'C-')]
+    + [(t, 'minor') for t in ('A', 'E', 'B', 'F#', 'C#', 'G#', 'D#', 'A#', 'D', 'G', 'C', 'F', 'B-', 'E-', 'A-')]
+)
+QUICK_KEYS = [('C', 'major'), ('E-', 'major'), ('F#', 'major'),
+              ('A', 'minor'), ('B-', 'minor'), ('G#', 'minor')]
+
+# Raw symbols as they arrive from imports (MuseScore shorthand, flats, slashes, junk)
+LEAD_SHEET_SYMBOLS = [
+    'C', 'Cm', 'C7', 'Cmaj7', 'C^7', 'C-7', 'Cm7b5', 'Cø7', 'C07', 'Co7', 'Cdim7', 'C+',
+    'Dm7', 'D-9', 'G7', 'G7(b9)', 'G7b9', 'G13', 'G7#11', 'Gsus4', 'G7sus4', 'G7alt',
+    'Bb7', 'Bbmaj7', 'Bbm7b5', 'Ebmaj7', 'Eb^9', 'Ab7', 'Abmaj7', 'Db7', 'Dbt7', 'Gb7',
+    'F#m7', 'F#ø7', 'F#7', 'C#m7b5', 'Bm7b5', 'E7', 'E7#9', 'A7', 'Am6', 'Am(maj7)',
+    'C6', 'C6/9', 'Fmaj9', 'Fmaj7#11', 'F/A', 'C/E', 'Dm7/G', 'G/B', 'Bb/D',
+    'D7b5', 'Emaj7#5', 'N.C.', '', 'X7', 'CMaj',
+]
+
+
+def engine_grid(keys) -> int:
+    failures = 0
+    for tonic, mode in keys:
+        k = key.Key(tonic, mode)
+        checked = 0
+        for root in ROOTS:
+            for quality in QUALITY_THIRDS:
+                symbol = root + quality
+                fast = roman_numeral(symbol, k.tonic.name, k.mode)
+                if fast is None:
+                    continue
+                try:
+                    rn = roman.romanNumeralFromChord(harmony.ChordSymbol(symbol), k)
+                    slow = (rn.romanNumeral, rn.scaleDegree)
+                except Exception as e:
+                    slow = ('error', type(e).__name__)
+                checked += 1
+                if fast != slow:
+                    failures += 1
+                    print(f"  FAIL: {symbol:12s} in {k}: fast {fast}  music21 {slow}")
+        print(f"  {str(k):12s} {checked} symbols checked")
+    return failures
+
+
+def analyzer_parity(keys) -> int:
+    failures = 0
+    analyzer = HarmonicAnalyzer()
+    for tonic, mode in keys:
+        analyzer.current_key = key.Key(tonic, mode)
+        for symbol in LEAD_SHEET_SYMBOLS:
+            fast = analyzer._chord_function(symbol)
+            slow = analyzer._chord_function(symbol, fast=False)
+            if fast != slow:
+                failures += 1
+                print(f"  FAIL: {symbol!r:12s} in {analyzer.current_key}: fast {fast}  music21 {slow}")
+    return failures
+
+
+if __name__ == '__main__':
+    keys = QUICK_KEYS if '--quick' in sys.argv else ALL_KEYS
+
+    print("=== roman_numeral() vs romanNumeralFromChord ===")
+    grid_failures = engine_grid(keys)
+
+    print("\n=== HarmonicAnalyzer._chord_function, fast vs music21 ===")
+    analyzer_failures = analyzer_parity(keys)
+    print(f"  {len(LEAD_SHEET_SYMBOLS) * len(keys)} symbol/key pairs checked")
+
+    total = grid_failures + analyzer_failures
+    print(f"\n{'ALL PASS' if total == 0 else f'{total} FAILURES'}")
+    sys.exit(1 if total else 0)
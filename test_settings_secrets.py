@@ -0,0 +1,138 @@
+"""Secrets resolved once per process (Settings.secrets / SecretsSnapshot).
+
+Replaces the secret lookup with a counting fake and checks that every
+secret is looked up once, that reading settings and building the database
+connection string afterwards does no lookups, that refresh_secrets() and
+the db_password_ttl rotation re-fetch (and keep rotating after a failed
+re-fetch), that the local-development fallbacks still apply, and that a
+failed database login refreshes the password and retries once.
+
+    python test_settings_secrets.py
+"""
+import os
+import sys
+sys.path.insert(0, os.path.dirname(__file__))
+
+import config.settings as settings_module
+from config.settings import Settings, SecretsSnapshot
+
+failures = 0
+
+
+def check(label, got, expected):
+    global failures
+    if got == expected:
+        print(f"  PASS: {label}")
+    else:
+        failures += 1
+        print(f"  FAIL: {label}: got {got!r}, expected {expected!r}")
+
+
+store = {}
+lookups = []
+
+
+def fake_lookup(secret_id, project_id):
+    lookups.append(secret_id)
+    if secret_id in store:
+        return store[secret_id], 'secret_manager'
+    return None, 'missing'
+
+
+settings_module._lookup_secret = fake_lookup
+for name in ('JWT_SECRET_KEY', 'GOOGLE_CLIENT_ID', 'GOOGLE_CLIENT_SECRET', 'DB_PASSWORD_TTL'):
+    os.environ.pop(name, None)
+store.update({'harmonylab-db-server': 'db.example', 'harmonylab-db-name': 'HarmonyLab',
+              'harmonylab-db-user': 'app', 'harmonylab-db-password': 'pw-1',
+              'harmonylab-google-client-id': 'client-id'})
+
+print("\n=== Resolved once ===")
+s = Settings()
+check("nothing resolved on construction", lookups, [])
+check("db_server", s.db_server, 'db.example')
+check("every secret looked up once", sorted(lookups), sorted(
+    ['harmonylab-db-server', 'harmonylab-db-name', 'harmonylab-db-user', 'harmonylab-db-password',
+     'harmonylab-jwt-secret', 'harmonylab-google-client-id', 'harmonylab-google-client-secret',
+     'anthropic-api-key']))
+lookups.clear()
+for _ in range(100):
+    s.db_server, s.db_name, s.db_user, s.db_password, s.jwt_secret_key, s.google_client_id
+check("repeated reads do no lookups", lookups, [])
+check("snapshot is shared", s.secrets() is s.secrets(), True)
+try:
+    s.secrets().db_password = 'x'
+    check("snapshot is immutable", None, 'FrozenInstanceError')
+except AttributeError:
+    check("snapshot is immutable", True, True)
+check("snapshot type", type(s.secrets()), SecretsSnapshot)
+
+print("\n=== Report and fallbacks ===")
+report = {r['name']: r['source'] for r in s.secrets().report()}
+check("report sources", (report['harmonylab-db-password'], report['harmonylab-jwt-secret'],
+                         report['anthropic-api-key']), ('secret_manager', 'default', 'missing'))
+check("report has no values", any('pw-1' in str(r) for r in s.secrets().report()), False)
+jwt_key = s.jwt_secret_key
+check("development JWT key is stable", s.jwt_secret_key, jwt_key)
+check("missing optional secret", s.google_client_secret, None)
+try:
+    s.anthropic_api_key
+    check("missing required secret raises", None, 'ValueError')
+except ValueError:
+    check("missing required secret raises", True, True)
+
+print("\n=== Refresh and rotation ===")
+store['harmonylab-db-password'] = 'pw-2'
+check("rotation not seen before refresh", s.db_password, 'pw-1')
+s.refresh_secrets(password_only=True)
+check("password-only refresh", (s.db_password, lookups), ('pw-2', ['harmonylab-db-password']))
+check("refresh keeps the development JWT key", s.refresh_secrets().jwt_secret_key, jwt_key)
+store['harmonylab-db-password'] = 'pw-3'
+os.environ['DB_PASSWORD_TTL'] = '0.01'
+import time
+time.sleep(0.02)
+lookups.clear()
+check("password re-fetched after the TTL", s.db_password, 'pw-3')
+check("only the password re-fetched", lookups, ['harmonylab-db-password'])
+del store['harmonylab-db-password']   # Secret Manager briefly unavailable
+time.sleep(0.02)
+check("failed re-fetch keeps the previous password", s.db_password, 'pw-3')
+check("failed re-fetch keeps the source", {r['name']: r['source'] for r in s.secrets().report()}
+      ['harmonylab-db-password'], 'secret_manager')
+store['harmonylab-db-password'] = 'pw-3b'
+time.sleep(0.02)
+lookups.clear()
+check("rotation resumes after a failed re-fetch", (s.db_password, lookups),
+      ('pw-3b', ['harmonylab-db-password']))
+os.environ['DB_PASSWORD_TTL'] = '0'
+
+print("\n=== Connection path ===")
+import pyodbc
+from app.db import connection
+
+
+class FakeError(pyodbc.Error):
+    pass
+
+
+attempts = []
+
+
+def fake_connect(conn_str, autocommit=True):
+    attempts.append(conn_str)
+    if 'PWD=pw-4;' not in conn_str:
+        raise FakeError('28000', 'Login failed for user')
+    return object()
+
+
+connection.settings = s
+connection.pyodbc.connect = fake_connect
+lookups.clear()
+check("connection string needs no lookups", ('PWD=pw-3b;' in connection.db.connection_string, lookups),
+      (True, []))
+store['harmonylab-db-password'] = 'pw-4'
+connection.db.get_connection()
+check("login failure refreshes the password and retries", (len(attempts), lookups),
+      (2, ['harmonylab-db-password']))
+
+print(f"\n{'ALL PASS' if failures == 0 else f'{failures} FAILURES'}")
+sys.exit(1 if failures else 0)
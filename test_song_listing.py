@@ -0,0 +1,178 @@
+"""Narrow song listing queries and the SongArtifacts side store.
+
+Checks that list_songs / get_song / get_song_audit name their Songs columns
+instead of SELECT *, that list_songs pages by the (created_at, id) keyset
+cursor it hands out in X-Next-Cursor, and that raw XML and section markers
+round-trip through app.services.song_artifacts (packed, on SQLite).
+
+    python test_song_listing.py
+"""
+import asyncio
+import glob
+import os
+import re
+import sqlite3
+import sys
+from contextlib import contextmanager
+from datetime import datetime
+sys.path.insert(0, os.path.dirname(__file__))
+
+from fastapi import HTTPException, Response
+from app.api.routes import songs
+from app.services import song_artifacts
+
+failures = 0
+
+
+def check(label, got, expected):
+    global failures
+    if got == expected:
+        print(f"  PASS: {label}")
+    else:
+        failures += 1
+        print(f"  FAIL: {label}: got {got!r}, expected {expected!r}")
+
+
+class Tx:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def execute(self, query, params=()):
+        return self.conn.execute(query, params).rowcount
+
+
+class SqliteDb:
+    def __init__(self):
+        self.conn = sqlite3.connect(':memory:', isolation_level=None)
+        self.conn.execute("""
+            CREATE TABLE SongArtifacts (song_id INT, kind TEXT, content BLOB NOT NULL,
+                                        text_length INT NOT NULL, PRIMARY KEY (song_id, kind))
+        """)
+
+    def execute_scalar(self, query, params=()):
+        row = self.conn.execute(query, params).fetchone()
+        return row[0] if row else None
+
+    @contextmanager
+    def transaction(self):
+        self.conn.execute("BEGIN")
+        try:
+            yield Tx(self.conn)
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+
+
+def as_datetime2(value):
+    """A created_at parameter as DATETIME2(7) text, the way SQL Server casts it."""
+    if isinstance(value, datetime):
+        return value.isoformat(' ', 'microseconds') + '0'
+    whole, _, fraction = value.partition('.')
+    return f"{whole}.{fraction:0<7}"
+
+
+class ListingDb:
+    """Answers the listing query from an in-memory song list, recording the SQL.
+
+    created_at is held as DATETIME2(7) text and handed back the way pyodbc
+    fetches it: a datetime cut to microseconds.
+    """
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.queries = []
+
+    def execute_query(self, query, params=()):
+        self.queries.append((query, params))
+        rows = sorted(self.rows, key=lambda r: (r['created_at'], r['id']), reverse=True)
+        params = list(params)
+        if 'AND id < ?' in query:
+            created_at, _, song_id = params[-5:-2]
+            rows = [r for r in rows if (r['created_at'], r['id']) < (as_datetime2(created_at), song_id)]
+        skip, limit = params[-2:]
+        return [dict(r, created_at=datetime.fromisoformat(r['created_at'][:26]),
+                     cursor_created_at=r['created_at'], fs_modified_at=None)
+                for r in rows[skip:skip + limit]]
+
+
+def page(db, **kwargs):
+    response = Response()
+    kwargs.setdefault('limit', 100)
+    rows = asyncio.run(songs.list_songs(response, db=db, skip=kwargs.pop('skip', 0),
+                                        genre=kwargs.pop('genre', None), **kwargs))
+    return rows, response.headers.get('X-Next-Cursor')
+
+
+xml = '<?xml version="1.0"?><museScore>' + '<Chord><Note><pitch>60</pitch></Note></Chord>' * 2000 + '</museScore>'
+
+print("\n=== put / get (SQLite) ===")
+db = SqliteDb()
+check("missing artifact", song_artifacts.get(1, song_artifacts.RAW_XML, db), None)
+song_artifacts.put(1, song_artifacts.RAW_XML, xml, db)
+song_artifacts.put(1, song_artifacts.SECTION_MARKERS, '[{"measure": 1, "label": "A"}]', db)
+check("raw xml read back", song_artifacts.get(1, song_artifacts.RAW_XML, db), xml)
+stored = db.execute_scalar("SELECT content FROM SongArtifacts WHERE kind = 'raw_xml'")
+check("stored packed, below 10% of the text", (stored[0], len(stored) < len(xml) // 10), (1, True))
+song_artifacts.put(1, song_artifacts.RAW_XML, '<score/>', db)
+check("re-import replaces", song_artifacts.get(1, song_artifacts.RAW_XML, db), '<score/>')
+check("one row per kind", db.execute_scalar("SELECT COUNT(*) FROM SongArtifacts"), 2)
+song_artifacts.put(1, song_artifacts.RAW_XML, None, db)
+check("None removes", song_artifacts.get(1, song_artifacts.RAW_XML, db), None)
+check("other kind kept", song_artifacts.get(1, song_artifacts.SECTION_MARKERS, db),
+      '[{"measure": 1, "label": "A"}]')
+try:
+    song_artifacts.get(1, 'analysis', db)
+    check("unknown kind rejected", False, True)
+except ValueError:
+    check("unknown kind rejected", True, True)
+
+print("\n=== Keyset pagination ===")
+# Three songs share a created_at, as a batch import produces. GETDATE() fills
+# the 100ns digit, which pyodbc drops, and neighbouring groups land in the
+# same microsecond.
+library = [{'id': i, 'title': f"Song {i}",
+            'created_at': f"2026-01-01 00:{i // 6:02d}:00.123333{3 + i // 3 % 2}"}
+           for i in range(1, 26)]
+db = ListingDb(library)
+seen, cursor, pages = [], None, 0
+while True:
+    rows, cursor = page(db, limit=7, after=cursor)
+    seen += [r['id'] for r in rows]
+    pages += 1
+    if not cursor:
+        break
+expected = [r['id'] for r in sorted(library, key=lambda r: (r['created_at'], r['id']), reverse=True)]
+check("cursor walk returns every song once, newest first", seen, expected)
+check("pages", pages, 4)
+check("offset pages agree", [r['id'] for r in page(db, limit=7, skip=7)[0]], expected[7:14])
+check("short page has no cursor", page(db, limit=100)[1], None)
+rows, cursor = page(db, limit=2)
+check("cursor keeps the stored precision", cursor, f"{library[-1]['created_at']},{rows[-1]['id']}")
+check("tied page boundary", [r['id'] for r in page(db, limit=7, after=cursor)[0]], expected[2:9])
+try:
+    page(db, after='not-a-cursor')
+    check("bad cursor is a 400", False, True)
+except HTTPException as e:
+    check("bad cursor is a 400", e.status_code, 400)
+
+query = db.queries[0][0]
+check("listing names its columns", '*' not in query.replace('p.*', ''), True)
+check("listing never touches artifacts", re.search(r'raw_xml|section_markers', query), None)
+check("projection matches the Song model",
+      set(songs.SONG_COLUMNS) | {'fs_modified_at'}, set(songs.Song.model_fields))
+
+print("\n=== No SELECT * on Songs, no artifact columns read ===")
+offenders = []
+for path in glob.glob('app/**/*.py', recursive=True):
+    if path.endswith('migrations.py'):
+        continue
+    source = open(path).read()
+    if re.search(r'SELECT\s+(s\.)?\*\s*(,[^\n]*)?\s+FROM\s+Songs\b', source):
+        offenders.append(path)
+    if re.search(r'\b(raw_xml|section_markers_json)\s*=\s*\?|SELECT[^"]*section_markers_json', source):
+        offenders.append(path)
+check("no route reads whole Songs rows or artifact columns", offenders, [])
+
+print(f"\n{'ALL PASS' if failures == 0 else f'{failures} FAILURES'}")
+sys.exit(1 if failures else 0)
@@ -0,0 +1,84 @@
+"""Lazy imports, the startup timeline and the background warm-up (app.startup).
+
+Imports main.py in a fresh interpreter and checks that none of the heavy
+dependencies (music21, anthropic, mido, Pillow, the Secret Manager client)
+were loaded, then runs the app's startup through TestClient and waits for
+the warm-up thread to fill the chord caches.
+
+    python test_startup.py
+"""
+import json
+import os
+import subprocess
+import sys
+import time
+sys.path.insert(0, os.path.dirname(__file__))
+
+failures = 0
+
+
+def check(label, got, expected):
+    global failures
+    if got == expected:
+        print(f"  PASS: {label}")
+    else:
+        failures += 1
+        print(f"  FAIL: {label}: got {got!r}, expected {expected!r}")
+
+
+HEAVY = ('music21', 'anthropic', 'mido', 'PIL', 'pdf2image', 'google.cloud.secretmanager')
+# Secrets injected as env vars (as on Cloud Run) keep startup off Secret Manager
+SECRETS = {'JWT_SECRET': 'test-secret', 'DB_SERVER': 'localhost', 'DB_NAME': 'HarmonyLab',
+           'DB_USER': 'sa', 'DB_PASSWORD': 'test-password', 'GOOGLE_CLIENT_ID': 'client-id',
+           'GOOGLE_CLIENT_SECRET': 'client-secret', 'ANTHROPIC_API_KEY': 'test-key'}
+env = dict(os.environ, **SECRETS)
+
+print("\n=== Importing main.py loads no heavy dependency ===")
+probe = subprocess.run(
+    [sys.executable, '-c',
+     'import json, sys, main\n'
+     f'print(json.dumps([m for m in {HEAVY!r} if m in sys.modules]))\n'
+     'print(json.dumps(main.timeline.snapshot()))'],
+    cwd=os.path.dirname(os.path.abspath(__file__)), env=env, capture_output=True, text=True,
+)
+lines = probe.stdout.strip().splitlines()
+check("main imports", probe.returncode, 0)
+if probe.returncode == 0:
+    check("heavy modules loaded at import", json.loads(lines[-2]), [])
+    snapshot = json.loads(lines[-1])
+    check("secrets and imports phases recorded", [p['name'] for p in snapshot['phases']],
+          ['secrets', 'imports'])
+    check("not ready before startup", snapshot['ready_ms'], None)
+else:
+    print(probe.stderr[-2000:])
+
+print("\n=== Startup timeline and warm-up ===")
+os.environ.update(SECRETS)
+os.environ['STARTUP_WARMUP'] = 'true'
+from fastapi.testclient import TestClient
+import main
+from app import startup
+from app.services.analysis_service import chord_cache_stats
+from app.services.midi_parser import _chord_table
+
+# No database here: migrations and the pool fill fail non-fatally, which is what is timed
+main.app.router.on_startup[:] = [main.startup_event]
+with TestClient(main.app) as client:
+    body = client.get('/health/startup').json()
+    names = [p['name'] for p in body['phases']]
+    check("startup phases in order", names[:5], ['secrets', 'imports', 'migrations', 'db_pool', 'ready'])
+    check("secrets report", {r['source'] for r in body['secrets']}, {'env'})
+    check("ready offset reported", body['ready_ms'] is not None and body['ready_ms'] >= 0, True)
+    deadline = time.time() + 120
+    while startup.timeline.snapshot()['warmup'] == 'running' and time.time() < deadline:
+        time.sleep(0.1)
+    body = client.get('/health/startup').json()
+    check("warm-up finished", body['warmup'], 'done')
+    check("warm-up phases", [p['name'] for p in body['phases'] if p['name'].startswith('warmup.')],
+          ['warmup.music21', 'warmup.chord_table', 'warmup.chord_caches'])
+    check("chord table built", _chord_table.cache_info().currsize, 1)
+    check("chord parse cache filled", chord_cache_stats()['parse']['size'] >= 84, True)
+    check("warm-up runs once", startup.start_warm_up(), None)
+
+print(f"\n{'ALL PASS' if failures == 0 else f'{failures} FAILURES'}")
+sys.exit(1 if failures else 0)